@@ -29,6 +29,8 @@ from apps.tb_UI import *
 from apps.tb_UI import *
 import maya
 import apps.tb_fileTools as ft
+import apps.tb_dataStore as dataStore
+import apps.tb_markingMenuCache as markingMenuCache
 
 # compatible with Python 2 *and* 3:
 ABC = abc.ABCMeta('ABC', (object,), {'__slots__': ()})
@@ -137,6 +139,15 @@ class toolAbstractFactory(ABC):
     bookendBakeOption = 'tbBookendBake'
     bookendBakeHighlightOption = 'tbBookendBakeHighlight'
     mainDataOption = 'tb_mainDataOption'
+    dataBackendOption = 'tbDataBackend'
+
+    # what qtMarkingMenu's result depends on, the result is cached against it.
+    # Tools that don't override qtMarkingMenu are static
+    markingMenuStatic = markingMenuCache.scopeStatic
+    markingMenuRig = markingMenuCache.scopeRig
+    markingMenuSelection = markingMenuCache.scopeSelection
+    markingMenuScope = markingMenuSelection
+    saveQueueExitJob = None
 
     def __new__(cls):
         if toolAbstractFactory.__instance is None:
@@ -189,15 +200,48 @@ class toolAbstractFactory(ABC):
     def saveData(self):
         self.initData()
         self.toJson()
-        self.saveJsonFile(self.dataFile, self.classData)
+        self.saveJsonFileDeferred(self.dataFile, self.classData)
+        self.clearMarkingMenuCache()
+
+    def getDataStore(self):
+        """
+        The storage backend for the appData folder, picked by the data backend option
+        :return:
+        """
+        if getattr(self, 'dataPath', None) is None:
+            toolAbstractFactory.initData(self)
+        return dataStore.getDataStore(self.dataPath,
+                                      pm.optionVar.get(self.dataBackendOption, dataStore.defaultBackend))
 
     def saveJsonFile(self, filePath, data):
-        fileName = os.path.join(filePath)
-        jsonString = json.dumps(data, indent=4, separators=(',', ': '))
-        jsonFile = open(fileName, 'w')
+        self.getDataStore().save(filePath, data)
 
-        jsonFile.write(jsonString)
-        jsonFile.close()
+    def saveJsonFileDeferred(self, filePath, data):
+        """
+        Queue the save to be written in the background, loads through the data store see it straight away
+        :param filePath:
+        :param data:
+        :return:
+        """
+        if toolAbstractFactory.saveQueueExitJob is None:
+            toolAbstractFactory.saveQueueExitJob = cmds.scriptJob(event=['quitApplication', dataStore.flushSaves])
+        self.getDataStore().saveDeferred(filePath, data)
+
+    def migrateAppData(self):
+        """
+        Copy the json appData files into the single file store
+        :return:
+        """
+        toolAbstractFactory.initData(self)
+        dataStore.flushSaves()
+        store = dataStore.getDataStore(self.dataPath, dataStore.backendSqlite)
+        if not isinstance(store, dataStore.SqliteStore):
+            return raiseError('sqlite3 is not available, appData can not be migrated')
+        migrated, failed = dataStore.migrateJsonTree(self.dataPath, store)
+        if failed:
+            cmds.warning('Could not read %s' % ', '.join(failed))
+        raiseOk('Migrated %d appData files to %s' % (len(migrated), store.databaseFile),
+                title='appData migrated')
 
     def revertAppData(self):
         pm.optionVar['mainDataOption'] = os.path.normpath(os.path.dirname(__file__))
@@ -219,6 +263,7 @@ class toolAbstractFactory(ABC):
             return
         if selected_directory == self.dataPath:
             return cmds.warning('Cannot copy to that location')
+        dataStore.flushSaves()
         # get the subfolder appData
         result_directory = os.path.join(selected_directory, 'appData')
         # copy the whole existing folder structure to the new location
@@ -238,9 +283,10 @@ class toolAbstractFactory(ABC):
 
     def loadData(self):
         self.initData()
-        if not os.path.isfile(self.dataFile):
+        store = self.getDataStore()
+        if not store.exists(self.dataFile):
             self.saveData()
-        self.rawJsonData = json.load(open(self.dataFile))
+        self.rawJsonData = store.load(self.dataFile)
 
     def loadRigData(self, dataCLS, rigName):
         subPath = os.path.join(self.dataPath, self.toolName)
@@ -255,14 +301,15 @@ class toolAbstractFactory(ABC):
         :return:
         """
         dataFile = os.path.join(self.subPath, refname + '.json')
-        self.saveJsonFile(dataFile, json.loads(jsonData))
+        self.saveJsonFileDeferred(dataFile, json.loads(jsonData))
+        self.clearMarkingMenuCache()
 
     def saveRigFileIfNew(self, refname, jsonData):
         self.subPath = os.path.join(self.dataPath, self.toolName)
         if not os.path.isdir(self.subPath):
             os.mkdir(self.subPath)
         dataFile = os.path.join(self.subPath, refname + '.json')
-        if not os.path.isfile(os.path.join(dataFile)):
+        if not self.getDataStore().exists(dataFile):
             self.saveJsonFile(dataFile, json.loads(jsonData))
 
     def updatePreview(self, scale=1, optionVar=str(), drawType='orb'):
@@ -324,8 +371,21 @@ class toolAbstractFactory(ABC):
             cmds.deleteUI('tempMM')
 
     def qtMarkingMenu(self, inputNodes):
+        """
+        Items this tool adds to the viewport marking menu, see tb_markingMenuCache.menuItem
+        :param inputNodes: selected nodes
+        :return:
+        """
         return list()
 
+    def clearMarkingMenuCache(self):
+        """
+        Call when something this tool's marking menu is built from has changed
+        :return:
+        """
+        if self.allTools:
+            self.allTools.clearMarkingMenuCache(self.toolName)
+
     def animLayerTabUI(self):
         return list()
 
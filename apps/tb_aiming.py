@@ -30,6 +30,7 @@ import maya.api.OpenMaya as om2
 import pymel.core.datatypes as dt
 import math
 from Abstract import *
+from apps.tb_markingMenuCache import menuItem
 
 import maya.api.OpenMaya as OpenMaya
 import maya.OpenMaya as om
@@ -139,6 +140,7 @@ class AimTools(toolAbstractFactory):
     toolName = 'AimTools'
     hotkeyClass = hotkeys()
     funcs = functions()
+    markingMenuScope = toolAbstractFactory.markingMenuStatic
 
     foundControls = dict()  # use this to save the last used settings to a file
     axisDict = {'x': om.MVector.xAxis,
@@ -301,6 +303,16 @@ class AimTools(toolAbstractFactory):
                       command=self.setDefaultUI,
                       )
 
+    def qtMarkingMenu(self, inputNodes):
+        return [menuItem('Quick Aim at Temp Control', 'aimAtTempControl'),
+                menuItem('Quick Aim', 'quickAim'),
+                menuItem('Quick aim X Y', 'quickAimXY'),
+                menuItem('Quick aim Z Y', 'quickAimZY'),
+                menuItem('Quick aim X Z', 'quickAimXZ'),
+                menuItem('Quick aim Y Z', 'quickAimYZ'),
+                menuItem('Quick aim Y X', 'quickAimYX'),
+                menuItem('Quick aim Z X', 'quickAimZX')]
+
     """
     Functions
     """
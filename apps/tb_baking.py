@@ -546,16 +546,17 @@ class BakeTools(toolAbstractFactory):
         with self.funcs.suspendUpdate():
             try:
                 if sel:
-                    for s in sel:
-                        # loc = self.funcs.tempLocator(name=s, suffix='baked')
+                    scale = pm.optionVar.get(self.tbBakeLocatorSizeOption, 1)
+                    tempControls = self.funcs.tempControls([{'name': s,
+                                                             'suffix': 'baked',
+                                                             'drawType': 'cross',
+                                                             'scale': scale} for s in sel])
+                    for s, loc in zip(sel, tempControls):
                         ps = pm.PyNode(s)
                         ns = ps.namespace()
                         if not cmds.objExists(ns + self.assetName):
                             self.createAsset(ns + self.assetName, imageName=None)
                         asset = ns + self.assetName
-                        loc = self.funcs.tempControl(name=s, suffix='baked', drawType='cross',
-                                                     scale=pm.optionVar.get(self.tbBakeLocatorSizeOption, 1))
-                        pm.setAttr(loc + '.rotateOrder')
                         pm.addAttr(loc, ln=self.constraintTargetAttr, at='message')
                         pm.connectAttr(s + '.message', loc + '.' + self.constraintTargetAttr)
                         const = cmds.parentConstraint(str(s), str(loc))
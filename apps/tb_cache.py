@@ -27,8 +27,13 @@ TODO - add option for combining selections into one cache object, feature to rel
 """
 import pymel.core as pm
 import maya.cmds as cmds
+import uuid
 
 from Abstract import *
+from apps.tb_cacheJobs import CacheJob, CacheJobScheduler, findMayapy
+import apps.tb_cacheChunks as cacheChunks
+import maya.api.OpenMaya as om2
+import apps.tb_visibility as tb_visibility
 
 qtVersion = pm.about(qtVersion=True)
 if int(qtVersion.split('.')[0]) < 5:
@@ -58,6 +63,10 @@ class hotkeys(hotKeyAbstractFactory):
                                      annotation='',
                                      category=self.category,
                                      command=['CacheTool.cacheSelectedCharacters(disableReferences=True)']))
+        self.addCommand(self.tb_hkey(name='cancelBackgroundCacheExports',
+                                     annotation='Cancel the queued and running background cache exports',
+                                     category=self.category,
+                                     command=['CacheTool.cancelExportJobs()']))
         self.addCommand(self.tb_hkey(name='importCache',
                                      annotation='Open a file dialog to import cache files',
                                      category=self.category,
@@ -85,7 +94,7 @@ class MeshData(object):
         return returnDict
 
     def fromJson(self, data):
-        rawJsonData = json.load(open(data))
+        rawJsonData = dataStore.loadJson(data)
 
         self.meshGroups = rawJsonData.get('meshGroups', list())
 
@@ -104,9 +113,16 @@ class CacheTool(toolAbstractFactory):
     gpuCachImportTypeOption = 'tbGpuCacheType'
     gpuCacheType_values = ['GPU', 'ALembic']
     gpuCacheType_default = 'GPU'
+    backgroundExportOption = 'tbCacheBackgroundExport'
+    exportWorkersOption = 'tbCacheExportWorkers'
+    chunkedExportOption = 'tbCacheChunkedExport'
+    chunkSizeOption = 'tbCacheChunkSize'
+    jobFolderName = '.tbCacheJobs'
 
     loadedMeshData = dict()
     namespaceToCharDict = dict()
+    exportScheduler = None
+    exportTimer = None
 
     def __new__(cls):
         if CacheTool.__instance is None:
@@ -136,8 +152,26 @@ class CacheTool(toolAbstractFactory):
                                           optionVar=self.gpuCachImportTypeOption,
                                           defaultValue=self.gpuCacheType_values[0], label='Import mode')
 
+        backgroundWidget = optionVarBoolWidget('Export caches in the background',
+                                               self.backgroundExportOption)
+        workersWidget = intFieldWidget(optionVar=self.exportWorkersOption,
+                                       defaultValue=2,
+                                       label='Background exports at once',
+                                       minimum=1, maximum=16, step=1)
+
+        chunkedWidget = optionVarBoolWidget('Export in frame blocks, only re-export changed blocks',
+                                            self.chunkedExportOption)
+        chunkSizeWidget = intFieldWidget(optionVar=self.chunkSizeOption,
+                                         defaultValue=100,
+                                         label='Frames per block',
+                                         minimum=10, maximum=1000, step=10)
+
         self.layout.addWidget(dirWidget)
         self.layout.addWidget(fileTypeWidget)
+        self.layout.addWidget(backgroundWidget)
+        self.layout.addWidget(workersWidget)
+        self.layout.addWidget(chunkedWidget)
+        self.layout.addWidget(chunkSizeWidget)
         self.layout.addStretch()
         return self.optionWidget
 
@@ -223,6 +257,11 @@ class CacheTool(toolAbstractFactory):
 
         fileName = cmds.file(query=True, sceneName=True, shortName=True)
         fileName = fileName.split('.')[0]
+        background = pm.optionVar.get(self.backgroundExportOption, False)
+        if background and findMayapy() is None:
+            cmds.warning('mayapy not found, exporting in this session instead of in the background')
+            background = False
+        sceneSnapshot = None
 
         for ns in characters.keys():
             charMeshes = self.allTools.tools['CharacterTool'].getAllMeshes(sel)
@@ -232,13 +271,101 @@ class CacheTool(toolAbstractFactory):
             allMeshes.extend(charMeshes)
 
             refNode, fileReference = self.getReference(charMeshes[0])
-            outputFile = self.exportCache(charMeshes, name=fileName + '_' + ns)
-            cacheNode = self.importCache(outputFile)
-            if refNode:
-                cmds.addAttr(str(cacheNode), ln='refNode', dt='string')
-                cmds.setAttr(str(cacheNode) + '.refNode', refNode, type='string')
-            if disableReferences:
-                self.unloadReference(refNode)
+            if background:
+                if sceneSnapshot is None:
+                    sceneSnapshot = self.saveSceneSnapshot(fileName)
+                    if not sceneSnapshot:
+                        return
+                self.submitExportJob(charMeshes, fileName + '_' + ns, sceneSnapshot,
+                                     refNode=refNode, disableReferences=disableReferences)
+                continue
+            if pm.optionVar.get(self.chunkedExportOption, False):
+                outputFile = self.exportCacheChunked(charMeshes, name=fileName + '_' + ns)
+            else:
+                outputFile = self.exportCache(charMeshes, name=fileName + '_' + ns)
+            if not outputFile:
+                continue
+            self.swapInCache(outputFile, refNode, disableReferences)
+
+    def swapInCache(self, outputFile, refNode, disableReferences=False):
+        cacheNode = self.importCache(outputFile)
+        if refNode:
+            cmds.addAttr(str(cacheNode), ln='refNode', dt='string')
+            cmds.setAttr(str(cacheNode) + '.refNode', refNode, type='string')
+        if disableReferences:
+            self.unloadReference(refNode)
+
+    def getJobFolder(self):
+        outputFolder = self.getExportFolder()
+        if not outputFolder:
+            return None
+        return os.path.join(outputFolder, self.jobFolderName)
+
+    def saveSceneSnapshot(self, name):
+        """
+        Write the scene as it is now for the background exports to open, the open scene is left as it is.
+        Every submission gets its own snapshot so queued jobs never open a later one
+        :param name:
+        :return: snapshot file path
+        """
+        jobFolder = self.getJobFolder()
+        if not jobFolder:
+            return cmds.warning('No output folder selected')
+        if not os.path.isdir(jobFolder):
+            os.makedirs(jobFolder)
+        snapshot = os.path.join(jobFolder, '%s_%s_snapshot.mb' % (name, uuid.uuid4().hex)).replace('\\', '/')
+        cmds.file(snapshot, force=True, exportAll=True, preserveReferences=True, type='mayaBinary')
+        return snapshot
+
+    def getExportScheduler(self):
+        if self.exportScheduler is None:
+            CacheTool.exportScheduler = CacheJobScheduler(onProgress=self.exportJobProgress,
+                                                          onComplete=self.exportJobComplete,
+                                                          onFailed=self.exportJobFailed)
+        self.exportScheduler.maxWorkers = int(pm.optionVar.get(self.exportWorkersOption, 2))
+        return self.exportScheduler
+
+    def submitExportJob(self, exportObjects, name, sceneSnapshot, refNode=None, disableReferences=False, abc=True):
+        outputFolder = self.getExportFolder()
+        job = CacheJob(name,
+                       cmds.ls(exportObjects, long=True),
+                       cmds.playbackOptions(query=True, min=True),
+                       cmds.playbackOptions(query=True, max=True),
+                       os.path.join(outputFolder, name + '.abc').replace('\\', '/'),
+                       sceneFile=sceneSnapshot,
+                       abc=abc,
+                       options={'refNode': refNode, 'disableReferences': disableReferences},
+                       jobFolder=self.getJobFolder())
+        self.getExportScheduler().submit(job)
+        self.startExportTimer()
+        self.funcs.infoMessage(prefix='Cache', message=' %s queued' % name)
+        return job
+
+    def startExportTimer(self):
+        if self.exportTimer is None:
+            CacheTool.exportTimer = QTimer()
+            self.exportTimer.timeout.connect(self.pollExportJobs)
+        if not self.exportTimer.isActive():
+            self.exportTimer.start(500)
+
+    def pollExportJobs(self):
+        if not self.exportScheduler.poll():
+            self.exportTimer.stop()
+
+    def cancelExportJobs(self):
+        if not self.exportScheduler:
+            return
+        cancelled = self.exportScheduler.cancelAll()
+        self.funcs.infoMessage(prefix='Cache', message=' %d exports cancelled' % cancelled)
+
+    def exportJobProgress(self, job):
+        self.funcs.infoMessage(prefix='Cache', message=' %s %d%%' % (job.name, int(job.progress * 100)))
+
+    def exportJobComplete(self, job):
+        self.swapInCache(job.outputFile, job.options.get('refNode', None), job.options.get('disableReferences', False))
+
+    def exportJobFailed(self, job):
+        cmds.warning('Cache export failed for %s\n%s' % (job.name, job.error))
 
     def unloadReference(self, refNnode):
         cmds.file(unloadReference=refNnode)
@@ -260,13 +387,18 @@ class CacheTool(toolAbstractFactory):
     def getSkinCLustersForNamespace(self, ns):
         skinClusters = pm.ls(ns + ':*', type='skinCluster')
         meshes = [str(a) for b in [n.outputGeometry.connections() for n in skinClusters] for a in b if a]
-        visibleMeshes = [m for m in meshes if self.isNodeVisible(m)]
+        longNames = self.getLongNames(meshes)
+        resolver = tb_visibility.getVisibilityResolver([path for path in longNames if path])
+        visibleMeshes = [m for m, path in zip(meshes, longNames) if path and resolver.isVisible(path)]
         return visibleMeshes
 
-    def exportCache(self, exportObjects, name='test', abc=True):
-        startTime = cmds.playbackOptions(query=True, min=True)
-        endTime = cmds.playbackOptions(query=True, max=True)
-        outputFolder = self.getExportFolder()
+    def exportCache(self, exportObjects, name='test', abc=True, startTime=None, endTime=None, outputFolder=None):
+        if startTime is None:
+            startTime = cmds.playbackOptions(query=True, min=True)
+        if endTime is None:
+            endTime = cmds.playbackOptions(query=True, max=True)
+        if outputFolder is None:
+            outputFolder = self.getExportFolder()
         if not outputFolder:
             return cmds.warning('No output folder selected')
         if abc:
@@ -298,7 +430,100 @@ class CacheTool(toolAbstractFactory):
                           saveMultipleFiles=False)
         return os.path.join(outputFolder, name + '.abc')
 
+    def getSourceCurves(self, exportObjects):
+        """
+        Keys of every anim curve upstream of the export objects
+        :param exportObjects:
+        :return: dict of curve: (times, values, tangent angles, infinity)
+        """
+        curves = dict()
+        for curve in cmds.ls(cmds.listHistory(exportObjects) or list(), type='animCurve'):
+            times = cmds.keyframe(curve, query=True, timeChange=True) or list()
+            values = cmds.keyframe(curve, query=True, valueChange=True) or list()
+            tangents = [cmds.keyTangent(curve, query=True, inAngle=True) or list(),
+                        cmds.keyTangent(curve, query=True, outAngle=True) or list()]
+            infinity = [cmds.setInfinity(curve, query=True, preInfinite=True),
+                        cmds.setInfinity(curve, query=True, postInfinite=True)]
+            curves[curve] = (times, values, tangents, infinity)
+        return curves
+
+    def exportCacheChunked(self, exportObjects, name='test', force=False):
+        """
+        Export the playback range in blocks, only blocks whose source curves changed since
+        the last export are written again
+        :param exportObjects:
+        :param name:
+        :param force: export every block
+        :return: manifest file path
+        """
+        outputFolder = self.getExportFolder()
+        if not outputFolder:
+            return cmds.warning('No output folder selected')
+        blockFolderName = name + '_blocks'
+        blockFolder = os.path.join(outputFolder, blockFolderName)
+        if not os.path.isdir(blockFolder):
+            os.makedirs(blockFolder)
+
+        blockSize = int(pm.optionVar.get(self.chunkSizeOption, 100))
+        blocks = cacheChunks.getBlocks(cmds.playbackOptions(query=True, min=True),
+                                       cmds.playbackOptions(query=True, max=True),
+                                       blockSize)
+        settings = {'roots': cmds.ls(exportObjects, long=True)}
+        hashes = cacheChunks.hashBlocks(self.getSourceCurves(exportObjects), blocks, settings)
+
+        manifestPath = cacheChunks.CacheManifest.getFilePath(outputFolder, name)
+        manifest = None
+        if not force and os.path.isfile(manifestPath):
+            manifest = cacheChunks.CacheManifest().fromJson(manifestPath)
+            if manifest.settings != settings or manifest.blockSize != blockSize:
+                manifest = None
+        if manifest is None:
+            manifest = cacheChunks.CacheManifest(name=name, blockSize=blockSize, settings=settings)
+        for entry in manifest.trim(blocks):
+            oldFile = os.path.join(outputFolder, entry['file'])
+            if os.path.isfile(oldFile):
+                os.remove(oldFile)
+
+        dirtyBlocks = cacheChunks.planDirtyBlocks(manifest, blocks, hashes, folder=outputFolder)
+        for index, (block, blockHash) in enumerate(dirtyBlocks):
+            blockName = os.path.splitext(cacheChunks.getBlockFileName(name, block))[0]
+            self.funcs.infoMessage(prefix='Cache',
+                                   message=' %s block %d/%d' % (name, index + 1, len(dirtyBlocks)))
+            self.exportCache(exportObjects, name=blockName, startTime=block[0], endTime=block[1],
+                             outputFolder=blockFolder)
+            manifest.setBlock(block, blockFolderName + '/' + blockName + '.abc', blockHash)
+            # saved per block so an interrupted export keeps what finished
+            manifest.save(manifestPath)
+        manifest.save(manifestPath)
+        return manifestPath
+
+    def importChunkedCache(self, filename, pointCloud=False, alembic=False):
+        """
+        Import each block of a chunked cache under one root, keying visibility so only
+        the block for the current frame shows
+        :param filename: manifest file
+        :return:
+        """
+        manifest = cacheChunks.CacheManifest().fromJson(filename)
+        folder = os.path.dirname(filename)
+        cacheRoot = self.funcs.tempControl(name=manifest.name or str(os.path.basename(filename)).split('.')[0],
+                                           suffix='Root',
+                                           drawType='flatRotator')
+        for index, entry in enumerate(manifest.blocks):
+            blockNode = self.importCache(os.path.join(folder, entry['file']), pointCloud=pointCloud, alembic=alembic)
+            pm.parent(blockNode, cacheRoot)
+            visibility = str(blockNode) + '.visibility'
+            if index:
+                cmds.setKeyframe(visibility, time=entry['start'] - 1, value=0)
+            cmds.setKeyframe(visibility, time=entry['start'], value=1)
+            if index < len(manifest.blocks) - 1:
+                cmds.setKeyframe(visibility, time=entry['end'] + 1, value=0)
+            cmds.keyTangent(visibility, outTangentType='step')
+        return cacheRoot
+
     def importCache(self, filename, pointCloud=False, alembic=False):
+        if filename.endswith(cacheChunks.manifestExtension):
+            return self.importChunkedCache(filename, pointCloud=pointCloud, alembic=alembic)
         mode = None
         if pointCloud:
             mode = self.gpuCacheType_values[0]
@@ -327,7 +552,7 @@ class CacheTool(toolAbstractFactory):
         return cacheNodeParent
 
     def importCacheDialog(self):
-        fileFilter = "gpu cache (*.abc)"
+        fileFilter = "gpu cache (*.abc);;chunked cache (*%s)" % cacheChunks.manifestExtension
         importedFiles = cmds.fileDialog2(fileFilter=fileFilter,
                                          fileMode=4,
                                          dialogStyle=1,
@@ -339,17 +564,26 @@ class CacheTool(toolAbstractFactory):
             self.importCache(f)
 
     def isNodeVisible(self, node):
-        if not cmds.objExists(node):
-            return False
-        if not cmds.attributeQuery("visibility", node=node, exists=True):
+        path = self.getLongNames([node])[0]
+        if not path:
             return False
-        visible = cmds.getAttr(node + '.visibility')
-        if not visible:
-            return False
-        parents = cmds.listRelatives(node, parent=True)
-        if parents:
-            visible = self.isNodeVisible(parents[0])
-        return visible
+        return tb_visibility.getVisibilityResolver([path]).isVisible(path)
+
+    @staticmethod
+    def getLongNames(nodes):
+        """
+        :param nodes:
+        :return: full dag path per node, None for anything missing or not a dag node
+        """
+        longNames = list()
+        for node in nodes:
+            selectionList = om2.MSelectionList()
+            try:
+                selectionList.add(node)
+                longNames.append(selectionList.getDagPath(0).fullPathName())
+            except (RuntimeError, TypeError):
+                longNames.append(None)
+        return longNames
 
     def getReference(self, obj):
         refState = cmds.referenceQuery(str(obj), isNodeReferenced=True)
@@ -0,0 +1,202 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+import os
+import json
+import bisect
+import hashlib
+from array import array
+
+'''
+Maya-free planning for range chunked caches.
+
+The frame range is split into fixed blocks, each block gets a hash of every anim
+curve key that can affect it (the keys inside it plus the key either side, for
+tangents and infinity) and only blocks whose hash changed are exported again.
+The manifest records the block files so importCache can stitch them back together.
+
+Curves are passed as a dict of curve name: (times, values[, keyData[, curveData]]),
+times must be ascending. keyData is a list of per key number lists lined up with
+times (tangent angles, weights) and is windowed per block like the values,
+curveData is any json-able data for the whole curve (infinity) and goes into
+every block.
+'''
+
+manifestVersion = 1
+manifestExtension = '.abcm'
+
+
+def getBlocks(startTime, endTime, blockSize):
+    """
+    :param startTime:
+    :param endTime:
+    :param blockSize: frames per block
+    :return: list of (start, end) inclusive frame ranges covering startTime to endTime
+    """
+    startTime = int(startTime)
+    endTime = int(endTime)
+    blockSize = max(1, int(blockSize))
+    # blocks line up on multiples of blockSize so changing the range doesn't shift every block
+    first = startTime - (startTime % blockSize)
+    blocks = list()
+    for blockStart in range(first, endTime + 1, blockSize):
+        blocks.append((max(blockStart, startTime), min(blockStart + blockSize - 1, endTime)))
+    return blocks
+
+
+def packDoubles(values):
+    packed = array('d', values)
+    if hasattr(packed, 'tobytes'):
+        return packed.tobytes()
+    return packed.tostring()
+
+
+def hashBlocks(curves, blocks, settings=None):
+    """
+    :param curves: dict of curve name: (times, values[, keyData[, curveData]])
+    :param blocks: from getBlocks
+    :param settings: anything else the cache depends on, hashed into every block
+    :return: list of hex digests, one per block
+    """
+    hashers = list()
+    settingsString = json.dumps(settings, sort_keys=True).encode('utf-8')
+    for block in blocks:
+        hasher = hashlib.sha1(settingsString)
+        hasher.update(packDoubles(block))
+        hashers.append(hasher)
+
+    for name in sorted(curves.keys()):
+        curve = curves[name]
+        times = curve[0]
+        values = curve[1]
+        keyData = curve[2] if len(curve) > 2 else list()
+        curveData = json.dumps(curve[3], sort_keys=True).encode('utf-8') if len(curve) > 3 else b''
+        nameBytes = name.encode('utf-8')
+        count = len(times)
+        for hasher, (blockStart, blockEnd) in zip(hashers, blocks):
+            # only the keys that shape this block, so editing a key elsewhere leaves it clean
+            first = max(0, bisect.bisect_left(times, blockStart) - 1)
+            last = min(count, bisect.bisect_right(times, blockEnd) + 1)
+            hasher.update(nameBytes)
+            hasher.update(packDoubles(times[first:last]))
+            hasher.update(packDoubles(values[first:last]))
+            for data in keyData:
+                hasher.update(packDoubles(data[first:last]))
+            if curveData:
+                hasher.update(curveData)
+    return [hasher.hexdigest() for hasher in hashers]
+
+
+def getBlockFileName(name, block):
+    return '{0}_{1}_{2}.abc'.format(name, int(block[0]), int(block[1]))
+
+
+class CacheManifest(object):
+    """
+    The block files that make up a chunked cache, stored next to them
+    """
+
+    def __init__(self, name=str(), blockSize=100, settings=None):
+        self.name = name
+        self.blockSize = blockSize
+        self.settings = settings or dict()
+        # list of dicts with start, end, file (relative to the manifest) and hash
+        self.blocks = list()
+
+    @staticmethod
+    def getFilePath(folder, name):
+        return os.path.join(folder, name + manifestExtension)
+
+    def json_serialize(self):
+        return {'version': manifestVersion,
+                'name': self.name,
+                'blockSize': self.blockSize,
+                'settings': self.settings,
+                'blocks': self.blocks}
+
+    def save(self, filePath):
+        tempPath = filePath + '.tmp'
+        with open(tempPath, 'w') as manifestFile:
+            json.dump(self.json_serialize(), manifestFile, indent=4, separators=(',', ': '))
+        if os.path.exists(filePath):
+            os.remove(filePath)
+        os.rename(tempPath, filePath)
+
+    def fromJson(self, data):
+        with open(data) as manifestFile:
+            rawJsonData = json.load(manifestFile)
+        self.name = rawJsonData.get('name', str())
+        self.blockSize = rawJsonData.get('blockSize', 100)
+        self.settings = rawJsonData.get('settings', dict())
+        self.blocks = rawJsonData.get('blocks', list())
+        return self
+
+    def getBlock(self, block):
+        for entry in self.blocks:
+            if entry['start'] == block[0] and entry['end'] == block[1]:
+                return entry
+        return None
+
+    def setBlock(self, block, fileName, blockHash):
+        entry = self.getBlock(block)
+        if entry is None:
+            entry = {'start': block[0], 'end': block[1]}
+            self.blocks.append(entry)
+            self.blocks.sort(key=lambda x: x['start'])
+        entry['file'] = fileName
+        entry['hash'] = blockHash
+
+    def trim(self, blocks):
+        """
+        Drop entries for blocks that are no longer part of the cache
+        :return: removed entries
+        """
+        wanted = set(tuple(block) for block in blocks)
+        removed = [entry for entry in self.blocks if (entry['start'], entry['end']) not in wanted]
+        self.blocks = [entry for entry in self.blocks if (entry['start'], entry['end']) in wanted]
+        return removed
+
+    def getFiles(self, folder):
+        return [os.path.join(folder, entry['file']) for entry in self.blocks]
+
+
+def planDirtyBlocks(manifest, blocks, hashes, fileExists=None, folder=str()):
+    """
+    :param manifest: CacheManifest from the last export, or None
+    :param blocks:
+    :param hashes: from hashBlocks
+    :param fileExists: callable for a block file path, defaults to os.path.isfile
+    :param folder: where the block files live
+    :return: list of (block, hash) that need exporting
+    """
+    fileExists = fileExists or os.path.isfile
+    dirty = list()
+    for block, blockHash in zip(blocks, hashes):
+        entry = manifest.getBlock(block) if manifest else None
+        if entry is None or entry.get('hash', None) != blockHash:
+            dirty.append((block, blockHash))
+            continue
+        if not fileExists(os.path.join(folder, entry['file'])):
+            dirty.append((block, blockHash))
+    return dirty
@@ -0,0 +1,377 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+import os
+import sys
+import json
+import uuid
+import subprocess
+
+'''
+Background cache export jobs.
+
+A job is a json spec written next to its progress file, a runner starts a process
+for it and the scheduler polls those processes, keeping at most maxWorkers running
+in submission order and retrying failures. The job, progress and scene snapshot
+files are deleted once the jobs using them finish. Maya-free, the default runner starts
+tb_cacheWorker.py in mayapy, any other runner only needs a start(job) that returns
+something with poll() and terminate()
+'''
+
+statusQueued = 'queued'
+statusRunning = 'running'
+statusDone = 'done'
+statusFailed = 'failed'
+statusCancelled = 'cancelled'
+
+
+class CacheJob(object):
+    def __init__(self, name, roots, startTime, endTime, outputFile, sceneFile=str(), abc=True, options=None,
+                 jobFolder=str()):
+        """
+        :param name: cache name
+        :param roots: long names of the export roots
+        :param startTime:
+        :param endTime:
+        :param outputFile: the .abc being written
+        :param sceneFile: scene snapshot the worker opens
+        :param abc: AbcExport if True, gpuCache otherwise
+        :param options: anything the caller wants back when the job finishes
+        :param jobFolder: where the job and progress files go
+        """
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.roots = list(roots)
+        self.startTime = startTime
+        self.endTime = endTime
+        self.outputFile = outputFile
+        self.sceneFile = sceneFile
+        self.abc = abc
+        self.options = options or dict()
+        self.jobFolder = jobFolder
+        self.status = statusQueued
+        self.attempts = 0
+        self.progress = 0.0
+        self.error = str()
+
+    @property
+    def jobFile(self):
+        return os.path.join(self.jobFolder, self.name + '_' + self.id + '.job.json')
+
+    @property
+    def progressFile(self):
+        return os.path.join(self.jobFolder, self.name + '_' + self.id + '.progress.json')
+
+    def json_serialize(self):
+        return {'id': self.id,
+                'name': self.name,
+                'roots': self.roots,
+                'startTime': self.startTime,
+                'endTime': self.endTime,
+                'outputFile': self.outputFile,
+                'sceneFile': self.sceneFile,
+                'abc': self.abc,
+                'options': self.options,
+                'progressFile': self.progressFile,
+                }
+
+    def save(self):
+        if not os.path.isdir(self.jobFolder):
+            os.makedirs(self.jobFolder)
+        with open(self.jobFile, 'w') as jobFile:
+            json.dump(self.json_serialize(), jobFile, indent=4, separators=(',', ': '))
+
+    @classmethod
+    def fromJson(cls, data):
+        with open(data) as jobFile:
+            rawJsonData = json.load(jobFile)
+        job = cls(rawJsonData['name'], rawJsonData['roots'], rawJsonData['startTime'], rawJsonData['endTime'],
+                  rawJsonData['outputFile'],
+                  sceneFile=rawJsonData.get('sceneFile', str()),
+                  abc=rawJsonData.get('abc', True),
+                  options=rawJsonData.get('options', dict()),
+                  jobFolder=os.path.dirname(data))
+        job.id = rawJsonData['id']
+        return job
+
+    def readProgress(self):
+        """
+        :return: dict with status, frame and error written by the worker, empty if nothing written yet
+        """
+        try:
+            with open(self.progressFile) as progressFile:
+                return json.load(progressFile)
+        except (IOError, OSError, ValueError):
+            # not written yet, or caught mid write
+            return dict()
+
+    def clearProgress(self):
+        removeFile(self.progressFile)
+
+    def deleteFiles(self):
+        for path in [self.jobFile, self.progressFile, self.progressFile + '.tmp']:
+            removeFile(path)
+
+
+def removeFile(path):
+    """
+    Delete path if it is there, a file a terminated worker still has open is left behind
+    """
+    if not os.path.isfile(path):
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def writeProgress(progressFile, status, frame=None, error=str()):
+    """
+    Called from the worker, written to a temp file and swapped in so the scheduler never reads half a file
+    """
+    tempFile = progressFile + '.tmp'
+    with open(tempFile, 'w') as f:
+        json.dump({'status': status, 'frame': frame, 'error': error}, f)
+    if hasattr(os, 'replace'):
+        os.replace(tempFile, progressFile)
+    else:
+        if os.path.exists(progressFile):
+            os.remove(progressFile)
+        os.rename(tempFile, progressFile)
+
+
+def getMayaBinFolders():
+    """
+    Folders mayapy can be in for the running maya, MAYA_LOCATION first
+    :return: list of folders
+    """
+    folders = list()
+    mayaLocation = os.environ.get('MAYA_LOCATION', None)
+    if mayaLocation:
+        folders.append(os.path.join(mayaLocation, 'bin'))
+        # macOS MAYA_LOCATION is Maya.app/Contents, allow for it pointing at the bundle or install folder
+        folders.append(os.path.join(mayaLocation, 'Contents', 'bin'))
+        folders.append(os.path.join(mayaLocation, 'Maya.app', 'Contents', 'bin'))
+    executableFolder = os.path.dirname(sys.executable)
+    folders.append(executableFolder)
+    # macOS runs Maya.app/Contents/MacOS/Maya, mayapy is in Contents/bin
+    folders.append(os.path.join(os.path.dirname(executableFolder), 'bin'))
+    return folders
+
+
+def findMayapy():
+    """
+    :return: mayapy path, None if it can't be found
+    """
+    if os.path.basename(sys.executable).lower().startswith('mayapy'):
+        return sys.executable
+    for folder in getMayaBinFolders():
+        for name in ['mayapy.exe', 'mayapy']:
+            path = os.path.join(folder, name)
+            if os.path.isfile(path):
+                return path
+    return None
+
+
+def getMayapy():
+    """
+    Never falls back to sys.executable, inside maya that is the gui
+    :return: mayapy path
+    """
+    mayapy = findMayapy()
+    if mayapy is None:
+        raise OSError('mayapy not found in MAYA_LOCATION (%s) or next to %s'
+                      % (os.environ.get('MAYA_LOCATION', 'not set'), sys.executable))
+    return mayapy
+
+
+class ScriptRunner(object):
+    """
+    Runs script with the job file as its only argument
+    """
+
+    def __init__(self, script, executable=None):
+        self.script = script
+        self.executable = executable
+
+    def getExecutable(self):
+        return self.executable or sys.executable
+
+    def start(self, job):
+        return subprocess.Popen([self.getExecutable(), self.script, job.jobFile])
+
+
+class MayapyRunner(ScriptRunner):
+    def __init__(self, executable=None):
+        super(MayapyRunner, self).__init__(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                        'tb_cacheWorker.py'),
+                                           executable=executable)
+
+    def getExecutable(self):
+        # looked up per start so a missing mayapy fails the job with a clear error
+        return self.executable or getMayapy()
+
+
+class CacheJobScheduler(object):
+    def __init__(self, runner=None, maxWorkers=2, maxRetries=1, onProgress=None, onComplete=None, onFailed=None,
+                 cleanUp=True):
+        """
+        :param runner: defaults to MayapyRunner
+        :param maxWorkers: processes allowed to run at once
+        :param maxRetries: extra attempts for a failed job
+        :param cleanUp: delete job files, and scene snapshots in the job folder, when jobs finish
+        :param onProgress: called with a job when its progress changes
+        :param onComplete: called with a job once its output is written
+        :param onFailed: called with a job that has run out of retries
+        """
+        self.runner = runner or MayapyRunner()
+        self.maxWorkers = maxWorkers
+        self.maxRetries = maxRetries
+        self.onProgress = onProgress
+        self.onComplete = onComplete
+        self.onFailed = onFailed
+        self.cleanUp = cleanUp
+        self.queue = list()
+        # job id: (job, process)
+        self.running = dict()
+        self.finished = list()
+
+    def submit(self, job):
+        job.status = statusQueued
+        job.save()
+        self.queue.append(job)
+        self.startQueued()
+        return job
+
+    def isIdle(self):
+        return not self.queue and not self.running
+
+    def getJobs(self):
+        return [job for job, process in self.running.values()] + list(self.queue) + list(self.finished)
+
+    def startQueued(self):
+        while self.queue and len(self.running) < self.maxWorkers:
+            job = self.queue.pop(0)
+            job.clearProgress()
+            job.attempts += 1
+            job.status = statusRunning
+            try:
+                process = self.runner.start(job)
+            except (OSError, ValueError) as e:
+                job.error = str(e)
+                self.jobFailed(job)
+                continue
+            self.running[job.id] = (job, process)
+
+    def poll(self):
+        """
+        Check on running jobs and start queued ones, call this regularly from the UI
+        :return: True while there is still work to do
+        """
+        for jobId, (job, process) in list(self.running.items()):
+            progress = job.readProgress()
+            frame = progress.get('frame', None)
+            if frame is not None and job.endTime > job.startTime:
+                progressValue = min(1.0, max(0.0, (frame - job.startTime) / float(job.endTime - job.startTime)))
+                if progressValue != job.progress:
+                    job.progress = progressValue
+                    if self.onProgress:
+                        self.onProgress(job)
+            returnCode = process.poll()
+            if returnCode is None:
+                continue
+            self.running.pop(jobId)
+            if returnCode == 0 and progress.get('status', statusDone) != statusFailed:
+                job.progress = 1.0
+                self.finish(job, statusDone)
+                if self.onComplete:
+                    self.onComplete(job)
+            else:
+                job.error = progress.get('error', str()) or 'exit code %s' % returnCode
+                self.jobFailed(job)
+        self.startQueued()
+        return not self.isIdle()
+
+    def jobFailed(self, job):
+        if job.attempts <= self.maxRetries:
+            job.status = statusQueued
+            # retries go back to the front so jobs still finish in the order given
+            self.queue.insert(0, job)
+            return
+        self.finish(job, statusFailed)
+        if self.onFailed:
+            self.onFailed(job)
+
+    def finish(self, job, status):
+        job.status = status
+        self.finished.append(job)
+        if self.cleanUp:
+            self.cleanUpJob(job)
+
+    def isSceneInUse(self, sceneFile):
+        return any(job.sceneFile == sceneFile for job in self.queue) or \
+               any(job.sceneFile == sceneFile for job, process in self.running.values())
+
+    def cleanUpJob(self, job):
+        """
+        Delete a finished job's files, and its scene snapshot once no other job needs it.
+        Only snapshots saved in the job folder are removed, never a scene opened directly
+        :param job:
+        :return:
+        """
+        job.deleteFiles()
+        if job.sceneFile and not self.isSceneInUse(job.sceneFile):
+            if os.path.dirname(os.path.abspath(job.sceneFile)) == os.path.abspath(job.jobFolder):
+                removeFile(job.sceneFile)
+        if os.path.isdir(job.jobFolder) and not os.listdir(job.jobFolder):
+            try:
+                os.rmdir(job.jobFolder)
+            except OSError:
+                pass
+
+    def cancel(self, jobId):
+        for job in self.queue:
+            if job.id == jobId:
+                self.queue.remove(job)
+                self.finish(job, statusCancelled)
+                return True
+        if jobId in self.running:
+            job, process = self.running.pop(jobId)
+            process.terminate()
+            self.finish(job, statusCancelled)
+            self.startQueued()
+            return True
+        return False
+
+    def cancelAll(self):
+        """
+        :return: number of jobs cancelled
+        """
+        cancelled = 0
+        # queued first, so cancelling a running job doesn't start the next one
+        for job in list(self.queue):
+            cancelled += self.cancel(job.id)
+        for jobId in list(self.running.keys()):
+            cancelled += self.cancel(jobId)
+        return cancelled
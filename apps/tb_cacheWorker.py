@@ -0,0 +1,90 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+import os
+import sys
+import traceback
+
+'''
+Runs one cache export job in mayapy, started by CacheJobScheduler
+
+    mayapy tb_cacheWorker.py <job file>
+'''
+
+
+def export(job):
+    import maya.cmds as cmds
+    import maya.mel as mel
+    from apps.tb_cacheJobs import writeProgress, statusRunning
+
+    cmds.file(job.sceneFile, open=True, force=True, prompt=False)
+    startTime = job.startTime
+    endTime = job.endTime
+    writeProgress(job.progressFile, statusRunning, startTime)
+    if job.abc:
+        cmds.loadPlugin('AbcExport', quiet=True)
+        objString = ' '.join(['-root ' + root for root in job.roots])
+        callback = ("import apps.tb_cacheJobs as j;j.writeProgress(r'{progressFile}', '{status}', #FRAME#)".format(
+            progressFile=job.progressFile, status=statusRunning))
+        cmdString = ('AbcExport -j "-frameRange {startTime} {endTime} -ro -worldSpace -dataFormat ogawa '
+                     '-pythonPerFrameCallback \\"{callback}\\" {objString} -file {fileName}"').format(
+            fileName=job.outputFile.replace('\\', '/'),
+            objString=objString,
+            callback=callback,
+            startTime=int(startTime),
+            endTime=int(endTime))
+        mel.eval(cmdString)
+    else:
+        cmds.loadPlugin('gpuCache', quiet=True)
+        outputFolder, fileName = os.path.split(job.outputFile)
+        cmds.gpuCache(job.roots,
+                      startTime=startTime,
+                      endTime=endTime,
+                      dataFormat='ogawa',
+                      optimize=True,
+                      optimizationThreshold=40000,
+                      writeMaterials=True,
+                      directory=outputFolder,
+                      fileName=os.path.splitext(fileName)[0],
+                      saveMultipleFiles=False)
+
+
+def main(jobFile):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from apps.tb_cacheJobs import CacheJob, writeProgress, statusDone, statusFailed
+
+    job = CacheJob.fromJson(jobFile)
+    try:
+        import maya.standalone
+        maya.standalone.initialize(name='python')
+        export(job)
+    except Exception:
+        writeProgress(job.progressFile, statusFailed, error=traceback.format_exc())
+        return 1
+    writeProgress(job.progressFile, statusDone, job.endTime)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1]))
@@ -27,6 +27,9 @@ import maya.cmds as cmds
 import maya.mel as mel
 from Abstract import *
 from tb_UI import *
+from apps.tb_eventDispatcher import EventDispatcher
+import apps.tb_pointMath as pointMath
+import maya.api.OpenMaya as om2
 import time
 qtVersion = pm.about(qtVersion=True)
 if int(qtVersion.split('.')[0]) < 5:
@@ -68,19 +71,64 @@ def unit_conversion():
     return conversion[pm.currentUnit(query=True, linear=True)]
 
 
-def midPoint(pointArray):
-    midPoint = [0, 0, 0]
-
-    # Get Center Point
-    total = len(pointArray)
-    for point in pointArray:
-        midPoint = [midPoint[0] + point[0], midPoint[1] + point[1], midPoint[2] + point[2]]
-
-    # Calculate Average Position
-    midPoint = [midPoint[0] / total, midPoint[1] / total, midPoint[2] / total]
-
-    # Return Result
-    return midPoint
+def getSelectedComponentPoints():
+    """
+    World positions of the selected vertices, curve and surface cvs and face vertices, read with one
+    getPoints/cvPositions call per shape straight from the active selection list. Other cv
+    components fall back to cmds.pointPosition, anything else is skipped
+    :return: dict of 'vertices', 'cvs', 'faces': list of points in ui units
+    """
+    result = {'vertices': list(), 'cvs': list(), 'faces': list()}
+    fallbackPoints = list()
+    selection = om2.MGlobal.getActiveSelectionList()
+    shapePoints = dict()
+    toUiUnits = 1.0 / unit_conversion()
+
+    def getPoints(dagPath, reader):
+        key = dagPath.fullPathName()
+        if key not in shapePoints:
+            shapePoints[key] = reader(dagPath)
+        return shapePoints[key]
+
+    for index in range(selection.length()):
+        try:
+            dagPath, component = selection.getComponent(index)
+        except (TypeError, RuntimeError):
+            continue
+        if component.isNull():
+            continue
+        apiType = component.apiType()
+        if apiType == om2.MFn.kMeshVertComponent:
+            elements = om2.MFnSingleIndexedComponent(component).getElements()
+            points = getPoints(dagPath, lambda x: om2.MFnMesh(x).getPoints(om2.MSpace.kWorld))
+            result['vertices'].extend(points[i] for i in elements)
+        elif apiType == om2.MFn.kMeshPolygonComponent:
+            elements = om2.MFnSingleIndexedComponent(component).getElements()
+            points = getPoints(dagPath, lambda x: om2.MFnMesh(x).getPoints(om2.MSpace.kWorld))
+            mfnMesh = om2.MFnMesh(dagPath)
+            vertexIds = set()
+            for face in elements:
+                vertexIds.update(mfnMesh.getPolygonVertices(face))
+            result['faces'].extend(points[i] for i in sorted(vertexIds))
+        elif apiType == om2.MFn.kCurveCVComponent:
+            elements = om2.MFnSingleIndexedComponent(component).getElements()
+            points = getPoints(dagPath, lambda x: om2.MFnNurbsCurve(x).cvPositions(om2.MSpace.kWorld))
+            result['cvs'].extend(points[i] for i in elements)
+        elif apiType == om2.MFn.kSurfaceCVComponent:
+            elements = om2.MFnDoubleIndexedComponent(component).getElements()
+            points = getPoints(dagPath, lambda x: om2.MFnNurbsSurface(x).cvPositions(om2.MSpace.kWorld))
+            # cvPositions is u major
+            cvsInV = om2.MFnNurbsSurface(dagPath).numCVsInV
+            result['cvs'].extend(points[u * cvsInV + v] for u, v in elements)
+        else:
+            components = [x for x in selection.getSelectionStrings(index) if '.cv[' in x]
+            for cv in cmds.ls(components, flatten=True) or list():
+                fallbackPoints.append(cmds.pointPosition(cv, world=True))
+    for key, points in result.items():
+        result[key] = [pointMath.scalePoint(point, toUiUnits) for point in points]
+    # pointPosition is already in ui units
+    result['cvs'].extend(fallbackPoints)
+    return result
 
 
 def getPivot(obj):
@@ -99,28 +147,14 @@ def getPivotAsBbox(boundingBox, obj):
     pivot = cmds.xform(obj, query=True, rotatePivot=True, absolute=True, worldSpace=True)
     if not boundingBox:
         return [pivot[0], pivot[1], pivot[2], pivot[0], pivot[1], pivot[2]]
-    else:
-        lowX = min(pivot[0], boundingBox[0])
-        lowY = min(pivot[1], boundingBox[1])
-        lowZ = min(pivot[2], boundingBox[2])
-        highX = max(pivot[0], boundingBox[3])
-        highY = max(pivot[1], boundingBox[4])
-        highZ = max(pivot[2], boundingBox[5])
-        return [lowX, lowY, lowZ, highX, highY, highZ]
+    return pointMath.boundingBox([pivot, boundingBox[:3], boundingBox[3:]])
 
 
 def get_bbox(boundingBox, obj):
     bbox = cmds.exactWorldBoundingBox(obj)
     if not boundingBox:
         return bbox
-    else:
-        lowX = min(bbox[0], boundingBox[0])
-        lowY = min(bbox[1], boundingBox[1])
-        lowZ = min(bbox[2], boundingBox[2])
-        highX = max(bbox[3], boundingBox[3])
-        highY = max(bbox[4], boundingBox[4])
-        highZ = max(bbox[5], boundingBox[5])
-        return [lowX, lowY, lowZ, highX, highY, highZ]
+    return pointMath.boundingBox([bbox[:3], bbox[3:], boundingBox[:3], boundingBox[3:]])
 
 
 def get_bounding_box_mid(box):
@@ -170,16 +204,12 @@ class CameraPivot(toolAbstractFactory):
 
     cameraPivotOption = 'tbCameraPivot'
     frequency = 0.1667
+    subscriberName = 'CameraPivot'
     contextQuery = {'manipMove': getMoveManipPosition,
                     'manipRotate': getRotateManipPosition,
                     'manipScale': getScaleManipPosition,
                     'selectTool': getSelectManipPosition}
 
-    SomethingSelectedScriptJob = int(-1)
-    DragReleaseScriptJob = int(-1)
-    ModelPanelSetFocusScriptJob = int(-1)
-    playbackModeChangedScriptJob = int(-1)
-
     if not pm.optionVar(exists='tumbler_enabled'):
         # TODO - make the option window so this is editable
         pm.optionVar(intValue=('tumbler_enabled', 0))
@@ -194,7 +224,6 @@ class CameraPivot(toolAbstractFactory):
     def __init__(self):
         self.hotkeyClass = hotkeys()
         self.funcs = functions()
-        self.time = cmds.timerX()
 
     """
     Declare an interface for operations that create abstract product
@@ -243,16 +272,12 @@ class CameraPivot(toolAbstractFactory):
             except:
                 Warning("Setting camera tumble pivot on " + cam + "failed!")
 
-    def elapsedTime(self):
-        # print('anti spam: Time - ', self.time, ' frequency - ', self.frequency)
-        return self.time + self.frequency < cmds.timerX()
-
     def doIt(self, *args):
         cmds.undoInfo(stateWithoutFlush=False)
         try:
-            if pm.optionVar.get(self.cameraPivotOption, False) and self.elapsedTime():
-                self.time = cmds.timerX()  # set a new time stamp to prevent spamming
-                selection = cmds.ls(selection=True)
+            if pm.optionVar.get(self.cameraPivotOption, False):
+                snapshot = EventDispatcher().getSelectionSnapshot()
+                selection = snapshot.selection
                 if not selection:
                     return None
                 pivots = []
@@ -285,26 +310,15 @@ class CameraPivot(toolAbstractFactory):
                 else:
                     # print 'not using skinning'
                     boundingBox = []
-                    selected_verts = [v for v in cmds.ls(sl=True, fl=True) if '.vtx' in v]
-                    if selected_verts:
-                        for vertex in selected_verts:
-                            # Get the world translation of the vertex
-                            pivots.append(cmds.xform(vertex, query=True, translation=True, worldSpace=True))
+                    if snapshot.vertices or snapshot.cvs or snapshot.faces:
+                        # vertices win over cvs, cvs over faces
+                        componentPoints = getSelectedComponentPoints()
+                        for key in ['vertices', 'cvs', 'faces']:
+                            if componentPoints[key]:
+                                pivots = componentPoints[key]
+                                break
                     if not pivots:
-                        selected_cv = [v for v in cmds.ls(sl=True, fl=True) if '.cv' in v]
-                        if selected_cv:
-                            for cv in selected_cv:
-                                # Get the world translation of the CV
-                                pivots.append(cmds.pointPosition(cv, world=True))
-                    if not pivots:
-                        selected_faces = [v for v in cmds.ls(sl=True, fl=True) if '.f' in v]
-                        if selected_faces:
-                            vertices = cmds.polyListComponentConversion(selected_faces, fromFace=True, toVertex=True)
-                            for vertex in vertices:
-                                # Get the world translation of the vertex
-                                pivots.append(cmds.xform(vertex, query=True, translation=True, worldSpace=True))
-                    if not pivots:
-                        selected_objects = cmds.ls(selection=True, flatten=True, type='transform', objectsOnly=True)
+                        selected_objects = snapshot.transforms
                         if not len(selected_objects):
                             return
                         pivots = [getPivotAsBbox(boundingBox, selected_objects[-1])]
@@ -328,7 +342,7 @@ class CameraPivot(toolAbstractFactory):
 
                     if pivots:
                         if pivots[0]:
-                            self.update_tumble_pivots(midPoint(pivots))
+                            self.update_tumble_pivots(pointMath.midPoint(pivots))
         finally:
             cmds.undoInfo(stateWithoutFlush=True)
 
@@ -340,34 +354,11 @@ class CameraPivot(toolAbstractFactory):
             self.removePivotScriptJobs()
 
     def removePivotScriptJobs(self):
-        if self.SomethingSelectedScriptJob != -1:
-            try:
-                cmds.scriptJob(kill=self.SomethingSelectedScriptJob)
-            except:
-                pass
-        if self.DragReleaseScriptJob != -1:
-            try:
-                cmds.scriptJob(kill=self.DragReleaseScriptJob)
-            except:
-                pass
-        if self.ModelPanelSetFocusScriptJob != -1:
-            try:
-                cmds.scriptJob(kill=self.ModelPanelSetFocusScriptJob)
-            except:
-                pass
-        if self.playbackModeChangedScriptJob != -1:
-            try:
-                cmds.scriptJob(kill=self.playbackModeChangedScriptJob)
-            except:
-                pass
+        EventDispatcher().unsubscribe(self.subscriberName)
 
     def createCameraPivotScriptJob(self):
-        self.removePivotScriptJobs()
-        if self.SomethingSelectedScriptJob == -1:
-            self.SomethingSelectedScriptJob = cmds.scriptJob(conditionTrue=("SomethingSelected", CameraPivot().doIt))
-        if self.DragReleaseScriptJob == -1:
-            self.DragReleaseScriptJob = cmds.scriptJob(event=("DragRelease", CameraPivot().doIt))
-        # if self.ModelPanelSetFocusScriptJob == -1:
-        #     self.ModelPanelSetFocusScriptJob = cmds.scriptJob(event=("ModelPanelSetFocus", CameraPivot().doIt))
-        if self.playbackModeChangedScriptJob == -1:
-            self.playbackModeChangedScriptJob = cmds.scriptJob(event=("playbackModeChanged", CameraPivot().doIt))
+        EventDispatcher().subscribe(self.subscriberName,
+                                    CameraPivot().doIt,
+                                    events=['DragRelease', 'playbackModeChanged'],
+                                    conditions=['SomethingSelected'],
+                                    interval=self.frequency)
@@ -121,7 +121,7 @@ class CharacterDefinition(object):
         self.topNode = str(topParent)
 
     def fromJson(self, data):
-        rawJsonData = json.load(open(data))
+        rawJsonData = dataStore.loadJson(data)
         # print (rawJsonData)
         sides = rawJsonData.get('sides', dict())
         self.leftSide = sides.get('left', '_l')
@@ -305,18 +305,13 @@ class CharacterDataLibrary(object):
         self.name = filePath.split('/')[-1].split('.')[0]
         self.toJson()
 
-        fileName = os.path.join(filePath)
-        jsonString = json.dumps(self.jsonObjectInfo, indent=4, separators=(',', ': '))
-        jsonFile = open(fileName, 'w')
-        # print ('jsonString',jsonString)
-        jsonFile.write(jsonString)
-        jsonFile.close()
+        dataStore.saveJson(filePath, self.jsonObjectInfo)
 
         self.createFileToRigMapping()
 
     def load(self, filepath):
         # print('load', filepath)
-        jsonObjectInfo = json.load(open(filepath))
+        jsonObjectInfo = dataStore.loadJson(filepath)
         self.UUID_map = jsonObjectInfo.get('UUID_map', dict())
         self.knownTopNodeList = jsonObjectInfo.get('knownTopNodeList', list())
         self.ignoredRigs = jsonObjectInfo.get('ignoredRigs', list())
@@ -516,7 +511,7 @@ class CharacterTool(toolAbstractFactory):
 
         dataFile = os.path.join(self.charTemplateDir, refname + '.json')
         isNew = False
-        if not os.path.isfile(dataFile):
+        if not self.getDataStore().exists(dataFile):
             isNew = True
             self.saveJsonFile(dataFile, dict())
         # TODO - maybe make a class for this?
@@ -557,11 +552,10 @@ class CharacterTool(toolAbstractFactory):
     def getAllCharacters(self):
         self.loadCharacterLibrary()
         self.jsonFiles = list()
-        for filename in os.listdir(self.charTemplateDir):
-            if filename.endswith(".json"):
-                if os.path.basename(filename) == self.libraryFile:
-                    continue
-                self.jsonFiles.append(os.path.join(self.charTemplateDir, filename))
+        for mapName in self.getDataStore().listNames(self.charTemplateDir):
+            if mapName + '.json' == self.libraryFile:
+                continue
+            self.jsonFiles.append(os.path.join(self.charTemplateDir, mapName + '.json'))
         for filename in self.jsonFiles:
             mapName = os.path.basename(filename).split('.')[0]
             self.loadCharacterIfNotLoaded(mapName)
@@ -579,7 +573,8 @@ class CharacterTool(toolAbstractFactory):
             if char.topNode not in self.characterLibrary.knownTopNodeList:
                 self.characterLibrary.knownTopNodeList.append(char.topNode)
 
-        statinfo = os.access(self.libraryFilePath, os.W_OK)
+        # a read only library on disk is shared, leave it alone
+        statinfo = not os.path.isfile(self.libraryFilePath) or os.access(self.libraryFilePath, os.W_OK)
         if statinfo:
             self.saveCharacterLibraryMap()
         # print self.walkDataLibrary.__dict__
@@ -591,7 +586,7 @@ class CharacterTool(toolAbstractFactory):
         self.libraryFile = self.libraryName + '.json'
         self.libraryFilePath = os.path.join(self.charTemplateDir, self.libraryFile)
 
-        if not os.path.isfile(self.libraryFilePath):
+        if not self.getDataStore().exists(self.libraryFilePath):
             self.characterLibrary = CharacterDataLibrary()
             self.saveCharacterLibraryMap()
         else:
@@ -697,6 +692,7 @@ class CharacterTool(toolAbstractFactory):
         # print ('currentChar', self.currentChar)
 
         self.saveJsonFile(self.currentCharData.getJsonFile(), self.currentCharData.toJson())
+        self.allTools.tools['MirrorTools'].clearMirrorPairTable(self.currentChar)
 
         allControls = self.getAllControls()
 
@@ -0,0 +1,140 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+from bisect import bisect_left
+from difflib import SequenceMatcher
+from heapq import heappush, heapreplace
+
+
+def nameGrams(name):
+    return set([name[i:i + 2] for i in range(len(name) - 1)])
+
+
+class ControlNameIndex(object):
+    """
+    Inverted bigram index over the control names of one namespace.
+    Close match queries only score the names whose length can reach the cutoff,
+    using the same SequenceMatcher scoring and ordering as difflib.get_close_matches.
+    Names sharing the most bigrams with the query are scored first, so the best
+    matches fill the result early and weaker names are dropped on their quick ratio
+    bounds without a full ratio.
+    """
+    # slack on the length bounds so float rounding never drops a name difflib keeps
+    lengthTolerance = 1e-6
+
+    def __init__(self, names, namespace=str(), nodeCount=None):
+        """
+        :param names: control names without namespace
+        :param namespace: namespace the names were collected from
+        :param nodeCount: scene node count used to invalidate the index
+        """
+        self.namespace = namespace
+        self.names = list(names)
+        self.nodeCount = len(self.names) if nodeCount is None else nodeCount
+        self.sortedNames = sorted(self.names)
+        self.nameSet = set(self.names)
+        self.grams = dict()
+        self.lengths = dict()
+        self.matchCache = dict()
+        for index, name in enumerate(self.names):
+            self.lengths.setdefault(len(name), set()).add(index)
+            for gram in nameGrams(name):
+                self.grams.setdefault(gram, set()).add(index)
+
+    def isValid(self, namespace, nodeCount):
+        return self.namespace == namespace and self.nodeCount == nodeCount
+
+    def candidates(self, word, cutoff=0.0):
+        """
+        Names that could score at least cutoff against word, most shared bigrams first
+        :param word:
+        :param cutoff:
+        :return:
+        """
+        # difflib's real_quick_ratio bound, 2 * min(a, b) / (a + b) >= cutoff
+        length = len(word)
+        if cutoff > 0:
+            minLength = length * cutoff / (2.0 - cutoff) - self.lengthTolerance
+            maxLength = length * (2.0 - cutoff) / cutoff + self.lengthTolerance
+        else:
+            minLength, maxLength = 0, float('inf')
+        indexes = list()
+        for nameLength, lengthIndexes in self.lengths.items():
+            if minLength <= nameLength <= maxLength:
+                indexes.extend(lengthIndexes)
+
+        sharedGrams = dict()
+        for gram in nameGrams(word):
+            for index in self.grams.get(gram, ()):
+                sharedGrams[index] = sharedGrams.get(index, 0) + 1
+        indexes.sort(key=lambda index: (-sharedGrams.get(index, 0), index))
+        return [self.names[i] for i in indexes]
+
+    def closeMatches(self, word, n=3, cutoff=0.6):
+        """
+        Drop in for difflib.get_close_matches(word, self.names, n, cutoff)
+        :param word:
+        :param n:
+        :param cutoff:
+        :return: list of names, best match first
+        """
+        if n <= 0:
+            raise ValueError('n must be > 0: %r' % (n,))
+        key = (word, n, cutoff)
+        if key in self.matchCache:
+            return list(self.matchCache[key])
+        best = list()
+        matcher = SequenceMatcher()
+        matcher.set_seq2(word)
+        for name in self.candidates(word, cutoff=cutoff):
+            matcher.set_seq1(name)
+            # a name can only get in if it beats the worst of a full result
+            bound = best[0][0] if len(best) >= n else cutoff
+            if matcher.real_quick_ratio() < bound or matcher.quick_ratio() < bound:
+                continue
+            score = matcher.ratio()
+            if score < cutoff:
+                continue
+            if len(best) < n:
+                heappush(best, (score, name))
+            elif (score, name) > best[0]:
+                heapreplace(best, (score, name))
+        matches = [name for score, name in sorted(best, reverse=True)]
+        self.matchCache[key] = matches
+        return list(matches)
+
+    def withPrefix(self, prefix):
+        """
+        All names starting with prefix, in sorted order
+        :param prefix:
+        :return:
+        """
+        start = bisect_left(self.sortedNames, prefix)
+        matching = list()
+        for name in self.sortedNames[start:]:
+            if not name.startswith(prefix):
+                break
+            matching.append(name)
+        return matching
+
@@ -0,0 +1,205 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+import os
+import sys
+import json
+import hashlib
+from array import array
+from collections import OrderedDict
+
+'''
+Maya-free library of the control shapes in appData/controlShapes.json.
+
+The json is only parsed the first time a shape is asked for, each shape is kept as a flat
+array of doubles. Scaled and up axis swapped point sets are kept in a small LRU cache as
+tuples of (x, y, z) so repeat requests from batch tools don't redo the maths. The parsed
+arrays can be written to a sidecar in the user's cache folder, a json header line naming
+the shapes followed by the raw doubles, which is ignored once the json is newer than it.
+The install folder is left alone, it may be shared or read only.
+'''
+
+dataPath = os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir, 'appData', 'controlShapes.json'))
+defaultShape = 'cross'
+sidecarVersion = 1
+
+
+def getUserCacheFolder():
+    """
+    Per user folder for compiled data, inside the maya user folder when running in maya
+    """
+    if os.environ.get('MAYA_APP_DIR'):
+        base = os.path.join(os.environ['MAYA_APP_DIR'], 'cache')
+    elif sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), 'AppData', 'Local')
+    elif sys.platform == 'darwin':
+        base = os.path.join(os.path.expanduser('~'), 'Library', 'Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'tbAnimTools')
+
+
+def getSidecarPath(path, folder=None):
+    """
+    :param path: shapes json
+    :param folder: folder for the sidecar, the user cache folder by default
+    :return: sidecar file, named after the json's full path so installs don't share one
+    """
+    path = os.path.normcase(os.path.abspath(path))
+    name = os.path.splitext(os.path.basename(path))[0]
+    pathHash = hashlib.md5(path.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(folder or getUserCacheFolder(), '%s_%s.cache' % (name, pathHash))
+
+
+class ControlShapeLibrary(object):
+    def __init__(self, path=dataPath, cacheSize=64, useSidecar=True, sidecarFolder=None):
+        """
+        :param path: controlShapes.json
+        :param cacheSize: number of (shape, scale, axis) point sets to keep
+        :param useSidecar: read and write the compiled sidecar file
+        :param sidecarFolder: where the sidecar goes, the user cache folder by default
+        """
+        self.path = path
+        self.sidecarPath = getSidecarPath(path, sidecarFolder)
+        self.cacheSize = cacheSize
+        self.useSidecar = useSidecar
+        self.shapes = None
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        """
+        Read the shapes as flat arrays, from the sidecar if it is up to date
+        :return: dict of shape name: array('d')
+        """
+        if self.shapes is not None:
+            return self.shapes
+        sourceTime = os.path.getmtime(self.path)
+        if self.useSidecar:
+            self.shapes = self.readSidecar(sourceTime)
+        if self.shapes is None:
+            with open(self.path) as f:
+                pointLists = json.load(f)['pointLists']
+            self.shapes = {name: array('d', [float(x) for point in points for x in point])
+                           for name, points in pointLists.items()}
+            if self.useSidecar:
+                self.writeSidecar(sourceTime)
+        return self.shapes
+
+    def readSidecar(self, sourceTime):
+        if not os.path.isfile(self.sidecarPath):
+            return None
+        try:
+            with open(self.sidecarPath, 'rb') as f:
+                header = json.loads(f.readline().decode('utf-8'))
+                if header.get('version', None) != sidecarVersion \
+                        or header.get('mtime', None) != sourceTime \
+                        or header.get('byteorder', None) != sys.byteorder:
+                    return None
+                values = array('d')
+                values.fromfile(f, sum(count for name, count in header['shapes']))
+                if f.read(1):
+                    return None
+        except Exception:
+            return None
+        shapes = dict()
+        start = 0
+        for name, count in header['shapes']:
+            shapes[name] = values[start:start + count]
+            start += count
+        return shapes
+
+    def writeSidecar(self, sourceTime):
+        names = sorted(self.shapes.keys())
+        header = {'version': sidecarVersion,
+                  'mtime': sourceTime,
+                  'byteorder': sys.byteorder,
+                  'shapes': [[name, len(self.shapes[name])] for name in names]}
+        try:
+            folder = os.path.dirname(self.sidecarPath)
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            with open(self.sidecarPath, 'wb') as f:
+                f.write((json.dumps(header) + '\n').encode('utf-8'))
+                for name in names:
+                    self.shapes[name].tofile(f)
+        except (IOError, OSError):
+            # the cache folder may not be writable, the json is still there
+            pass
+
+    def reload(self):
+        self.shapes = None
+        self.cache = OrderedDict()
+        self.load()
+
+    def shapeNames(self):
+        return sorted(self.load().keys())
+
+    def hasShape(self, shape):
+        return shape in self.load()
+
+    def getFlatPoints(self, shape):
+        """
+        :param shape: shape name, unknown shapes fall back to a cross
+        :return: array('d') of x, y, z values, don't modify it
+        """
+        shapes = self.load()
+        return shapes.get(shape, shapes[defaultShape])
+
+    def getPoints(self, shape, scale=1.0, axis='y'):
+        """
+        :param shape: shape name, unknown shapes fall back to a cross
+        :param scale: uniform scale for the points
+        :param axis: up axis, 'z' swaps y and z
+        :return: tuple of (x, y, z)
+        """
+        key = (shape, scale, axis)
+        if key in self.cache:
+            self.hits += 1
+            points = self.cache.pop(key)
+            self.cache[key] = points
+            return points
+        self.misses += 1
+        values = self.getFlatPoints(shape)
+        if scale != 1.0:
+            values = [x * scale for x in values]
+        xs, ys, zs = values[0::3], values[1::3], values[2::3]
+        if axis == 'z':
+            ys, zs = zs, ys
+        points = tuple(zip(xs, ys, zs))
+        self.cache[key] = points
+        while len(self.cache) > self.cacheSize:
+            self.cache.popitem(last=False)
+        return points
+
+
+controlShapeLibrary = None
+
+
+def getControlShapeLibrary():
+    global controlShapeLibrary
+    if controlShapeLibrary is None:
+        controlShapeLibrary = ControlShapeLibrary()
+    return controlShapeLibrary
@@ -0,0 +1,167 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+import math
+
+try:
+    import maya.cmds as cmds
+    import maya.api.OpenMaya as om2
+    import maya.api.OpenMayaAnim as oma2
+except ImportError:
+    cmds = None
+    om2 = None
+    oma2 = None
+
+'''
+Undoable api curve edits.
+
+Tools queue a callable with applyCurveEdit, the tbCurveEdit command runs it with
+an MAnimCurveChange and an MDagModifier and keeps hold of them for undo/redo.
+'''
+
+pluginName = 'tbCurveEdit.py'
+commandName = 'tbCurveEdit'
+pendingEdits = list()
+
+
+def isPluginLoaded():
+    if cmds.pluginInfo(pluginName, query=True, loaded=True):
+        return True
+    try:
+        cmds.loadPlugin(pluginName, quiet=True)
+    except RuntimeError:
+        return False
+    return cmds.pluginInfo(pluginName, query=True, loaded=True)
+
+
+def applyCurveEdit(edit):
+    """
+    Run edit(animCurveChange, dagModifier) as a single undoable step.
+    Without the plugin the edit still runs, it just can't be undone
+    :param edit: callable, anything it creates with the modifier must be done with modifier.doIt()
+    :return: whatever the edit returned
+    """
+    if not isPluginLoaded():
+        cmds.warning('%s is not loaded, curve edits will not be undoable' % pluginName)
+        return edit(oma2.MAnimCurveChange(), om2.MDagModifier())
+    result = dict()
+
+    def run(animCurveChange, dagModifier):
+        result['value'] = edit(animCurveChange, dagModifier)
+
+    pendingEdits.append(run)
+    try:
+        getattr(cmds, commandName)()
+    finally:
+        if run in pendingEdits:
+            pendingEdits.remove(run)
+    return result.get('value', None)
+
+
+def getAnimCurveFn(curve):
+    selectionList = om2.MSelectionList()
+    selectionList.add(curve)
+    return oma2.MFnAnimCurve(selectionList.getDependNode(0))
+
+
+def getCurveForAttribute(attribute, layer=None):
+    """
+    The anim curve driving attribute, on layer if given
+    :param attribute: 'node.attr'
+    :param layer: anim layer name, None for the base/only curve
+    :return: curve name or None
+    """
+    if layer:
+        curves = cmds.animLayer(layer, query=True, findCurveForPlug=attribute) or list()
+    else:
+        curves = cmds.keyframe(attribute, query=True, name=True) or list()
+    return curves[0] if curves else None
+
+
+def toMTimeArray(times):
+    unit = om2.MTime.uiUnit()
+    timeArray = om2.MTimeArray(len(times), om2.MTime())
+    for index, frame in enumerate(times):
+        timeArray[index] = om2.MTime(frame, unit)
+    return timeArray
+
+
+def replaceKeys(mfnCurve, times, values, animCurveChange=None, degrees=True,
+                tangentType=None):
+    """
+    Swap the keys between the first and last time with new ones in one addKeys call
+    :param mfnCurve: MFnAnimCurve
+    :param times: ascending frame list
+    :param values: values in maya's internal units, angles in degrees when degrees=True
+    :param animCurveChange:
+    :param degrees: convert values for angular curves
+    :param tangentType: defaults to kTangentAuto
+    :return:
+    """
+    if not times:
+        return
+    if tangentType is None:
+        tangentType = oma2.MFnAnimCurve.kTangentAuto
+    unit = om2.MTime.uiUnit()
+    startTime = om2.MTime(times[0], unit)
+    endTime = om2.MTime(times[-1], unit)
+    for index in reversed(range(mfnCurve.numKeys)):
+        keyTime = mfnCurve.input(index)
+        if keyTime < startTime:
+            break
+        if keyTime <= endTime:
+            mfnCurve.remove(index, change=animCurveChange)
+    if degrees and mfnCurve.animCurveType == oma2.MFnAnimCurve.kAnimCurveTA:
+        values = [math.radians(x) for x in values]
+    mfnCurve.addKeys(toMTimeArray(times), om2.MDoubleArray(values),
+                     tangentInType=tangentType,
+                     tangentOutType=tangentType,
+                     keepExistingKeys=True,
+                     change=animCurveChange)
+
+
+def redundantKeyIndexes(values):
+    """
+    Indexes of stepped keys that repeat the value of the key before them
+    :param values: key values in time order
+    :return: ascending list of indexes
+    """
+    return [index for index in range(1, len(values)) if values[index] == values[index - 1]]
+
+
+def removeRedundantSteppedKeys(mfnCurve, animCurveChange=None):
+    """
+    Strip repeated values from a stepped curve and make what's left step out/linear in
+    :param mfnCurve: MFnAnimCurve
+    :param animCurveChange:
+    :return: number of keys removed
+    """
+    values = [mfnCurve.value(index) for index in range(mfnCurve.numKeys)]
+    redundant = redundantKeyIndexes(values)
+    for index in reversed(redundant):
+        mfnCurve.remove(index, change=animCurveChange)
+    for index in range(mfnCurve.numKeys):
+        mfnCurve.setOutTangentType(index, oma2.MFnAnimCurve.kTangentStep, change=animCurveChange)
+        mfnCurve.setInTangentType(index, oma2.MFnAnimCurve.kTangentLinear, change=animCurveChange)
+    return len(redundant)
@@ -0,0 +1,536 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+import os
+import copy
+import stat
+import json
+import atexit
+import tempfile
+import threading
+from collections import OrderedDict
+from timeit import default_timer
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+'''
+Storage backends for tool and rig data.
+
+Everything is addressed by the same file paths the tools have always used, the
+JSON backend reads and writes those files directly while the SQLite backend keeps
+anything under the appData folder in a single database with one row per top level
+key of each file. Paths outside the appData folder are always plain JSON files.
+SQLite documents load as a read only LazyDocument that only decodes the keys asked for.
+
+Saves can be deferred through the save queue, a snapshot of the data is taken
+straight away and written out on a worker thread once a file has stopped changing.
+Loads see queued data before it reaches disk.
+'''
+
+backendJson = 'JSON'
+backendSqlite = 'SQLite'
+backendNames = [backendJson, backendSqlite]
+defaultBackend = backendJson
+databaseName = 'tbAnimTools.db'
+extension = '.json'
+
+stores = dict()
+currentStore = None
+
+
+def plainData(data):
+    """
+    :param data: loaded data, LazyDocuments are decoded into a dict
+    :return: something json can dump and callers can edit
+    """
+    if isinstance(data, LazyDocument):
+        return data.toDict()
+    return data
+
+
+def dumpJson(data):
+    return json.dumps(plainData(data), indent=4, separators=(',', ': '))
+
+
+class LazyDocument(Mapping):
+    """
+    Read only view of a stored document, the encoded values are read in one query and
+    each is only decoded the first time its key is asked for. Decoded values are plain
+    data, use toDict or plainData for a dict to edit or dump
+    """
+
+    def __init__(self, entries):
+        """
+        :param entries: list of (key, json text) in saved order
+        """
+        self.encoded = OrderedDict(entries)
+        self.decoded = dict()
+
+    def __getitem__(self, key):
+        if key not in self.decoded:
+            self.decoded[key] = json.loads(self.encoded[key])
+        return self.decoded[key]
+
+    def __iter__(self):
+        return iter(self.encoded)
+
+    def __len__(self):
+        return len(self.encoded)
+
+    def __contains__(self, key):
+        return key in self.encoded
+
+    def __repr__(self):
+        return 'LazyDocument(%s)' % list(self.encoded.keys())
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self.toDict(), memo)
+
+    def toDict(self):
+        return OrderedDict((key, self[key]) for key in self.encoded)
+
+
+def replaceFile(source, destination):
+    if hasattr(os, 'replace'):
+        os.replace(source, destination)
+        return
+    # python 2, rename only overwrites on posix
+    if os.name == 'nt' and os.path.exists(destination):
+        os.remove(destination)
+    os.rename(source, destination)
+
+
+def getUmask():
+    # os.umask can only be read by setting it, do it once here rather than on the save thread
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+newFileMode = 0o666 & ~getUmask()
+
+
+def getFileMode(filePath):
+    """
+    :param filePath:
+    :return: permission bits of the existing file, or what open() would give a new one
+    """
+    try:
+        return stat.S_IMODE(os.stat(filePath).st_mode)
+    except OSError:
+        return newFileMode
+
+
+def writeFileAtomic(filePath, text):
+    """
+    Write to a temp file next to filePath then swap it in, an interrupted
+    write leaves the old file untouched. The file keeps its permissions,
+    temp files are created owner only
+    :param filePath:
+    :param text:
+    :return:
+    """
+    folder = os.path.dirname(os.path.abspath(filePath))
+    mode = getFileMode(filePath)
+    handle, tempPath = tempfile.mkstemp(prefix='.' + os.path.basename(filePath), suffix='.tmp', dir=folder)
+    try:
+        with os.fdopen(handle, 'w') as tempFile:
+            tempFile.write(text)
+            tempFile.flush()
+            os.fsync(tempFile.fileno())
+        os.chmod(tempPath, mode)
+        replaceFile(tempPath, filePath)
+    except BaseException:
+        if os.path.exists(tempPath):
+            os.remove(tempPath)
+        raise
+
+
+class SaveQueue(object):
+    """
+    Write behind queue, repeated saves to the same file inside the delay only
+    write the last one. A file that keeps changing is still written every maxDelay
+    """
+    clock = staticmethod(default_timer)
+
+    def __init__(self, delay=0.25, maxDelay=2.0):
+        self.delay = delay
+        self.maxDelay = maxDelay
+        # filePath: [store, snapshot, due time, first request time]
+        self.pending = dict()
+        self.lock = threading.Lock()
+        # held while popping and writing so an older snapshot can't land after a newer one
+        self.writeLock = threading.RLock()
+        self.wake = threading.Condition(self.lock)
+        self.worker = None
+        self.requests = 0
+        self.writes = 0
+        self.errors = list()
+
+    def save(self, store, filePath, data):
+        filePath = os.path.normpath(filePath)
+        snapshot = copy.deepcopy(data)
+        now = self.clock()
+        with self.lock:
+            self.requests += 1
+            firstRequest = self.pending[filePath][3] if filePath in self.pending else now
+            due = min(now + self.delay, firstRequest + self.maxDelay)
+            self.pending[filePath] = [store, snapshot, due, firstRequest]
+            self.startWorker()
+            self.wake.notify()
+
+    def startWorker(self):
+        if self.worker is not None and self.worker.is_alive():
+            return
+        self.worker = threading.Thread(target=self.run, name='tbSaveQueue')
+        self.worker.daemon = True
+        self.worker.start()
+
+    def isPending(self, filePath):
+        filePath = os.path.normpath(filePath)
+        with self.lock:
+            return filePath in self.pending
+
+    def getPending(self, filePath):
+        """
+        :param filePath:
+        :return: (True, copy of the queued data) or (False, None)
+        """
+        filePath = os.path.normpath(filePath)
+        with self.lock:
+            if filePath not in self.pending:
+                return False, None
+            return True, copy.deepcopy(self.pending[filePath][1])
+
+    def getPendingNames(self, folder):
+        folder = os.path.normpath(folder)
+        with self.lock:
+            paths = list(self.pending.keys())
+        return [os.path.splitext(os.path.basename(path))[0] for path in paths
+                if path.endswith(extension) and os.path.normpath(os.path.dirname(path)) == folder]
+
+    def run(self):
+        while True:
+            with self.lock:
+                while not self.pending:
+                    self.wake.wait()
+                wait = min(entry[2] for entry in self.pending.values()) - self.clock()
+                if wait > 0:
+                    self.wake.wait(wait)
+                    continue
+            self.writeDue()
+
+    def writeDue(self):
+        with self.writeLock:
+            now = self.clock()
+            with self.lock:
+                due = [filePath for filePath, entry in self.pending.items() if entry[2] <= now]
+                entries = [(filePath, self.pending.pop(filePath)) for filePath in due]
+            self.write(entries)
+
+    def flush(self, filePath=None):
+        """
+        Write out queued saves now on the calling thread
+        :param filePath: just this file, defaults to everything
+        :return:
+        """
+        with self.writeLock:
+            with self.lock:
+                paths = list(self.pending.keys()) if filePath is None else [os.path.normpath(filePath)]
+                entries = [(path, self.pending.pop(path)) for path in paths if path in self.pending]
+            self.write(entries)
+
+    def write(self, entries):
+        for filePath, entry in entries:
+            try:
+                entry[0].save(filePath, entry[1])
+                self.writes += 1
+            except Exception as e:
+                self.errors.append((filePath, e))
+
+    def stats(self):
+        return {'requests': self.requests,
+                'writes': self.writes,
+                'pending': len(self.pending),
+                'errors': len(self.errors)}
+
+
+saveQueue = SaveQueue()
+atexit.register(saveQueue.flush)
+
+
+class JsonStore(object):
+    """
+    One indented json file per tool/rig, the original appData layout
+    """
+    name = backendJson
+
+    def __init__(self, rootPath=None):
+        self.rootPath = os.path.normpath(rootPath) if rootPath else None
+
+    def exists(self, filePath):
+        return saveQueue.isPending(filePath) or self.stored(filePath)
+
+    def stored(self, filePath):
+        return os.path.isfile(filePath)
+
+    def load(self, filePath):
+        isPending, data = saveQueue.getPending(filePath)
+        if isPending:
+            return data
+        return self.read(filePath)
+
+    def read(self, filePath):
+        with open(filePath) as jsonFile:
+            return json.load(jsonFile)
+
+    def save(self, filePath, data):
+        writeFileAtomic(filePath, dumpJson(data))
+
+    def saveDeferred(self, filePath, data):
+        """
+        Queue a save, data is copied now and written out shortly after on the save queue's thread
+        :param filePath:
+        :param data:
+        :return:
+        """
+        saveQueue.save(self, filePath, data)
+
+    def listNames(self, folder):
+        """
+        :param folder:
+        :return: file names without the extension of every json file in folder
+        """
+        names = saveQueue.getPendingNames(folder)
+        if os.path.isdir(folder):
+            names += [os.path.splitext(f)[0] for f in os.listdir(folder) if f.endswith(extension)]
+        return sorted(set(names))
+
+
+class SqliteStore(JsonStore):
+    """
+    Single file store, every file under the appData folder becomes a document row
+    (tool folder, file name) with one entry row per top level key. Saves are written
+    through in one transaction, files that have not been migrated yet are imported
+    the first time they are read. Mapping documents are read as a LazyDocument
+    """
+    name = backendSqlite
+
+    def __init__(self, rootPath):
+        super(SqliteStore, self).__init__(rootPath)
+        self.databaseFile = os.path.join(self.rootPath, databaseName)
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(self.databaseFile, check_same_thread=False)
+        with self.connection:
+            self.connection.executescript('''
+                CREATE TABLE IF NOT EXISTS documents (
+                    tool TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    isMapping INTEGER NOT NULL,
+                    PRIMARY KEY (tool, name));
+                CREATE TABLE IF NOT EXISTS entries (
+                    tool TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    PRIMARY KEY (tool, name, key));
+                ''')
+
+    def getRowKey(self, filePath):
+        """
+        :param filePath:
+        :return: (tool, name) for json files under the root folder, None for anything else
+        """
+        if not filePath.endswith(extension):
+            return None
+        try:
+            relativePath = os.path.relpath(os.path.normpath(filePath), self.rootPath)
+        except ValueError:
+            # different drive
+            return None
+        if relativePath.startswith(os.pardir):
+            return None
+        folder, fileName = os.path.split(relativePath[:-len(extension)])
+        return folder.replace(os.sep, '/'), fileName
+
+    def getFolderKey(self, folder):
+        try:
+            relativePath = os.path.relpath(os.path.normpath(folder), self.rootPath)
+        except ValueError:
+            return None
+        if relativePath.startswith(os.pardir):
+            return None
+        if relativePath == os.curdir:
+            return str()
+        return relativePath.replace(os.sep, '/')
+
+    def hasDocument(self, tool, name):
+        with self.lock:
+            cursor = self.connection.execute('SELECT 1 FROM documents WHERE tool=? AND name=?', (tool, name))
+            return cursor.fetchone() is not None
+
+    def stored(self, filePath):
+        rowKey = self.getRowKey(filePath)
+        if rowKey is None:
+            return super(SqliteStore, self).stored(filePath)
+        return self.hasDocument(*rowKey) or super(SqliteStore, self).stored(filePath)
+
+    def read(self, filePath):
+        rowKey = self.getRowKey(filePath)
+        if rowKey is None:
+            return super(SqliteStore, self).read(filePath)
+        tool, name = rowKey
+        with self.lock:
+            row = self.connection.execute('SELECT isMapping FROM documents WHERE tool=? AND name=?',
+                                          (tool, name)).fetchone()
+            if row is None:
+                data = super(SqliteStore, self).read(filePath)
+                self.saveDocument(tool, name, data)
+                return data
+            entries = self.connection.execute('SELECT key, value FROM entries WHERE tool=? AND name=? ORDER BY rowid',
+                                              (tool, name)).fetchall()
+        if not row[0]:
+            return json.loads(entries[0][1])
+        return LazyDocument(entries)
+
+    def save(self, filePath, data):
+        rowKey = self.getRowKey(filePath)
+        if rowKey is None:
+            return super(SqliteStore, self).save(filePath, data)
+        self.saveDocument(rowKey[0], rowKey[1], data)
+
+    def saveDocument(self, tool, name, data):
+        isMapping = isinstance(data, Mapping)
+        if isinstance(data, LazyDocument):
+            # keys that were never decoded go back as they came
+            entries = [(tool, name, key, json.dumps(data.decoded[key]) if key in data.decoded else value)
+                       for key, value in data.encoded.items()]
+        elif isMapping:
+            entries = [(tool, name, key, json.dumps(value)) for key, value in data.items()]
+        else:
+            entries = [(tool, name, str(), json.dumps(data))]
+        with self.lock:
+            with self.connection:
+                self.connection.execute('DELETE FROM entries WHERE tool=? AND name=?', (tool, name))
+                self.connection.execute('INSERT OR REPLACE INTO documents (tool, name, isMapping) VALUES (?, ?, ?)',
+                                        (tool, name, int(isMapping)))
+                self.connection.executemany('INSERT INTO entries (tool, name, key, value) VALUES (?, ?, ?, ?)',
+                                            entries)
+
+    def listNames(self, folder):
+        names = super(SqliteStore, self).listNames(folder)
+        tool = self.getFolderKey(folder)
+        if tool is None:
+            return names
+        with self.lock:
+            stored = [name for name, in self.connection.execute('SELECT name FROM documents WHERE tool=?', (tool,))]
+        return sorted(set(names + stored))
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+def getDataStore(rootPath, backend=defaultBackend):
+    """
+    Shared store for an appData folder
+    :param rootPath: appData folder
+    :param backend: one of backendNames, SQLite falls back to JSON if sqlite3 is missing
+    :return: JsonStore or SqliteStore
+    """
+    global currentStore
+    if backend == backendSqlite and sqlite3 is None:
+        backend = backendJson
+    key = (backend, os.path.normpath(rootPath))
+    if key not in stores:
+        stores[key] = SqliteStore(rootPath) if backend == backendSqlite else JsonStore(rootPath)
+    currentStore = stores[key]
+    return currentStore
+
+
+def flushSaves():
+    saveQueue.flush()
+
+
+def loadJson(filePath):
+    """
+    Load a data file through whichever store the tools are using, for data classes
+    that are handed a file path
+    :param filePath:
+    :return:
+    """
+    if currentStore is None:
+        return JsonStore().load(filePath)
+    return currentStore.load(filePath)
+
+
+def saveJson(filePath, data):
+    """
+    Save a data file through whichever store the tools are using
+    :param filePath:
+    :param data:
+    :return:
+    """
+    if currentStore is None:
+        return JsonStore().save(filePath, data)
+    return currentStore.save(filePath, data)
+
+
+def migrateJsonTree(rootPath, store, overwrite=False):
+    """
+    Copy every json file under rootPath into store
+    :param rootPath: appData folder
+    :param store: SqliteStore for the same folder
+    :param overwrite: replace documents that are already in the store
+    :return: (list of migrated files, list of files that could not be read)
+    """
+    migrated = list()
+    failed = list()
+    jsonStore = JsonStore(rootPath)
+    for folder, _, fileNames in os.walk(rootPath):
+        for fileName in sorted(fileNames):
+            if not fileName.endswith(extension):
+                continue
+            filePath = os.path.join(folder, fileName)
+            rowKey = store.getRowKey(filePath)
+            if rowKey is None:
+                continue
+            if not overwrite and store.hasDocument(*rowKey):
+                continue
+            try:
+                data = jsonStore.read(filePath)
+            except (IOError, OSError, ValueError):
+                failed.append(filePath)
+                continue
+            store.saveDocument(rowKey[0], rowKey[1], data)
+            migrated.append(filePath)
+    return migrated, failed
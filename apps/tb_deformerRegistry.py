@@ -0,0 +1,257 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+import apps.tb_visibility as tb_visibility
+from apps.tb_visibility import getAncestorPaths
+
+try:
+    import maya.cmds as cmds
+    import maya.api.OpenMaya as om2
+    import pymel.core as pm
+except ImportError:
+    cmds = None
+    om2 = None
+    pm = None
+
+suspendDeformerTypesOption = 'tbSuspendDeformerTypes'
+defaultSuspendDeformerTypes = ['skinCluster']
+suspendableDeformerTypes = ['skinCluster', 'blendShape', 'wrap', 'deltaMush', 'ffd']
+# nurbsCurve is left out, every temp control is one
+deformableShapeTypes = ['mesh', 'nurbsSurface', 'subdiv']
+
+sceneMessages = ['kAfterNew',
+                 'kAfterOpen',
+                 'kAfterImport',
+                 'kAfterCreateReference',
+                 'kAfterRemoveReference',
+                 'kAfterLoadReference',
+                 'kAfterUnloadReference']
+
+
+class DeformerRegistry(object):
+    """
+    Caches which deformers drive which shapes, and every ancestor of those shapes,
+    so suspendUpdate doesn't rescan the scene on each entry. The cache is keyed on a
+    scene change counter bumped by callbacks whenever deformers or deformable shapes
+    are added or removed, a node the cache uses is deleted or reparented, or a
+    scene/reference is loaded. Temp controls, nulls and locators made by the bake
+    tools leave it alone.
+    """
+    __instance = None
+    sceneVersion = 0
+    cachedVersion = -1
+    callbackIDs = list()
+
+    # deformer: list of full shape paths
+    deformerShapes = dict()
+    deformerTypes = dict()
+    shapePaths = list()
+    # hash codes of the shapes and their ancestors
+    trackedNodes = set()
+    # deformer: (frozen, nodeState) before suspension
+    suspended = dict()
+    suspendDepth = 0
+
+    def __new__(cls):
+        if DeformerRegistry.__instance is None:
+            DeformerRegistry.__instance = object.__new__(cls)
+            DeformerRegistry.__instance.installCallbacks()
+        return DeformerRegistry.__instance
+
+    def installCallbacks(self):
+        self.removeCallbacks()
+        for message in sceneMessages:
+            self.callbackIDs.append(om2.MSceneMessage.addCallback(getattr(om2.MSceneMessage, message),
+                                                                  self.sceneChanged))
+        for nodeType in ['geometryFilter'] + deformableShapeTypes:
+            self.callbackIDs.append(om2.MDGMessage.addNodeAddedCallback(self.sceneChanged, nodeType))
+            self.callbackIDs.append(om2.MDGMessage.addNodeRemovedCallback(self.sceneChanged, nodeType))
+        self.callbackIDs.append(om2.MDGMessage.addNodeRemovedCallback(self.trackedNodeRemoved, 'dagNode'))
+        self.callbackIDs.append(om2.MDagMessage.addAllDagChangesCallback(self.trackedNodeReparented))
+
+    def removeCallbacks(self):
+        for callbackID in self.callbackIDs:
+            try:
+                om2.MMessage.removeCallback(callbackID)
+            except RuntimeError:
+                pass
+        DeformerRegistry.callbackIDs = list()
+
+    @staticmethod
+    def sceneChanged(*args):
+        DeformerRegistry.sceneVersion += 1
+
+    @staticmethod
+    def getNodeHash(node):
+        return om2.MObjectHandle(node).hashCode()
+
+    def isTracked(self, node):
+        return self.getNodeHash(node) in self.trackedNodes
+
+    def trackedNodeRemoved(self, node, *args):
+        if self.isTracked(node):
+            self.sceneChanged()
+
+    def trackedNodeReparented(self, message, child, parent, *args):
+        if self.isTracked(child.node()):
+            self.sceneChanged()
+
+    @staticmethod
+    def getPolicy():
+        """
+        Deformer types to suspend, set with the tbSuspendDeformerTypes string array optionVar
+        :return:
+        """
+        deformerTypes = pm.optionVar.get(suspendDeformerTypesOption, defaultSuspendDeformerTypes)
+        if not deformerTypes:
+            return list(defaultSuspendDeformerTypes)
+        if not isinstance(deformerTypes, (list, tuple)):
+            deformerTypes = [deformerTypes]
+        return [str(x) for x in deformerTypes]
+
+    @staticmethod
+    def setPolicy(deformerTypes):
+        pm.optionVar.pop(suspendDeformerTypesOption)
+        for deformerType in deformerTypes:
+            pm.optionVar(stringValueAppend=(suspendDeformerTypesOption, deformerType))
+
+    def isCacheValid(self):
+        return self.cachedVersion == self.sceneVersion
+
+    def rebuild(self):
+        """
+        Walk every suspendable deformer downstream to the shapes it finally deforms
+        :return:
+        """
+        DeformerRegistry.deformerShapes = dict()
+        DeformerRegistry.deformerTypes = dict()
+        for deformerType in suspendableDeformerTypes:
+            for deformer in cmds.ls(type=deformerType) or list():
+                self.deformerTypes[deformer] = deformerType
+                self.deformerShapes[deformer] = self.getOutputShapes(deformer)
+
+        allShapes = set()
+        for shapes in self.deformerShapes.values():
+            allShapes.update(shapes)
+        DeformerRegistry.shapePaths = sorted(allShapes)
+        trackedPaths = getAncestorPaths(allShapes)
+        selectionList = om2.MSelectionList()
+        for path in trackedPaths:
+            selectionList.add(path)
+        DeformerRegistry.trackedNodes = set(self.getNodeHash(selectionList.getDependNode(index))
+                                            for index in range(len(trackedPaths)))
+        DeformerRegistry.cachedVersion = self.sceneVersion
+
+    @staticmethod
+    def getOutputShapes(deformer, maxDepth=32):
+        """
+        Follows outputGeometry through groupParts/tweaks/other deformers to the dag shapes
+        :param deformer:
+        :param maxDepth:
+        :return: list of full shape paths
+        """
+        selectionList = om2.MSelectionList()
+        selectionList.add(deformer)
+        pending = [selectionList.getDependNode(0)]
+        visited = set()
+        shapes = list()
+        while pending and maxDepth > 0:
+            maxDepth -= 1
+            nextPending = list()
+            for node in pending:
+                mfnDep = om2.MFnDependencyNode(node)
+                if mfnDep.name() in visited:
+                    continue
+                visited.add(mfnDep.name())
+                if not mfnDep.hasAttribute('outputGeometry'):
+                    continue
+                plug = mfnDep.findPlug('outputGeometry', False)
+                plugs = [plug.elementByPhysicalIndex(i) for i in range(plug.numElements())] if plug.isArray else [plug]
+                for outputPlug in plugs:
+                    for destination in outputPlug.connectedTo(False, True):
+                        destinationNode = destination.node()
+                        if destinationNode.hasFn(om2.MFn.kDagNode):
+                            path = om2.MDagPath.getAPathTo(destinationNode).fullPathName()
+                            if path not in shapes:
+                                shapes.append(path)
+                        else:
+                            nextPending.append(destinationNode)
+            pending = nextPending
+        return shapes
+
+    def getValidDeformers(self, deformerTypes=None):
+        """
+        Deformers of the policy types that drive at least one visible shape
+        :param deformerTypes: defaults to the optionVar policy
+        :return:
+        """
+        if deformerTypes is None:
+            deformerTypes = self.getPolicy()
+        if not self.isCacheValid():
+            self.rebuild()
+
+        try:
+            resolver = tb_visibility.getVisibilityResolver(self.shapePaths)
+        except RuntimeError:
+            # a shape went away without a callback
+            self.rebuild()
+            resolver = tb_visibility.getVisibilityResolver(self.shapePaths)
+
+        validDeformers = list()
+        for deformer, shapes in self.deformerShapes.items():
+            if self.deformerTypes[deformer] not in deformerTypes:
+                continue
+            if any(resolver.isVisible(shape) for shape in shapes):
+                validDeformers.append(deformer)
+        return validDeformers
+
+    def suspend(self, deformers):
+        DeformerRegistry.suspendDepth += 1
+        if self.suspendDepth > 1:
+            return
+        cmds.refresh(suspend=True)
+        for deformer in deformers:
+            if deformer in self.suspended or not cmds.objExists(deformer):
+                continue
+            self.suspended[deformer] = (cmds.getAttr(deformer + '.frozen'), cmds.getAttr(deformer + '.nodeState'))
+            cmds.setAttr(deformer + '.frozen', 1)
+            cmds.setAttr(deformer + '.nodeState', 1)
+
+    def resume(self, force=False):
+        """
+        Restore the state of everything we suspended and the viewport refresh, nested suspensions
+        only resume at the outer level
+        :param force: resume regardless of nesting, used when a suspended operation fails
+        :return:
+        """
+        DeformerRegistry.suspendDepth = 0 if force else max(0, self.suspendDepth - 1)
+        if self.suspendDepth:
+            return
+        for deformer, (frozen, nodeState) in self.suspended.items():
+            if not cmds.objExists(deformer):
+                continue
+            cmds.setAttr(deformer + '.frozen', frozen)
+            cmds.setAttr(deformer + '.nodeState', nodeState)
+        DeformerRegistry.suspended = dict()
+        cmds.refresh(suspend=False)
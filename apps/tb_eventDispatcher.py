@@ -0,0 +1,318 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+import traceback
+from timeit import default_timer
+from collections import OrderedDict
+
+try:
+    import maya.cmds as cmds
+    import pymel.core as pm
+
+    qtVersion = pm.about(qtVersion=True)
+    if int(qtVersion.split('.')[0]) < 5:
+        from PySide.QtCore import QTimer
+    else:
+        from PySide2.QtCore import QTimer
+except ImportError:
+    cmds = None
+    QTimer = None
+
+componentTokens = OrderedDict([('vertices', '.vtx['),
+                               ('cvs', '.cv['),
+                               ('faces', '.f['),
+                               ('edges', '.e[')])
+
+
+def idleScheduler(delay, function):
+    """
+    Default scheduler, idle queue for no delay, a Qt timer otherwise
+    :param delay: seconds
+    :param function:
+    :return:
+    """
+    if delay <= 0:
+        cmds.evalDeferred(function, lowestPriority=True)
+    else:
+        QTimer.singleShot(int(delay * 1000), function)
+
+
+class SelectionSnapshot(object):
+    """
+    One flattened read of the selection, split up by component type
+    and shared by everything that responds to the same event
+    """
+
+    def __init__(self, selection=None):
+        self.selection = cmds.ls(selection=True, flatten=True) if selection is None else list(selection)
+        self.components = {key: list() for key in componentTokens.keys()}
+        self.otherComponents = list()
+        self.objects = list()
+        for item in self.selection:
+            if '.' not in item:
+                self.objects.append(item)
+                continue
+            for key, token in componentTokens.items():
+                if token in item:
+                    self.components[key].append(item)
+                    break
+            else:
+                self.otherComponents.append(item)
+        self._transforms = None
+
+    def __bool__(self):
+        return bool(self.selection)
+
+    __nonzero__ = __bool__
+
+    @property
+    def vertices(self):
+        return self.components['vertices']
+
+    @property
+    def cvs(self):
+        return self.components['cvs']
+
+    @property
+    def faces(self):
+        return self.components['faces']
+
+    @property
+    def edges(self):
+        return self.components['edges']
+
+    @property
+    def transforms(self):
+        if self._transforms is None:
+            self._transforms = cmds.ls(self.selection, flatten=True, type='transform', objectsOnly=True) or list()
+        return self._transforms
+
+
+class Subscriber(object):
+    def __init__(self, name, callback, interval=0.0, once=False, sequence=0):
+        self.name = name
+        self.callback = callback
+        self.interval = interval
+        self.once = once
+        # registration order, events queued before this are not delivered to it
+        self.sequence = sequence
+        self.lastRun = None
+        self.calls = 0
+        self.totalTime = 0.0
+        self.maxTime = 0.0
+        self.lastTime = 0.0
+
+    def remaining(self, now):
+        if not self.interval or self.lastRun is None:
+            return 0.0
+        return max(0.0, self.lastRun + self.interval - now)
+
+    def record(self, elapsed, now):
+        self.lastRun = now
+        self.calls += 1
+        self.totalTime += elapsed
+        self.lastTime = elapsed
+        self.maxTime = max(self.maxTime, elapsed)
+
+    def stats(self):
+        return {'calls': self.calls,
+                'total': self.totalTime,
+                'max': self.maxTime,
+                'last': self.lastTime,
+                'average': self.totalTime / self.calls if self.calls else 0.0}
+
+
+class EventDispatcher(object):
+    """
+    Owns a single scriptJob per event/condition and fans it out to subscribers.
+    Events fired in a burst are coalesced into one flush on the idle queue, each
+    subscriber runs at most once per flush (in the order they subscribed) and can
+    be throttled to a minimum interval. A subscriber only receives events fired
+    after it subscribed. Subscribers are called with no arguments and read the
+    selection from getSelectionSnapshot, which is only captured once per flush
+    """
+    __instance = None
+
+    # (kind, event): scriptJob id, kind is 'event' or 'conditionTrue'
+    scriptJobs = dict()
+    # (kind, event): list of subscriber names
+    eventSubscribers = dict()
+    subscribers = OrderedDict()
+    # (kind, event): sequence number of the newest subscriber when it last fired
+    pendingEvents = OrderedDict()
+    sequence = 0
+    throttled = set()
+    flushScheduled = False
+    delayScheduled = False
+    flushing = False
+    snapshot = None
+
+    scheduler = staticmethod(idleScheduler)
+    clock = staticmethod(default_timer)
+
+    def __new__(cls):
+        if EventDispatcher.__instance is None:
+            EventDispatcher.__instance = object.__new__(cls)
+        return EventDispatcher.__instance
+
+    def subscribe(self, name, callback, events=list(), conditions=list(), interval=0.0, once=False):
+        """
+        :param name: unique subscriber name, subscribing again replaces it
+        :param callback: called with no arguments
+        :param events: scriptJob event names, 'SelectionChanged', 'DragRelease'
+        :param conditions: scriptJob conditions to fire on when they become true
+        :param interval: minimum seconds between calls, later calls are delayed not dropped
+        :param once: remove the subscriber after its first call, like runOnce
+        :return:
+        """
+        self.unsubscribe(name)
+        self.sequence += 1
+        self.subscribers[name] = Subscriber(name, callback, interval=interval, once=once, sequence=self.sequence)
+        keys = [('event', event) for event in events] + [('conditionTrue', condition) for condition in conditions]
+        for key in keys:
+            self.eventSubscribers.setdefault(key, list()).append(name)
+            if key not in self.scriptJobs:
+                self.scriptJobs[key] = self.createScriptJob(key)
+        return self.subscribers[name]
+
+    def unsubscribe(self, name):
+        if name not in self.subscribers:
+            return
+        self.subscribers.pop(name)
+        self.throttled.discard(name)
+        for key in list(self.eventSubscribers.keys()):
+            names = self.eventSubscribers[key]
+            if name in names:
+                names.remove(name)
+            if not names:
+                self.eventSubscribers.pop(key)
+                self.removeScriptJob(key)
+
+    def isSubscribed(self, name):
+        return name in self.subscribers
+
+    def createScriptJob(self, key):
+        kind, event = key
+
+        def fire(*args):
+            self.eventFired(key)
+
+        if kind == 'conditionTrue':
+            return cmds.scriptJob(conditionTrue=(event, fire))
+        return cmds.scriptJob(event=(event, fire))
+
+    def removeScriptJob(self, key):
+        jobID = self.scriptJobs.pop(key, None)
+        if jobID is None:
+            return
+        try:
+            cmds.scriptJob(kill=jobID, force=True)
+        except RuntimeError:
+            pass
+
+    def eventFired(self, key):
+        self.pendingEvents[key] = self.sequence
+        if not self.flushScheduled:
+            self.flushScheduled = True
+            self.scheduler(0, self.flush)
+
+    def getSelectionSnapshot(self):
+        """
+        The selection, captured once per flush and shared by all subscribers,
+        calls from outside a flush always get a fresh snapshot
+        :return: SelectionSnapshot
+        """
+        if not self.flushing:
+            return SelectionSnapshot()
+        if self.snapshot is None:
+            self.snapshot = SelectionSnapshot()
+        return self.snapshot
+
+    def flush(self):
+        """
+        Run every subscriber of the pending events once, delaying any that are throttled
+        :return:
+        """
+        self.flushScheduled = False
+        due = list()
+        for key, sequence in self.pendingEvents.items():
+            for name in self.eventSubscribers.get(key, list()):
+                if self.subscribers[name].sequence > sequence:
+                    continue
+                if name not in due:
+                    due.append(name)
+        for name in self.throttled:
+            if name not in due:
+                due.append(name)
+        self.pendingEvents = OrderedDict()
+        self.throttled = set()
+
+        delay = None
+        self.flushing = True
+        self.snapshot = None
+        try:
+            for name in due:
+                subscriber = self.subscribers.get(name, None)
+                if subscriber is None:
+                    continue
+                remaining = subscriber.remaining(self.clock())
+                if remaining > 0:
+                    self.throttled.add(name)
+                    delay = remaining if delay is None else min(delay, remaining)
+                    continue
+                self.run(subscriber)
+        finally:
+            self.flushing = False
+            self.snapshot = None
+
+        if delay is not None and not self.delayScheduled:
+            self.delayScheduled = True
+            self.scheduler(delay, self.delayedFlush)
+
+    def delayedFlush(self):
+        self.delayScheduled = False
+        self.flush()
+
+    def run(self, subscriber):
+        if subscriber.once:
+            self.unsubscribe(subscriber.name)
+        start = self.clock()
+        try:
+            subscriber.callback()
+        except Exception:
+            cmds.warning('%s failed\n%s' % (subscriber.name, traceback.format_exc()))
+        end = self.clock()
+        subscriber.record(end - start, end)
+
+    def getStats(self):
+        """
+        :return: dict of subscriber name: calls, total, max, last and average seconds
+        """
+        return {name: subscriber.stats() for name, subscriber in self.subscribers.items()}
+
+    def printStats(self):
+        stats = self.getStats()
+        for name in sorted(stats.keys(), key=lambda x: stats[x]['total'], reverse=True):
+            print('{0}: {calls} calls, {total:.4f}s total, {average:.4f}s average, {max:.4f}s max'.format(
+                name, **stats[name]))
@@ -0,0 +1,273 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+import math
+import os
+import sys
+import multiprocessing
+from array import array
+from apps.tb_cacheJobs import findMayapy
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # python 2 maya, always stays in process
+    shared_memory = None
+
+'''
+Curve filters used by the slide tools, kept free of any maya imports so
+the worker processes can import this module from a plain python interpreter
+'''
+
+
+def gaussian_smoothing(data, sigma):
+    smoothed_data = []
+    kernel_radius = int(2 * math.ceil(2 * sigma) + 1)
+    kernel = []
+
+    for x in range(-kernel_radius, kernel_radius + 1):
+        weight = math.exp(-0.5 * (x / sigma) ** 2)
+        kernel.append(weight)
+
+    for i in range(len(data)):
+        smoothed_value = 0.0
+        normalization_factor = 0.0
+
+        for j in range(len(kernel)):
+            index = i + j - kernel_radius
+
+            if index >= 0 and index < len(data):
+                smoothed_value += kernel[j] * data[index]
+                normalization_factor += kernel[j]
+
+        smoothed_data.append(smoothed_value / normalization_factor)
+
+    return smoothed_data
+
+
+def highpass_smoothing(data, alpha, iterations=1):
+    smoothed_data = data
+    for x in range(max(1, int(iterations))):
+        # Initialize the smoothed data with the first value of the input data
+        previous = [smoothed_data[0]]
+        for i in range(1, len(smoothed_data)):
+            previous.append(alpha * smoothed_data[i] + (1 - alpha) * previous[i - 1])
+        smoothed_data = previous
+    return smoothed_data
+
+
+def butterworth_filter(data, cutoff_freq, sampling_rate, order):
+    filtered_data = []
+    nyquist_freq = 0.5 * sampling_rate
+    normalized_cutoff = cutoff_freq / nyquist_freq
+    tan_half_normalized_cutoff = math.tan(math.pi * normalized_cutoff * 0.5)
+    sqr_tan_half_normalized_cutoff = tan_half_normalized_cutoff ** 2
+
+    c = [0.0] * (order + 1)
+    d = [0.0] * (order + 1)
+
+    c[0] = sqr_tan_half_normalized_cutoff + 2.0 * tan_half_normalized_cutoff + 1.0
+    c[1] = 2.0 * (sqr_tan_half_normalized_cutoff - 1.0) / c[0]
+
+    for i in range(2, order + 1):
+        c[i] = (2.0 * sqr_tan_half_normalized_cutoff - 2.0) / c[i - 1]
+
+    d[0] = 1.0 / c[0]
+    d[1] = 0.0
+
+    for i in range(2, order + 1):
+        d[i] = (-2.0 * tan_half_normalized_cutoff) / c[i - 1] * d[i - 1] - d[i - 2]
+
+    for i in range(len(data)):
+        filtered_value = 0.0
+
+        for j in range(order + 1):
+            index = i - j
+
+            if index >= 0:
+                filtered_value += c[j] * data[index]
+
+        for j in range(1, order + 1):
+            index = i - j
+
+            if index >= 0:
+                filtered_value -= d[j] * filtered_data[index]
+
+        filtered_data.append(filtered_value)
+
+    return filtered_data
+
+
+filterFunctions = {'gauss': gaussian_smoothing,
+                   'highpass': highpass_smoothing,
+                   'butter': butterworth_filter,
+                   }
+
+
+def _filterShard(job):
+    """
+    Worker entry point, reads each curve span from the shared input block,
+    filters it and writes the result to the same span in the output block
+    :param job: (inputName, outputName, filterName, filterArgs, spans)
+    :return: number of samples written
+    """
+    inputName, outputName, filterName, filterArgs, spans = job
+    inputMemory = shared_memory.SharedMemory(name=inputName)
+    outputMemory = shared_memory.SharedMemory(name=outputName)
+    written = 0
+    try:
+        inputBuffer = inputMemory.buf.cast('d')
+        outputBuffer = outputMemory.buf.cast('d')
+        filterFunction = filterFunctions[filterName]
+        for offset, length in spans:
+            result = filterFunction(inputBuffer[offset:offset + length].tolist(), *filterArgs)
+            for i in range(length):
+                outputBuffer[offset + i] = result[i]
+            written += length
+        inputBuffer.release()
+        outputBuffer.release()
+    finally:
+        inputMemory.close()
+        outputMemory.close()
+    return written
+
+
+class CurveFilterPool(object):
+    """
+    Runs the slide tool filters over many independent curves, sharding the
+    curves across worker processes via shared memory once the selection is
+    big enough to be worth the overhead. Results are handed back to the
+    caller so the maya writes stay on the main thread.
+    """
+    pool = None
+    poolSize = 0
+
+    def __init__(self, workers=0, threshold=200000):
+        """
+        :param workers: worker process count, 0 uses all but one core
+        :param threshold: total sample count below which filtering stays in process
+        """
+        self.workers = workers
+        self.threshold = threshold
+
+    def workerCount(self):
+        if self.workers > 0:
+            return self.workers
+        return max(1, multiprocessing.cpu_count() - 1)
+
+    def useWorkers(self, sampleCount, curveCount):
+        if shared_memory is None:
+            return False
+        if self.workerCount() < 2 or curveCount < 2:
+            return False
+        if sampleCount < self.threshold:
+            return False
+        # no mayapy to spawn, stay in process rather than start gui mayas
+        return self.workerExecutable() is not None
+
+    def filterCurves(self, filterName, curveValues, *filterArgs):
+        """
+        Filter every curve in curveValues
+        :param filterName: key in filterFunctions
+        :param curveValues: dict of curve name: list of values
+        :param filterArgs: extra args passed to the filter after the values
+        :return: dict of curve name: filtered values
+        """
+        curveNames = [name for name, values in curveValues.items() if values]
+        sampleCount = sum([len(curveValues[name]) for name in curveNames])
+        if not self.useWorkers(sampleCount, len(curveNames)):
+            filterFunction = filterFunctions[filterName]
+            return {name: filterFunction(curveValues[name], *filterArgs) for name in curveNames}
+        return self.filterCurvesPooled(filterName, curveNames, curveValues, sampleCount, filterArgs)
+
+    def filterCurvesPooled(self, filterName, curveNames, curveValues, sampleCount, filterArgs):
+        packed = array('d')
+        spans = list()
+        for name in curveNames:
+            spans.append((len(packed), len(curveValues[name])))
+            packed.extend(curveValues[name])
+
+        byteCount = sampleCount * packed.itemsize
+        inputMemory = shared_memory.SharedMemory(create=True, size=byteCount)
+        outputMemory = shared_memory.SharedMemory(create=True, size=byteCount)
+        try:
+            inputMemory.buf[:byteCount] = packed.tobytes()
+            jobs = [(inputMemory.name, outputMemory.name, filterName, tuple(filterArgs), shard)
+                    for shard in self.shardSpans(spans, self.workerCount())]
+            self.getPool().map(_filterShard, jobs)
+
+            result = array('d')
+            result.frombytes(bytes(outputMemory.buf[:byteCount]))
+        finally:
+            inputMemory.close()
+            inputMemory.unlink()
+            outputMemory.close()
+            outputMemory.unlink()
+        return {name: result[offset:offset + length].tolist() for name, (offset, length) in zip(curveNames, spans)}
+
+    @staticmethod
+    def shardSpans(spans, shardCount):
+        """
+        Split the curve spans into shards of roughly equal sample counts,
+        longest curves first so one big curve doesn't end up stacked with others
+        :param spans: list of (offset, length)
+        :param shardCount:
+        :return: list of span lists
+        """
+        shards = [list() for x in range(min(shardCount, len(spans)))]
+        loads = [0] * len(shards)
+        for span in sorted(spans, key=lambda x: (-x[1], x[0])):
+            index = loads.index(min(loads))
+            shards[index].append(span)
+            loads[index] += span[1]
+        return [shard for shard in shards if shard]
+
+    def getPool(self):
+        workers = self.workerCount()
+        if CurveFilterPool.pool is not None and CurveFilterPool.poolSize == workers:
+            return CurveFilterPool.pool
+        self.close()
+        context = multiprocessing.get_context('spawn')
+        context.set_executable(self.workerExecutable())
+        CurveFilterPool.pool = context.Pool(workers)
+        CurveFilterPool.poolSize = workers
+        return CurveFilterPool.pool
+
+    @staticmethod
+    def workerExecutable():
+        """
+        Inside maya sys.executable is the gui, spawn the workers with mayapy instead
+        :return: executable for the workers, None inside maya without a mayapy
+        """
+        if not os.path.basename(sys.executable).lower().startswith('maya'):
+            return sys.executable
+        return findMayapy()
+
+    @staticmethod
+    def close():
+        if CurveFilterPool.pool is None:
+            return
+        CurveFilterPool.pool.terminate()
+        CurveFilterPool.pool = None
+        CurveFilterPool.poolSize = 0
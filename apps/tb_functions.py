@@ -33,6 +33,12 @@ import maya.OpenMayaUI as omUI
 import pymel.core.datatypes as dt
 import re
 from difflib import SequenceMatcher, get_close_matches, ndiff
+from apps.tb_controlNameIndex import ControlNameIndex
+from apps.tb_hierarchy import DagHierarchy
+from apps.tb_deformerRegistry import DeformerRegistry
+from apps.tb_curveEdit import applyCurveEdit
+import apps.tb_tempControls as tb_tempControls
+from apps.tb_tempControls import zUpRotateOrders, getControlShapePoints
 from colorsys import rgb_to_hls, hls_to_rgb
 from maya.api import OpenMaya
 xAx = om.MVector.xAxis
@@ -91,11 +97,7 @@ import maya.OpenMaya as om
 import maya.api.OpenMayaAnim as oma2
 import maya.api.OpenMaya as om2
 import maya.OpenMayaUI as omui
-import os
-import json
 
-dataPath = os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir, 'appData', 'controlShapes.json'))
-pointLists = json.load(open(dataPath))
 
 acceptedConstraintTypes = ['pairBlend', 'constraint']
 
@@ -137,6 +139,7 @@ class functions(object):
                       }
 
     lastPanel = None
+    controlNameIndexes = dict()
 
     """
     API Classes - layers
@@ -455,28 +458,65 @@ class functions(object):
 
         return mainControl
 
+    def tempControls(self, specs, modifier=None):
+        """
+        Batch version of tempControl, all the transforms, shapes and attributes
+        are made through one modifier instead of several commands per control.
+        The drawScale attribute scales the shape through a transformGeometry node
+        rather than a blendShape
+        :param specs: list of dicts of tempControl arguments, name, suffix, scale, color,
+        drawType, rotateOrder and an optional parent
+        :param modifier: MDagModifier to use, the edit is made undoable with applyCurveEdit if not given
+        :return: list of control names in the same order as specs
+        """
+        if not specs:
+            return list()
+        if int(cmds.about(majorVersion=True)) < 2020:
+            # no composeMatrix node to drive the draw scale
+            controls = list()
+            for spec in specs:
+                spec = dict(spec)
+                parent = spec.pop('parent', None)
+                control = str(self.tempControl(**spec))
+                if parent:
+                    # local identity under the parent, as the batch creates it
+                    control = cmds.parent(control, parent, relative=True)[0]
+                controls.append(control)
+            return controls
+        if modifier is None:
+            return applyCurveEdit(lambda animCurveChange, dagModifier: self.tempControls(specs, dagModifier))
+        return tb_tempControls.createTempControls(specs, modifier,
+                                                  upAxis=cmds.upAxis(query=True, axis=True),
+                                                  xRay=int(cmds.about(majorVersion=True)) >= 2024,
+                                                  lineWidth=float(pm.optionVar.get('lineWidth', -1)),
+                                                  xRayDefault=float(pm.optionVar.get('xRayDefault', 0.3)),
+                                                  unitScale=1.0 / self.unit_conversion())
+
+    def tempNulls(self, specs, modifier=None):
+        """
+        Batch version of tempNull
+        :param specs: list of dicts of name, suffix and an optional parent
+        :param modifier: MDagModifier to use, the edit is made undoable with applyCurveEdit if not given
+        :return: list of node names in the same order as specs
+        """
+        if not specs:
+            return list()
+        if modifier is None:
+            return applyCurveEdit(lambda animCurveChange, dagModifier: self.tempNulls(specs, dagModifier))
+        return tb_tempControls.createTempNulls(specs, modifier)
+
     def drawTempControl(self, name='loc', suffix='baked', scale=1.0, color=(1.0, 0.537, 0.016), drawType='orb',
                         unlockScale=False, rotateOrder=2, blendshape=True):
         upAxis = cmds.upAxis(query=True, axis=True)
-        points = pointLists['pointLists'].get(drawType, pointLists['pointLists']['cross'])
-        # process points for z up space
-        if upAxis == 'z':
-            points = [[p[0], p[2], p[1]] for p in points]
+        points = getControlShapePoints(drawType, upAxis)
         control, shape = self.drawControl(points, scale=1)
         blendControl, blendControlShape = self.drawControl(points, scale=0.01)
         control.rename(name + '_' + suffix)
         blendControl.rename(name + '_' + suffix + '_bs')
-        rotOrder = {0: 1,
-                    1: 2,
-                    2: 0,
-                    3: 4,
-                    4: 5,
-                    5: 3,
-                     }
         if upAxis == 'y':
             outRotateOrder = rotateOrder
         else:
-            outRotateOrder = rotOrder[rotateOrder]
+            outRotateOrder = zUpRotateOrders[rotateOrder]
         # change this for z up
         control.rotateOrder.set(outRotateOrder)
         control.rotateOrder.set(channelBox=True)
@@ -710,61 +750,42 @@ class functions(object):
                     j = j.getParent()
         return oobjectList
 
-    def sortByParents(self, selection):
-        selection = [pm.PyNode(x) for x in selection]
-        parentDict = {}
-        for x in selection:
-            allParents = x.getAllParents()[::-1]
-            parentDict[x] = allParents
-
-        mostParentKeys = sorted(parentDict, key=lambda k: len(parentDict[k]), reverse=True)
-        leastParentKeys = sorted(parentDict, key=lambda k: len(parentDict[k]))
-
-        returnedList = [x for x in selection]
-        for key in leastParentKeys:
-            found = False
-            for p in mostParentKeys:
-                if found:
-                    continue
-                if p not in parentDict[key]:
-                    continue
-                if p in selection:
-                    found = True
-                    returnedList.insert(returnedList.index(p) + 1, returnedList.pop(returnedList.index(key)))
-                if not found:
-                    returnedList.insert(0, returnedList.pop(returnedList.index(key)))
+    def getDagHierarchy(self, selection):
+        return DagHierarchy(cmds.ls([str(x) for x in selection], long=True))
 
-        return returnedList
+    def getShortNames(self, longNames):
+        shortNames = cmds.ls(longNames)
+        if len(shortNames) != len(longNames):
+            shortNames = [cmds.ls(x)[0] for x in longNames]
+        return dict(zip(longNames, shortNames))
 
-    def splitSelectionToChains(self, selection, requiresParent=True, returnTopParent=False):
-        selection = [pm.PyNode(x) for x in selection]
-        outputDict = {}
-
-        parentDict = {}
-        # get all object parents for all objects
-        for x in selection:
-            allParents = x.getAllParents()[::-1]
-            parentDict[x] = allParents
+    def sortByParents(self, selection):
+        """
+        Sort the selection so parents always come before their children
+        :param selection:
+        :return: list of PyNodes
+        """
+        return [pm.PyNode(x) for x in self.getDagHierarchy(selection).sortByParents()]
 
-        mostParentKeys = sorted(parentDict, key=lambda k: len(parentDict[k]), reverse=True)
-        leastParentKeys = sorted(parentDict, key=lambda k: len(parentDict[k]))
+    def splitSelectionToChains(self, selection, requiresParent=True, returnTopParent=False):
+        """
+        Split the selection into chains, keyed by the top selected node of each chain
+        :param selection:
+        :param requiresParent:
+        :param returnTopParent: include the top node at the start of each chain
+        :return: dict of top node: list of nodes from the top down
+        """
+        chains = self.getDagHierarchy(selection).getChains()
+        allPaths = list(chains.keys())
+        for chain in chains.values():
+            allPaths.extend(chain)
+        shortNames = self.getShortNames(allPaths)
 
-        discardedIntermediates = list()
-        for key in mostParentKeys:
-            found = False
-            if key in discardedIntermediates:
-                continue
-            for p in leastParentKeys:
-                if found:
-                    continue
-                if p not in parentDict[key]:
-                    continue
-                found = True
-                intermediateObjects = self.getIntermediateNodes(topObject=p, bottomObject=key)
-                discardedIntermediates.extend(intermediateObjects)
-                if returnTopParent:
-                    intermediateObjects.insert(0, intermediateObjects[0].getParent())
-                outputDict[str(p)] = [str(o) for o in intermediateObjects]
+        outputDict = {}
+        for top, chain in chains.items():
+            if returnTopParent:
+                chain = [top] + chain
+            outputDict[shortNames[top]] = [shortNames[x] for x in chain]
         return outputDict
 
     @staticmethod
@@ -1437,10 +1458,11 @@ class functions(object):
     def suspendUpdate(self, slow=False):
         validSkinClusters = self.getValidSkinsForSuspension()
         self.suspendSkinning(validSkinClusters)
-
-        yield
-
-        self.resumeSkinning()
+        try:
+            yield
+        finally:
+            # depth counted, the viewport only refreshes again when the outermost block exits
+            DeformerRegistry().resume()
 
     def getObjectsFromSkinCluster(self, skinCluster):
         shapes = cmds.listConnections(skinCluster + '.outputGeometry')
@@ -1458,49 +1480,19 @@ class functions(object):
         return skinCluster
 
     def getValidSkinsForSuspension(self):
-        allSkins = cmds.ls(type='skinCluster')
-        validSkinClusters = list()
-        for skin in allSkins:
-            visibleSkins = self.getObjectsFromSkinCluster(skin)
-
-            if not visibleSkins:
-                continue
-            validSkinClusters.append(visibleSkins)
-
-        # CharacterTool = getGlobalTools().tools['CharacterTool']
-        # CharacterTool.getAllCharacters()
-        # chars = self.splitSelectionToCharacters(allSkins)
-        # validSkinClusters = list()
-        # for key, selection in chars.items():
-        #     rig = self.getCurrentRig(selection)
-        #     meshes = CharacterTool.getAllMeshes(sel=selection)
-        #     for mesh in meshes:
-        #         shapes = cmds.listRelatives(mesh, shapes=True)
-        #         for shape in shapes:
-        #             skinClusters = cmds.listConnections(shape, type='skinCluster')
-        #             if not skinClusters:
-        #                 continue
-        #             for skin in skinClusters:
-        #                 if skin in validSkinClusters:
-        #                     continue
-        #                 validSkinClusters.append(skin)
-        return validSkinClusters
+        """
+        Deformers driving visible shapes, which types are included is set by
+        the tbSuspendDeformerTypes optionVar (skinClusters by default).
+        The deformer to shape mapping is cached until the scene changes.
+        :return:
+        """
+        return DeformerRegistry().getValidDeformers()
 
     def suspendSkinning(self, validSkinClusters=list()):
-        allSkins = cmds.ls(type='skinCluster')
-        for skin in validSkinClusters:
-            cmds.setAttr(skin + '.frozen', 1)
-            cmds.setAttr(skin + '.nodeState', 1)
-
-        cmds.refresh(su=True)
+        DeformerRegistry().suspend(validSkinClusters)
 
     def resumeSkinning(self):
-        allSkins = cmds.ls(type='skinCluster')
-        for skin in allSkins:
-            cmds.setAttr(skin + '.frozen', 0)
-            cmds.setAttr(skin + '.nodeState', 0)
-
-        cmds.refresh(su=False)
+        DeformerRegistry().resume(force=True)
 
     @staticmethod
     def unit_conversion():
@@ -1847,15 +1839,15 @@ class functions(object):
         return False
 
     def drawOrb(self, scale=1.0):
-        points = pointLists['pointLists'].get('orb', pointLists['pointLists']['cross'])
+        points = getControlShapePoints('orb')
         return self.drawControl(points, scale=scale)
 
     def drawCross(self, scale=1.0):
-        points = pointLists['pointLists'].get('cross', pointLists['pointLists']['cross'])
+        points = getControlShapePoints('cross')
         return self.drawControl(points, scale=scale)
 
     def drawRedirectRoot(self, scale=1.0):
-        points = pointLists['pointLists'].get('redirectRoot', pointLists['pointLists']['cross'])
+        points = getControlShapePoints('redirectRoot')
         return self.drawControl(points, scale=scale)
 
     def drawControl(self, pointlist, scale=1.0):
@@ -2167,16 +2159,37 @@ class functions(object):
     
     """
 
-    def getSimilarControlsMinusPrefix(self, namespace, control, prefix, constraint=False, shape=False):
+    def getControlNameIndex(self, namespace, constraint=False, shape=False):
+        """
+        Cached name index for the transforms in a namespace, rebuilt when the transform count changes
+        :param namespace:
+        :param constraint: include constraint nodes
+        :param shape: only include transforms with shapes
+        :return: ControlNameIndex
+        """
         wildcard = ('{ns}:*'.format(ns=namespace))
-        matching = cmds.ls(wildcard, type='transform')
+        transforms = cmds.ls(wildcard, type='transform', long=True)
+        key = (namespace, constraint, shape)
+        index = self.controlNameIndexes.get(key, None)
+        if index is not None and index.isValid(namespace, len(transforms)):
+            return index
+
+        matching = transforms
         if not constraint:
-            matching = [x for x in matching if 'Constraint' not in cmds.objectType(x)]
+            constraints = set(cmds.ls(wildcard, type='constraint', long=True))
+            matching = [x for x in matching if x not in constraints]
         if shape:
-            matching = [x for x in matching if cmds.listRelatives(x, shapes=True)]
-        if control in matching:
-            matching.remove(control)
-        return [x.split(':')[-1] for x in matching]
+            shapes = cmds.ls(wildcard, shapes=True, long=True)
+            parents = set(cmds.listRelatives(shapes, parent=True, fullPath=True) or list()) if shapes else set()
+            matching = [x for x in matching if x in parents]
+        names = [x.rsplit('|', 1)[-1].split(':')[-1] for x in matching]
+        index = ControlNameIndex(names, namespace=namespace, nodeCount=len(transforms))
+        self.controlNameIndexes[key] = index
+        return index
+
+    def getSimilarControlsMinusPrefix(self, namespace, control, prefix, constraint=False, shape=False):
+        index = self.getControlNameIndex(namespace, constraint=constraint, shape=shape)
+        return [x for x in index.names if x != control]
 
     def getOppositeControl(self, name):
         if ':' in name:
@@ -2184,29 +2197,27 @@ class functions(object):
         else:
             namespace = str()
             control = str(name)
-        prefix = re.split('[^a-zA-Z0-9]+', control)
-
-        for pre in prefix:
-            matches = self.getSimilarControlsMinusPrefix(namespace, control, pre, constraint=False, shape=False)
-            close_matches = get_close_matches(control, [x.split(':')[-1] for x in matches])
-            shorter = sorted(list(x for x in close_matches if len(x) < len(control)), key=len)
-            longer = sorted(list(x for x in close_matches if len(x) >= len(control)), key=len)
-            if len(shorter) < len(longer):
-                shorter.extend([None] * (len(longer) - len(shorter)))
-            if len(longer) < len(shorter):
-                longer.extend([None] * (len(shorter) - len(longer)))
-            longer = [x for x in longer if x != control]
-            shorter = [x for x in shorter if x != control]
-            merged = list()
-            for index, x in enumerate(longer):
-                merged.append(x)
-                merged.append(shorter[index])
-            merged = [i for i in merged if i is not control]
-
-            for x in merged:
-                obj = '{ns}:{ct}'.format(ns=namespace, ct=x)
-                if cmds.objExists(obj):
-                    return obj
+
+        # every prefix used to query the same namespace list, so one lookup covers them all
+        close_matches = self.getControlNameIndex(namespace, constraint=False, shape=False).closeMatches(control)
+        shorter = sorted(list(x for x in close_matches if len(x) < len(control)), key=len)
+        longer = sorted(list(x for x in close_matches if len(x) >= len(control)), key=len)
+        if len(shorter) < len(longer):
+            shorter.extend([None] * (len(longer) - len(shorter)))
+        if len(longer) < len(shorter):
+            longer.extend([None] * (len(shorter) - len(longer)))
+        longer = [x for x in longer if x != control]
+        shorter = [x for x in shorter if x != control]
+        merged = list()
+        for index, x in enumerate(longer):
+            merged.append(x)
+            merged.append(shorter[index])
+        merged = [i for i in merged if i is not control]
+
+        for x in merged:
+            obj = '{ns}:{ct}'.format(ns=namespace, ct=x)
+            if cmds.objExists(obj):
+                return obj
         return
         st = self.stripTailDigits(control)
         tailLen = len(control) - len(st)
@@ -2236,11 +2247,8 @@ class functions(object):
         matches = get_close_matches(st, [x[:len(x) - tailLen] for x in matchingPrefix])
 
     def getSimilarControls(self, namespace, sel, prefix, constraint=False, shape=True):
-        matching = cmds.ls('{ns}:{ct}*'.format(ns=namespace, ct=prefix[0]), type='transform')
-        if not constraint:
-            matching = [x for x in matching if 'Constraint' not in cmds.objectType(x)]
-        if shape:
-            matching = [x for x in matching if cmds.listRelatives(x, shapes=True)]
+        index = self.getControlNameIndex(namespace, constraint=constraint, shape=shape)
+        matching = ['{ns}:{ct}'.format(ns=namespace, ct=x) for x in index.withPrefix(prefix[0])]
         if sel in matching:
             matching.remove(sel)
         return matching
@@ -916,7 +916,7 @@ class GravityTools(toolAbstractFactory):
             cmds.delete(mainCapsule)
 
         dataFile = os.path.join(self.comTemplateDir, refname + '.json')
-        jsonData = json.load(open(dataFile))
+        jsonData = self.getDataStore().load(dataFile)
 
         for key in jsonData['offsets'].keys():
             capsuleTarget = namespace + ':' + key.rsplit('_cap')[0]
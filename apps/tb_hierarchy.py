@@ -0,0 +1,110 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+
+
+class DagHierarchy(object):
+    """
+    Parent lookups for a selection, worked out from full dag paths alone
+    so the whole selection only needs one cmds.ls(long=True) call
+    """
+
+    def __init__(self, longNames):
+        """
+        :param longNames: full dag paths, '|root|child|grandChild'
+        """
+        self.paths = list()
+        self.order = dict()
+        for path in longNames:
+            if path in self.order:
+                continue
+            self.order[path] = len(self.paths)
+            self.paths.append(path)
+        self.parentMap = {path: self.getSelectedParent(path) for path in self.paths}
+
+    @staticmethod
+    def depth(path):
+        return path.count('|')
+
+    @staticmethod
+    def getParentPath(path):
+        if '|' not in path:
+            return None
+        parent = path.rsplit('|', 1)[0]
+        return parent or None
+
+    def getSelectedParent(self, path):
+        """
+        Closest ancestor of path that is also in the selection
+        :param path:
+        :return:
+        """
+        parent = self.getParentPath(path)
+        while parent:
+            if parent in self.order:
+                return parent
+            parent = self.getParentPath(parent)
+        return None
+
+    def getTopParent(self, path):
+        top = path
+        parent = self.parentMap.get(path, None)
+        while parent:
+            top = parent
+            parent = self.parentMap[parent]
+        return top
+
+    def sortByParents(self):
+        """
+        Selection ordered so every node comes after all of its ancestors,
+        nodes at the same depth keep their selection order
+        :return:
+        """
+        return sorted(self.paths, key=lambda x: (self.depth(x), self.order[x]))
+
+    def getChains(self):
+        """
+        Splits the selection into chains, one per top most selected node. Each chain
+        runs from the top node down to its deepest selected descendant and includes
+        any unselected nodes in between, but not the top node itself
+        :return: dict of top node path: list of paths, top to bottom
+        """
+        deepest = dict()
+        for path in self.sortByParents():
+            top = self.getTopParent(path)
+            if top == path:
+                continue
+            if top not in deepest or self.depth(path) > self.depth(deepest[top]):
+                deepest[top] = path
+
+        chains = dict()
+        for top in sorted(deepest.keys(), key=lambda x: self.order[x]):
+            bottom = deepest[top]
+            chain = list()
+            path = bottom
+            while path and path != top:
+                chain.insert(0, path)
+                path = self.getParentPath(path)
+            chains[top] = chain
+        return chains
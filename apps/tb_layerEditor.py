@@ -24,9 +24,9 @@
 '''
 import pymel.core as pm
 import maya.cmds as cmds
-from functools import partial
 
 from Abstract import *
+from apps.tb_eventDispatcher import EventDispatcher
 import maya.OpenMayaUI as omui
 import maya
 
@@ -507,7 +507,10 @@ class LayerEditor(toolAbstractFactory):
 
         if not self.selectBestLayerRepeat:
             self.selectBestLayerRepeat = True
-            pm.scriptJob(runOnce=True, event=['SelectionChanged', partial(self.clearBestAnimSelection)])
+            EventDispatcher().subscribe('LayerEditorBestLayer',
+                                        self.clearBestAnimSelection,
+                                        events=['SelectionChanged'],
+                                        once=True)
 
     def clearBestAnimSelection(self):
         self.selectBestLayerRepeat = False
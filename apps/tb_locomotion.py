@@ -29,6 +29,11 @@ from Abstract import *
 import maya
 import time
 from maya.api import OpenMaya
+import apps.tb_locomotionAnalysis as locomotionAnalysis
+import apps.tb_locomotionGraphs as locomotionGraphs
+import apps.tb_transformMath as transformMath
+from apps.tb_matrixBake import TransformSampler, prepareCurves, writeChannels
+from apps.tb_curveEdit import applyCurveEdit
 
 # maya.utils.loadStringResourcesForModule(__name__)
 qtVersion = pm.about(qtVersion=True)
@@ -49,6 +54,11 @@ turnexpressionName = '_turnExpression'
 attrName = 'DegreesPerMeter'
 circleCentreAttr = 'CircleCentre'
 offsetAttrName = 'OffsetPosition'
+circleNetworkAttr = 'tbCircleNetwork'
+
+circleMethodExpression = 'Expression'
+circleMethodNodes = 'Nodes'
+circleMethods = [circleMethodExpression, circleMethodNodes]
 
 assetCommandName = 'blankCommandName'
 
@@ -90,6 +100,7 @@ class LocomotionTools(toolAbstractFactory):
     strafeAssetName = 'Strafe_Control'
 
     autoAlignFeetOption = 'tbAutoAlignFeet'
+    circleMethodOption = 'tbCircleWalkMethod'
 
     def __new__(cls):
         if LocomotionTools.__instance is None:
@@ -108,7 +119,14 @@ class LocomotionTools(toolAbstractFactory):
     """
 
     def optionUI(self):
-        return super(LocomotionTools, self).optionUI()
+        super(LocomotionTools, self).optionUI()
+        circleMethodWidget = radioGroupWidget(optionVarList=circleMethods,
+                                              optionVar=self.circleMethodOption,
+                                              defaultValue=circleMethodExpression,
+                                              label='Circle walk setup')
+        self.layout.addWidget(circleMethodWidget)
+        self.layout.addStretch()
+        return self.optionWidget
 
     def showUI(self):
         return None
@@ -203,11 +221,15 @@ class LocomotionTools(toolAbstractFactory):
         addSelectedRotationButton = QPushButton('Add Selected controls (rotate only)')
         selectCurveButton = QPushButton('Select Curve Main')
         resetCurveButton = QPushButton('Reset curve')
+        convertButton = QPushButton('Convert setups to %s' % circleMethodNodes)
+        convertExpressionButton = QPushButton('Convert setups to %s' % circleMethodExpression)
         bakeOutButton = QPushButton('- Bake Out -')
         buttonLayout.addWidget(addSelectedButton)
         buttonLayout.addWidget(addSelectedRotationButton)
         buttonLayout.addWidget(selectCurveButton)
         buttonLayout.addWidget(resetCurveButton)
+        buttonLayout.addWidget(convertButton)
+        buttonLayout.addWidget(convertExpressionButton)
         buttonLayout.addWidget(bakeOutButton)
         self.circleToolbox.mainLayout.addWidget(toolboxWidget)
 
@@ -215,6 +237,8 @@ class LocomotionTools(toolAbstractFactory):
         addSelectedRotationButton.clicked.connect(lambda: self.addCircleToSelected(rotateOnly=True))
         selectCurveButton.clicked.connect(self.selectCurveMain)
         resetCurveButton.clicked.connect(self.resetCurve)
+        convertButton.clicked.connect(lambda: convertCircleSetups(circleMethodNodes))
+        convertExpressionButton.clicked.connect(lambda: convertCircleSetups(circleMethodExpression))
         bakeOutButton.clicked.connect(self.bakeOut)
 
         self.circleToolbox.show()
@@ -266,6 +290,7 @@ class LocomotionTools(toolAbstractFactory):
             CharacterTool.allCharacters[refname].setFeetControls(strippedControls)
             CharacterTool.saveJsonFile(CharacterTool.allCharacters[refname].getJsonFile(),
                                        CharacterTool.allCharacters[refname].toJson())
+            self.allTools.tools['MirrorTools'].clearMirrorPairTable(refname)
 
     def alignFeet(self):
         curveMains = cmds.ls('*:Strafe_Control')
@@ -374,6 +399,13 @@ class LocomotionTools(toolAbstractFactory):
             cmds.parent(tempControllerParent, globalControl)
 
         allControls = [x['tempController'] for x in controlData.values()]
+        analysis = self.analyseControls(allControls)
+        for cnt, data in controlData.items():
+            controlAnalysis = analysis[data['tempController']]
+            data['forwardAxis'] = controlAnalysis.getForwardAxis()
+            if controlAnalysis.isStationary:
+                cmds.warning('%s does not move on the floor, using %s as its forward axis' % (cnt,
+                                                                                              data['forwardAxis']))
         self.allTools.tools['BakeTools'].quickBake(allControls,
                                                    startTime=cmds.playbackOptions(query=True, min=True),
                                                    endTime=cmds.playbackOptions(query=True, max=True),
@@ -424,59 +456,60 @@ class LocomotionTools(toolAbstractFactory):
         tempParent = str(self.funcs.tempNull(name=control, suffix='LocoGrp'))
         constraint = cmds.parentConstraint(control, tempController)
         cmds.parent(tempController, tempParent)
-        forwardAxis = self.guessForwardAxis(control=tempController)
         return {'tempParent': tempParent,
                 'tempController': tempController,
-                'forwardAxis': forwardAxis,
+                'forwardAxis': None,
                 'constraint': constraint}
 
-    def max_difference_axis(self, vec1, vec2):
-        """
-        Returns the axis name with the largest delta
-        :param vec1:
-        :param vec2:
-        :return:
-        """
-        # Calculate absolute differences for each axis
-        diff_x = abs(vec1[0] - vec2[0])
-        diff_y = abs(vec1[1] - vec2[1])
-        diff_z = abs(vec1[2] - vec2[2])
-
-        # Find the maximum difference among the axes
-        max_diff = max(diff_x, diff_y, diff_z)
-
-        # Determine which axis has the maximum difference
-        if max_diff == diff_x:
-            return 'x'
-        elif max_diff == diff_y:
-            return 'y'
-        else:
-            return 'z'
-
-    def guessForwardAxis(self, control=None, startFrame=cmds.playbackOptions(query=True, min=True),
-                         endFrame=cmds.playbackOptions(query=True, max=True)):
+    def guessForwardAxis(self, control=None, startFrame=None, endFrame=None):
         if not control:
             return None, None
         if not cmds.objExists(control):
             return None, None
+        return self.analyseControls([control], startFrame=startFrame, endFrame=endFrame)[control].getForwardAxis()
+
+    @staticmethod
+    def getAnalysisFrames(startFrame=None, endFrame=None):
+        if startFrame is None:
+            startFrame = cmds.playbackOptions(query=True, min=True)
+        if endFrame is None:
+            endFrame = cmds.playbackOptions(query=True, max=True)
+        return [startFrame + x for x in range(int(endFrame - startFrame) + 1)]
+
+    @staticmethod
+    def sampleTrajectories(controls, frames):
+        """
+        World rotate pivot positions of every control for every frame, all read in one pass per frame
+        :param controls:
+        :param frames:
+        :return: dict of control: list of x, y, z
+        """
+        sampler = TransformSampler(controls)
+        sampled = sampler.sample(frames)
+        return {control: [transformMath.transformPoint(sampler.nodeData[control]['rotatePivot'], matrix)
+                          for matrix in matrices]
+                for control, matrices in sampled.items()}
 
-        thisMob = self.funcs.getMObject(control)
-        startTranslation = self.getTranslationAtFrame(startFrame, thisMob)
-        endTranslation = self.getTranslationAtFrame(endFrame, thisMob)
-
-        return self.max_difference_axis(startTranslation, endTranslation)
-
-    def getTranslationAtFrame(self, endFrame, thisMob):
-        currentMDG = OpenMaya.MDGContext(OpenMaya.MTime(endFrame, om2.MTime.uiUnit()))
-        currentTransform = self.funcs.om_plug_worldMatrix_at_time('worldMatrix', thisMob, currentMDG)
-        mfnTransform = om2.MTransformationMatrix(currentTransform)
-        endTranslation = mfnTransform.translation(om2.MSpace.kWorld)
-        return endTranslation
+    def analyseControls(self, controls, startFrame=None, endFrame=None, frames=None):
+        """
+        Sample and analyse the trajectories of all the controls at once
+        :param controls:
+        :param startFrame: defaults to the playback range
+        :param endFrame:
+        :param frames: explicit frames, overrides startFrame and endFrame
+        :return: dict of control: TrajectoryAnalysis
+        """
+        frames = frames or self.getAnalysisFrames(startFrame, endFrame)
+        return locomotionAnalysis.analyseTrajectories(self.sampleTrajectories(controls, frames),
+                                                      frames,
+                                                      upAxis=cmds.upAxis(query=True, axis=True),
+                                                      fps=OpenMaya.MTime(1, OpenMaya.MTime.kSeconds).asUnits(OpenMaya.MTime.uiUnit()))
 
     def addExpressionToNodes(self,
                              globalControl=None,
                              controls=dict(),
-                             controlData=dict()
+                             controlData=dict(),
+                             method=None
                              ):
         """
         Adds an expression to offset the space group, using a multmatrix node to insert the offset, plugs in
@@ -486,16 +519,17 @@ class LocomotionTools(toolAbstractFactory):
         :param offsetData:
         :param axis:
         :param space:
+        :param method: circleMethodExpression or circleMethodNodes, defaults to the option
         :return:
         """
-
+        method = method or pm.optionVar.get(self.circleMethodOption, circleMethodExpression)
         upAxis = cmds.upAxis(query=True, axis=True)
 
         for cnt, offset in controls.items():
             availableAxis = ['x', 'y', 'z']
             # remove the forward axis
-            availableAxis = [x for x in availableAxis if x is not controlData[cnt]['forwardAxis']]
-            availableAxis = [x for x in availableAxis if x is not upAxis]
+            availableAxis = [x for x in availableAxis if x != controlData[cnt]['forwardAxis']]
+            availableAxis = [x for x in availableAxis if x != upAxis]
 
             translateAxis = 'translate' + controlData[cnt]['forwardAxis'].upper()
             rotateAxis = 'rotate' + upAxis.upper()
@@ -509,17 +543,18 @@ class LocomotionTools(toolAbstractFactory):
 
             # print(globalControl, driverNode, offsetNode)
 
-            circleExpression(turnControl=globalControl,
-                             turnAttr=attrName,
-                             circleCentreAttr=circleCentreAttr,
-                             outputNode=controlData[cnt]['tempParent'],
-                             driverAttr=translateAxis,
-                             rotateAttr=rotateAxis,
-                             floorForwardAttr=floorForwardAxis,
-                             floorSideAttr=floorSideAxis,
-                             offsetAttr=controlData[cnt]['tempController'] + '.' + offsetAttrName,
-                             driverControl=controlData[cnt]['tempController']
-                             )
+            circleSetup = circleNetwork if method == circleMethodNodes else circleExpression
+            circleSetup(turnControl=globalControl,
+                        turnAttr=attrName,
+                        circleCentreAttr=circleCentreAttr,
+                        outputNode=controlData[cnt]['tempParent'],
+                        driverAttr=translateAxis,
+                        rotateAttr=rotateAxis,
+                        floorForwardAttr=floorForwardAxis,
+                        floorSideAttr=floorSideAxis,
+                        offsetAttr=controlData[cnt]['tempController'] + '.' + offsetAttrName,
+                        driverControl=controlData[cnt]['tempController']
+                        )
 
     def redirectSelected(self):
         sel = cmds.ls(sl=True)
@@ -532,27 +567,63 @@ class LocomotionTools(toolAbstractFactory):
                 cmds.warning(traceback.format_exc())
                 self.funcs.resumeSkinning()
 
-    def redirect(self, sel, rotateOnly=False):
+    def getRedirectColours(self, sel, names):
+        """
+        Colours for the temp controls, darker and lighter versions of each control's colour
+        :param sel:
+        :param names: dict of control: redirect node names
+        :return: dict of temp control: rgb, 0-1
+        """
+        colours = dict()
+        for s in sel:
+            colour = self.funcs.getControlColour(s)
+            for node, offset in [(names[s]['rotationRoot'], -0.15), (names[s]['rotateOffset'], 0.15)]:
+                colours[node] = [x / 255.0 for x in self.funcs.adjust_color_lightness(colour[0], colour[1],
+                                                                                      colour[2], 1 + offset)]
+        return colours
+
+    def getRedirectGraph(self, sel, strafeControl, names=None, shapes=dict()):
+        names = names or {s: locomotionGraphs.getRedirectNames(s) for s in sel}
+        return locomotionGraphs.redirectGraph(sel, strafeControl,
+                                              upAxis=cmds.upAxis(query=True, axis=True),
+                                              jointOrients=[s for s in sel if
+                                                            cmds.attributeQuery('jointOrient', node=s, exists=True)],
+                                              colours=self.getRedirectColours(sel, names),
+                                              shapes=shapes,
+                                              names=names)
+
+    def redirect(self, sel, rotateOnly=False, dryRun=False):
+        """
+        :param sel:
+        :param rotateOnly:
+        :param dryRun: return the planned node graph as json instead of changing the scene
+        :return:
+        """
         if not sel:
             return
 
-        roots = dict()
+        currentAssetName = sel[0].split(':')[0] + ':' + self.strafeAssetName
+        if dryRun:
+            return self.getRedirectGraph(sel, currentAssetName).toJson()
+
+        with self.funcs.undoChunk():
+            self.redirectControls(sel, currentAssetName, rotateOnly=rotateOnly)
+
+    def redirectControls(self, sel, currentAssetName, rotateOnly=False):
         rotationRoots = dict()
-        translateAnimNodes = dict()
         rotateAnimNodes = dict()
-        translateAnimOffsetNodes = dict()
         rotateAnimOffsetNodes = dict()
-        tempConstraints = list()
+        names = dict()
 
         assetShapeControl = self.funcs.tempControl(name='delete', suffix='Root', drawType='arrow', scale=1.0)
-        currentAssetName = sel[0].split(':')[0] + ':' + self.strafeAssetName
         if not cmds.objExists(currentAssetName):
-            strafeControl = self.createAsset(sel[0].split(':')[0] + ':' + self.strafeAssetName,
+            strafeControl = self.createAsset(currentAssetName,
                                              transform=True,
                                              imageName='directKeySmall.png',
                                              assetCommandName=assetCommandName)
         else:
-            strafeControl = pm.PyNode(currentAssetName)
+            strafeControl = currentAssetName
+        strafeControl = str(strafeControl)
         pm.delete(assetShapeControl, ch=True)
         pm.parent(assetShapeControl.getShapes(), strafeControl, r=True, s=True)
         pm.delete(assetShapeControl)
@@ -560,98 +631,40 @@ class LocomotionTools(toolAbstractFactory):
         rotateCache = cmds.getAttr(strafeControl + '.rotate')[0]
         cmds.setAttr(strafeControl + '.rotate', 0, 0, 0)
         bakeAttrs = list()
-        upAxis = cmds.upAxis(query=True, axis=True)
+        shapes = dict()
+        specs = list()
         for s in sel:
-            # root = self.funcs.tempControl(name=s, suffix='Root', drawType='redirectRoot', scale=0.5)
-
-            rotationRoot = self.funcs.tempControl(name=s, suffix='RotationRoot', drawType='sphereZ', scale=0.7)
-            cmds.addAttr(str(rotationRoot), ln='animControl', at='message')
-            cmds.connectAttr(s + '.message', str(rotationRoot) + '.animControl')
-            # worldOffsetControl = self.funcs.tempControl(name=s, suffix='TranslateOffset', drawType='redirectRoot',
-            #                                             scale=1)
-
-            # translateAnimOFfsetNode = self.funcs.tempControl(name=s, suffix='TranslateOffset', drawType='plus',
-            #                                                  scale=0.75)
-            # self.funcs.getSetColour(s, translateAnimOFfsetNode, brightnessOffset=0.15)
-
-            rotateAnimNode = self.funcs.tempNull(name=s, suffix='RotateBaked')
-            rotateAnimOffsetNode = self.funcs.tempControl(name=s, suffix='RotateOffset', drawType='diamond',
-                                                          scale=1, rotateOrder=2)
-            tiltAnimOffsetNode = self.funcs.tempControl(name=s, suffix='TiltDirection', drawType='arrow',
-                                                        scale=1.0, rotateOrder=3)
-            cmds.setAttr(tiltAnimOffsetNode + '.rotateX', lock=True, channelBox=False)
-            cmds.setAttr(tiltAnimOffsetNode + '.rotateY', lock=True, channelBox=False)
-            cmds.setAttr(tiltAnimOffsetNode + '.rotateZ', lock=True, channelBox=False)
-            cmds.setAttr(tiltAnimOffsetNode + '.translate', lock=True, channelBox=False)
-            cmds.setAttr(tiltAnimOffsetNode + '.scale', lock=True, channelBox=False)
-            cmds.setAttr(tiltAnimOffsetNode + '.rotate' + upAxis.upper(), lock=False, channelBox=True)
-
-            self.funcs.getSetColour(s, rotationRoot, brightnessOffset=-0.15)
-            self.funcs.getSetColour(s, rotateAnimOffsetNode, brightnessOffset=0.15)
-
-            if pm.attributeQuery('jointOrient', node=s, exists=True):
-                tiltComposeMatrix = cmds.createNode('composeMatrix')
-                tiltInverseMatrix = cmds.createNode('inverseMatrix')
-
-                jointOrientComposeMatrix = cmds.createNode('composeMatrix')
-                jointOrientMultMatrix = cmds.createNode('multMatrix')
-                jointOrientInverseMatrix = cmds.createNode('inverseMatrix')
-                jointOrientOutMultMatrix = cmds.createNode('multMatrix')
-
-                pm.connectAttr(tiltAnimOffsetNode + '.rotate', tiltComposeMatrix + '.inputRotate')
-                pm.connectAttr(tiltComposeMatrix + '.outputMatrix', rotateAnimNode + ' .offsetParentMatrix')
-
-                # connect the joint orient to some mult matrices to compensate
-                pm.connectAttr(s + '.jointOrient', jointOrientComposeMatrix + '.inputRotate')
-                pm.connectAttr(jointOrientComposeMatrix + '.outputMatrix', jointOrientMultMatrix + '.matrixIn[0]')
-                pm.connectAttr(tiltComposeMatrix + '.outputMatrix', jointOrientMultMatrix + '.matrixIn[1]')
-
-                pm.connectAttr(jointOrientMultMatrix + '.matrixSum', jointOrientOutMultMatrix + '.matrixIn[0]')
-                pm.connectAttr(jointOrientComposeMatrix + '.outputMatrix', jointOrientInverseMatrix + '.inputMatrix')
-                pm.connectAttr(jointOrientInverseMatrix + '.outputMatrix', jointOrientOutMultMatrix + '.matrixIn[1]')
-                pm.connectAttr(jointOrientOutMultMatrix + '.matrixSum', tiltInverseMatrix + '.inputMatrix')
-                pm.connectAttr(tiltInverseMatrix + '.outputMatrix', rotateAnimOffsetNode + ' .offsetParentMatrix')
-            else:
-                tiltComposeMatrix = cmds.createNode('composeMatrix')
-                tiltInverseMatrix = cmds.createNode('inverseMatrix')
-
-                pm.connectAttr(tiltAnimOffsetNode + '.rotate', tiltComposeMatrix + '.inputRotate')
-                pm.connectAttr(tiltComposeMatrix + '.outputMatrix', tiltInverseMatrix + '.inputMatrix')
-                pm.connectAttr(tiltComposeMatrix + '.outputMatrix', rotateAnimNode + ' .offsetParentMatrix')
-                pm.connectAttr(tiltInverseMatrix + '.outputMatrix', rotateAnimOffsetNode + ' .offsetParentMatrix')
-
-            pm.parent(tiltAnimOffsetNode, rotationRoot)
-            pm.parent(rotateAnimOffsetNode, rotateAnimNode)
-            pm.parent(rotateAnimNode, rotationRoot)
-
-            # pm.parent(translateAnimOFfsetNode, translateAnimNode)
+            specs.append({'name': s, 'suffix': 'RotationRoot', 'drawType': 'sphereZ', 'scale': 0.7})
+            specs.append({'name': s, 'suffix': 'RotateOffset', 'drawType': 'diamond', 'scale': 1.0, 'rotateOrder': 2})
+            specs.append({'name': s, 'suffix': 'TiltDirection', 'drawType': 'arrow', 'scale': 1.0, 'rotateOrder': 3})
+        tempControls = self.funcs.tempControls(specs)
+        for index, s in enumerate(sel):
+            rotationRoot, rotateAnimOffsetNode, tiltAnimOffsetNode = tempControls[index * 3:index * 3 + 3]
+            names[s] = {'rotationRoot': rotationRoot,
+                        'rotateBaked': locomotionGraphs.getRedirectNames(s)['rotateBaked'],
+                        'rotateOffset': rotateAnimOffsetNode,
+                        'tiltDirection': tiltAnimOffsetNode}
+            for node in [rotationRoot, rotateAnimOffsetNode]:
+                shapes[node] = cmds.listRelatives(node, shapes=True, fullPath=True) or list()
+
+        # everything else around the temp controls goes in as one batch
+        graph = self.getRedirectGraph(sel, strafeControl, names=names, shapes=shapes)
+        builtNames = applyCurveEdit(lambda animCurveChange, dagModifier: graph.build(dagModifier))
 
-            rotationRoot.inheritsTransform.set(0)
-
-            tempConstraints.append(pm.parentConstraint(s, rotateAnimNode))
-
-            # tempConstraints.append(pm.parentConstraint(s, worldOffsetControl, skipRotate=('x', 'y', 'z')))
-            tempConstraints.append(pm.parentConstraint(s, rotationRoot, skipRotate=('x', 'y', 'z')))
-            # pm.pointConstraint(worldOffsetControl, rotationRoot)
-
-            bakeAttrs.extend([str(rotationRoot) + '.translate' + x for x in ['X','Y','Z']])
-            bakeAttrs.extend([str(rotateAnimNode) + '.rotate' + x for x in ['X','Y','Z']])
-            bakeAttrs.extend([str(rotateAnimNode) + '.translate' + x for x in ['X','Y','Z']])
-            rotationRoots[s] = rotationRoot
-            rotateAnimNodes[s] = rotateAnimNode
-            # translateAnimOffsetNodes[s] = worldOffsetControl
-            rotateAnimOffsetNodes[s] = rotateAnimOffsetNode
-
-            # pm.parent(worldOffsetControl, strafeControl)
-            pm.parent(rotationRoot, strafeControl)
-        # pm.container(strafeControl, edit=True,
-        #              includeHierarchyBelow=False,
-        #              force=True,
-        #              addNode=list(roots.values()))
-
-        bakeTargets = list(rotationRoots.values()) + list(rotateAnimNodes.values())
+        tempConstraints = list()
+        for s in sel:
+            rotationRoots[s] = names[s]['rotationRoot']
+            rotateAnimNodes[s] = builtNames[names[s]['rotateBaked']]
+            rotateAnimOffsetNodes[s] = names[s]['rotateOffset']
+            tempConstraints.extend(cmds.parentConstraint(s, rotateAnimNodes[s]))
+            bakeAttrs.extend([rotateAnimNodes[s] + '.rotate' + x for x in ['X', 'Y', 'Z']])
+            bakeAttrs.extend([rotateAnimNodes[s] + '.translate' + x for x in ['X', 'Y', 'Z']])
 
         keyRange = self.funcs.getBestTimelineRangeForBake()
+        # the rotation roots just follow the controls' pivots, key them from the sampled trajectories
+        frames = self.getAnalysisFrames(keyRange[0], keyRange[1])
+        analysis = self.analyseControls(sel, frames=frames)
+        self.keyRotationRoots(rotationRoots, analysis, frames)
         with self.funcs.suspendUpdate():
             pm.bakeResults(bakeAttrs,
                            time=(keyRange[0], keyRange[1]),
@@ -667,49 +680,58 @@ class LocomotionTools(toolAbstractFactory):
                            minimizeRotation=True,
                            controlPoints=False,
                            shape=False)
-        pm.delete(tempConstraints)
+        cmds.delete(tempConstraints)
 
         if int(cmds.about(majorVersion=True)) >= 2020:
+            translateSources = dict()
             for o in rotationRoots.values():
-                o = str(o)
-                composeMatrix = cmds.createNode('composeMatrix')
-                multMatrix = cmds.createNode('multMatrix')
-                pickMatrix = cmds.createNode('pickMatrix')
-                cmds.setAttr(pickMatrix + '.useScale', False)
-                cmds.setAttr(pickMatrix + '.useRotate', False)
-                cmds.setAttr(pickMatrix + '.useShear', False)
-                cmds.connectAttr(multMatrix + '.matrixSum', pickMatrix + '.inputMatrix')
-                cmds.connectAttr(composeMatrix + '.outputMatrix', multMatrix + '.matrixIn[0]')
-                cmds.connectAttr(strafeControl + '.worldMatrix[0]', multMatrix + '.matrixIn[1]')
-                cmds.connectAttr(pickMatrix + '.outputMatrix', o + '.offsetParentMatrix')
+                translateSources[o] = dict()
                 for a in ['X', 'Y', 'Z']:
                     conns = cmds.listConnections(o + '.translate' + a, source=True, destination=False,
                                                  plugs=True)
                     if not conns:
                         print('no connections', o)
                         continue
-                    conns = conns[0]
-                    cmds.disconnectAttr(conns, o + '.translate' + a)
-                    cmds.connectAttr(conns, composeMatrix + '.inputTranslate.inputTranslate' + a)
-
-                cmds.setAttr(o + '.translate', 0, 0, 0)
+                    translateSources[o][a] = conns[0]
+            strafeGraph = locomotionGraphs.redirectStrafeGraph(list(rotationRoots.values()), strafeControl,
+                                                               translateSources)
+            applyCurveEdit(lambda animCurveChange, dagModifier: strafeGraph.build(dagModifier))
         # TODO - add scalar/blend to animated nodes-rest position
 
         for s in sel:
-            translateTarget = rotateAnimOffsetNodes.get(s, None)
-            rotateTarget = rotateAnimOffsetNodes.get(s, None)
-            if translateTarget:
-                if not rotateOnly:
-                    pm.pointConstraint(rotateAnimOffsetNodes[s], s)
-            if rotateTarget:
-
-                if self.funcs.getAvailableRotates(s):
-                    continue
-                pm.orientConstraint(rotateAnimOffsetNodes[s], s)
+            if not rotateOnly:
+                cmds.pointConstraint(rotateAnimOffsetNodes[s], s)
+            if self.funcs.getAvailableRotates(s):
+                continue
+            cmds.orientConstraint(rotateAnimOffsetNodes[s], s)
 
         cmds.setAttr(strafeControl + '.rotate', *rotateCache)
 
 
+    @staticmethod
+    def keyRotationRoots(rotationRoots, analysis, frames):
+        """
+        Key each rotation root's translation to its control's sampled trajectory, one write per channel
+        :param rotationRoots: dict of control: rotation root
+        :param analysis: dict of control: TrajectoryAnalysis
+        :param frames:
+        :return:
+        """
+        prepareCurves([str(root) + '.translate' + axis for root in rotationRoots.values() for axis in 'XYZ'],
+                      frames[0])
+
+        def edit(animCurveChange, dagModifier):
+            for control, root in rotationRoots.items():
+                points = analysis[control].points
+                writeChannels(str(root),
+                              {'translate' + axis: [point[index] for point in points]
+                               for index, axis in enumerate('XYZ')},
+                              frames,
+                              animCurveChange=animCurveChange)
+
+        applyCurveEdit(edit)
+
+
 def circleExpression(turnControl=str(),
                      turnAttr=str(),
                      driverAttr=str(),
@@ -731,67 +753,112 @@ def circleExpression(turnControl=str(),
     :param outputNode:
     :return:
     """
-    upAxis = cmds.upAxis(query=True, axis=True)
-
-    if upAxis == 'y':
-        outFwdCalc = "{out}.{t} = (-$rot_offset.x + $circle.x -$offset.x);".format(out=outputNode,
-                                                                                   t=floorForwardAttr)
-        outSideCalc = "{out}.{t} = -(-$rot_offset.z + $circle.z - $offset.z);".format(out=outputNode,
-                                                                                      t=floorSideAttr)
-    else:
-        outFwdCalc = "{out}.{t} = (-$rot_offset.x + $circle.x -$offset.x);".format(out=outputNode,
-                                                                                   t=floorSideAttr)
-        outSideCalc = "{out}.{t} = (-$rot_offset.z + $circle.z - $offset.z);".format(out=outputNode,
-                                                                                     t=floorForwardAttr)
-    if 'X' in driverAttr:
-        circleLine1 = "float $circleX = $radius * cos($angle) - $radius;"
-        circleLine2 = "float $circleZ = $radius * sin($angle);"
-        progressString = "vector $rot_offset = rot( << 0, 0, $progress >>, << 0, 1, 0 >>, -$angle);"
-        offsetString = "vector $offset = rot( <<0, 0, {offsetAttr} >>, << 0, 1, 0 >>, -$angle);".format(
-            offsetAttr=offsetAttr)
-        groupOffsetLine = "vector $group_offset = rot($circle, << 0, 1, 0 >>, -$angle);"
-        outAngleLine = "{out}.{r} = rad_to_deg(-$angle);".format(out=outputNode, r=rotateAttr)
-    else:
-        circleLine1 = "float $circleX = $radius * sin($angle);"
-        circleLine2 = "float $circleZ = ($radius * cos($angle))- $radius;"
-        progressString = "vector $rot_offset = rot( <<$progress, 0, 0 >>, << 0, 1, 0 >>, $angle);"
-        offsetString = "vector $offset = rot( <<{offsetAttr}, 0, 0 >>, << 0, 1, 0 >>, -$angle);".format(
-            offsetAttr=offsetAttr)
-        groupOffsetLine = "vector $group_offset = rot($circle, << 0, 1, 0 >>, $angle);"
-        outAngleLine = "{out}.{r} = rad_to_deg($angle);".format(out=outputNode, r=rotateAttr)
-
-    expString = [
-        "float $progress = {driverControl}.{driverAttr};".format(driverControl=driverControl,
-                                                                 driverAttr=driverAttr),
-        "float $offset = {offsetAttr};".format(offsetAttr=offsetAttr),
-        "float $turn = {control}.{attr};".format(control=turnControl, attr=turnAttr),
-        "float $circumference = 0.0;",
-        "float $angle = 0.0;",
-        "float $radius = 0.0;",
-        "if (abs($turn) > 0.0)",
-        "{",
-        "$circumference = 100.0 * (360.0 /$turn);",
-        "$radius = 0.5 * ($circumference / 3.14159265359);",
-        "$angle = 2.0 * 3.14159265359 * (($progress + $offset) / $circumference);",
-        offsetString,
-        circleLine1,
-        circleLine2,
-        "$circle = << $circleX, 0.0, $circleZ >>;",
-        progressString,
-        groupOffsetLine,
-        outFwdCalc,
-        outSideCalc,
-        "{out}.{t} = $radius;".format(out=driverControl, t=circleCentreAttr),
-        outAngleLine,
-        "}",
-        "else",
-        "{",
-        "{out}.{t} = 0.0;".format(out=outputNode, t=floorForwardAttr),
-        "{out}.{t} = 0.0;".format(out=outputNode, t=floorSideAttr),
-        "{out}.{r} = 0.0;".format(out=outputNode, r=rotateAttr),
-        "{out}.{r} = 0.0;".format(out=driverControl, r=circleCentreAttr),
-        "}"]
-    cmds.expression(name=outputNode + turnexpressionName, s=str('\n').join(expString))
+    expString = locomotionGraphs.circleExpressionString(upAxis=cmds.upAxis(query=True, axis=True),
+                                                        turnControl=turnControl,
+                                                        turnAttr=turnAttr,
+                                                        driverAttr=driverAttr,
+                                                        rotateAttr=rotateAttr,
+                                                        circleCentreAttr=circleCentreAttr,
+                                                        floorForwardAttr=floorForwardAttr,
+                                                        floorSideAttr=floorSideAttr,
+                                                        offsetAttr=offsetAttr,
+                                                        driverControl=driverControl,
+                                                        outputNode=outputNode)
+    cmds.expression(name=outputNode + turnexpressionName, s=expString)
+
+
+def circleNetwork(turnControl=str(),
+                  turnAttr=str(),
+                  driverAttr=str(),
+                  rotateAttr=str(),
+                  circleCentreAttr=str(),
+                  floorForwardAttr=str(),
+                  floorSideAttr=str(),
+                  offsetAttr=str(),
+                  driverControl=str(),
+                  outputNode=str()):
+    """
+    Builds the same circular motion as circleExpression from utility nodes, so it
+    evaluates in parallel and doesn't force an expression update every frame.
+    The arguments and nodes are stored on the output node so it can be converted back
+    """
+    arguments = {'turnControl': turnControl,
+                 'turnAttr': turnAttr,
+                 'driverAttr': driverAttr,
+                 'rotateAttr': rotateAttr,
+                 'circleCentreAttr': circleCentreAttr,
+                 'floorForwardAttr': floorForwardAttr,
+                 'floorSideAttr': floorSideAttr,
+                 'offsetAttr': offsetAttr,
+                 'driverControl': driverControl,
+                 'outputNode': outputNode}
+    graph = locomotionGraphs.circleNetwork(turnPlug=turnControl + '.' + turnAttr,
+                                           driverPlug=driverControl + '.' + driverAttr,
+                                           offsetPlug=offsetAttr,
+                                           circleCentrePlug=driverControl + '.' + circleCentreAttr,
+                                           outputNode=outputNode,
+                                           rotateAttr=rotateAttr,
+                                           floorForwardAttr=floorForwardAttr,
+                                           floorSideAttr=floorSideAttr,
+                                           upAxis=cmds.upAxis(query=True, axis=True),
+                                           name=outputNode + '_circle')
+    nodes = graph.build()
+    if not cmds.attributeQuery(circleNetworkAttr, node=outputNode, exists=True):
+        cmds.addAttr(outputNode, ln=circleNetworkAttr, dt='string')
+    cmds.setAttr(outputNode + '.' + circleNetworkAttr,
+                 json.dumps({'arguments': arguments, 'nodes': list(nodes.values())}),
+                 type='string')
+    return list(nodes.values())
+
+
+def getCircleSetups():
+    """
+    Every circle walk setup in the scene, expression or node based
+    :return: dict of output node: (method, expression name or list of nodes, circleExpression arguments)
+    """
+    setups = dict()
+    expressions = cmds.ls('*' + turnexpressionName, '*:*' + turnexpressionName, type='expression') or list()
+    for expression in expressions:
+        arguments = locomotionGraphs.parseCircleExpression(cmds.expression(expression, query=True, string=True))
+        if arguments:
+            setups[arguments['outputNode']] = (circleMethodExpression, expression, arguments)
+    networkNodes = cmds.ls('*.' + circleNetworkAttr, '*:*.' + circleNetworkAttr, objectsOnly=True) or list()
+    for node in networkNodes:
+        data = cmds.getAttr(node + '.' + circleNetworkAttr)
+        if not data:
+            continue
+        data = json.loads(data)
+        setups[data['arguments']['outputNode']] = (circleMethodNodes, data['nodes'], data['arguments'])
+    return setups
+
+
+def removeCircleSetup(outputNode, method, setup):
+    if method == circleMethodExpression:
+        cmds.delete(setup)
+        return
+    cmds.delete([node for node in setup if cmds.objExists(node)])
+    cmds.setAttr(outputNode + '.' + circleNetworkAttr, str(), type='string')
+
+
+def convertCircleSetups(method, outputNodes=None):
+    """
+    Rebuild circle walk setups as expressions or node networks
+    :param method: circleMethodExpression or circleMethodNodes
+    :param outputNodes: the setups to convert, defaults to all of them
+    :return:
+    """
+    setups = getCircleSetups()
+    with functions().undoChunk():
+        for outputNode, (currentMethod, setup, arguments) in setups.items():
+            if outputNodes is not None and outputNode not in outputNodes:
+                continue
+            if currentMethod == method:
+                continue
+            removeCircleSetup(outputNode, currentMethod, setup)
+            if method == circleMethodNodes:
+                circleNetwork(**arguments)
+            else:
+                circleExpression(**arguments)
 
 
 def removeExpressionFromNodes(namespace=str(),
@@ -0,0 +1,247 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+import math
+
+'''
+Maya-free analysis of sampled trajectories for the locomotion tools.
+
+A trajectory is a list of x, y, z world positions, one per frame. Everything
+works on the floor plane, the two axes that are not the scene up axis.
+'''
+
+axisNames = ['x', 'y', 'z']
+
+
+def getFloorAxes(upAxis='y'):
+    up = axisNames.index(upAxis)
+    return [axis for axis in range(3) if axis != up]
+
+
+def defaultForwardAxis(upAxis='y'):
+    """
+    Forward axis for a trajectory that never moves on the floor, the first floor axis
+    """
+    return axisNames[getFloorAxes(upAxis)[0]]
+
+
+def velocities(points, fps=1.0):
+    """
+    Per frame velocity, central differences with one sided ends
+    :param points: list of x, y, z
+    :param fps: frames per second, 1.0 gives units per frame
+    :return: list of x, y, z
+    """
+    count = len(points)
+    if count < 2:
+        return [[0.0, 0.0, 0.0] for x in range(count)]
+    result = list()
+    for index in range(count):
+        before = points[max(0, index - 1)]
+        after = points[min(count - 1, index + 1)]
+        step = (min(count - 1, index + 1) - max(0, index - 1)) / float(fps)
+        result.append([(after[axis] - before[axis]) / step for axis in range(3)])
+    return result
+
+
+def floorSpeeds(velocityList, upAxis='y'):
+    first, second = getFloorAxes(upAxis)
+    return [math.sqrt(v[first] * v[first] + v[second] * v[second]) for v in velocityList]
+
+
+def principalDirection(points, upAxis='y'):
+    """
+    Main direction of travel on the floor plane, the major axis of the point spread
+    pointed the way the trajectory heads. This holds up on curved and noisy paths
+    where the start to end difference alone does not
+    :param points: list of x, y, z
+    :param upAxis:
+    :return: unit x, y, z with 0 on the up axis, None if the points never move
+    """
+    first, second = getFloorAxes(upAxis)
+    count = len(points)
+    if count < 2:
+        return None
+    meanA = sum(p[first] for p in points) / count
+    meanB = sum(p[second] for p in points) / count
+    covAA = covAB = covBB = 0.0
+    for p in points:
+        a = p[first] - meanA
+        b = p[second] - meanB
+        covAA += a * a
+        covAB += a * b
+        covBB += b * b
+    if covAA + covBB < 1.0e-12:
+        return None
+    angle = 0.5 * math.atan2(2.0 * covAB, covAA - covBB)
+    dirA = math.cos(angle)
+    dirB = math.sin(angle)
+
+    # the eigenvector has no sign, point it along the net travel
+    travelA = points[-1][first] - points[0][first]
+    travelB = points[-1][second] - points[0][second]
+    if abs(travelA * dirA + travelB * dirB) < 1.0e-9:
+        travelA = sum(p[first] for p in points[count // 2:]) - sum(p[first] for p in points[:count - count // 2])
+        travelB = sum(p[second] for p in points[count // 2:]) - sum(p[second] for p in points[:count - count // 2])
+    if travelA * dirA + travelB * dirB < 0:
+        dirA = -dirA
+        dirB = -dirB
+    direction = [0.0, 0.0, 0.0]
+    direction[first] = dirA
+    direction[second] = dirB
+    return direction
+
+
+def dominantAxis(direction):
+    """
+    :param direction: x, y, z
+    :return: 'x', 'y' or 'z' for the largest component, None for no direction
+    """
+    if direction is None:
+        return None
+    values = [abs(x) for x in direction]
+    return axisNames[values.index(max(values))]
+
+
+def curvature(points, upAxis='y'):
+    """
+    Signed turning per unit distance on the floor plane, the inverse of the turn radius,
+    from the circle through each frame and its neighbours. Positive turns run
+    counter clockwise looking down from above, a positive rotation about the up axis
+    :param points:
+    :param upAxis:
+    :return: list of floats, 0.0 where the path is straight or not moving
+    """
+    first, second = getFloorAxes(upAxis)
+    # with y up the floor axes x, z are left handed looking down y
+    handedness = 1.0 if (second - first) % 3 == 1 else -1.0
+    count = len(points)
+    result = [0.0] * count
+    for index in range(1, count - 1):
+        before, current, after = points[index - 1], points[index], points[index + 1]
+        ax = current[first] - before[first]
+        ay = current[second] - before[second]
+        bx = after[first] - current[first]
+        by = after[second] - current[second]
+        cx = after[first] - before[first]
+        cy = after[second] - before[second]
+        lengths = math.sqrt(ax * ax + ay * ay) * math.sqrt(bx * bx + by * by) * math.sqrt(cx * cx + cy * cy)
+        if lengths < 1.0e-12:
+            continue
+        result[index] = handedness * 2.0 * (ax * by - ay * bx) / lengths
+    if count > 2:
+        result[0] = result[1]
+        result[-1] = result[-2]
+    return result
+
+
+def strideSegments(speeds, plantRatio=0.2, minimumLength=2):
+    """
+    Split a trajectory into strides at the frames it plants, frames slower than
+    plantRatio of the top speed. Each stride runs from the start of one plant to
+    the start of the next
+    :param speeds: per frame speed
+    :param plantRatio:
+    :param minimumLength: plants shorter than this many frames are ignored
+    :return: list of start, end frame indices
+    """
+    if not speeds:
+        return list()
+    threshold = max(speeds) * plantRatio
+    plantStarts = list()
+    runStart = None
+    for index, speed in enumerate(speeds + [threshold + 1.0]):
+        if speed <= threshold:
+            if runStart is None:
+                runStart = index
+            continue
+        if runStart is not None and index - runStart >= minimumLength:
+            plantStarts.append(runStart)
+        runStart = None
+    return [(start, end) for start, end in zip(plantStarts, plantStarts[1:])]
+
+
+class TrajectoryAnalysis(object):
+    """
+    Direction, velocity, turning and strides for one sampled trajectory
+    """
+
+    def __init__(self, points, frames, upAxis='y', fps=1.0):
+        self.points = [list(p) for p in points]
+        self.frames = list(frames)
+        self.upAxis = upAxis
+        self.velocity = velocities(self.points, fps=fps)
+        self.speed = floorSpeeds(self.velocity, upAxis=upAxis)
+        self.direction = principalDirection(self.points, upAxis=upAxis)
+        self.curvature = curvature(self.points, upAxis=upAxis)
+        self._strides = None
+
+    @property
+    def forwardAxis(self):
+        return dominantAxis(self.direction)
+
+    @property
+    def isStationary(self):
+        return self.direction is None
+
+    def getForwardAxis(self):
+        """
+        :return: the forward axis, the default floor axis when the trajectory never moves
+        """
+        return self.forwardAxis or defaultForwardAxis(self.upAxis)
+
+    @property
+    def distance(self):
+        return sum(math.sqrt(sum((b[axis] - a[axis]) ** 2 for axis in getFloorAxes(self.upAxis)))
+                   for a, b in zip(self.points, self.points[1:]))
+
+    @property
+    def averageCurvature(self):
+        """
+        Distance weighted turning over the whole path
+        """
+        totalSpeed = sum(self.speed)
+        if not totalSpeed:
+            return 0.0
+        return sum(k * s for k, s in zip(self.curvature, self.speed)) / totalSpeed
+
+    @property
+    def strides(self):
+        """
+        :return: list of start, end frames
+        """
+        if self._strides is None:
+            self._strides = [(self.frames[start], self.frames[end]) for start, end in strideSegments(self.speed)]
+        return self._strides
+
+
+def analyseTrajectories(trajectories, frames, upAxis='y', fps=1.0):
+    """
+    :param trajectories: dict of node: list of positions
+    :param frames:
+    :param upAxis:
+    :param fps:
+    :return: dict of node: TrajectoryAnalysis
+    """
+    return {node: TrajectoryAnalysis(points, frames, upAxis=upAxis, fps=fps) for node, points in trajectories.items()}
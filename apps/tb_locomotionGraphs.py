@@ -0,0 +1,401 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+import re
+import math
+from apps.tb_nodeGraph import NodeGraph
+
+'''
+Maya-free descriptions of the locomotion rigs, the circle walk as the original
+expression (ported to python so it can be evaluated headless) and as a network of
+utility nodes that does the same thing without an expression.
+'''
+
+melPi = 3.14159265359
+
+# scale between DegreesPerMeter * distance and degrees, and the radius constant
+degreesPerUnit = 0.01
+radiusConstant = 18000.0 / math.pi
+
+circleNodeCounts = {'x': 10, 'z': 13}
+
+
+def rotateY(vector, angle):
+    """
+    rot(vector, <<0, 1, 0>>, angle) in mel, right handed like maya's rotateY
+    :param vector:
+    :param angle: radians
+    :return:
+    """
+    c = math.cos(angle)
+    s = math.sin(angle)
+    return [vector[0] * c + vector[2] * s, vector[1], -vector[0] * s + vector[2] * c]
+
+
+def evaluateCircleExpression(progress, offset, turn, driverAxis='x', upAxis='y'):
+    """
+    The circle walk expression written by circleExpression, line for line
+    :param progress: driver control value along its forward axis
+    :param offset: offset attribute value
+    :param turn: degrees per meter
+    :param driverAxis: 'x' when the driver attribute is translateX
+    :param upAxis:
+    :return: dict of forward, side, rotate (degrees) and circleCentre
+    """
+    if not abs(turn) > 0.0:
+        return {'forward': 0.0, 'side': 0.0, 'rotate': 0.0, 'circleCentre': 0.0}
+    circumference = 100.0 * (360.0 / turn)
+    radius = 0.5 * (circumference / melPi)
+    angle = 2.0 * melPi * ((progress + offset) / circumference)
+    if driverAxis == 'x':
+        offsetVector = rotateY([0.0, 0.0, offset], -angle)
+        circle = [radius * math.cos(angle) - radius, 0.0, radius * math.sin(angle)]
+        rotateOffset = rotateY([0.0, 0.0, progress], -angle)
+        outAngle = math.degrees(-angle)
+    else:
+        offsetVector = rotateY([offset, 0.0, 0.0], -angle)
+        circle = [radius * math.sin(angle), 0.0, radius * math.cos(angle) - radius]
+        rotateOffset = rotateY([progress, 0.0, 0.0], angle)
+        outAngle = math.degrees(angle)
+    first = -rotateOffset[0] + circle[0] - offsetVector[0]
+    second = -rotateOffset[2] + circle[2] - offsetVector[2]
+    if upAxis == 'y':
+        forward, side = first, -second
+    else:
+        forward, side = second, first
+    return {'forward': forward, 'side': side, 'rotate': outAngle, 'circleCentre': radius}
+
+
+def circleNetwork(turnPlug, driverPlug, offsetPlug, circleCentrePlug, outputNode,
+                  rotateAttr, floorForwardAttr, floorSideAttr, upAxis='y', name='circle'):
+    """
+    The circle walk as utility nodes. Every rot() in the expression turns the same way
+    around y, so the vectors that share an angle are summed and rotated by one
+    composeMatrix and pointMatrixMult. When y is up the side output is negated, which
+    is done by mirroring the vectors in z and turning the other way.
+
+    10 nodes when the driver is translateX, 13 otherwise as the offset is rotated
+    the opposite way to the progress and needs its own rotation
+    :param turnPlug: degrees per meter plug
+    :param driverPlug: driver control's forward translate plug
+    :param offsetPlug: offset attribute plug
+    :param circleCentrePlug: plug that receives the radius
+    :param outputNode: node that gets moved round the circle
+    :param rotateAttr: rotate attribute on outputNode, around the up axis
+    :param floorForwardAttr:
+    :param floorSideAttr:
+    :param upAxis:
+    :param name: prefix for the node names
+    :return: NodeGraph
+    """
+    driverAxis = 'x' if driverPlug.endswith('X') else 'z'
+    mirror = -1.0 if upAxis == 'y' else 1.0
+    angleToRadians = math.radians(degreesPerUnit)
+
+    graph = NodeGraph()
+    distance = graph.addNode(name + '_distance', 'addDoubleLinear')
+    graph.connect(driverPlug, distance + '.input1')
+    graph.connect(offsetPlug, distance + '.input2')
+
+    safeTurn = graph.addNode(name + '_safeTurn', 'condition', {'secondTerm': 0.0,
+                                                               'operation': 0,
+                                                               'colorIfTrueR': 1.0})
+    graph.connect(turnPlug, safeTurn + '.firstTerm')
+    graph.connect(turnPlug, safeTurn + '.colorIfFalseR')
+
+    # X radius, Y negated input, Z radius mirrored
+    radius = graph.addNode(name + '_radius', 'multiplyDivide', {'operation': 2,
+                                                                'input1X': radiusConstant,
+                                                                'input1Z': radiusConstant * mirror,
+                                                                'input2Y': -1.0})
+    graph.connect(safeTurn + '.outColorR', radius + '.input2X')
+    graph.connect(safeTurn + '.outColorR', radius + '.input2Z')
+    graph.connect(distance + '.output' if driverAxis == 'x' else driverPlug, radius + '.input1Y')
+
+    angle = graph.addNode(name + '_angle', 'multDoubleLinear')
+    graph.connect(distance + '.output', angle + '.input1')
+    graph.connect(turnPlug, angle + '.input2')
+
+    def addRotation(suffix, factor):
+        units = graph.addNode(name + '_%sAngle' % suffix, 'unitConversion', {'conversionFactor': factor})
+        rotation = graph.addNode(name + '_%sRotation' % suffix, 'composeMatrix')
+        point = graph.addNode(name + '_%sPoint' % suffix, 'pointMatrixMult')
+        graph.connect(angle + '.output', units + '.input')
+        graph.connect(units + '.output', rotation + '.inputRotateY')
+        graph.connect(rotation + '.outputMatrix', point + '.inMatrix')
+        return point
+
+    centred = graph.addNode(name + '_centred', 'plusMinusAverage', {'operation': 2})
+    if driverAxis == 'x':
+        # rot(<< radius, 0, -(progress + offset) >>, -angle) - << radius, 0, 0 >>
+        point = addRotation('circle', -mirror * angleToRadians)
+        graph.connect(radius + '.outputX', point + '.inPointX')
+        graph.connect(distance + '.output' if upAxis == 'y' else radius + '.outputY', point + '.inPointZ')
+        graph.connect(radius + '.outputX', centred + '.input3D[1].input3Dx')
+        outAngleFactor = -angleToRadians
+    else:
+        # rot(<< -progress, 0, radius >>, angle) - rot(<< offset, 0, 0 >>, -angle) - << 0, 0, radius >>
+        point = addRotation('circle', mirror * angleToRadians)
+        graph.connect(radius + '.outputY', point + '.inPointX')
+        graph.connect(radius + '.outputZ', point + '.inPointZ')
+        offsetPoint = addRotation('offset', -mirror * angleToRadians)
+        graph.connect(offsetPlug, offsetPoint + '.inPointX')
+        graph.connect(offsetPoint + '.outputX', centred + '.input3D[1].input3Dx')
+        graph.connect(offsetPoint + '.outputZ', centred + '.input3D[1].input3Dz')
+        graph.connect(radius + '.outputZ', centred + '.input3D[2].input3Dz')
+        outAngleFactor = angleToRadians
+    graph.connect(point + '.outputX', centred + '.input3D[0].input3Dx')
+    graph.connect(point + '.outputZ', centred + '.input3D[0].input3Dz')
+
+    # everything is zero while the turn is zero, the rotation already is
+    result = graph.addNode(name + '_result', 'condition', {'secondTerm': 0.0,
+                                                           'operation': 0,
+                                                           'colorIfTrueR': 0.0,
+                                                           'colorIfTrueG': 0.0,
+                                                           'colorIfTrueB': 0.0})
+    graph.connect(turnPlug, result + '.firstTerm')
+    graph.connect(centred + '.output3Dx', result + '.colorIfFalseR')
+    graph.connect(centred + '.output3Dz', result + '.colorIfFalseG')
+    graph.connect(radius + '.outputX', result + '.colorIfFalseB')
+
+    outAngle = graph.addNode(name + '_outAngle', 'unitConversion', {'conversionFactor': outAngleFactor})
+    graph.connect(angle + '.output', outAngle + '.input')
+
+    if upAxis == 'y':
+        graph.connect(result + '.outColorR', outputNode + '.' + floorForwardAttr)
+        graph.connect(result + '.outColorG', outputNode + '.' + floorSideAttr)
+    else:
+        graph.connect(result + '.outColorR', outputNode + '.' + floorSideAttr)
+        graph.connect(result + '.outColorG', outputNode + '.' + floorForwardAttr)
+    graph.connect(outAngle + '.output', outputNode + '.' + rotateAttr)
+    graph.connect(result + '.outColorB', circleCentrePlug)
+    return graph
+
+
+def circleExpressionString(upAxis='y',
+                           turnControl=str(),
+                           turnAttr=str(),
+                           driverAttr=str(),
+                           rotateAttr=str(),
+                           circleCentreAttr=str(),
+                           floorForwardAttr=str(),
+                           floorSideAttr=str(),
+                           offsetAttr=str(),
+                           driverControl=str(),
+                           outputNode=str()):
+    """
+    The mel for the circle walk expression, parseCircleExpression reads the arguments back out
+    :param upAxis: scene up axis
+    :return: expression string
+    """
+    if upAxis == 'y':
+        outFwdCalc = "{out}.{t} = (-$rot_offset.x + $circle.x -$offset.x);".format(out=outputNode,
+                                                                                   t=floorForwardAttr)
+        outSideCalc = "{out}.{t} = -(-$rot_offset.z + $circle.z - $offset.z);".format(out=outputNode,
+                                                                                      t=floorSideAttr)
+    else:
+        outFwdCalc = "{out}.{t} = (-$rot_offset.x + $circle.x -$offset.x);".format(out=outputNode,
+                                                                                   t=floorSideAttr)
+        outSideCalc = "{out}.{t} = (-$rot_offset.z + $circle.z - $offset.z);".format(out=outputNode,
+                                                                                     t=floorForwardAttr)
+    if 'X' in driverAttr:
+        circleLine1 = "float $circleX = $radius * cos($angle) - $radius;"
+        circleLine2 = "float $circleZ = $radius * sin($angle);"
+        progressString = "vector $rot_offset = rot( << 0, 0, $progress >>, << 0, 1, 0 >>, -$angle);"
+        offsetString = "vector $offset = rot( <<0, 0, {offsetAttr} >>, << 0, 1, 0 >>, -$angle);".format(
+            offsetAttr=offsetAttr)
+        groupOffsetLine = "vector $group_offset = rot($circle, << 0, 1, 0 >>, -$angle);"
+        outAngleLine = "{out}.{r} = rad_to_deg(-$angle);".format(out=outputNode, r=rotateAttr)
+    else:
+        circleLine1 = "float $circleX = $radius * sin($angle);"
+        circleLine2 = "float $circleZ = ($radius * cos($angle))- $radius;"
+        progressString = "vector $rot_offset = rot( <<$progress, 0, 0 >>, << 0, 1, 0 >>, $angle);"
+        offsetString = "vector $offset = rot( <<{offsetAttr}, 0, 0 >>, << 0, 1, 0 >>, -$angle);".format(
+            offsetAttr=offsetAttr)
+        groupOffsetLine = "vector $group_offset = rot($circle, << 0, 1, 0 >>, $angle);"
+        outAngleLine = "{out}.{r} = rad_to_deg($angle);".format(out=outputNode, r=rotateAttr)
+
+    expString = [
+        "float $progress = {driverControl}.{driverAttr};".format(driverControl=driverControl,
+                                                                 driverAttr=driverAttr),
+        "float $offset = {offsetAttr};".format(offsetAttr=offsetAttr),
+        "float $turn = {control}.{attr};".format(control=turnControl, attr=turnAttr),
+        "float $circumference = 0.0;",
+        "float $angle = 0.0;",
+        "float $radius = 0.0;",
+        "if (abs($turn) > 0.0)",
+        "{",
+        "$circumference = 100.0 * (360.0 /$turn);",
+        "$radius = 0.5 * ($circumference / 3.14159265359);",
+        "$angle = 2.0 * 3.14159265359 * (($progress + $offset) / $circumference);",
+        offsetString,
+        circleLine1,
+        circleLine2,
+        "$circle = << $circleX, 0.0, $circleZ >>;",
+        progressString,
+        groupOffsetLine,
+        outFwdCalc,
+        outSideCalc,
+        "{out}.{t} = $radius;".format(out=driverControl, t=circleCentreAttr),
+        outAngleLine,
+        "}",
+        "else",
+        "{",
+        "{out}.{t} = 0.0;".format(out=outputNode, t=floorForwardAttr),
+        "{out}.{t} = 0.0;".format(out=outputNode, t=floorSideAttr),
+        "{out}.{r} = 0.0;".format(out=outputNode, r=rotateAttr),
+        "{out}.{r} = 0.0;".format(out=driverControl, r=circleCentreAttr),
+        "}"]
+    return str('\n').join(expString)
+
+
+def parseCircleExpression(text):
+    """
+    Read the circleExpression arguments back out of an expression it wrote
+    :param text: expression string
+    :return: dict of circleExpression keyword arguments, None if it is not a circle expression
+    """
+    progress = re.search(r'float \$progress = (\S+)\.(\w+);', text)
+    offset = re.search(r'float \$offset = (\S+);', text)
+    turn = re.search(r'float \$turn = (\S+)\.(\w+);', text)
+    # the else branch zeroes forward, side, rotate and the circle centre in that order
+    zeroed = re.findall(r'^(\S+)\.(\w+) = 0\.0;$', text.split('else', 1)[-1], re.MULTILINE)
+    if not (progress and offset and turn) or len(zeroed) != 4:
+        return None
+    return {'turnControl': turn.group(1),
+            'turnAttr': turn.group(2),
+            'driverAttr': progress.group(2),
+            'rotateAttr': zeroed[2][1],
+            'circleCentreAttr': zeroed[3][1],
+            'floorForwardAttr': zeroed[0][1],
+            'floorSideAttr': zeroed[1][1],
+            'offsetAttr': offset.group(1),
+            'driverControl': progress.group(1),
+            'outputNode': zeroed[0][0]}
+
+
+def getRedirectNames(control):
+    """
+    Names of the nodes redirect makes for a control
+    """
+    return {'rotationRoot': control + '_RotationRoot',
+            'rotateBaked': control + '_RotateBaked',
+            'rotateOffset': control + '_RotateOffset',
+            'tiltDirection': control + '_TiltDirection'}
+
+
+def redirectGraph(controls, strafeControl, upAxis='y', jointOrients=list(), colours=dict(), shapes=dict(),
+                  names=dict()):
+    """
+    Everything redirect hooks up around the temp controls, for all controls at once.
+    Per control the tilt control's rotation is composed into the offset parent matrix of
+    the baked rotation node and its inverse into the rotate offset control, compensating
+    for joint orient where the control has one
+    :param controls: anim controls being redirected
+    :param strafeControl: strafe asset the rotation roots go under
+    :param upAxis:
+    :param jointOrients: controls with a jointOrient attribute
+    :param colours: dict of temp control: rgb, 0-1
+    :param shapes: dict of temp control: shapes, their own colour overrides are turned off
+    :param names: dict of control: node names, for temp controls that didn't get the names
+                  from getRedirectNames
+    :return: NodeGraph
+    """
+    graph = NodeGraph()
+    for control in controls:
+        controlNames = names.get(control, None) or getRedirectNames(control)
+        rotationRoot = controlNames['rotationRoot']
+        tiltDirection = controlNames['tiltDirection']
+        rotateOffset = controlNames['rotateOffset']
+        rotateBaked = graph.addNode(controlNames['rotateBaked'], 'transform', {'rotateOrder': 2},
+                                    parent=rotationRoot)
+
+        graph.connect(control + '.message', graph.addAttr(rotationRoot, 'animControl', 'message'))
+
+        for attribute in ['rotateX', 'rotateY', 'rotateZ', 'translate', 'scale']:
+            graph.setAttrState(tiltDirection + '.' + attribute, lock=True, channelBox=False)
+        graph.setAttrState(tiltDirection + '.rotate' + upAxis.upper(), lock=False, channelBox=True)
+
+        tiltCompose = graph.addNode(control + '_tiltCompose', 'composeMatrix')
+        tiltInverse = graph.addNode(control + '_tiltInverse', 'inverseMatrix')
+        graph.connect(tiltDirection + '.rotate', tiltCompose + '.inputRotate')
+        graph.connect(tiltCompose + '.outputMatrix', rotateBaked + '.offsetParentMatrix')
+        if control in jointOrients:
+            # tilt inside the joint orient, jointOrient * tilt * jointOrient inverse
+            jointOrientCompose = graph.addNode(control + '_jointOrientCompose', 'composeMatrix')
+            jointOrientMult = graph.addNode(control + '_jointOrientMult', 'multMatrix')
+            jointOrientInverse = graph.addNode(control + '_jointOrientInverse', 'inverseMatrix')
+            jointOrientOutMult = graph.addNode(control + '_jointOrientOutMult', 'multMatrix')
+            graph.connect(control + '.jointOrient', jointOrientCompose + '.inputRotate')
+            graph.connect(jointOrientCompose + '.outputMatrix', jointOrientMult + '.matrixIn[0]')
+            graph.connect(tiltCompose + '.outputMatrix', jointOrientMult + '.matrixIn[1]')
+            graph.connect(jointOrientMult + '.matrixSum', jointOrientOutMult + '.matrixIn[0]')
+            graph.connect(jointOrientCompose + '.outputMatrix', jointOrientInverse + '.inputMatrix')
+            graph.connect(jointOrientInverse + '.outputMatrix', jointOrientOutMult + '.matrixIn[1]')
+            graph.connect(jointOrientOutMult + '.matrixSum', tiltInverse + '.inputMatrix')
+        else:
+            graph.connect(tiltCompose + '.outputMatrix', tiltInverse + '.inputMatrix')
+        graph.connect(tiltInverse + '.outputMatrix', rotateOffset + '.offsetParentMatrix')
+
+        for node in [rotationRoot, rotateOffset]:
+            if node not in colours:
+                continue
+            graph.setAttr(node + '.overrideEnabled', True)
+            graph.setAttr(node + '.overrideRGBColors', True)
+            graph.setAttr(node + '.overrideColorRGB', list(colours[node]))
+            for shape in shapes.get(node, list()):
+                graph.setAttr(shape + '.overrideEnabled', False)
+
+        graph.setAttr(rotationRoot + '.inheritsTransform', False)
+        graph.parent(tiltDirection, rotationRoot)
+        graph.parent(rotateOffset, rotateBaked)
+        graph.parent(rotationRoot, strafeControl)
+    return graph
+
+
+def redirectStrafeGraph(rotationRoots, strafeControl, translateSources):
+    """
+    Moves each rotation root's baked translation into its offset parent matrix, under
+    the strafe control's world matrix with only its translation picked out
+    :param rotationRoots:
+    :param strafeControl:
+    :param translateSources: dict of rotation root: dict of axis: curve output plug
+    :return: NodeGraph
+    """
+    graph = NodeGraph()
+    for root in rotationRoots:
+        compose = graph.addNode(root + '_strafeCompose', 'composeMatrix')
+        mult = graph.addNode(root + '_strafeMult', 'multMatrix')
+        pick = graph.addNode(root + '_strafePick', 'pickMatrix', {'useScale': False,
+                                                                  'useRotate': False,
+                                                                  'useShear': False})
+        graph.connect(mult + '.matrixSum', pick + '.inputMatrix')
+        graph.connect(compose + '.outputMatrix', mult + '.matrixIn[0]')
+        graph.connect(strafeControl + '.worldMatrix[0]', mult + '.matrixIn[1]')
+        graph.connect(pick + '.outputMatrix', root + '.offsetParentMatrix')
+        for axis, source in translateSources.get(root, dict()).items():
+            graph.disconnect(source, root + '.translate' + axis)
+            graph.connect(source, compose + '.inputTranslate' + axis)
+        graph.setAttr(root + '.translate', [0.0, 0.0, 0.0])
+    return graph
@@ -0,0 +1,182 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+from collections import OrderedDict
+from timeit import default_timer
+
+'''
+Maya-free cache for the marking menu data each tool contributes.
+
+A tool declares what its qtMarkingMenu result depends on with markingMenuScope.
+Static data is cached once per tool, rig data once per set of selected namespaces
+and selection data once per exact set of selected nodes, keeping only the most
+recently used selections.
+
+qtMarkingMenu returns a list of menuItem dicts, the keyword arguments of
+tb_qtMarkingMenu.MarkingMenuItem. The command is the name of a method on the tool,
+called with variable_data as its keyword arguments.
+'''
+
+scopeStatic = 'static'
+scopeRig = 'rig'
+scopeSelection = 'selection'
+
+
+def menuItem(label, command, variableData=None, radialPosition=None, textColour=None):
+    """
+    :param label:
+    :param command: name of the tool method the item runs
+    :param variableData: keyword arguments for the command
+    :param radialPosition: compass position for radial items, listed in the menu otherwise
+    :param textColour:
+    :return:
+    """
+    return {'label': label,
+            'command': command,
+            'variable_data': variableData or dict(),
+            'radial': radialPosition is not None,
+            'radial_position': radialPosition,
+            'textColour': textColour}
+
+
+def getSelectionSignature(selection):
+    """
+    :param selection: node names
+    :return: sorted tuple of the unique selected nodes
+    """
+    return tuple(sorted(set(str(node) for node in selection)))
+
+
+def getSelectionNamespaces(selection):
+    """
+    :param selection: node names
+    :return: sorted tuple of the namespaces in the selection, '' for nodes in the root namespace
+    """
+    return tuple(sorted(set(str(node).rpartition(':')[0] for node in selection)))
+
+
+def getScope(tool, baseClass):
+    """
+    The tool's declared scope. A tool that doesn't override baseClass.qtMarkingMenu
+    always returns the base class result, so it is static whatever it declares
+    :param tool: tool instance
+    :param baseClass: the class qtMarkingMenu is inherited from by default
+    :return:
+    """
+    mro = type(tool).__mro__
+    overrides = mro[:mro.index(baseClass)] if baseClass in mro else mro
+    if not any('qtMarkingMenu' in vars(cls) for cls in overrides):
+        return scopeStatic
+    return getattr(tool, 'markingMenuScope', scopeSelection)
+
+
+class MarkingMenuCache(object):
+    """
+    Menu data per (tool name, scope, scope key) with per tool build timing
+    """
+    clock = staticmethod(default_timer)
+    # selections change all the time, only the latest ones are worth keeping
+    maxSelectionEntries = 64
+
+    def __init__(self):
+        # (toolName, scope, ...): menu data
+        self.entries = dict()
+        # (toolName, scopeSelection, signature): menu data, oldest first
+        self.selectionEntries = OrderedDict()
+        # toolName: calls, hits, total, last
+        self.stats = dict()
+
+    @staticmethod
+    def getKey(toolName, scope, selection):
+        """
+        :return: cache key
+        """
+        if scope == scopeStatic:
+            return toolName, scope
+        if scope == scopeRig:
+            return toolName, scope, getSelectionNamespaces(selection)
+        return toolName, scopeSelection, getSelectionSignature(selection)
+
+    def lookup(self, key):
+        """
+        :return: cached menu data, None when there is none
+        """
+        if key[1] != scopeSelection:
+            return self.entries.get(key)
+        menuData = self.selectionEntries.pop(key, None)
+        if menuData is not None:
+            self.selectionEntries[key] = menuData
+        return menuData
+
+    def store(self, key, menuData):
+        if key[1] != scopeSelection:
+            self.entries[key] = menuData
+            return
+        self.selectionEntries.pop(key, None)
+        self.selectionEntries[key] = menuData
+        while len(self.selectionEntries) > self.maxSelectionEntries:
+            self.selectionEntries.popitem(last=False)
+
+    def get(self, toolName, scope, selection, build):
+        """
+        Cached menu data, or build(selection) when there is none
+        :param toolName:
+        :param scope: scopeStatic, scopeRig or scopeSelection
+        :param selection: node names
+        :param build: callable taking the selection, the tool's qtMarkingMenu
+        :return:
+        """
+        stats = self.stats.setdefault(toolName, {'calls': 0, 'hits': 0, 'total': 0.0, 'last': 0.0})
+        stats['calls'] += 1
+        key = self.getKey(toolName, scope, selection)
+        menuData = self.lookup(key)
+        if menuData is not None:
+            stats['hits'] += 1
+            return menuData
+
+        start = self.clock()
+        menuData = build(selection)
+        elapsed = self.clock() - start
+        stats['total'] += elapsed
+        stats['last'] = elapsed
+        self.store(key, menuData)
+        return menuData
+
+    def clear(self, toolName=None):
+        """
+        :param toolName: tool to clear, clears everything by default
+        :return:
+        """
+        if toolName is None:
+            self.entries = dict()
+            self.selectionEntries = OrderedDict()
+            return
+        for entries in (self.entries, self.selectionEntries):
+            for key in [key for key in entries.keys() if key[0] == toolName]:
+                entries.pop(key)
+
+    def printStats(self):
+        for toolName in sorted(self.stats.keys(), key=lambda x: self.stats[x]['total'], reverse=True):
+            print('{0}: {calls} calls, {hits} cached, {total:.4f}s building, {last:.4f}s last build'.format(
+                toolName, **self.stats[toolName]))
@@ -0,0 +1,306 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+try:
+    import maya.cmds as cmds
+    import maya.api.OpenMaya as om2
+except ImportError:
+    cmds = None
+    om2 = None
+import apps.tb_transformMath as transformMath
+from apps.tb_curveEdit import applyCurveEdit, getAnimCurveFn, getCurveForAttribute, replaceKeys
+
+transformChannels = ['translateX', 'translateY', 'translateZ', 'rotateX', 'rotateY', 'rotateZ']
+shortChannelNames = {'tx': 'translateX', 'ty': 'translateY', 'tz': 'translateZ',
+                     'rx': 'rotateX', 'ry': 'rotateY', 'rz': 'rotateZ'}
+matrixTolerance = 1.0e-9
+
+
+class TransformSampler(object):
+    """
+    Reads matrices for a set of transforms at any time through an MDGContext,
+    the current time is never changed. Static per node values (rotate order,
+    rotate axis, joint orient, pivots) are read once up front
+    """
+
+    def __init__(self, nodes):
+        self.nodes = list(nodes)
+        self.plugs = dict()
+        self.nodeData = dict()
+        self.dependNodes = dict()
+        for node in self.nodes:
+            selectionList = om2.MSelectionList()
+            selectionList.add(node)
+            self.dependNodes[node] = selectionList.getDependNode(0)
+            mfnDep = om2.MFnDependencyNode(self.dependNodes[node])
+            plugs = {'worldMatrix': mfnDep.findPlug('worldMatrix', False).elementByLogicalIndex(0),
+                     'parentMatrix': mfnDep.findPlug('parentMatrix', False).elementByLogicalIndex(0),
+                     'matrix': mfnDep.findPlug('matrix', False)}
+            if mfnDep.hasAttribute('offsetParentMatrix'):
+                plugs['offsetParentMatrix'] = mfnDep.findPlug('offsetParentMatrix', False)
+            self.plugs[node] = plugs
+            self.nodeData[node] = self.getStaticData(node, mfnDep)
+
+    @staticmethod
+    def getStaticData(node, mfnDep):
+        def readVector(attribute):
+            if not mfnDep.hasAttribute(attribute):
+                return (0.0, 0.0, 0.0)
+            plug = mfnDep.findPlug(attribute, False)
+            return tuple(plug.child(i).asDouble() for i in range(3))
+
+        data = {'rotateOrder': mfnDep.findPlug('rotateOrder', False).asInt(),
+                'rotateAxis': tuple(om2.MAngle(x).asDegrees() for x in readVector('rotateAxis')),
+                'jointOrient': tuple(om2.MAngle(x).asDegrees() for x in readVector('jointOrient')),
+                'rotatePivot': readVector('rotatePivot'),
+                'rotatePivotTranslate': readVector('rotatePivotTranslate'),
+                'scalePivot': readVector('scalePivot'),
+                'scalePivotTranslate': readVector('scalePivotTranslate'),
+                }
+        return data
+
+    @staticmethod
+    def readMatrix(plug, context=None):
+        if context is None:
+            return list(om2.MFnMatrixData(plug.asMObject()).matrix())
+        return list(om2.MFnMatrixData(plug.asMObject(context)).matrix())
+
+    @staticmethod
+    def getContext(frame):
+        return om2.MDGContext(om2.MTime(frame, om2.MTime.uiUnit()))
+
+    def sample(self, times, matrix='worldMatrix', nodes=None):
+        """
+        Sample one matrix plug for every node, all nodes are read per frame
+        :param times: frames
+        :param matrix: worldMatrix, parentMatrix, matrix
+        :param nodes: subset of nodes, defaults to all
+        :return: dict of node: list of flat matrices
+        """
+        nodes = nodes or self.nodes
+        result = {node: list() for node in nodes}
+        for frame in times:
+            context = self.getContext(frame)
+            for node in nodes:
+                result[node].append(self.readMatrix(self.plugs[node][matrix], context))
+        return result
+
+    def sampleParentSpace(self, times, nodes=None):
+        """
+        The space the local matrix lives in, offsetParentMatrix * parentMatrix
+        :param times:
+        :param nodes:
+        :return: dict of node: list of flat matrices
+        """
+        nodes = nodes or self.nodes
+        result = {node: list() for node in nodes}
+        for frame in times:
+            context = self.getContext(frame)
+            for node in nodes:
+                result[node].append(self.readParentSpace(node, context))
+        return result
+
+    def readParentSpace(self, node, context=None):
+        plugs = self.plugs[node]
+        parentMatrix = self.readMatrix(plugs['parentMatrix'], context)
+        if 'offsetParentMatrix' in plugs:
+            parentMatrix = transformMath.multiply(self.readMatrix(plugs['offsetParentMatrix'], context),
+                                                  parentMatrix)
+        return parentMatrix
+
+    def sampleCurrent(self, matrix='worldMatrix', nodes=None):
+        """
+        Read one matrix plug for every node at the current time
+        :return: dict of node: flat matrix
+        """
+        nodes = nodes or self.nodes
+        return {node: self.readMatrix(self.plugs[node][matrix]) for node in nodes}
+
+    def localChannels(self, node, worldMatrices, parentMatrices):
+        """
+        Channel values that put node at worldMatrices under parentMatrices
+        :return: dict of channel: list of values
+        """
+        data = self.nodeData[node]
+        return transformMath.decomposeMatrices(transformMath.localMatrices(worldMatrices, parentMatrices),
+                                               rotateOrder=data['rotateOrder'],
+                                               rotateAxis=data['rotateAxis'],
+                                               jointOrient=data['jointOrient'],
+                                               rotatePivot=data['rotatePivot'],
+                                               rotatePivotTranslate=data['rotatePivotTranslate'],
+                                               scalePivot=data['scalePivot'],
+                                               scalePivotTranslate=data['scalePivotTranslate'])
+
+
+def getChannelFilter(channels):
+    """
+    Long transform channel names for a channel box selection, short or long names
+    :param channels:
+    :return: list, empty for no transform channels
+    """
+    channels = [shortChannelNames.get(channel, channel) for channel in channels]
+    return [channel for channel in transformChannels if channel in channels]
+
+
+def getWritableChannels(node, channels=transformChannels):
+    return [channel for channel in channels
+            if cmds.getAttr(node + '.' + channel, settable=True)
+            and cmds.getAttr(node + '.' + channel, keyable=True)]
+
+
+def prepareCurves(attributes, startTime, layer=None):
+    """
+    Make sure every attribute has a curve (on the layer if given) to write into,
+    this is done with cmds so should be called before the api edit
+    :param attributes: list of 'node.attr'
+    :param startTime:
+    :param layer:
+    :return:
+    """
+    if not attributes:
+        return
+    if layer:
+        cmds.animLayer(layer, edit=True, attribute=attributes)
+    missing = [attribute for attribute in attributes if not getCurveForAttribute(attribute, layer)]
+    if not missing:
+        return
+    if layer:
+        cmds.setKeyframe(missing, time=startTime, animLayer=layer)
+    else:
+        cmds.setKeyframe(missing, time=startTime)
+
+
+def writeChannels(node, channels, times, layer=None, animCurveChange=None):
+    """
+    Write baked channel values straight onto the curves, one addKeys per curve
+    :param node:
+    :param channels: dict of channel: values
+    :param times:
+    :param layer:
+    :param animCurveChange:
+    :return:
+    """
+    for channel, values in channels.items():
+        curve = getCurveForAttribute(node + '.' + channel, layer)
+        if not curve:
+            continue
+        replaceKeys(getAnimCurveFn(curve), times, values, animCurveChange=animCurveChange)
+
+
+def restoreWorldPoses(sampler, worldMatrices, channels, currentRotations, setValues):
+    """
+    Put nodes back at captured world matrices, one at a time in sampler order (parents first).
+    Each parent space is read after the nodes before it were set. A node whose space follows
+    a node later in the order is solved again once its parent space has moved, so chains of
+    controls following each other land correctly whatever the order
+    :param sampler: TransformSampler
+    :param worldMatrices: dict of node: flat world matrix
+    :param channels: dict of node: channels to set
+    :param currentRotations: dict of node: rotation before the change, new eulers stay closest to it
+    :param setValues: callable(node, dict of channel: value), the values must be applied when it returns
+    :return: number of nodes set, counting repeats
+    """
+    nodes = [node for node in sampler.nodes if channels[node]]
+    solvedSpaces = dict()
+    setCount = 0
+    for iteration in range(len(nodes)):
+        changed = False
+        for node in nodes:
+            parentSpace = sampler.readParentSpace(node)
+            solvedSpace = solvedSpaces.get(node)
+            if solvedSpace is not None and max(abs(a - b) for a, b in zip(parentSpace, solvedSpace)) < matrixTolerance:
+                continue
+            localValues = sampler.localChannels(node, [worldMatrices[node]], [parentSpace])
+            rotation = transformMath.closestEuler([localValues['rotate' + axis][0] for axis in 'XYZ'],
+                                                  currentRotations[node],
+                                                  sampler.nodeData[node]['rotateOrder'])
+            for index, axis in enumerate('XYZ'):
+                localValues['rotate' + axis] = [rotation[index]]
+            setValues(node, {channel: localValues[channel][0] for channel in channels[node]})
+            solvedSpaces[node] = parentSpace
+            setCount += 1
+            changed = True
+        if not changed:
+            break
+    return setCount
+
+
+def bakeWorldMatrices(worldMatrices, parentMatrices, times, layer=None):
+    """
+    Key nodes so they follow per frame world matrices, the whole write is one undoable edit
+    :param worldMatrices: dict of node: list of world matrices
+    :param parentMatrices: dict of node: list of parent space matrices
+    :param times: frames
+    :param layer:
+    :return:
+    """
+    nodes = list(worldMatrices.keys())
+    sampler = TransformSampler(nodes)
+    channels = {node: getWritableChannels(node) for node in nodes}
+    prepareCurves([node + '.' + channel for node in nodes for channel in channels[node]], times[0], layer=layer)
+
+    def edit(animCurveChange, dagModifier):
+        for node in nodes:
+            if not channels[node]:
+                continue
+            localValues = sampler.localChannels(node, worldMatrices[node], parentMatrices[node])
+            writeChannels(node,
+                          {channel: localValues[channel] for channel in channels[node]},
+                          times,
+                          layer=layer,
+                          animCurveChange=animCurveChange)
+
+    applyCurveEdit(edit)
+
+
+def bakeWorldMatricesInOrder(worldMatrices, times, nodes=None, channels=None, layer=None):
+    """
+    Key nodes so they follow per frame world matrices when some of them may sit under others,
+    nodes are written in order and each one's parent space is sampled after the nodes before
+    it have been written. The whole write is one undoable edit
+    :param worldMatrices: dict of node: list of world matrices
+    :param times: frames
+    :param nodes: write order, parents before children, defaults to the worldMatrices keys
+    :param channels: transform channels to key, defaults to all writable ones
+    :param layer:
+    :return:
+    """
+    nodes = nodes or list(worldMatrices.keys())
+    sampler = TransformSampler(nodes)
+    writable = {node: getWritableChannels(node, channels=channels or transformChannels) for node in nodes}
+    prepareCurves([node + '.' + channel for node in nodes for channel in writable[node]], times[0], layer=layer)
+
+    def edit(animCurveChange, dagModifier):
+        for node in nodes:
+            if not writable[node]:
+                continue
+            parentMatrices = sampler.sampleParentSpace(times, nodes=[node])[node]
+            localValues = sampler.localChannels(node, worldMatrices[node], parentMatrices)
+            writeChannels(node,
+                          {channel: localValues[channel] for channel in writable[node]},
+                          times,
+                          layer=layer,
+                          animCurveChange=animCurveChange)
+
+    applyCurveEdit(edit)
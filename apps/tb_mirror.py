@@ -51,6 +51,9 @@ import pickle
 
 IconPath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Icons'))
 from Abstract import *
+from apps.tb_mirrorTable import MirrorPairTable
+import apps.tb_mirrorTable as mirrorTable
+from apps.tb_markingMenuCache import menuItem
 
 mirrorPlane = {'YZ': [-1, 1, 1],
                'XZ': [1, -1, 1],
@@ -153,7 +156,7 @@ class MirrorData(object):
         return returnDict
 
     def fromJson(self, data):
-        rawJsonData = json.load(open(data))
+        rawJsonData = dataStore.loadJson(data)
 
         self.mirrorPlane = rawJsonData.get('mirrorPlane', list())
         self.controls = rawJsonData.get('controls', dict())
@@ -170,9 +173,11 @@ class MirrorTools(toolAbstractFactory):
     subFolder = 'mirrorTables'
     hotkeyClass = hotkeys()
     funcs = functions()
+    markingMenuScope = toolAbstractFactory.markingMenuStatic
     lastSelected = None
 
     loadedMirrorTables = dict()
+    compiledMirrorTables = dict()
 
     def __new__(cls):
         if MirrorTools.__instance is None:
@@ -232,6 +237,40 @@ class MirrorTools(toolAbstractFactory):
     def loadMirrorData(self, refname):
         return self.loadRigData(MirrorData(), refname)
 
+    def getMirrorPairTable(self, character, validate=False):
+        """
+        Returns the compiled mirror table for a character, loading it from disk if
+        the stored rig hash still matches, otherwise compiling and saving a new one
+        :param character: CharacterDefinition
+        :param validate: re-check the rig hash of a table already in memory, do this
+        once per operation rather than per control
+        :return: MirrorPairTable
+        """
+        mirrorData = self.loadedMirrorTables.get(character.char, None)
+        pairTable = self.compiledMirrorTables.get(character.char, None)
+        if pairTable is not None and pairTable.isCurrent(character, mirrorData, checkHash=validate):
+            return pairTable
+
+        if mirrorData is None and self.getDataStore().exists(os.path.join(self.mirrorDataDir, character.char + '.json')):
+            mirrorData = self.loadMirrorData(character.char)
+            self.loadedMirrorTables[character.char] = mirrorData
+
+        pairTable = MirrorPairTable()
+        filePath = MirrorPairTable.getFilePath(character)
+        if os.path.isfile(filePath):
+            try:
+                pairTable.fromJson(filePath)
+            except ValueError:
+                pairTable = MirrorPairTable()
+        if not pairTable.isCurrent(character, mirrorData, checkHash=True):
+            pairTable = MirrorPairTable().compile(character, mirrorData)
+            self.saveJsonFile(filePath, pairTable.json_serialize())
+        self.compiledMirrorTables[character.char] = pairTable
+        return pairTable
+
+    def clearMirrorPairTable(self, refname):
+        self.compiledMirrorTables.pop(refname, None)
+
     def loadRigData(self, dataCLS, rigName):
         subPath = os.path.join(self.dataPath, self.subFolder)
         dataCLS.fromJson(os.path.join(subPath, rigName + '.json'))
@@ -242,7 +281,7 @@ class MirrorTools(toolAbstractFactory):
         if not os.path.isdir(self.subPath):
             os.mkdir(self.subPath)
         dataFile = os.path.join(self.subPath, refname + '.json')
-        if not os.path.isfile(os.path.join(dataFile)):
+        if not self.getDataStore().exists(dataFile):
             self.saveJsonFile(dataFile, json.loads(jsonData))
 
     def saveRigData(self, refname, jsonData):
@@ -253,7 +292,8 @@ class MirrorTools(toolAbstractFactory):
         :return:
         """
         dataFile = os.path.join(self.subPath, refname + '.json')
-        self.saveJsonFile(dataFile, json.loads(jsonData))
+        self.saveJsonFileDeferred(dataFile, json.loads(jsonData))
+        self.clearMarkingMenuCache()
 
     def openMM(self):
         self.build_MM()
@@ -304,89 +344,24 @@ class MirrorTools(toolAbstractFactory):
                                                 command=lambda: MirrorTools().mirrorSelection(option="fromOpposite"),
                                                 closeOnPress=True))
 
-    @staticmethod
-    def _replace(name, old, new, count=1):
-        """
-        """
-        return new.join(name.rsplit(old, count))
-
-    @staticmethod
-    def swapPrefix(objectName, old, new):
-        """
-        """
-        outName = str(objectName)
-        old = old.replace("*", "")
-        new = new.replace("*", "")
-
-        if ":" in objectName:
-            outName = MirrorTools._replace(objectName, ":" + old, ":" + new, 1)
-            if objectName != outName:
-                return outName
-
-        if "|" in objectName:
-            outName = objectName.replace("|" + old, "|" + new)
-        elif outName.startswith(old):
-            outName = objectName.replace(old, new, 1)
-
-        return outName
-
-    @staticmethod
-    def swapSuffix(objectName, old, new):
-        """
-        """
-        outName = str(objectName)
-        old = old.replace("*", "")
-        new = new.replace("*", "")
-
-        if "|" in objectName:
-            outName = objectName.replace(old + "|", new + "|")
-
-        if outName.endswith(old):
-            outName = outName[:-len(old)] + new
-
-        return outName
-
-    @staticmethod
-    def getMirrorControl(control, leftSide, rightSide):
-        """
-        """
-        outName = None
-        # Support for the prefix naming convention.
-        if leftSide.endswith("*") or rightSide.endswith("*"):
-            outName = MirrorTools.swapPrefix(control, leftSide, rightSide)
-
-            if control == outName:
-                outName = MirrorTools.swapPrefix(control, rightSide, leftSide)
-
-            if outName != control:
-                return outName
-
-        # Support for the suffix naming convention.
-        elif leftSide.startswith("*") or rightSide.startswith("*"):
-
-            outName = MirrorTools.swapSuffix(control, leftSide, rightSide)
-
-            if control == outName:
-                outName = MirrorTools.swapSuffix(control, rightSide, leftSide)
-
-            if outName != control:
-                return outName
-
-        # Support for all other naming conventions.
-        else:
-            outName = control.replace(leftSide, rightSide)
-
-            if outName == control:
-                outName = control.replace(rightSide, leftSide)
-
-            if outName != control:
-                return outName
-
-        # Return None as the given name is probably a center control
-        # and doesn't have an opposite side.
-        return control
-
-    def getMirrorForControlFromCharacter(self, character, control):
+    def qtMarkingMenu(self, inputNodes):
+        return [menuItem(label, 'mirrorSelection', variableData={'option': option}, radialPosition='SE')
+                for label, option in (('Mirror Pose', 'swap'),
+                                      ('Mirror Left To Right', 'toRight'),
+                                      ('Mirror Right To Left', 'toLeft'),
+                                      ('Mirror To Opposite', 'toOpposite'),
+                                      ('Mirror From Opposite', 'fromOpposite'))]
+
+    _replace = staticmethod(mirrorTable._replace)
+    swapPrefix = staticmethod(mirrorTable.swapPrefix)
+    swapSuffix = staticmethod(mirrorTable.swapSuffix)
+    getMirrorControl = staticmethod(mirrorTable.getMirrorControl)
+
+    def getMirrorForControlFromCharacter(self, character, control, compiled=True):
+        if compiled:
+            mirroredControl = self.getMirrorPairTable(character).getOpposite(control)
+            if mirroredControl is not None:
+                return mirroredControl
         left = character.getSide('left')
         right = character.getSide('right')
         mirroredControl = self.getMirrorControl(control, left, right)
@@ -405,6 +380,7 @@ class MirrorTools(toolAbstractFactory):
             return cmds.warning('No Selection')
         CharacterTool = self.allTools.tools['CharacterTool']
         mirrorSel = list()
+        validated = set()
 
         for s in sel:
             refname, namespace = CharacterTool.getSelectedChar(sel=s)
@@ -412,6 +388,9 @@ class MirrorTools(toolAbstractFactory):
                 cmds.warning('No character for control %s' % s)
                 continue
             character = CharacterTool.allCharacters[refname]
+            if refname not in validated:
+                self.getMirrorPairTable(character, validate=True)
+                validated.add(refname)
             mirrorSel.append(self.getMirrorForControlFromCharacter(character, s))
         return mirrorSel
 
@@ -628,7 +607,7 @@ class MirrorTools(toolAbstractFactory):
                 continue
             pControl = pm.PyNode(control)
 
-            opposite = self.getMirrorForControlFromCharacter(character, control)
+            opposite = self.getMirrorForControlFromCharacter(character, control, compiled=False)
             # print ('opposite', opposite)
             if not maya.cmds.objExists(opposite):
                 continue
@@ -644,10 +623,14 @@ class MirrorTools(toolAbstractFactory):
 
         mirrorData.mirrorPlane = mirrorAxisRaw
         self.saveRigData(dataFile, mirrorData.toJson())
+        self.loadedMirrorTables[refname] = mirrorData
+        self.clearMirrorPairTable(refname)
+        self.getMirrorPairTable(character)
 
     def saveCurrentMirrorData(self, character):
         dataFile = os.path.join(self.mirrorDataDir, character)
         self.saveRigData(dataFile, self.loadedMirrorTables[character].toJson())
+        self.clearMirrorPairTable(character)
         print('Saving current mirror', character)
         print('dataFile', dataFile)
         print(self.loadedMirrorTables[character].toJson())
@@ -696,6 +679,7 @@ class MirrorTools(toolAbstractFactory):
 
         controlPairs = list()
         matched = list()
+        validated = set()
         for c in controls:
             if c in matched:
                 continue
@@ -706,6 +690,9 @@ class MirrorTools(toolAbstractFactory):
                 control = c
             rigName = self.namespaceToCharDict[namespace]
             CharacterTool.loadCharacterIfNotLoaded(rigName)
+            if rigName not in validated:
+                self.getMirrorPairTable(CharacterTool.allCharacters[rigName], validate=True)
+                validated.add(rigName)
             opposite = self.getMirrorForControlFromCharacter(CharacterTool.allCharacters[rigName], c)
             matched.append(opposite)
             controlPairs.append([c, opposite, rigName])
@@ -764,8 +751,7 @@ class MirrorTools(toolAbstractFactory):
 
         attrs = cmds.listAttr(fromControl, keyable=True, scalar=True, settable=True, inUse=True)
         toAttrs = cmds.listAttr(toControl, keyable=True, scalar=True, settable=True, inUse=True)
-        strippedFrom = pm.PyNode(fromControl).stripNamespace()
-        strippedTo = pm.PyNode(toControl).stripNamespace()
+        pairTable = self.getMirrorPairTable(self.allTools.tools['CharacterTool'].allCharacters[character])
         valuesDict[fromControl] = dict()
         valuesDict[toControl] = dict()
         for index, a in enumerate(attrs):
@@ -776,7 +762,7 @@ class MirrorTools(toolAbstractFactory):
 
         if self.isMirror(fromControl, character, option):
 
-            attrEntry = self.loadedMirrorTables[character].controls.get(strippedFrom, None)
+            attrEntry = pairTable.getSigns(fromControl)
             if not attrEntry:
                 # print ('skip')
                 return
@@ -798,7 +784,7 @@ class MirrorTools(toolAbstractFactory):
                     pass
         if self.isMirror(toControl, character, option):
 
-            attrEntry = self.loadedMirrorTables[character].controls.get(strippedTo, None)
+            attrEntry = pairTable.getSigns(toControl)
             if not attrEntry:
                 # print ('skip')
                 return
@@ -884,6 +870,7 @@ class MirrorTools(toolAbstractFactory):
         print('character', character)
 
         mirrorSel = dict()
+        self.getMirrorPairTable(character, validate=True)
         for s in sel:
             mirrorSel[s] = self.getMirrorForControlFromCharacter(character, s)
         selectedStart, selectedEnd = self.funcs.getTimelineHighlightedRange()
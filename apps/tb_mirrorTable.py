@@ -0,0 +1,215 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+import os
+import json
+import hashlib
+import apps.tb_dataStore as dataStore
+
+'''
+Maya-free mirror naming and the compiled per rig mirror table.
+
+The character and mirror data passed in only need the attributes the tools already
+use, controls, leftSide/rightSide, mirrorAxis, getSide and getJsonFile on the
+character, controls and oppositeControls on the mirror data.
+'''
+
+
+def _replace(name, old, new, count=1):
+    return new.join(name.rsplit(old, count))
+
+
+def swapPrefix(objectName, old, new):
+    outName = str(objectName)
+    old = old.replace("*", "")
+    new = new.replace("*", "")
+
+    if ":" in objectName:
+        outName = _replace(objectName, ":" + old, ":" + new, 1)
+        if objectName != outName:
+            return outName
+
+    if "|" in objectName:
+        outName = objectName.replace("|" + old, "|" + new)
+    elif outName.startswith(old):
+        outName = objectName.replace(old, new, 1)
+
+    return outName
+
+
+def swapSuffix(objectName, old, new):
+    outName = str(objectName)
+    old = old.replace("*", "")
+    new = new.replace("*", "")
+
+    if "|" in objectName:
+        outName = objectName.replace(old + "|", new + "|")
+
+    if outName.endswith(old):
+        outName = outName[:-len(old)] + new
+
+    return outName
+
+
+def getMirrorControl(control, leftSide, rightSide):
+    """
+    Swap the side token in a control name, prefixes are written 'l_*', suffixes '*_l'
+    :param control:
+    :param leftSide:
+    :param rightSide:
+    :return: the opposite name, the control itself for a centre control
+    """
+    # Support for the prefix naming convention.
+    if leftSide.endswith("*") or rightSide.endswith("*"):
+        outName = swapPrefix(control, leftSide, rightSide)
+
+        if control == outName:
+            outName = swapPrefix(control, rightSide, leftSide)
+
+    # Support for the suffix naming convention.
+    elif leftSide.startswith("*") or rightSide.startswith("*"):
+        outName = swapSuffix(control, leftSide, rightSide)
+
+        if control == outName:
+            outName = swapSuffix(control, rightSide, leftSide)
+
+    # Support for all other naming conventions.
+    else:
+        outName = control.replace(leftSide, rightSide)
+
+        if outName == control:
+            outName = control.replace(rightSide, leftSide)
+
+    # the name comes back unchanged for a centre control
+    return outName
+
+
+class MirrorPairTable(object):
+    """
+    Compiled control <-> opposite lookup with a sign per mirror channel.
+    Built once per rig from the character definition and mirror data, saved
+    beside the character template and rebuilt when the rig hash changes
+    """
+    channels = ['translateX', 'translateY', 'translateZ', 'rotateX', 'rotateY', 'rotateZ']
+    extension = '.mirrorTable'
+
+    def __init__(self):
+        self.rigHash = str()
+        self.opposites = dict()
+        self.signs = dict()
+        self.signMaps = dict()
+        # the objects the table was last checked against, not saved
+        self.character = None
+        self.mirrorData = None
+
+    @staticmethod
+    def getRigHash(character, mirrorData=None):
+        hashData = {'controls': sorted(character.controls),
+                    'sides': [character.leftSide, character.rightSide],
+                    'mirrorAxis': character.mirrorAxis,
+                    'mirrorData': mirrorData.json_serialize() if mirrorData else None,
+                    }
+        return hashlib.md5(json.dumps(hashData, sort_keys=True).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def getFilePath(character):
+        return os.path.splitext(character.getJsonFile())[0] + MirrorPairTable.extension
+
+    def compile(self, character, mirrorData=None):
+        left = character.getSide('left')
+        right = character.getSide('right')
+        self.rigHash = self.getRigHash(character, mirrorData)
+        self.opposites = dict()
+        self.signs = dict()
+        for control in character.controls:
+            opposite = None
+            if mirrorData:
+                opposite = mirrorData.oppositeControls.get(control, None)
+            if not opposite:
+                opposite = getMirrorControl(control, left, right)
+            self.opposites[control] = opposite
+            if mirrorData and control in mirrorData.controls:
+                # controls without calculated mirror data are skipped when mirroring
+                axisDict = mirrorData.controls[control]
+                self.signs[control] = [axisDict.get(channel, 1) for channel in self.channels]
+        self.buildSignMaps()
+        self.setSource(character, mirrorData)
+        return self
+
+    def buildSignMaps(self):
+        self.signMaps = {control: dict(zip(self.channels, signs)) for control, signs in self.signs.items()}
+
+    def setSource(self, character, mirrorData):
+        self.character = character
+        self.mirrorData = mirrorData
+
+    def isCurrent(self, character, mirrorData=None, checkHash=False):
+        """
+        :param character:
+        :param mirrorData:
+        :param checkHash: compare the full rig hash, otherwise only check the table
+        was made from the same character and mirror data objects
+        :return:
+        """
+        if not checkHash and self.character is character and self.mirrorData is mirrorData:
+            return True
+        if self.rigHash != self.getRigHash(character, mirrorData):
+            return False
+        self.setSource(character, mirrorData)
+        return True
+
+    def getOpposite(self, control):
+        """
+        :param control: control name, with or without namespace
+        :return: opposite control with the same namespace, None if the control isn't in the table
+        """
+        if ':' in control:
+            namespace, stripped = control.rsplit(':', 1)
+            opposite = self.opposites.get(stripped, None)
+            if opposite is None:
+                return None
+            return namespace + ':' + opposite
+        return self.opposites.get(control, None)
+
+    def getSigns(self, control):
+        """
+        :param control: control name, with or without namespace
+        :return: dict of channel: 1 or -1, None if the control has no mirror data
+        """
+        return self.signMaps.get(control.rsplit(':', 1)[-1], None)
+
+    def json_serialize(self):
+        returnDict = {}
+        returnDict['rigHash'] = self.rigHash
+        returnDict['opposites'] = self.opposites
+        returnDict['signs'] = self.signs
+        return returnDict
+
+    def fromJson(self, data):
+        rawJsonData = dataStore.loadJson(data)
+
+        self.rigHash = rawJsonData.get('rigHash', str())
+        self.opposites = rawJsonData.get('opposites', dict())
+        self.signs = rawJsonData.get('signs', dict())
+        self.buildSignMaps()
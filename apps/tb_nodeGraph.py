@@ -0,0 +1,463 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+import re
+import math
+from collections import OrderedDict
+import apps.tb_transformMath as transformMath
+
+try:
+    import maya.cmds as cmds
+    import maya.api.OpenMaya as om2
+except ImportError:
+    cmds = None
+    om2 = None
+
+'''
+Networks of maya nodes described as data.
+
+A NodeGraph holds node names and types, added attributes, attribute values, lock
+states, connections and parenting. Plugs are 'node.attribute' strings, the evaluator
+works at the child level ('md.outputX', 'pma.input3D[1].input3Dz'). Connections and
+parenting can involve nodes outside the graph. The graph can be built in a scene,
+saved as json for a dry run, or evaluated without maya by GraphEvaluator for the
+node types in nodeFunctions.
+'''
+
+indexPattern = re.compile(r'\[(\d+)\]')
+
+
+class NodeGraph(object):
+    def __init__(self):
+        # name: node type
+        self.nodes = OrderedDict()
+        # plug: value, values are in maya's internal units, radians for angles
+        self.values = OrderedDict()
+        # source plug, destination plug
+        self.connections = list()
+        # existing connections to break, source plug, destination plug
+        self.disconnections = list()
+        # node, long name, attribute type
+        self.attributes = list()
+        # plug: dict of lock, keyable, channelBox
+        self.attributeStates = OrderedDict()
+        # child: parent, for graph nodes and nodes already in the scene
+        self.parents = OrderedDict()
+
+    def addNode(self, name, nodeType, values=None, parent=None):
+        """
+        :param name: node name in the scene, the built name may differ if it is taken
+        :param nodeType:
+        :param values: dict of attribute: value
+        :param parent: for dag nodes
+        :return: name
+        """
+        self.nodes[name] = nodeType
+        for attribute, value in (values or dict()).items():
+            self.setAttr(name + '.' + attribute, value)
+        if parent:
+            self.parent(name, parent)
+        return name
+
+    def setAttr(self, plug, value):
+        self.values[plug] = value
+
+    def connect(self, source, destination):
+        self.connections.append((source, destination))
+
+    def disconnect(self, source, destination):
+        self.disconnections.append((source, destination))
+
+    def addAttr(self, node, longName, attributeType='double'):
+        """
+        :param node:
+        :param longName:
+        :param attributeType: double, float, bool, message or string
+        :return: the new plug
+        """
+        self.attributes.append((node, longName, attributeType))
+        return node + '.' + longName
+
+    def setAttrState(self, plug, lock=None, keyable=None, channelBox=None):
+        """
+        Lock and channel box state, applied after the values so locked plugs still get set
+        """
+        state = self.attributeStates.setdefault(plug, dict())
+        for key, value in (('lock', lock), ('keyable', keyable), ('channelBox', channelBox)):
+            if value is not None:
+                state[key] = value
+
+    def parent(self, child, parent):
+        self.parents[child] = parent
+
+    def getValue(self, plug, default=None):
+        return self.values.get(plug, default)
+
+    def getNodeCount(self):
+        return len(self.nodes)
+
+    def update(self, other):
+        """
+        Add everything from another graph
+        """
+        self.nodes.update(other.nodes)
+        self.values.update(other.values)
+        self.connections.extend(other.connections)
+        self.disconnections.extend(other.disconnections)
+        self.attributes.extend(other.attributes)
+        for plug, state in other.attributeStates.items():
+            self.setAttrState(plug, **state)
+        self.parents.update(other.parents)
+
+    def toJson(self):
+        return {'nodes': [[name, nodeType] for name, nodeType in self.nodes.items()],
+                'values': [[plug, value] for plug, value in self.values.items()],
+                'connections': [list(connection) for connection in self.connections],
+                'disconnections': [list(connection) for connection in self.disconnections],
+                'attributes': [list(attribute) for attribute in self.attributes],
+                'attributeStates': [[plug, state] for plug, state in self.attributeStates.items()],
+                'parents': [[child, parent] for child, parent in self.parents.items()]}
+
+    @classmethod
+    def fromJson(cls, data):
+        graph = cls()
+        for name, nodeType in data.get('nodes', list()):
+            graph.addNode(name, nodeType)
+        for plug, value in data.get('values', list()):
+            graph.setAttr(plug, value)
+        for source, destination in data.get('connections', list()):
+            graph.connect(source, destination)
+        for source, destination in data.get('disconnections', list()):
+            graph.disconnect(source, destination)
+        for node, longName, attributeType in data.get('attributes', list()):
+            graph.addAttr(node, longName, attributeType)
+        for plug, state in data.get('attributeStates', list()):
+            graph.setAttrState(plug, **state)
+        for child, parent in data.get('parents', list()):
+            graph.parent(child, parent)
+        return graph
+
+    def evaluate(self, plugs, inputs=None):
+        """
+        :param plugs: graph plugs, or plugs outside the graph the graph connects in to
+        :param inputs: dict of plug: value for the plugs outside the graph it reads from
+        :return: dict of plug: value
+        """
+        evaluator = GraphEvaluator(self, inputs)
+        return {plug: evaluator.getPlug(plug) for plug in plugs}
+
+    def build(self, modifier=None):
+        """
+        Create the nodes in the scene, add attributes, set values, make the connections
+        and parent. With an MDagModifier everything goes through it in a few doIt calls,
+        so it can be undone as one step, otherwise it is done with cmds
+        :param modifier: om2.MDagModifier
+        :return: dict of graph name: scene name
+        """
+        if modifier is not None:
+            return self.buildWithModifier(modifier)
+        names = OrderedDict()
+        for name, nodeType in self.nodes.items():
+            names[name] = cmds.createNode(nodeType, name=name, skipSelect=True)
+        for node, longName, attributeType in self.attributes:
+            node = names.get(node, node)
+            if attributeType == 'string':
+                cmds.addAttr(node, longName=longName, dataType='string')
+            else:
+                cmds.addAttr(node, longName=longName, attributeType=attributeType)
+        for plug, value in self.values.items():
+            plug = self.renamePlug(plug, names)
+            if isinstance(value, (list, tuple)):
+                cmds.setAttr(plug, *value)
+            elif isinstance(value, (bool, int, float)):
+                cmds.setAttr(plug, value)
+            else:
+                cmds.setAttr(plug, value, type='string')
+        for source, destination in self.disconnections:
+            cmds.disconnectAttr(self.renamePlug(source, names), self.renamePlug(destination, names))
+        for source, destination in self.connections:
+            cmds.connectAttr(self.renamePlug(source, names), self.renamePlug(destination, names), force=True)
+        for child, parent in self.parents.items():
+            cmds.parent(names.get(child, child), names.get(parent, parent))
+        for plug, state in self.attributeStates.items():
+            cmds.setAttr(self.renamePlug(plug, names), edit=True, **state)
+        return names
+
+    def buildWithModifier(self, modifier):
+        objects = OrderedDict()
+        for name, nodeType in self.nodes.items():
+            if isDagType(nodeType):
+                objects[name] = modifier.createNode(nodeType)
+            else:
+                objects[name] = om2.MDGModifier.createNode(modifier, nodeType)
+            modifier.renameNode(objects[name], name)
+        for node, longName, attributeType in self.attributes:
+            modifier.addAttribute(objects[node] if node in objects else getDependNode(node),
+                                  createAttribute(longName, attributeType))
+        modifier.doIt()
+
+        names = OrderedDict((name, om2.MFnDependencyNode(node).name()) for name, node in objects.items())
+        for source, destination in self.disconnections:
+            modifier.disconnect(getPlug(self.renamePlug(source, names)), getPlug(self.renamePlug(destination, names)))
+        modifier.doIt()
+        for plug, value in self.values.items():
+            setPlugValue(modifier, getPlug(self.renamePlug(plug, names)), value)
+        for source, destination in self.connections:
+            destinationPlug = getPlug(self.renamePlug(destination, names))
+            if destinationPlug.isDestination:
+                modifier.disconnect(destinationPlug.source(), destinationPlug)
+            modifier.connect(getPlug(self.renamePlug(source, names)), destinationPlug)
+        for child, parent in self.parents.items():
+            modifier.reparentNode(objects[child] if child in objects else getDependNode(child),
+                                  objects[parent] if parent in objects else getDependNode(parent))
+        for plug, state in self.attributeStates.items():
+            flags = ' '.join('-%s %d' % (key, int(value)) for key, value in state.items())
+            modifier.commandToExecute('setAttr -e %s "%s"' % (flags, self.renamePlug(plug, names)))
+        modifier.doIt()
+        return names
+
+    @staticmethod
+    def renamePlug(plug, names):
+        node, attribute = plug.split('.', 1)
+        return names.get(node, node) + '.' + attribute
+
+
+dagTypes = dict()
+
+
+def isDagType(nodeType):
+    if nodeType not in dagTypes:
+        dagTypes[nodeType] = 'dagNode' in (cmds.nodeType(nodeType, isTypeName=True, inherited=True) or list())
+    return dagTypes[nodeType]
+
+
+def getDependNode(node):
+    selectionList = om2.MSelectionList()
+    selectionList.add(node)
+    return selectionList.getDependNode(0)
+
+
+def getPlug(plug):
+    selectionList = om2.MSelectionList()
+    selectionList.add(plug)
+    return selectionList.getPlug(0)
+
+
+def createAttribute(longName, attributeType):
+    if attributeType == 'message':
+        return om2.MFnMessageAttribute().create(longName, longName)
+    if attributeType == 'string':
+        return om2.MFnTypedAttribute().create(longName, longName, om2.MFnData.kString)
+    numericTypes = {'double': om2.MFnNumericData.kDouble,
+                    'float': om2.MFnNumericData.kFloat,
+                    'bool': om2.MFnNumericData.kBoolean,
+                    'long': om2.MFnNumericData.kInt}
+    attribute = om2.MFnNumericAttribute()
+    attributeObject = attribute.create(longName, longName, numericTypes[attributeType], 0.0)
+    attribute.keyable = True
+    return attributeObject
+
+
+def setPlugValue(modifier, plug, value):
+    if isinstance(value, (list, tuple)):
+        for index, childValue in enumerate(value):
+            setPlugValue(modifier, plug.child(index), childValue)
+    elif isinstance(value, bool):
+        modifier.newPlugValueBool(plug, value)
+    elif isinstance(value, int):
+        modifier.newPlugValueInt(plug, value)
+    elif isinstance(value, float):
+        modifier.newPlugValueDouble(plug, value)
+    else:
+        modifier.newPlugValueString(plug, value)
+
+
+class GraphEvaluator(object):
+    """
+    Pulls plug values through a NodeGraph, each node is computed once
+    """
+
+    def __init__(self, graph, inputs=None):
+        self.graph = graph
+        self.inputs = dict(inputs or dict())
+        self.sources = {destination: source for source, destination in graph.connections}
+        self.outputs = dict()
+
+    def getPlug(self, plug):
+        if plug in self.inputs:
+            return self.inputs[plug]
+        node, attribute = plug.split('.', 1)
+        if node not in self.graph.nodes:
+            if plug in self.sources:
+                # a plug outside the graph driven from inside it
+                return self.getPlug(self.sources[plug])
+            raise KeyError('No input value for %s' % plug)
+        if node not in self.outputs:
+            self.outputs[node] = nodeFunctions[self.graph.nodes[node]](self, node)
+        if attribute in self.outputs[node]:
+            return self.outputs[node][attribute]
+        return self.getInput(node, attribute)
+
+    def getInput(self, node, attribute, default=0.0):
+        plug = node + '.' + attribute
+        if plug in self.sources:
+            return self.getPlug(self.sources[plug])
+        # a child of a connected compound reads the same child of the source, rotate -> rotateX
+        parentPlug = plug[:-1]
+        if plug[-1] in 'XYZ' and parentPlug in self.sources:
+            return self.getPlug(self.sources[parentPlug] + plug[-1])
+        return self.graph.getValue(plug, default)
+
+    def getIndices(self, node, arrayAttribute):
+        """
+        Indices of an array attribute with a value or a connection
+        """
+        prefix = node + '.' + arrayAttribute + '['
+        plugs = list(self.graph.values.keys()) + list(self.sources.keys())
+        return sorted(set(int(indexPattern.match(plug[len(prefix) - 1:]).group(1))
+                          for plug in plugs if plug.startswith(prefix)))
+
+
+def conditionNode(evaluator, node):
+    first = evaluator.getInput(node, 'firstTerm')
+    second = evaluator.getInput(node, 'secondTerm')
+    operation = int(evaluator.getInput(node, 'operation', 0))
+    state = [first == second,
+             first != second,
+             first > second,
+             first >= second,
+             first < second,
+             first <= second][operation]
+    prefix = 'colorIfTrue' if state else 'colorIfFalse'
+    default = 0.0 if state else 1.0
+    return {'outColor' + channel: evaluator.getInput(node, prefix + channel, default) for channel in 'RGB'}
+
+
+def multiplyDivideNode(evaluator, node):
+    operation = int(evaluator.getInput(node, 'operation', 1))
+    result = dict()
+    for axis in 'XYZ':
+        first = evaluator.getInput(node, 'input1' + axis)
+        second = evaluator.getInput(node, 'input2' + axis, 1.0)
+        if operation == 1:
+            result['output' + axis] = first * second
+        elif operation == 2:
+            result['output' + axis] = first / second
+        elif operation == 3:
+            result['output' + axis] = first ** second
+        else:
+            result['output' + axis] = first
+    return result
+
+
+def addDoubleLinearNode(evaluator, node):
+    return {'output': evaluator.getInput(node, 'input1') + evaluator.getInput(node, 'input2')}
+
+
+def multDoubleLinearNode(evaluator, node):
+    return {'output': evaluator.getInput(node, 'input1') * evaluator.getInput(node, 'input2')}
+
+
+def plusMinusAverageNode(evaluator, node):
+    operation = int(evaluator.getInput(node, 'operation', 1))
+
+    def combine(values):
+        if not values:
+            return 0.0
+        if operation == 2:
+            return values[0] - sum(values[1:])
+        if operation == 3:
+            return sum(values) / float(len(values))
+        return sum(values)
+
+    result = {'output1D': combine([evaluator.getInput(node, 'input1D[%d]' % index)
+                                   for index in evaluator.getIndices(node, 'input1D')])}
+    indices = evaluator.getIndices(node, 'input3D')
+    for axis in 'xyz':
+        result['output3D' + axis] = combine([evaluator.getInput(node, 'input3D[%d].input3D%s' % (index, axis))
+                                             for index in indices])
+    return result
+
+
+def unitConversionNode(evaluator, node):
+    return {'output': evaluator.getInput(node, 'input') * evaluator.getInput(node, 'conversionFactor', 1.0)}
+
+
+def composeMatrixNode(evaluator, node):
+    """
+    inputRotate values are in radians, as maya holds angles internally
+    """
+    translate = [evaluator.getInput(node, 'inputTranslate' + axis) for axis in 'XYZ']
+    rotate = [math.degrees(evaluator.getInput(node, 'inputRotate' + axis)) for axis in 'XYZ']
+    scale = [evaluator.getInput(node, 'inputScale' + axis, 1.0) for axis in 'XYZ']
+    return {'outputMatrix': transformMath.composeMatrix(translate, rotate, scale,
+                                                        rotateOrder=int(evaluator.getInput(node, 'inputRotateOrder',
+                                                                                           0)))}
+
+
+def pointMatrixMultNode(evaluator, node):
+    point = [evaluator.getInput(node, 'inPoint' + axis) for axis in 'XYZ']
+    matrix = evaluator.getInput(node, 'inMatrix', transformMath.identity)
+    if evaluator.getInput(node, 'vectorMultiply', False):
+        matrix = list(matrix[:12]) + [0.0, 0.0, 0.0, 1.0]
+    result = transformMath.transformPoint(point, matrix)
+    return {'output' + axis: value for axis, value in zip('XYZ', result)}
+
+
+def inverseMatrixNode(evaluator, node):
+    return {'outputMatrix': transformMath.inverse(evaluator.getInput(node, 'inputMatrix', transformMath.identity))}
+
+
+def multMatrixNode(evaluator, node):
+    result = transformMath.identity
+    for index in evaluator.getIndices(node, 'matrixIn'):
+        result = transformMath.multiply(result, evaluator.getInput(node, 'matrixIn[%d]' % index,
+                                                                   transformMath.identity))
+    return {'matrixSum': list(result)}
+
+
+def pickMatrixNode(evaluator, node):
+    matrix = evaluator.getInput(node, 'inputMatrix', transformMath.identity)
+    translate, rotate, scale = transformMath.decomposeMatrix(matrix)
+    if not evaluator.getInput(node, 'useTranslate', True):
+        translate = (0.0, 0.0, 0.0)
+    if not evaluator.getInput(node, 'useRotate', True):
+        rotate = (0.0, 0.0, 0.0)
+    if not evaluator.getInput(node, 'useScale', True):
+        scale = (1.0, 1.0, 1.0)
+    return {'outputMatrix': transformMath.composeMatrix(translate, rotate, scale)}
+
+
+nodeFunctions = {'condition': conditionNode,
+                 'multiplyDivide': multiplyDivideNode,
+                 'addDoubleLinear': addDoubleLinearNode,
+                 'multDoubleLinear': multDoubleLinearNode,
+                 'plusMinusAverage': plusMinusAverageNode,
+                 'unitConversion': unitConversionNode,
+                 'composeMatrix': composeMatrixNode,
+                 'pointMatrixMult': pointMatrixMultNode,
+                 'inverseMatrix': inverseMatrixNode,
+                 'multMatrix': multMatrixNode,
+                 'pickMatrix': pickMatrixNode,
+                 }
@@ -24,6 +24,7 @@
 '''
 import pymel.core as pm
 import maya.cmds as cmds
+import maya.api.OpenMaya as om2
 import os.path
 from Abstract import *
 from Abstract import *
@@ -42,6 +43,7 @@ else:
     from shiboken2 import wrapInstance
 
 from tb_UI import *
+import apps.tb_playblastEncode as playblastEncode
 
 
 class hotkeys(hotKeyAbstractFactory):
@@ -81,6 +83,12 @@ class PlayblastTool(toolAbstractFactory):
     playblastExt_opv = 'tb_playblast_ext'
     playblastExt_values = ['mp4', 'avi', 'mov']
     playblastExt_default = 'mov'
+    directMovieOption = 'tbPlayblastDirectMovie'
+    encodeWorkersOption = 'tbPlayblastEncodeWorkers'
+
+    versions = dict()
+    encodeScheduler = None
+    encodeTimer = None
 
     def __new__(cls):
         if PlayblastTool.__instance is None:
@@ -107,8 +115,17 @@ class PlayblastTool(toolAbstractFactory):
                                           optionVar=self.playblastExt_opv,
                                           defaultValue=self.playblastExt_values[0], label='Output file type')
 
+        directWidget = optionVarBoolWidget('Write movies directly (no background encoding)',
+                                           self.directMovieOption)
+        workersWidget = intFieldWidget(optionVar=self.encodeWorkersOption,
+                                       defaultValue=2,
+                                       label='Background encodes at once',
+                                       minimum=1, maximum=8, step=1)
+
         self.layout.addWidget(dirWidget)
         self.layout.addWidget(fileTypeWidget)
+        self.layout.addWidget(directWidget)
+        self.layout.addWidget(workersWidget)
         self.layout.addStretch()
         return self.optionWidget
 
@@ -118,8 +135,32 @@ class PlayblastTool(toolAbstractFactory):
     def drawMenuBar(self, parentMenu):
         return None
 
+    def loadData(self):
+        super(PlayblastTool, self).loadData()
+        self.versions = self.rawJsonData.get('versions', dict())
+
+    def toJson(self):
+        jsonData = '''{}'''
+        self.classData = json.loads(jsonData)
+        self.classData['versions'] = self.versions
+
+    def getNextVersion(self, folderName):
+        """
+        Version numbers come from a saved counter per folder, the movies in the folder
+        are only counted the first time it is used
+        :param folderName:
+        :return:
+        """
+        self.loadData()
+        key = os.path.normpath(folderName)
+        version = self.versions.get(key, None)
+        if version is None:
+            version = playblastEncode.getMovieCount(folderName)
+        self.versions[key] = version + 1
+        self.saveData()
+        return version
+
     def make_playblast(self, ext="mov"):
-        # TODO - mp4 support
         formats = {"mov": "qt", "avi": "avi"}
 
         directory = pm.optionVar.get(self.playblastDir_opv, self.playblastDir_default)
@@ -129,17 +170,92 @@ class PlayblastTool(toolAbstractFactory):
         folderName = '%sp_%s/' % (directory, filename)
         if not os.path.exists(folderName):
             os.makedirs(folderName)
-        count = len(cmds.getFileList(fld=folderName))
-        string_count = len(str(count))
-        string_base = "0000"
-        string_base_count = len(string_base)
-        index = string_base_count - string_count
-        string_result = string_base[:index]
-        blast_name = '%s%s_%s%s.%s' % (folderName, filename, string_result, count, ext)
+        count = self.getNextVersion(folderName)
 
         if self.funcs.isTimelineHighlighted():
             range = self.funcs.getTimelineHighlightedRange()
         else:
             range = self.funcs.getTimelineRange()
-        cmds.playblast(startTime=range[0], endTime=range[1], format=formats[ext],
-                       clearCache=False, percent=75, filename=blast_name)
+
+        ffmpeg = playblastEncode.findFfmpeg()
+        if ext == 'mp4' and not ffmpeg:
+            cmds.warning('mp4 needs ffmpeg on the path, writing avi')
+            ext = 'avi'
+        blast_name = '%s%s_%04d.%s' % (folderName, filename, count, ext)
+
+        # playblast can't write mp4 itself, so those always go through ffmpeg
+        if ext in formats and (pm.optionVar.get(self.directMovieOption, False) or (not ffmpeg and ext != 'avi')):
+            cmds.playblast(startTime=range[0], endTime=range[1], format=formats[ext],
+                           clearCache=False, percent=75, filename=blast_name)
+            return blast_name
+        return self.playblastInBackground(blast_name, range, ext, ffmpeg)
+
+    def playblastInBackground(self, blast_name, timeRange, ext, ffmpeg=None):
+        """
+        Capture jpeg frames here and queue the movie encode in the background
+        :param blast_name: movie file
+        :param timeRange: start, end
+        :param ext:
+        :param ffmpeg: ffmpeg executable, the built in mjpeg avi writer is used without it
+        :return:
+        """
+        name = os.path.splitext(os.path.basename(blast_name))[0]
+        frameFolder = os.path.join(os.path.dirname(blast_name), '.frames_' + name)
+        if not os.path.isdir(frameFolder):
+            os.makedirs(frameFolder)
+        framePrefix = os.path.join(frameFolder, name).replace('\\', '/')
+        cmds.playblast(startTime=timeRange[0], endTime=timeRange[1], format='image', compression='jpg', quality=95,
+                       clearCache=False, percent=75, filename=framePrefix, framePadding=4,
+                       forceOverwrite=True, viewer=False)
+        framePaths = [playblastEncode.getFramePath(framePrefix, frame)
+                      for frame in range(int(timeRange[0]), int(timeRange[1]) + 1)]
+        framePaths = [path for path in framePaths if os.path.isfile(path)]
+        if not framePaths:
+            return cmds.warning('Playblast wrote no frames')
+
+        job = playblastEncode.EncodeJob(name, framePaths, int(timeRange[0]), int(timeRange[1]), blast_name,
+                                        fps=om2.MTime(1, om2.MTime.kSeconds).asUnits(om2.MTime.uiUnit()),
+                                        encoder=playblastEncode.encoderFfmpeg if ffmpeg else playblastEncode.encoderMjpeg,
+                                        codecArgs=playblastEncode.ffmpegCodecs[ext],
+                                        framePattern=framePrefix + '.%04d.jpg',
+                                        jobFolder=frameFolder)
+        self.getEncodeScheduler(ffmpeg).submit(job)
+        self.startEncodeTimer()
+        self.funcs.infoMessage(prefix='Playblast', message=' encoding %s' % os.path.basename(blast_name))
+        return blast_name
+
+    def getEncodeScheduler(self, ffmpeg=None):
+        if self.encodeScheduler is None:
+            PlayblastTool.encodeScheduler = playblastEncode.getEncodeScheduler(onComplete=self.encodeComplete,
+                                                                               onFailed=self.encodeFailed)
+        self.encodeScheduler.runner.ffmpeg = ffmpeg
+        self.encodeScheduler.maxWorkers = int(pm.optionVar.get(self.encodeWorkersOption, 2))
+        return self.encodeScheduler
+
+    def startEncodeTimer(self):
+        if self.encodeTimer is None:
+            PlayblastTool.encodeTimer = QTimer()
+            self.encodeTimer.timeout.connect(self.pollEncodeJobs)
+        if not self.encodeTimer.isActive():
+            self.encodeTimer.start(500)
+
+    def pollEncodeJobs(self):
+        if not self.encodeScheduler.poll():
+            self.encodeTimer.stop()
+
+    def cleanUpFrames(self, job):
+        job.deleteFrames()
+        for path in [job.jobFile, job.progressFile]:
+            if os.path.isfile(path):
+                os.remove(path)
+        if os.path.isdir(job.jobFolder) and not os.listdir(job.jobFolder):
+            os.rmdir(job.jobFolder)
+
+    def encodeComplete(self, job):
+        self.cleanUpFrames(job)
+        self.funcs.infoMessage(prefix='Playblast', message=' %s done' % os.path.basename(job.outputFile))
+        QDesktopServices.openUrl(QUrl.fromLocalFile(job.outputFile))
+
+    def encodeFailed(self, job):
+        cmds.warning('Playblast encode failed for %s, frames kept in %s\n%s' % (job.outputFile, job.jobFolder,
+                                                                                job.error))
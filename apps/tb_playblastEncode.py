@@ -0,0 +1,264 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+import os
+import sys
+import struct
+import subprocess
+
+try:
+    from shutil import which
+except ImportError:
+    from distutils.spawn import find_executable as which
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from apps.tb_cacheJobs import CacheJob, CacheJobScheduler, ScriptRunner, getMayapy, writeProgress, \
+    statusRunning, statusDone, statusFailed
+
+'''
+Background encoding for playblasts captured as image sequences.
+
+Frames are encoded by ffmpeg when it can be found, otherwise by the MJPEG avi
+writer here, run as a script in mayapy. Jobs go through the same scheduler as
+background cache exports. Maya-free.
+'''
+
+encoderFfmpeg = 'ffmpeg'
+encoderMjpeg = 'mjpeg'
+
+ffmpegCodecs = {'mp4': ['-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-crf', '18'],
+                'mov': ['-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-crf', '18'],
+                'avi': ['-c:v', 'mjpeg', '-q:v', '3']}
+movieExtensions = sorted(ffmpegCodecs.keys())
+
+
+def findFfmpeg():
+    return which('ffmpeg')
+
+
+def getMovieCount(folder):
+    """
+    Movie files in a playblast folder, frame folders and anything else are ignored
+    :param folder:
+    :return:
+    """
+    count = 0
+    for fileName in os.listdir(folder):
+        if fileName.startswith('.') or fileName.rsplit('.', 1)[-1].lower() not in movieExtensions:
+            continue
+        if os.path.isfile(os.path.join(folder, fileName)):
+            count += 1
+    return count
+
+
+def getFramePath(prefix, frame, padding=4, ext='jpg'):
+    return '{0}.{1:0{2}d}.{3}'.format(prefix, int(frame), padding, ext)
+
+
+def getJpegSize(data):
+    """
+    :param data: jpeg bytes
+    :return: (width, height) from the first start of frame marker
+    """
+    index = 2
+    while index + 9 < len(data):
+        if data[index:index + 1] != b'\xff':
+            index += 1
+            continue
+        marker = ord(data[index + 1:index + 2])
+        if marker in (0xd8, 0x01) or 0xd0 <= marker <= 0xd7 or marker == 0xff:
+            index += 2 if marker != 0xff else 1
+            continue
+        length = struct.unpack('>H', data[index + 2:index + 4])[0]
+        if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+            height, width = struct.unpack('>HH', data[index + 5:index + 9])
+            return width, height
+        index += 2 + length
+    raise ValueError('No jpeg frame size found')
+
+
+def chunk(fourcc, data):
+    padding = b'\x00' if len(data) % 2 else b''
+    return fourcc + struct.pack('<I', len(data)) + data + padding
+
+
+def writeMjpegAvi(framePaths, outputFile, fps, progress=None):
+    """
+    Write jpeg frames into an MJPEG avi, frames are streamed from disk one at a time
+    :param framePaths: ordered jpeg files
+    :param outputFile:
+    :param fps: may be fractional
+    :param progress: called with the index of each frame as it is written
+    :return:
+    """
+    if not framePaths:
+        raise ValueError('No frames to encode')
+    sizes = [os.path.getsize(path) for path in framePaths]
+    with open(framePaths[0], 'rb') as firstFrame:
+        width, height = getJpegSize(firstFrame.read())
+
+    frameCount = len(framePaths)
+    scale = 1000
+    rate = int(round(fps * scale))
+    maxSize = max(sizes)
+    paddedSizes = [size + size % 2 for size in sizes]
+
+    avih = struct.pack('<14I',
+                       int(round(1000000.0 / fps)),  # microseconds per frame
+                       int(maxSize * fps),  # max bytes per second
+                       0,  # padding granularity
+                       0x10,  # AVIF_HASINDEX
+                       frameCount,
+                       0,  # initial frames
+                       1,  # streams
+                       maxSize,
+                       width,
+                       height,
+                       0, 0, 0, 0)
+    strh = b'vidsMJPG' + struct.pack('<IHHIIIIIIII4h',
+                                     0,  # flags
+                                     0, 0,  # priority, language
+                                     0,  # initial frames
+                                     scale,
+                                     rate,
+                                     0,  # start
+                                     frameCount,
+                                     maxSize,
+                                     0xffffffff,  # quality
+                                     0,  # sample size
+                                     0, 0, width, height)
+    strf = struct.pack('<IiiHH4sIiiII', 40, width, height, 1, 24, b'MJPG', width * height * 3, 0, 0, 0, 0)
+    strl = b'LIST' + struct.pack('<I', 4 + len(chunk(b'strh', strh)) + len(chunk(b'strf', strf))) + b'strl' + \
+           chunk(b'strh', strh) + chunk(b'strf', strf)
+    hdrlData = b'hdrl' + chunk(b'avih', avih) + strl
+    hdrl = b'LIST' + struct.pack('<I', len(hdrlData)) + hdrlData
+
+    moviSize = 4 + sum(8 + size for size in paddedSizes)
+    index = list()
+    offset = 4
+    for size, paddedSize in zip(sizes, paddedSizes):
+        index.append(struct.pack('<4sIII', b'00dc', 0x10, offset, size))
+        offset += 8 + paddedSize
+    idx1 = chunk(b'idx1', b''.join(index))
+
+    riffSize = 4 + len(hdrl) + 8 + moviSize + len(idx1)
+    with open(outputFile, 'wb') as avi:
+        avi.write(b'RIFF' + struct.pack('<I', riffSize) + b'AVI ')
+        avi.write(hdrl)
+        avi.write(b'LIST' + struct.pack('<I', moviSize) + b'movi')
+        for frameIndex, path in enumerate(framePaths):
+            with open(path, 'rb') as frame:
+                avi.write(chunk(b'00dc', frame.read()))
+            if progress:
+                progress(frameIndex)
+        avi.write(idx1)
+
+
+class EncodeJob(CacheJob):
+    """
+    Encode an image sequence to a movie, the frames are options['framePaths']
+    """
+
+    def __init__(self, name, framePaths, startTime, endTime, outputFile, fps=24.0, encoder=encoderMjpeg,
+                 codecArgs=None, deleteFrames=True, framePattern=str(), jobFolder=str()):
+        """
+        :param framePaths: ordered frame files
+        :param framePattern: printf style pattern of the frames for ffmpeg, prefix.%04d.jpg
+        """
+        super(EncodeJob, self).__init__(name, list(), startTime, endTime, outputFile,
+                                        options={'framePaths': list(framePaths),
+                                                 'framePattern': framePattern,
+                                                 'fps': fps,
+                                                 'encoder': encoder,
+                                                 'codecArgs': codecArgs or list(),
+                                                 'deleteFrames': deleteFrames},
+                                        jobFolder=jobFolder)
+
+    @classmethod
+    def fromJson(cls, data):
+        job = cls.__new__(cls)
+        job.__dict__.update(CacheJob.fromJson(data).__dict__)
+        return job
+
+    def getFfmpegCommand(self, ffmpeg):
+        return [ffmpeg, '-y', '-loglevel', 'error',
+                '-framerate', str(self.options['fps']),
+                '-start_number', str(int(self.startTime)),
+                '-i', self.options['framePattern']] + self.options['codecArgs'] + [self.outputFile]
+
+    def deleteFrames(self):
+        if not self.options.get('deleteFrames', False):
+            return
+        for path in self.options['framePaths']:
+            if os.path.isfile(path):
+                os.remove(path)
+
+
+class EncodeRunner(ScriptRunner):
+    """
+    Starts ffmpeg for ffmpeg jobs, this script in mayapy for the built in writer
+    """
+
+    def __init__(self, ffmpeg=None, executable=None):
+        super(EncodeRunner, self).__init__(os.path.abspath(__file__).replace('.pyc', '.py'),
+                                           executable=executable)
+        self.ffmpeg = ffmpeg
+
+    def getExecutable(self):
+        return self.executable or getMayapy()
+
+    def start(self, job):
+        if job.options['encoder'] == encoderFfmpeg and self.ffmpeg:
+            return subprocess.Popen(job.getFfmpegCommand(self.ffmpeg))
+        return super(EncodeRunner, self).start(job)
+
+
+def getEncodeScheduler(maxWorkers=2, ffmpeg=None, onProgress=None, onComplete=None, onFailed=None,
+                       executable=None):
+    return CacheJobScheduler(runner=EncodeRunner(ffmpeg=ffmpeg, executable=executable),
+                             maxWorkers=maxWorkers,
+                             onProgress=onProgress,
+                             onComplete=onComplete,
+                             onFailed=onFailed)
+
+
+def main(jobFile):
+    import traceback
+    job = EncodeJob.fromJson(jobFile)
+    framePaths = job.options['framePaths']
+    frameOffset = job.startTime
+    try:
+        writeMjpegAvi(framePaths, job.outputFile, job.options['fps'],
+                      progress=lambda index: writeProgress(job.progressFile, statusRunning, frameOffset + index))
+    except Exception:
+        writeProgress(job.progressFile, statusFailed, error=traceback.format_exc())
+        return 1
+    writeProgress(job.progressFile, statusDone, job.endTime)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1]))
@@ -0,0 +1,64 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+
+'''
+Maya-free point set maths, points are any sequence of x, y, z sequences
+'''
+
+
+def midPoint(points):
+    """
+    Average position
+    :param points:
+    :return: [x, y, z] or None for no points
+    """
+    total = 0
+    sumX = sumY = sumZ = 0.0
+    for point in points:
+        sumX += point[0]
+        sumY += point[1]
+        sumZ += point[2]
+        total += 1
+    if not total:
+        return None
+    return [sumX / total, sumY / total, sumZ / total]
+
+
+def boundingBox(points):
+    """
+    :param points:
+    :return: [minX, minY, minZ, maxX, maxY, maxZ] or None for no points
+    """
+    points = list(points)
+    if not points:
+        return None
+    xs = [point[0] for point in points]
+    ys = [point[1] for point in points]
+    zs = [point[2] for point in points]
+    return [min(xs), min(ys), min(zs), max(xs), max(ys), max(zs)]
+
+
+def scalePoint(point, scale):
+    return [point[0] * scale, point[1] * scale, point[2] * scale]
@@ -7,6 +7,7 @@ import getStyleSheet as getqss
 import os
 import maya.cmds as cmds
 from Abstract import *
+from apps.tb_radialLookup import RadialLookup
 
 qtVersion = pm.about(qtVersion=True)
 
@@ -15,12 +16,12 @@ if int(qtVersion.split('.')[0]) < 5:
     from PySide.QtCore import *
     from PySide.QtWidgets import *
 
-    from shiboken import wrapInstance
+    from shiboken import wrapInstance, isValid
 else:
     from PySide2.QtWidgets import *
     from PySide2.QtGui import *
     from PySide2.QtCore import *
-    from shiboken2 import wrapInstance
+    from shiboken2 import wrapInstance, isValid
 
 filepath = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe()))) + "\\"  # script directory
 
@@ -68,6 +69,7 @@ class ViewportRadialMenu(ViewportDialog):
             self.returnButton.setNonHoverSS()
         self.maxButtons = 0
         self.labelText = 'blank'
+        self.buttonLookup = None
 
     def enableLayer(self):
         super(ViewportRadialMenu, self).enableLayer()
@@ -101,6 +103,7 @@ class ViewportRadialMenu(ViewportDialog):
 
     def arrangeButtons(self):
         print ('arrangeButtons')
+        self.buttonLookup = None
         self.maxButtons = len(self.widgets['radial'])
         initialAngle = 0
         if self.parentMenu:
@@ -149,6 +152,7 @@ class ViewportRadialMenu(ViewportDialog):
         :return:
         '''
 
+        self.buttonLookup = None
         if isinstance(button, ToolboxButton):
             self.widgets[quad].append(button)
             button.absPos = button.pos()
@@ -163,6 +167,56 @@ class ViewportRadialMenu(ViewportDialog):
                 b.absPos = button.pos()  # + b.parent().pos()
                 self.allButtons.append(b)
 
+    def buildButtonLookup(self):
+        self.buttonLookup = RadialLookup((self.cursorPos.x(), self.cursorPos.y()),
+                                         [(w, (w.absPos.x() + w.width() / 2, w.absPos.y() + w.height() / 2))
+                                          for w in self.allButtons if isinstance(w, ToolboxButton)],
+                                         deadZone=self.scalar)
+
+    def getTooltipGeometry(self, button):
+        """
+        :param button:
+        :return: font, text width, text height, text position
+        """
+        font = defaultFont()
+        fontMetrics = QFontMetrics(font)
+        pixelsWide = fontMetrics.width(button.labelText)
+        pixelsHigh = fontMetrics.height()
+
+        radius = self.distance(self.centralPoint, self.parentPos) + 128
+        offset = QPoint(
+            math.sin((math.radians(button.currentAngle))) * (radius + (0.5 * pixelsWide)),
+            -math.cos((math.radians(button.currentAngle))) * (radius + pixelsHigh))
+        tooltipPos = QPoint(self.centralPoint.x() + offset.x() - (pixelsWide * 0.5),
+                            self.centralPoint.y() + offset.y() + (pixelsHigh * 0.5))
+        return font, pixelsWide, pixelsHigh, tooltipPos
+
+    def getHighlightRegion(self, button):
+        """
+        Everything paintEvent draws for the active button, the button, the line to it and the tooltip
+        :param button:
+        :return: QRegion
+        """
+        region = QRegion()
+        if button is None:
+            return region
+        margin = 4
+        buttonRect = QRect(button.absPos, button.size())
+        region = region.united(buttonRect.adjusted(-margin, -margin, margin, margin))
+        lineStart = self.parentPos if self.parentMenu else self.cursorPos
+        region = region.united(QRect(lineStart, buttonRect.center()).normalized().adjusted(-margin, -margin,
+                                                                                            margin, margin))
+        if self.tooltipEnabled:
+            font, pixelsWide, pixelsHigh, tooltipPos = self.getTooltipGeometry(button)
+            region = region.united(QRect(tooltipPos.x() - margin, tooltipPos.y() - pixelsHigh - margin,
+                                         pixelsWide + 2 * margin, pixelsHigh + 2 * margin))
+            region = region.united(QRect(0, 0, pixelsWide + 2 * margin, pixelsHigh + 2 + 2 * margin))
+        return region
+
+    def mouseMoveEvent(self, event):
+        self.currentCursorPos = self.mapFromGlobal(event.globalPos())
+        self.getClosesWidget()
+
     def paintEvent(self, event):
         qp = QPainter()
         qp.begin(self)
@@ -246,23 +300,13 @@ class ViewportRadialMenu(ViewportDialog):
                 brush = QBrush()
                 font = defaultFont()
 
+                font, pixelsWide, pixelsHigh, tooltipPos = self.getTooltipGeometry(self.activeButton)
                 pen.setWidth(3.5)
                 pen.setColor(lineColor)
                 brush.setColor(fillColor)
                 qp.setFont(font)
                 qp.setPen(pen)
 
-                fontMetrics = QFontMetrics(font)
-                pixelsWide = fontMetrics.width(self.activeButton.labelText)
-                pixelsHigh = fontMetrics.height()
-
-                radius = self.distance(self.centralPoint, self.parentPos) + 128
-                offset = QPoint(
-                    math.sin((math.radians(self.activeButton.currentAngle))) * (radius + (0.5 * pixelsWide)),
-                    -math.cos((math.radians(self.activeButton.currentAngle))) * (radius + pixelsHigh))
-                tooltipPos = QPoint(self.centralPoint.x() + offset.x() - (pixelsWide * 0.5),
-                                    self.centralPoint.y() + offset.y() + (pixelsHigh * 0.5))
-
                 path.addText(0, pixelsHigh + 2, font, self.activeButton.labelText)
                 path.addText(tooltipPos.x(), tooltipPos.y(), font, self.activeButton.labelText)
 
@@ -281,33 +325,22 @@ class ViewportRadialMenu(ViewportDialog):
         qp.end()
 
     def getClosesWidget(self):
-        # print ('getClosesWidget')
-        distance = self.distance(self.cursorPos, self.currentCursorPos)
-        for w in self.allButtons:
-            w.setNonHoverSS()
-        if distance < self.scalar:
-            self.activeButton = None
+        """
+        Look up the closest button and only repaint what changed when it moves
+        :return:
+        """
+        if self.buttonLookup is None:
+            self.buildButtonLookup()
+        closestWidget = self.buttonLookup.closest((self.currentCursorPos.x(), self.currentCursorPos.y()))
+        if closestWidget is self.activeButton:
             return
-        if self.allButtons:
-            closest = 9999
-            closestWidget = None
-            for w in self.allButtons:
-                if not isinstance(w, ToolboxButton):
-                    # print ('skip', w)
-                    continue
-                # w.setNonHoverSS()
-                widgetPos = QPoint(w.absPos.x() + w.width() / 2, w.absPos.y() + w.height() / 2)
-                distance = self.distance(widgetPos, self.currentCursorPos)
-                if distance < closest:
-                    closestWidget = w
-                    closest = distance
-
-                # print (widgetPos, distance)
-            # print ('closest', closestWidget)
-            self.activeButton = closestWidget
-            if self.activeButton:
-                self.activeButton.setHoverSS()
-            self.update()
+        previousButton = self.activeButton
+        if previousButton:
+            previousButton.setNonHoverSS()
+        self.activeButton = closestWidget
+        if self.activeButton:
+            self.activeButton.setHoverSS()
+        self.update(self.getHighlightRegion(previousButton).united(self.getHighlightRegion(self.activeButton)))
 
     def distance(self, point_a, point_b):
         distance = math.sqrt(math.pow(point_a.x() - (point_b.x()), 2) + math.pow(point_a.y() - (point_b.y()), 2))
@@ -578,6 +611,8 @@ class EventFilterManager(object):
     uiUpdateFilter = None
     markingMenuFilter = None
     markingMenuClass = None
+    # model editor name: viewport widget the marking menu filter goes on
+    panelWidgets = dict()
 
     def __new__(cls):
         if EventFilterManager.__instance is None:
@@ -609,29 +644,47 @@ class EventFilterManager(object):
                (widget.parent().__class__ == QStackedWidget or widget.parent().__class__ == QObject) \
                and not widget.isHidden()
 
-    def recursive_widget_lookup(self, widget, filter, remove=False):
+    def findPanelWidget(self, widget):
         matches = [x for x in widget.children() if self.isPanelWidget(x)]
-        try:
-            if remove:
-                matches[0].removeEventFilter(filter)
-            else:
-                matches[0].installEventFilter(filter)
-            # print "installing event filter,", filter, "on", matches[0], matches[0].__class__
-        except Exception as e:
-            print (e)
-            for child in widget.children():
-                self.recursive_widget_lookup(child, filter)
+        if matches:
+            return matches[0]
+        for child in widget.children():
+            match = self.findPanelWidget(child)
+            if match is not None:
+                return match
+        return None
+
+    def getPanelWidget(self, editor):
+        """
+        The viewport widget for a model editor, kept until Qt deletes it
+        :param editor:
+        :return:
+        """
+        widget = self.panelWidgets.get(editor, None)
+        if widget is not None and isValid(widget):
+            return widget
+        editorWidget = self.getQObjectFromName(editor)
+        widget = self.findPanelWidget(editorWidget) if editorWidget is not None else None
+        if widget is None:
+            self.panelWidgets.pop(editor, None)
+        else:
+            self.panelWidgets[editor] = widget
+        return widget
+
+    def getModelEditors(self):
+        return [p for p in cmds.lsUI(editors=True) or list() if cmds.objectTypeUI(p) == 'modelEditor']
 
     def addFilterToModelPanels(self, filter):
-        print('addFilterToModelPanels')
-        for p in pm.lsUI(editors=True):
-            if pm.objectTypeUI(p) == 'modelEditor':
-                self.recursive_widget_lookup(self.getQObjectFromName(p), filter)
+        for editor in self.getModelEditors():
+            widget = self.getPanelWidget(editor)
+            if widget is not None:
+                widget.installEventFilter(filter)
 
     def removeFilterToModelPanels(self, filter):
-        for p in pm.lsUI(editors=True):
-            if pm.objectTypeUI(p) == 'modelEditor':
-                self.recursive_widget_lookup(self.getQObjectFromName(p), filter, remove=True)
+        for editor in self.getModelEditors():
+            widget = self.getPanelWidget(editor)
+            if widget is not None:
+                widget.removeEventFilter(filter)
 
     def getQObjectFromName(self, name):
         ptr = omui.MQtUtil.findControl(name)
@@ -47,6 +47,7 @@ import pickle
 import json
 import maya.OpenMayaUI as omUI
 from Abstract import *
+from apps.tb_markingMenuCache import menuItem
 from tb_UI import *
 import getStyleSheet as getqss
 
@@ -134,6 +135,8 @@ class QuickSelectionTools(toolAbstractFactory):
     toolName = 'QuickSelectionSets'
     hotkeyClass = hotkeys()
     funcs = functions()
+    # the sets listed first are the ones the selected nodes belong to
+    markingMenuScope = toolAbstractFactory.markingMenuSelection
 
     quickSelectFolderOption = 'tb_qs_folder'
     quickSelectFolder = 'qssFiles'
@@ -529,6 +532,7 @@ class QuickSelectionTools(toolAbstractFactory):
             cmds.sets(qs, addElement=self.create_main_set())
             cmds.select(pre_sel, replace=True)
         self.create_main_set()
+        self.clearMarkingMenuCache()
 
     def saveUberSet(self, qs_name, selection, quick=True, colour=[0.5, 0.5, 0.5]):
         qs_name = qs_name.split(':')[-1]
@@ -559,6 +563,7 @@ class QuickSelectionTools(toolAbstractFactory):
             # cmds.select(qs, replace=True)
             cmds.sets(qs, addElement=self.create_main_set())
             # cmds.select(pre_sel, replace=True)
+            self.clearMarkingMenuCache()
 
     def save_qs_from_file(self, qs_name, selection):
         namespace_override = None
@@ -650,9 +655,10 @@ class QuickSelectionTools(toolAbstractFactory):
             qss_name = qss_name.split('.')[0] + '.json'
 
         file_name = os.path.join(self.quickSelectSavePath, qss_name)
-        if not os.path.isfile(file_name):
+        store = self.getDataStore()
+        if not store.exists(file_name):
             return
-        rawJsonData = json.load(open(file_name))
+        rawJsonData = store.load(file_name)
         if 'setNames' not in rawJsonData.keys():
             cmds.warning('Loading legacy set')
             for qs_name, qs_objects in rawJsonData.items():
@@ -662,10 +668,8 @@ class QuickSelectionTools(toolAbstractFactory):
             self.save_qs_from_file(qs_name, qs_objects.get('qs_objects', list()))
 
     def restore_qs_from_dir(self):
-        qss_files = list()
-        for qss_files in os.listdir(self.quickSelectSavePath):
-            if qss_files.endswith(".json"):
-                self.qss_files.append(qss_files)
+        for name in self.getDataStore().listNames(self.quickSelectSavePath):
+            self.qss_files.append(name + '.json')
 
     def openQssLoadWindow(self):
         win = LoadQuickSelectWindow()
@@ -946,6 +950,19 @@ class QuickSelectionTools(toolAbstractFactory):
                                             command=lambda: self.save_qs_to_file(),
                                             closeOnPress=True))
 
+    def qtMarkingMenu(self, inputNodes):
+        matchedSets, unmatchedSets = self.getMatchingSets(inputNodes, self.get_sets(forceAll=True))
+        menuItems = [menuItem('Quick Select', 'qs_select', radialPosition='NE'),
+                     menuItem('Add Selection Set', 'saveQssDialog', variableData={'quick': False}, radialPosition='NW'),
+                     menuItem('Add Quick Selection Set', 'saveQssDialog', variableData={'quick': True},
+                              radialPosition='NW')]
+        for mset in matchedSets + unmatchedSets:
+            menuItems.append(menuItem(mset, 'selectQuickSelectionSet',
+                                      variableData={'name': mset, 'add': False},
+                                      radialPosition='SE',
+                                      textColour='#%02X%02X%02X' % tuple(int(c) for c in self.getSetColoursForUI(mset))))
+        return menuItems
+
     def getSetColoursForUI(self, mset):
         colour = self.getSetColour(mset)
         colour = [colour[0] * 255, colour[1] * 255, colour[2] * 255]
@@ -953,6 +970,7 @@ class QuickSelectionTools(toolAbstractFactory):
 
     def setSetColourFromUI(self, mset, colourR, colourG, colourB):
         cmds.setAttr(mset + '.Colour', colourR, colourG, colourB, type='double3')
+        self.clearMarkingMenuCache()
 
     def setSelectionTool(self):
         cmds.setToolTo('selectSuperContext')
@@ -0,0 +1,147 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+import math
+import bisect
+
+'''
+Maya-free hit testing for radial menus. Angles are in degrees, clockwise from
+up in screen space (y down), matching the layout in ViewportRadialMenu.
+'''
+
+
+def getAngle(centre, point):
+    """
+    :param centre: (x, y)
+    :param point: (x, y)
+    :return: 0-360 degrees clockwise from up
+    """
+    return math.degrees(math.atan2(point[0] - centre[0], centre[1] - point[1])) % 360.0
+
+
+def angleDifference(a, b):
+    difference = abs(a - b) % 360.0
+    return min(difference, 360.0 - difference)
+
+
+class RadialLookup(object):
+    """
+    Nearest item lookup for items laid out around a centre point. Built once when
+    the menu opens, a query buckets the cursor angle to find its place among the
+    items sorted by angle, then checks neighbours outwards until no item further
+    round can be closer. Items on a ring are found after two or three checks
+    """
+
+    def __init__(self, centre, items, deadZone=0.0, sectorsPerItem=4):
+        """
+        :param centre: (x, y)
+        :param items: list of (item, (x, y)) centre positions
+        :param deadZone: radius around the centre that hits nothing
+        :param sectorsPerItem: bucket resolution
+        """
+        self.centre = (float(centre[0]), float(centre[1]))
+        self.deadZone = deadZone
+        entries = list()
+        for item, position in items:
+            position = (float(position[0]), float(position[1]))
+            entries.append((getAngle(self.centre, position), item, position))
+        entries.sort(key=lambda entry: entry[0])
+        self.angles = [entry[0] for entry in entries]
+        self.items = [entry[1] for entry in entries]
+        self.positions = [entry[2] for entry in entries]
+        radii = [math.hypot(x - self.centre[0], y - self.centre[1]) for x, y in self.positions]
+        self.minRadius = min(radii) if radii else 0.0
+        self.maxRadius = max(radii) if radii else 0.0
+        self.sectorCount = max(8, sectorsPerItem * len(self.items))
+        self.sectorSize = 360.0 / self.sectorCount
+        # index of the first item at or after the start of each sector
+        self.sectorStart = [bisect.bisect_left(self.angles, sector * self.sectorSize)
+                            for sector in range(self.sectorCount)]
+
+    def lowerBound(self, distance, angle):
+        """
+        Smallest squared distance from a point at distance from the centre to any
+        item angle degrees round from it
+        """
+        cosAngle = math.cos(math.radians(angle))
+        sinAngle = math.sin(math.radians(angle))
+        radius = min(max(distance * cosAngle, self.minRadius), self.maxRadius)
+        return (radius - distance * cosAngle) ** 2 + (distance * sinAngle) ** 2
+
+    def closest(self, point):
+        """
+        :param point: (x, y)
+        :return: the closest item or None inside the dead zone
+        """
+        count = len(self.items)
+        if not count:
+            return None
+        offsetX = point[0] - self.centre[0]
+        offsetY = point[1] - self.centre[1]
+        distance = math.hypot(offsetX, offsetY)
+        if distance < self.deadZone:
+            return None
+        angle = math.degrees(math.atan2(offsetX, -offsetY)) % 360.0
+        index = self.sectorStart[int(angle / self.sectorSize) % self.sectorCount]
+        while index < count and self.angles[index] < angle:
+            index += 1
+
+        closestIndex = None
+        closestDistance = None
+        # walk clockwise from index and anticlockwise from index - 1
+        forward = 0
+        backward = 1
+        while forward + backward <= count:
+            forwardIndex = (index + forward) % count
+            backwardIndex = (index - backward) % count
+            forwardAngle = angleDifference(self.angles[forwardIndex], angle)
+            backwardAngle = angleDifference(self.angles[backwardIndex], angle)
+            if forwardAngle <= backwardAngle:
+                nextIndex, nextAngle = forwardIndex, forwardAngle
+                forward += 1
+            else:
+                nextIndex, nextAngle = backwardIndex, backwardAngle
+                backward += 1
+            if closestDistance is not None and self.lowerBound(distance, nextAngle) >= closestDistance:
+                break
+            position = self.positions[nextIndex]
+            itemDistance = (position[0] - point[0]) ** 2 + (position[1] - point[1]) ** 2
+            if closestDistance is None or itemDistance < closestDistance:
+                closestDistance = itemDistance
+                closestIndex = nextIndex
+        return self.items[closestIndex]
+
+    def closestBruteForce(self, point):
+        offsetX = point[0] - self.centre[0]
+        offsetY = point[1] - self.centre[1]
+        if math.hypot(offsetX, offsetY) < self.deadZone:
+            return None
+        closestItem = None
+        closestDistance = None
+        for item, position in zip(self.items, self.positions):
+            distance = (position[0] - point[0]) ** 2 + (position[1] - point[1]) ** 2
+            if closestDistance is None or distance < closestDistance:
+                closestDistance = distance
+                closestItem = item
+        return closestItem
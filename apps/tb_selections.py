@@ -224,12 +224,5 @@ class SelectionTools(toolAbstractFactory):
         matches = get_close_matches(st, [x[:len(x) - tailLen] for x in matchingPrefix])
 
     def getSimilarControls(self, namespace, sel, prefix, constraint=False, shape=True):
-        matching = cmds.ls('{ns}:{ct}*'.format(ns=namespace, ct=prefix[0]), type='transform')
-        if not constraint:
-            matching = [x for x in matching if 'Constraint' not in cmds.objectType(x)]
-        if shape:
-            matching = [x for x in matching if cmds.listRelatives(x, shapes=True)]
-        if sel in matching:
-            matching.remove(sel)
-        return matching
+        return self.funcs.getSimilarControls(namespace, sel, prefix, constraint=constraint, shape=shape)
 
@@ -100,6 +100,7 @@ else:
     from shiboken2 import wrapInstance
 import sys, os
 import tb_functions as funcs
+from apps.tb_filterPool import CurveFilterPool, gaussian_smoothing, highpass_smoothing, butterworth_filter
 
 scriptLocation = os.path.dirname(os.path.realpath(__file__))
 IconPath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Icons'))
@@ -960,6 +961,9 @@ class SlideTools(toolAbstractFactory):
 
     undoChunk = None
 
+    filterPoolWorkersOption = 'tbFilterPoolWorkers'
+    filterPoolThresholdOption = 'tbFilterPoolThreshold'
+
     def __new__(cls):
         if SlideTools.__instance is None:
             SlideTools.__instance = object.__new__(cls)
@@ -2016,31 +2020,20 @@ class SlideTools(toolAbstractFactory):
         if not self.keyframeData:
             return
 
-        tempKeyList = list()
-        tempRevKeyList = list()
+        curveValues = dict()
+        for curve, keyframeData in self.keyframeData.items():
+            tempKeyList = [self.keyframeRefData[curve].previousValues[keyframeData.keyIndexes[0]]]
+            tempKeyList.extend(self.keyframeRefData[curve].keyValues)
+            tempKeyList.append(self.keyframeRefData[curve].nextValues[keyframeData.keyIndexes[-1]])
+            curveValues[curve] = tempKeyList
 
+        filteredValues = self.getFilterPool().filterCurves('highpass', curveValues, 0.5, abs(int(alphaB)))
         for curve, keyframeData in self.keyframeData.items():
-            # keyframeData.keyValues = self.highpass_smoothing(self.keyframeRefData[curve].keyValues, 0.9)
-            for x in range(abs(int(alphaB))):
-                if not tempKeyList:
-                    tempKeyList = [self.keyframeRefData[curve].previousValues[keyframeData.keyIndexes[0]]]
-                    tempKeyList.extend(self.keyframeRefData[curve].keyValues)
-                    tempKeyList.append(self.keyframeRefData[curve].nextValues[keyframeData.keyIndexes[-1]])
-                    # try flipping the value each time?
-                    # tempRevKeyList = tempKeyList[::-1]
-                tempKeyList = self.highpass_smoothing(tempKeyList, 0.5)
-                # tempRevKeyList = self.highpass_smoothing(tempRevKeyList, 0.5)
-
-            # keyframeData.revKeyValues = tempKeyList[1:-1]
-            keyframeData.keyValues = tempKeyList[1:-1]
+            keyframeData.keyValues = filteredValues[curve][1:-1]
             keyframeData.isCached = True
 
         for curve, keyframeData in self.keyframeData.items():
             for i in range(len(keyframeData.keyIndexes)):
-                # if alpha >= 0:
-                #     vals = keyframeData.keyValues
-                # else:
-                #     vals = keyframeData.revKeyValues
                 outValue = lerpFloat(keyframeData.keyValues[i], self.keyframeRefData[curve].keyValues[i], alpha)
                 self.selectedCurveDict[curve].setValue(keyframeData.keyIndexes[i], outValue,
                                                        change=animCurveChange)
@@ -2066,19 +2059,22 @@ class SlideTools(toolAbstractFactory):
                                                            change=animCurveChange)
             return
 
+        if alpha < 0:
+            alpha *= -1
+            flipped = True
+
+        curveValues = dict()
         for curve, keyframeData in self.keyframeData.items():
             if keyframeData.isCached:
                 continue
-            if alpha < 0:
-                alpha *= -1
-                flipped = True
-
             tempKeyList = [self.keyframeRefData[curve].previousValues[keyframeData.keyIndexes[0]]]
             tempKeyList.extend(self.keyframeRefData[curve].keyValues)
             tempKeyList.append(self.keyframeRefData[curve].nextValues[keyframeData.keyIndexes[-1]])
+            curveValues[curve] = tempKeyList
 
-            keyframeData.keyValues = self.gaussian_smoothing(tempKeyList, alpha)[1:-1]
-
+        filteredValues = self.getFilterPool().filterCurves('gauss', curveValues, alpha)
+        for curve, values in filteredValues.items():
+            self.keyframeData[curve].keyValues = values[1:-1]
             # keyframeData.isCached = True
 
         for curve, keyframeData in self.keyframeData.items():
@@ -2112,14 +2108,15 @@ class SlideTools(toolAbstractFactory):
                                                            change=animCurveChange)
             return
 
-        for curve, keyframeData in self.keyframeData.items():
-            if keyframeData.isCached:
-                continue
-            if alpha < 0:
-                alpha *= -1
-                flipped = True
-            keyframeData.keyValues = self.butterworth_filter(self.keyframeRefData[curve].keyValues, 7.00, 40.0, 1)
-
+        if alpha < 0:
+            alpha *= -1
+            flipped = True
+
+        curveValues = {curve: self.keyframeRefData[curve].keyValues
+                       for curve, keyframeData in self.keyframeData.items() if not keyframeData.isCached}
+        filteredValues = self.getFilterPool().filterCurves('butter', curveValues, 7.00, 40.0, 1)
+        for curve, values in filteredValues.items():
+            self.keyframeData[curve].keyValues = values
             # keyframeData.isCached = True
 
         for curve, keyframeData in self.keyframeData.items():
@@ -2130,79 +2127,22 @@ class SlideTools(toolAbstractFactory):
                 self.selectedCurveDict[curve].setValue(keyframeData.keyIndexes[i], outValue,
                                                        change=animCurveChange)
 
-    def gaussian_smoothing(self, data, sigma):
-        smoothed_data = []
-        kernel_radius = int(2 * math.ceil(2 * sigma) + 1)
-        kernel = []
-
-        for x in range(-kernel_radius, kernel_radius + 1):
-            weight = math.exp(-0.5 * (x / sigma) ** 2)
-            kernel.append(weight)
-
-        kernel_sum = sum(kernel)
-
-        for i in range(len(data)):
-            smoothed_value = 0.0
-            normalization_factor = 0.0
-
-            for j in range(len(kernel)):
-                index = i + j - kernel_radius
-
-                if index >= 0 and index < len(data):
-                    smoothed_value += kernel[j] * data[index]
-                    normalization_factor += kernel[j]
-
-            smoothed_data.append(smoothed_value / normalization_factor)
+    def getFilterPool(self):
+        """
+        Filters run in worker processes once the key count passes the threshold option
+        :return:
+        """
+        return CurveFilterPool(workers=pm.optionVar.get(self.filterPoolWorkersOption, 0),
+                               threshold=pm.optionVar.get(self.filterPoolThresholdOption, 200000))
 
-        return smoothed_data
+    def gaussian_smoothing(self, data, sigma):
+        return gaussian_smoothing(data, sigma)
 
     def highpass_smoothing(self, data, alpha):
-        smoothed_data = [data[0]]  # Initialize the smoothed data with the first value of the input data
-        for i in range(1, len(data)):
-            smoothed_value = alpha * data[i] + (1 - alpha) * smoothed_data[i - 1]
-            smoothed_data.append(smoothed_value)
-        return smoothed_data
+        return highpass_smoothing(data, alpha)
 
     def butterworth_filter(self, data, cutoff_freq, sampling_rate, order):
-        filtered_data = []
-        nyquist_freq = 0.5 * sampling_rate
-        normalized_cutoff = cutoff_freq / nyquist_freq
-        tan_half_normalized_cutoff = math.tan(math.pi * normalized_cutoff * 0.5)
-        sqr_tan_half_normalized_cutoff = tan_half_normalized_cutoff ** 2
-
-        c = [0.0] * (order + 1)
-        d = [0.0] * (order + 1)
-
-        c[0] = sqr_tan_half_normalized_cutoff + 2.0 * tan_half_normalized_cutoff + 1.0
-        c[1] = 2.0 * (sqr_tan_half_normalized_cutoff - 1.0) / c[0]
-
-        for i in range(2, order + 1):
-            c[i] = (2.0 * sqr_tan_half_normalized_cutoff - 2.0) / c[i - 1]
-
-        d[0] = 1.0 / c[0]
-        d[1] = 0.0
-
-        for i in range(2, order + 1):
-            d[i] = (-2.0 * tan_half_normalized_cutoff) / c[i - 1] * d[i - 1] - d[i - 2]
-
-        for i in range(len(data)):
-            filtered_value = 0.0
-
-            for j in range(order + 1):
-                index = i - j
-
-                if index >= 0:
-                    filtered_value += c[j] * data[index]
-
-            for j in range(1, order + 1):
-                index = i - j
-
-                if index >= 0:
-                    filtered_value -= d[j] * filtered_data[index]
-
-            filtered_data.append(filtered_value)
-
-        return filtered_data
+        return butterworth_filter(data, cutoff_freq, sampling_rate, order)
 
     def comb(self, n, k):
         if k > n or k < 0:
@@ -31,6 +31,8 @@ import pymel.core.datatypes as dt
 from Abstract import *
 import maya.OpenMaya as om
 import maya.api.OpenMaya as om2
+import apps.tb_transformMath as transformMath
+from apps.tb_matrixBake import TransformSampler, bakeWorldMatricesInOrder, getChannelFilter
 
 qtVersion = pm.about(qtVersion=True)
 if int(qtVersion.split('.')[0]) < 5:
@@ -221,16 +223,16 @@ class SnapTools(toolAbstractFactory):
         sel = cmds.ls(selection=True)
         if not sel:
             return
-        if len(sel) >= 2:
-            state = pm.optionVar.get(self.selectionOrderOption, False)
-            original = {True: sel[1], False: sel[0]}[state]
-            target = {True: sel[0], False: sel[1]}[state]
+        if len(sel) < 2:
+            return
+        state = pm.optionVar.get(self.selectionOrderOption, False)
+        original = {True: sel[1], False: sel[0]}[state]
+        target = {True: sel[0], False: sel[1]}[state]
 
         if self.funcs.isTimelineHighlighted():
             startTime, endTime = self.funcs.getTimelineHighlightedRange()
-            for x in range(int(startTime), int(endTime)):
-                cmds.currentTime(x)
-                self.snap_object(original, target, translate, orient)
+            with self.funcs.undoChunk():
+                self.snap_object_range(original, target, translate, orient, self.getSnapFrames(startTime, endTime))
         else:
             self.snap_object(original, target, translate, orient)
 
@@ -263,6 +265,36 @@ class SnapTools(toolAbstractFactory):
             pm.xform(original, absolute=True, worldSpace=True, rotation=rot, rotateOrder=ro, preserve=True)
             pm.xform(original, rotateOrder=node_ro, preserve=True)
 
+    @staticmethod
+    def getSnapFrames(startTime, endTime):
+        return list(range(int(startTime), int(endTime) + 1))
+
+    def snap_object_range(self, original, target, translate, orient, frames):
+        """
+        snap_object over a frame range, both nodes are sampled for every frame without
+        changing the current time and original is keyed in one write per channel
+        :param original:
+        :param target:
+        :param translate:
+        :param orient:
+        :param frames:
+        :return:
+        """
+        sampler = TransformSampler([original, target])
+        worldMatrices = sampler.sample(frames)
+        originalPivot = sampler.nodeData[original]['rotatePivot']
+        targetPivot = sampler.nodeData[target]['rotatePivot']
+        result = [transformMath.snapMatrix(originalMatrix, targetMatrix, originalPivot, targetPivot,
+                                           translate=translate, orient=orient)
+                  for originalMatrix, targetMatrix in zip(worldMatrices[original], worldMatrices[target])]
+
+        channels = list()
+        if translate:
+            channels.extend(['translateX', 'translateY', 'translateZ'])
+        if orient:
+            channels.extend(['rotateX', 'rotateY', 'rotateZ'])
+        bakeWorldMatricesInOrder({original: result}, frames, channels=channels)
+
     def init_relative_transform_key(self, key):
         self.relativeTransformClipboard[key] = self.relativeTransformClipboard.get(key, dict())
 
@@ -326,6 +358,10 @@ class SnapTools(toolAbstractFactory):
             startTime, endTime = self.funcs.getTimelineHighlightedRange()
 
         constrain = pm.optionVar.get(self.relativeSelectionConstraintOption, False)
+        if not constrain and startTime != endTime:
+            with self.funcs.undoChunk():
+                return self.restore_relative_transform_range(parent, targets, self.getSnapFrames(startTime, endTime),
+                                                             channels=channels)
         for x in range(int(startTime), int(endTime) + 1):
             if int(cmds.currentTime(query=True)) != x:
                 cmds.currentTime(x)
@@ -348,6 +384,36 @@ class SnapTools(toolAbstractFactory):
                 pm.setKeyframe(targets)
                 pm.delete(tempNodes)
 
+    def restore_relative_transform_range(self, parent, targets, frames, channels=list()):
+        """
+        Key the targets at their stored offsets from parent over a frame range. The parent is sampled
+        for every frame without changing the current time, targets are written parents first so
+        targets under other targets follow their new animation
+        :param parent:
+        :param targets:
+        :param frames:
+        :param channels: channel box selection, used when the channel filter option is on
+        :return:
+        """
+        offsets = dict()
+        for target in targets:
+            offset = self.relativeTransformClipboard[parent].get(target, None)
+            if offset:
+                offsets[target] = list(offset)
+        if not offsets:
+            return
+        parentMatrices = TransformSampler([parent]).sample(frames)[parent]
+        worldMatrices = {target: [transformMath.multiply(offset, parentMatrix) for parentMatrix in parentMatrices]
+                         for target, offset in offsets.items()}
+
+        channelFilter = None
+        if pm.optionVar.get(self.relativeSelectionChannelFilterOption, False):
+            channelFilter = getChannelFilter(channels) or None
+        longNames = {cmds.ls(target, long=True)[0]: target for target in offsets.keys()}
+        nodes = self.funcs.getDagHierarchy(list(longNames.keys())).sortByParents()
+        bakeWorldMatricesInOrder({node: worldMatrices[longNames[node]] for node in nodes}, frames, nodes=nodes,
+                                 channels=channelFilter)
+
     def store_transform(self):
         sel = cmds.ls(selection=True)
         if not sel:
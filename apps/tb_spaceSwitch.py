@@ -28,6 +28,10 @@ import pymel.core.datatypes as dt
 from Abstract import *
 import maya.api.OpenMaya as om2
 from difflib import SequenceMatcher
+from apps.tb_matrixBake import TransformSampler, getWritableChannels, prepareCurves, writeChannels, restoreWorldPoses
+from apps.tb_curveEdit import applyCurveEdit, getAnimCurveFn, removeRedundantSteppedKeys
+from apps.tb_eventDispatcher import EventDispatcher
+from apps.tb_markingMenuCache import menuItem
 
 str_spacePresets = 'spacePresets'
 str_spaceDefaultValues = 'spaceDefaultValues'
@@ -158,7 +162,7 @@ class SpaceData(object):
         return returnDict
 
     def fromJson(self, data):
-        rawJsonData = json.load(open(data))
+        rawJsonData = dataStore.loadJson(data)
 
         self.spaceControl = rawJsonData.get(str_spaceControlKey, dict())
         self.spaceGlobalValues = rawJsonData.get(str_spaceGlobalValues, dict())
@@ -184,8 +188,11 @@ class SpaceSwitch(toolAbstractFactory):
     # __metaclass__ = abc.ABCMeta
     __instance = None
     toolName = 'SpaceSwitch'
+    dependentPlugins = ['tbCurveEdit.py']
     hotkeyClass = hotkeys()
     funcs = functions()
+    # the presets come from each selected rig's space data
+    markingMenuScope = toolAbstractFactory.markingMenuRig
 
     culledUserAttributes = ['blendParent', 'blendOrient', 'blendPoint']
     quickBakeSimOption = 'tbSpaceSwitchBakeUseSim'
@@ -193,6 +200,7 @@ class SpaceSwitch(toolAbstractFactory):
     bakeTimelineModeOption = 'tbSpaceBakeTimelineMode'
     bakeLayerModes = ['To Override', 'To Override - Extract anim', 'To Base']
     bakeToLayerModeOption = 'tbSpaceBakeToLayerMode'
+    constraintBakeOption = 'tbSpaceSwitchConstraintBake'
 
     loadedSpaceData = dict()  # store loaded data per session to avoid accessing the disc all the time
     namespaceToCharDict = dict()
@@ -203,6 +211,7 @@ class SpaceSwitch(toolAbstractFactory):
 
     subPath = None
     allCharacters = dict()
+    spaceEnumCache = dict()  # enum definition: {lower case space name: index}
 
     def __new__(cls):
         if SpaceSwitch.__instance is None:
@@ -242,6 +251,8 @@ class SpaceSwitch(toolAbstractFactory):
                                                                                 self.bakeTimelineModes[0]),
                                                   label='Bake mode range')
         simOptionWidget = optionVarBoolWidget('Space switch bake uses Simulation ', self.quickBakeSimOption)
+        constraintBakeWidget = optionVarBoolWidget('Space switch bake uses constraints (legacy) ',
+                                                   self.constraintBakeOption)
         infoText4 = QLabel('<b>Bake to layer</b> - A space bake will bake to a new override layer')
         self.bakeLayerModeWidget = comboBoxWidget(optionVar=self.bakeToLayerModeOption,
                                                   values=self.bakeLayerModes,
@@ -254,6 +265,7 @@ class SpaceSwitch(toolAbstractFactory):
         self.layout.addWidget(infoText3)
         self.layout.addWidget(self.bakeRangeModeWidget)
         self.layout.addWidget(simOptionWidget)
+        self.layout.addWidget(constraintBakeWidget)
         self.layout.addWidget(infoText4)
         self.layout.addWidget(self.bakeLayerModeWidget)
 
@@ -489,6 +501,26 @@ class SpaceSwitch(toolAbstractFactory):
                                             popupSubMenu=True,
                                             subMenuClass=SaveCurrentStateWidget))
 
+    def qtMarkingMenu(self, inputNodes):
+        characters = self.funcs.splitSelectionToCharacters(inputNodes)
+        self.loadDataForCharacters(characters)
+        menuItems = list()
+        for label, mode in (('Local', str_spaceLocalValues),
+                            ('Global', str_spaceGlobalValues),
+                            ('Default', str_spaceDefaultValues)):
+            menuItems.append(menuItem('switch to ' + label, 'switchSelection',
+                                      variableData={'mode': mode}, radialPosition='NW'))
+            menuItems.append(menuItem('bake to ' + label, 'bakeSelection',
+                                      variableData={'mode': mode}, radialPosition='NE'))
+        for namespace, rigName in sorted(self.namespaceToCharDict.items()):
+            for preset in sorted(self.loadedSpaceData[rigName].spacePresets.keys()):
+                presetData = {'preset': preset, 'rigName': rigName, 'namespace': namespace}
+                menuItems.append(menuItem('Switch ' + preset, 'switchFromPreset',
+                                          variableData=presetData, radialPosition='SE'))
+                menuItems.append(menuItem('Bake ' + preset, 'bakeFromPreset',
+                                          variableData=presetData, radialPosition='SE'))
+        return menuItems
+
     def togglePopupSwitchMode(self):
         self.popupSwitchMode = not self.popupSwitchMode
 
@@ -499,8 +531,7 @@ class SpaceSwitch(toolAbstractFactory):
         """
         self.allCharacters = dict()
         self.allSpaceAttributes = list()
-        for file_name in [f for f in os.listdir(self.subPath) if f.endswith('.json')]:
-            refname = file_name.split('.')[0]
+        for refname in self.getDataStore().listNames(self.subPath):
             spaceData = self.loadRigData(SpaceData(), refname)
             self.loadedSpaceData[refname] = spaceData
 
@@ -533,38 +564,26 @@ class SpaceSwitch(toolAbstractFactory):
 
     def simplifySpaceKeys(self, spaceAttribute='space'):
         """
-        reduce the space switch attribute keys to a minimum
-        :param node:
-        :param spaceAttribute:
+        reduce the space switch attribute keys to a minimum, all the curves are
+        read and cleaned in one undoable api edit
+        :param spaceAttribute: attribute or list of attributes
         :return:
         """
-        with self.funcs.keepSelection():
-            # make a list so we can send multiple objects in one go
-            if not isinstance(spaceAttribute, list):
-                spaceAttribute = [spaceAttribute]
-
-            for attr in spaceAttribute:
-                spaceSwitchAttr = pm.Attribute(attr)
-
-                cmds.select(clear=True)
-
-                allSpaceAttrKeyTimes = sorted(list(set(pm.keyframe(spaceSwitchAttr, query=True))))
-                duplicateSpaceKeyTimes = []
-                spaceAttrValues = pm.keyframe(spaceSwitchAttr, query=True, valueChange=True)
-                for index in range(0, len(spaceAttrValues) - 1):
-                    if spaceAttrValues[index] != spaceAttrValues[index + 1]:
-                        continue
-                    duplicateSpaceKeyTimes.append(allSpaceAttrKeyTimes[index + 1])
-
-                # remove the duplicate values
-                for keyTime in duplicateSpaceKeyTimes:
-                    pm.cutKey(spaceSwitchAttr, time=keyTime)
+        # make a list so we can send multiple objects in one go
+        if not isinstance(spaceAttribute, list):
+            spaceAttribute = [spaceAttribute]
+        curves = cmds.keyframe([str(x) for x in spaceAttribute], query=True, name=True)
+        if not curves:
+            return
+        curves = list(dict.fromkeys(curves))
+        # put this as an option
+        cmds.keyframe(curves, tickDrawSpecial=True)
 
-                # put this as an option
-                pm.keyframe(spaceSwitchAttr, tickDrawSpecial=True)
+        def edit(animCurveChange, dagModifier):
+            for curve in curves:
+                removeRedundantSteppedKeys(getAnimCurveFn(curve), animCurveChange=animCurveChange)
 
-                # set the tangents to stepped and flat
-                pm.keyTangent(spaceSwitchAttr, outTangentType='step', inTangentType='linear')
+        applyCurveEdit(edit)
 
     def getAllControlsInSpace(self, mode=str_spaceGlobalValues):
         sel = cmds.ls(sl=True)
@@ -770,6 +789,7 @@ class SpaceSwitch(toolAbstractFactory):
 
     def bakeFromData(self, attributes, values):
         resultLayer = None
+        bakeAttributes = list()
         timeRange = self.funcs.getTimelineRange()
         bakeOption = pm.optionVar.get(self.bakeToLayerModeOption, self.bakeLayerModes[0])
         initialTime = cmds.currentTime(query=True)
@@ -784,7 +804,7 @@ class SpaceSwitch(toolAbstractFactory):
             bakeAttributes.extend(list(attributes.values()))
 
         self.bakeSpaceSwitch(selection=selection,
-                             resultLayer=str(resultLayer),
+                             resultLayer=str(resultLayer) if resultLayer else None,
                              spaceAttributes=attributes,
                              bakeAttributes=bakeAttributes,
                              values=values,
@@ -801,14 +821,98 @@ class SpaceSwitch(toolAbstractFactory):
                         startTime=0,
                         endTime=0,
                         bakeOption=str()):
-        locators = dict()
-        tempConstraints = dict()
         if not isinstance(selection, list):
             selection = [selection]
-        for s in selection:
-            loc = self.funcs.tempNull(name=s, suffix='space')
-            locators[s] = str(loc)
-            cmds.parentConstraint(s, str(loc))
+        if pm.optionVar.get(self.constraintBakeOption, False) and resultLayer:
+            return self.bakeSpaceSwitchConstraints(selection=selection,
+                                                   resultLayer=resultLayer,
+                                                   spaceAttributes=spaceAttributes,
+                                                   bakeAttributes=bakeAttributes,
+                                                   values=values,
+                                                   startTime=startTime,
+                                                   endTime=endTime)
+        return self.bakeSpaceSwitchMatrix(selection=selection,
+                                          resultLayer=resultLayer,
+                                          spaceAttributes=spaceAttributes,
+                                          values=values,
+                                          startTime=startTime,
+                                          endTime=endTime)
+
+    def keySpaceAttributes(self, spaceAttributes, values, startTime, endTime, resultLayer=None):
+        if resultLayer:
+            cmds.animLayer(resultLayer, edit=True, attribute=list(spaceAttributes.keys()))
+            cmds.animLayer(resultLayer, edit=True, selected=True)
+            cmds.animLayer(resultLayer, edit=True, preferred=True)
+
+        for key, attr in spaceAttributes.items():
+            spaceSwitchAttr = pm.Attribute(key)
+            spaceValue = values[key]
+            if not isinstance(values[key], int) and not isinstance(values[key], float):
+                spaceEnums = dict((k.lower(), v) for k, v in spaceSwitchAttr.getEnums().items())
+                spaceValue = spaceEnums[spaceValue.lower()]
+            if not resultLayer:
+                cmds.cutKey(key, time=(startTime, endTime), clear=True)
+            cmds.setKeyframe(key, time=(startTime, endTime), value=spaceValue)
+
+    def bakeSpaceSwitchMatrix(self, selection=list(),
+                              resultLayer=None,
+                              spaceAttributes=dict(),
+                              values=dict(),
+                              startTime=0,
+                              endTime=0):
+        """
+        Samples the world matrices of the selection, switches space, then samples the new parent
+        space and writes the local channel values straight onto the curves. No locators,
+        constraints or bakeResults, and the current time is never changed.
+        Parents are written before their children so a child sees its parent's new animation
+        :param selection:
+        :param resultLayer: override layer to bake to, None to bake to the base layer
+        :param spaceAttributes: dict of space attribute: control
+        :param values: dict of space attribute: space value
+        :param startTime:
+        :param endTime:
+        :return:
+        """
+        frames = [startTime + x for x in range(int(endTime - startTime) + 1)]
+        if not frames:
+            return
+        nodes = self.funcs.getDagHierarchy(cmds.ls(selection, long=True)).sortByParents()
+        sampler = TransformSampler(nodes)
+        worldMatrices = sampler.sample(frames)
+        channels = {node: getWritableChannels(node) for node in nodes}
+
+        def edit(animCurveChange, dagModifier):
+            for node in nodes:
+                if not channels[node]:
+                    continue
+                parentMatrices = sampler.sampleParentSpace(frames, nodes=[node])[node]
+                localValues = sampler.localChannels(node, worldMatrices[node], parentMatrices)
+                writeChannels(node,
+                              {channel: localValues[channel] for channel in channels[node]},
+                              frames,
+                              layer=resultLayer,
+                              animCurveChange=animCurveChange)
+
+        with self.funcs.undoChunk():
+            self.keySpaceAttributes(spaceAttributes, values, startTime, endTime, resultLayer=resultLayer)
+            prepareCurves([node + '.' + channel for node in nodes for channel in channels[node]],
+                          startTime,
+                          layer=resultLayer)
+            applyCurveEdit(edit)
+
+    def bakeSpaceSwitchConstraints(self, selection=list(),
+                                   resultLayer=str(),
+                                   spaceAttributes=dict(),
+                                   bakeAttributes=dict(),
+                                   values=dict(),
+                                   startTime=0,
+                                   endTime=0):
+        locators = dict()
+        tempConstraints = dict()
+        nulls = self.funcs.tempNulls([{'name': s, 'suffix': 'space'} for s in selection])
+        for s, loc in zip(selection, nulls):
+            locators[s] = loc
+            cmds.parentConstraint(s, loc)
 
         with self.funcs.suspendUpdate():
             cmds.bakeResults(list(locators.values()),
@@ -821,18 +925,7 @@ class SpaceSwitch(toolAbstractFactory):
             tempConstraints[s] = str(
                 self.funcs.safeParentConstraint(locators[s], s, orientOnly=False, maintainOffset=False))
 
-        cmds.animLayer(resultLayer, edit=True, attribute=list(spaceAttributes.keys()))
-        cmds.animLayer(resultLayer, edit=True, selected=True)
-        cmds.animLayer(resultLayer, edit=True, preferred=True)
-
-        for key, attr in spaceAttributes.items():
-            spaceSwitchAttr = pm.Attribute(key)
-            spaceValue = values[key]
-            if not isinstance(values[key], int) and not isinstance(values[key], float):
-                spaceEnums = dict((k.lower(), v) for k, v in spaceSwitchAttr.getEnums().items())
-                spaceValue = spaceEnums[spaceValue.lower()]
-
-            cmds.setKeyframe(key, time=(startTime, endTime), value=spaceValue)
+        self.keySpaceAttributes(spaceAttributes, values, startTime, endTime, resultLayer=resultLayer)
 
         with self.funcs.suspendUpdate():
             cmds.bakeResults(bakeAttributes,
@@ -994,28 +1087,123 @@ class SpaceSwitch(toolAbstractFactory):
             timeDict[s] = self.getMatchRange(s, timeline=False)
 
         combinedTimeList = sorted({x for v in list(timeDict.values()) for x in v})
+        switches = [(s, attributeKeyList[index], values[attributeKeyList[index]])
+                    for index, s in enumerate(selection)]
+        rotateAttributes = [control + '.' + axis for control in selection for axis in ['rotateX', 'rotateY', 'rotateZ']]
 
         if len(combinedTimeList) > 1:
             with self.funcs.suspendUpdate():
                 for t in combinedTimeList[::-1]:
                     cmds.currentTime(t)
-                    for index, s in enumerate(selection):
-                        if s not in timeDict.keys():
-                            continue
-                        attributeKey = attributeKeyList[index]
-                        self.simpleSpaceSwitch(node=s,
-                                               spaceValue=values[attributeKey],
-                                               spaceAttribute=attributeKey)
-                for control in selection:
-                    cmds.filterCurve(control + '.rotateX', control + '.rotateY', control + '.rotateZ')
+                    self.switchSpaces(switches)
         else:
-            for index, s in enumerate(selection):
-                attributeKey = attributeKeyList[index]
-                self.simpleSpaceSwitch(node=s,
-                                       spaceValue=values[attributeKey],
-                                       spaceAttribute=attributeKey)
-            for control in selection:
-                cmds.filterCurve(control + '.rotateX', control + '.rotateY', control + '.rotateZ')
+            self.switchSpaces(switches)
+        cmds.filterCurve(rotateAttributes)
+
+    @staticmethod
+    def splitSpaceAttribute(node, spaceAttribute):
+        """
+        Space attributes come in as either the full 'namespace:control.attr' or just the attribute name
+        :return: node, attribute plug
+        """
+        spaceAttribute = str(spaceAttribute)
+        if '.' in spaceAttribute:
+            return spaceAttribute.split('.', 1)[0], spaceAttribute
+        return str(node), str(node) + '.' + spaceAttribute
+
+    @staticmethod
+    def parseEnumString(enumString):
+        enums = dict()
+        index = 0
+        for item in enumString.split(':'):
+            if '=' in item:
+                item, value = item.rsplit('=', 1)
+                index = int(value)
+            enums[item.lower()] = index
+            index += 1
+        return enums
+
+    def getSpaceValue(self, plug, spaceValue):
+        """
+        Resolve an enum name to its index, parsed enum definitions are cached
+        :param plug: 'node.attr'
+        :param spaceValue: index or space name
+        :return:
+        """
+        if isinstance(spaceValue, (int, float)):
+            return spaceValue
+        node, attribute = plug.split('.', 1)
+        enumString = (cmds.attributeQuery(attribute, node=node, listEnum=True) or [str()])[0]
+        if enumString not in self.spaceEnumCache:
+            self.spaceEnumCache[enumString] = self.parseEnumString(enumString)
+        return self.spaceEnumCache[enumString][spaceValue.lower()]
+
+    def switchSpaces(self, switches):
+        """
+        Switch the space of many controls at once, keeping their world pose.
+        All world matrices are captured first, every space attribute is set,
+        then each control is put back parent first so dependent controls land correctly.
+        :param switches: list of (control, space attribute, space value)
+        :return:
+        """
+        spaceValues = dict()
+        controls = list()
+        for node, spaceAttribute, spaceValue in switches:
+            if not cmds.objExists(node):
+                pm.warning(node + ' does not exist')
+                continue
+            node, plug = self.splitSpaceAttribute(node, spaceAttribute)
+            spaceValues[plug] = self.getSpaceValue(plug, spaceValue)
+            controls.append(node)
+        if not controls:
+            return
+
+        nodes = self.funcs.getDagHierarchy(cmds.ls(controls, long=True)).sortByParents()
+        sampler = TransformSampler(nodes)
+        worldMatrices = sampler.sampleCurrent()
+        channels = {node: getWritableChannels(node) for node in nodes}
+        currentRotations = {node: cmds.getAttr(node + '.rotate')[0] for node in nodes}
+
+        def edit(animCurveChange, dagModifier):
+            for plug, value in spaceValues.items():
+                selectionList = om2.MSelectionList()
+                selectionList.add(plug)
+                mPlug = selectionList.getPlug(0)
+                if isinstance(value, float):
+                    dagModifier.newPlugValueDouble(mPlug, value)
+                else:
+                    dagModifier.newPlugValueInt(mPlug, int(value))
+            dagModifier.doIt()
+
+            def setValues(node, values):
+                mfnDep = om2.MFnDependencyNode(sampler.dependNodes[node])
+                for channel, value in values.items():
+                    mPlug = mfnDep.findPlug(channel, False)
+                    if channel.startswith('rotate'):
+                        dagModifier.newPlugValueMAngle(mPlug, om2.MAngle(value, om2.MAngle.kDegrees))
+                    else:
+                        dagModifier.newPlugValueDouble(mPlug, value)
+                # children read their parent space from this, so apply before moving on
+                dagModifier.doIt()
+
+            restoreWorldPoses(sampler, worldMatrices, channels, currentRotations, setValues)
+
+        with self.funcs.undoChunk():
+            applyCurveEdit(edit)
+
+            if pm.autoKeyframe(state=True, q=True):
+                keyedControls = [node for node in controls if cmds.keyframe(node, query=True)]
+                keyedPlugs = [plug for plug in spaceValues.keys() if plug.split('.', 1)[0] in keyedControls]
+                if keyedControls:
+                    for attribute in ['.translate', '.rotate']:
+                        try:
+                            cmds.setKeyframe([node + attribute for node in keyedControls])
+                        except RuntimeError:
+                            pass
+                    cmds.setKeyframe(keyedPlugs)
+            self.simplifySpaceKeys(spaceAttribute=list(spaceValues.keys()))
+            for node in set(controls):
+                self.deleteBlendAttributes(node)
 
     def simpleSpaceBake(self, node=str(), spaceValue=None, spaceAttribute='space'):
         """
@@ -1030,6 +1218,7 @@ class SpaceSwitch(toolAbstractFactory):
         if not isinstance(node, list):
             node = [node]
         resultLayer = None
+        bakeAttributes = list()
         timeRange = self.funcs.getTimelineRange()
         bakeOption = pm.optionVar.get(self.bakeToLayerModeOption, self.bakeLayerModes[0])
         initialTime = cmds.currentTime(query=True)
@@ -1045,7 +1234,7 @@ class SpaceSwitch(toolAbstractFactory):
             spaceValueDict[n + '.' + spaceAttribute] = spaceValue
 
         self.bakeSpaceSwitch(selection=node,
-                             resultLayer=str(resultLayer),
+                             resultLayer=str(resultLayer) if resultLayer else None,
                              spaceAttributes=spaceAttributeDict,
                              bakeAttributes=bakeAttributes,
                              values=spaceValueDict,
@@ -1065,56 +1254,7 @@ class SpaceSwitch(toolAbstractFactory):
         """
         if not cmds.objExists(node):
             return pm.warning(node + ' does not exist')
-        # if there is no control node specified, just use the main node
-
-        spaceSwitchAttr = pm.Attribute(node + '.' + spaceAttribute)
-
-        if not isinstance(spaceValue, int) and not isinstance(spaceValue, float):
-            spaceEnums = dict((k.lower(), v) for k, v in list(spaceSwitchAttr.getEnums().items()))
-            spaceValue = spaceEnums[spaceValue.lower()]
-
-        rotation = cmds.xform(node, query=True, absolute=True, worldSpace=True, rotation=True)
-        translation = cmds.xform(node, query=True, absolute=True, worldSpace=True, translation=True)
-
-        cmds.setAttr(spaceAttribute, spaceValue)
-        cmds.xform(node, absolute=True, worldSpace=True, translation=translation)
-        cmds.xform(node, absolute=True, worldSpace=True, rotation=rotation)
-        '''
-        # store the matrix
-        storedMtx = self.funcs.getMatrix(node)
-
-        # swap the space value
-        pm.setAttr(spaceSwitchAttr, spaceValue)
-
-        # get the new matrix
-        postMtx = self.funcs.getMatrix(node)
-        # also the parent matrix
-        parentMtx = self.funcs.getMatrix(node, matrix='parentMatrix')
-
-        # get the new position and rotation
-        pos, rot = self.funcs.getMatrixOffset(node, storedMtx, postMtx, parentMtx)
-
-        # rotate is
-        cmds.xform(node, relative=True, rotation=rot)
-
-        postMtx = self.funcs.getMatrix(node)
-        parentMtx = self.funcs.getMatrix(node, matrix='parentMatrix')
-        pos, rot = self.funcs.getMatrixOffset(node, storedMtx, postMtx, parentMtx)
-        # translate it
-        cmds.xform(node, relative=True, translation=pos)
-        '''
-        if pm.keyframe(node, query=True) and pm.autoKeyframe(state=True, q=True):
-            try:
-                cmds.setKeyframe(node + '.translate')
-            except:
-                pass
-            try:
-                cmds.setKeyframe(node + '.rotate')
-            except:
-                pass
-            cmds.setKeyframe(str(spaceSwitchAttr))
-        self.simplifySpaceKeys(spaceAttribute=spaceSwitchAttr)
-        self.deleteBlendAttributes(node)
+        self.switchSpaces([(node, spaceAttribute, spaceValue)])
 
     def deleteBlendAttributes(self, node):
         for attr in pm.listAttr(node, userDefined=True, keyable=True):
@@ -1337,11 +1477,11 @@ class SpaceSwitchSetupUI(QMainWindow):
         # self.controlsLayout.addStretch()
         # self.controlsLayout.addWidget(SwitchableObjectWidget(self))
         self.setObjectName('SpaceSetupUI')
-        self.selectionChangedCallback = -1
+        self.selectionChangedCallback = 'SpaceSwitchSetupUI'
         self.createSelectionChangedScriptJob()
 
     def createSelectionChangedScriptJob(self):
-        self.selectionChangedCallback = cmds.scriptJob(event=("SelectionChanged", pm.Callback(self.selectionChanged)))
+        EventDispatcher().subscribe(self.selectionChangedCallback, self.selectionChanged, events=['SelectionChanged'])
         return self.selectionChangedCallback
 
     def selectionChanged(self, *args):
@@ -1400,7 +1540,7 @@ class SpaceSwitchSetupUI(QMainWindow):
             self.addNewControlsWithAttribute(channels[0].split('.')[-1])
 
     def getPendingControls(self):
-        sel = cmds.ls(sl=True)
+        sel = EventDispatcher().getSelectionSnapshot().objects
 
         if not sel:
             cmds.warning('nothing selected')
@@ -1540,7 +1680,7 @@ class SpaceSwitchSetupUI(QMainWindow):
         widget.deleteLater()
 
     def closeEvent(self, event):
-        cmds.scriptJob(kill=self.selectionChangedCallback)
+        EventDispatcher().unsubscribe(self.selectionChangedCallback)
 
         event.accept()
 
@@ -0,0 +1,210 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+try:
+    import maya.api.OpenMaya as om2
+except ImportError:
+    om2 = None
+
+from apps.tb_nodeGraph import getDependNode, setPlugValue
+from apps.tb_controlShapes import getControlShapeLibrary
+
+'''
+Batch creation of temp controls and nulls through one MDagModifier, used by
+functions.tempControls and functions.tempNulls. Scene settings (up axis, maya version,
+option vars) are passed in so this doesn't need cmds.
+'''
+
+# maps a y up rotate order to the z up equivalent
+zUpRotateOrders = {0: 1,
+                   1: 2,
+                   2: 0,
+                   3: 4,
+                   4: 5,
+                   5: 3,
+                   }
+
+
+def getControlShapePoints(drawType, upAxis='y', scale=1.0):
+    """
+    The points for a shape in controlShapes.json, swapped for z up
+    :param drawType: shape name, unknown shapes are drawn as a cross
+    :param upAxis: 'y' or 'z'
+    :param scale:
+    :return: tuple of (x, y, z)
+    """
+    return getControlShapeLibrary().getPoints(drawType, scale=scale, axis=upAxis)
+
+
+def createCurveData(points):
+    """
+    Linear curve geometry for setting on a nurbsCurve's cached attribute
+    :param points: (x, y, z) sequence
+    :return: MObject nurbsCurveData
+    """
+    data = om2.MFnNurbsCurveData().create()
+    om2.MFnNurbsCurve().create([om2.MPoint(p[0], p[1], p[2]) for p in points],
+                               [float(x) for x in range(len(points))],
+                               1,
+                               om2.MFnNurbsCurve.kOpen,
+                               False,
+                               False,
+                               data)
+    return data
+
+
+def createFloatAttribute(longName, defaultValue=0.0, minimum=None, maximum=None, keyable=False):
+    attribute = om2.MFnNumericAttribute()
+    attributeObject = attribute.create(longName, longName, om2.MFnNumericData.kFloat, defaultValue)
+    if minimum is not None:
+        attribute.setMin(minimum)
+    if maximum is not None:
+        attribute.setMax(maximum)
+    attribute.keyable = keyable
+    attribute.channelBox = not keyable
+    return attributeObject
+
+
+def createTempControls(specs, modifier, upAxis='y', xRay=False, lineWidth=-1.0, xRayDefault=0.3, unitScale=1.0):
+    """
+    Every control's nodes and attributes are added to the modifier, then one doIt creates them,
+    then the values and connections go in with a second doIt. Curve data is made once per
+    shape in the batch
+    :param specs: list of dicts of name, suffix, scale, color, drawType, rotateOrder and an optional parent
+    :param modifier: MDagModifier
+    :param upAxis: scene up axis
+    :param xRay: add the always on top shape, maya 2024 and later
+    :param lineWidth: lineWidth option var
+    :param xRayDefault: xRayDefault option var
+    :param unitScale: shape scale for the scene's linear unit
+    :return: list of control names in the same order as specs
+    """
+    if not specs:
+        return list()
+    curveData = dict()
+    controls = list()
+    for spec in specs:
+        drawType = spec.get('drawType', 'orb')
+        if drawType not in curveData:
+            curveData[drawType] = createCurveData(getControlShapePoints(drawType, upAxis, scale=unitScale))
+        name = spec.get('name', 'loc') + '_' + spec.get('suffix', 'baked')
+        parent = spec.get('parent', None)
+        if parent:
+            transform = modifier.createNode('transform', getDependNode(parent))
+        else:
+            transform = modifier.createNode('transform')
+        modifier.renameNode(transform, name)
+        control = {'spec': spec,
+                   'transform': transform,
+                   'orig': modifier.createNode('nurbsCurve', transform),
+                   'shape': modifier.createNode('nurbsCurve', transform),
+                   'transformGeometry': om2.MDGModifier.createNode(modifier, 'transformGeometry'),
+                   'composeMatrix': om2.MDGModifier.createNode(modifier, 'composeMatrix'),
+                   'data': curveData[drawType]}
+        modifier.renameNode(control['orig'], name + 'ShapeOrig')
+        modifier.renameNode(control['shape'], name + 'Shape')
+        modifier.renameNode(control['transformGeometry'], name + '_drawScale')
+        modifier.renameNode(control['composeMatrix'], name + '_drawScaleMatrix')
+        scale = float(spec.get('scale', 1.0))
+        modifier.addAttribute(transform, createFloatAttribute('drawScale', scale, minimum=0.001, keyable=True))
+        modifier.addAttribute(transform, createFloatAttribute('LineWidth', scale, minimum=-1, maximum=10))
+        if xRay:
+            control['xRay'] = modifier.createNode('nurbsCurve', transform)
+            modifier.renameNode(control['xRay'], name + 'XRayShape')
+            modifier.addAttribute(transform, createFloatAttribute('xRay', scale, minimum=0.0, maximum=1.0))
+        controls.append(control)
+    modifier.doIt()
+
+    names = list()
+    for control in controls:
+        spec = control['spec']
+        rotateOrder = spec.get('rotateOrder', 3)
+        if upAxis != 'y':
+            rotateOrder = zUpRotateOrders[rotateOrder]
+        transform = om2.MFnDependencyNode(control['transform'])
+        orig = om2.MFnDependencyNode(control['orig'])
+        shape = om2.MFnDependencyNode(control['shape'])
+        transformGeometry = om2.MFnDependencyNode(control['transformGeometry'])
+        composeMatrix = om2.MFnDependencyNode(control['composeMatrix'])
+
+        modifier.newPlugValue(orig.findPlug('cached', False), control['data'])
+        setPlugValue(modifier, orig.findPlug('intermediateObject', False), True)
+        setPlugValue(modifier, transform.findPlug('rotateOrder', False), rotateOrder)
+        setPlugValue(modifier, transform.findPlug('drawScale', False), float(spec.get('scale', 1.0)))
+        setPlugValue(modifier, transform.findPlug('LineWidth', False), lineWidth)
+        setPlugValue(modifier, shape.findPlug('overrideEnabled', False), True)
+        setPlugValue(modifier, shape.findPlug('overrideRGBColors', False), True)
+        setPlugValue(modifier, shape.findPlug('overrideColorRGB', False),
+                     [float(x) for x in spec.get('color', (1.0, 0.537, 0.016))])
+        modifier.connect(orig.findPlug('local', False), transformGeometry.findPlug('inputGeometry', False))
+        modifier.connect(composeMatrix.findPlug('outputMatrix', False),
+                         transformGeometry.findPlug('transform', False))
+        for axis in 'XYZ':
+            modifier.connect(transform.findPlug('drawScale', False),
+                             composeMatrix.findPlug('inputScale' + axis, False))
+        modifier.connect(transformGeometry.findPlug('outputGeometry', False), shape.findPlug('create', False))
+        modifier.connect(transform.findPlug('LineWidth', False), shape.findPlug('lineWidth', False))
+        if 'xRay' in control:
+            xRayShape = om2.MFnDependencyNode(control['xRay'])
+            setPlugValue(modifier, transform.findPlug('xRay', False), xRayDefault)
+            setPlugValue(modifier, xRayShape.findPlug('alwaysDrawOnTop', False), True)
+            setPlugValue(modifier, xRayShape.findPlug('overrideEnabled', False), True)
+            setPlugValue(modifier, xRayShape.findPlug('overrideRGBColors', False), True)
+            modifier.connect(transformGeometry.findPlug('outputGeometry', False),
+                             xRayShape.findPlug('create', False))
+            for channel in 'RGB':
+                modifier.connect(shape.findPlug('overrideColor' + channel, False),
+                                 xRayShape.findPlug('overrideColor' + channel, False))
+            modifier.connect(transform.findPlug('xRay', False), xRayShape.findPlug('overrideColorA', False))
+            modifier.connect(transform.findPlug('LineWidth', False), xRayShape.findPlug('lineWidth', False))
+        name = om2.MFnDagNode(control['transform']).partialPathName()
+        modifier.commandToExecute('setAttr -e -keyable 1 "%s.rotateOrder"' % name)
+        names.append(name)
+    modifier.doIt()
+    return names
+
+
+def createTempNulls(specs, modifier):
+    """
+    :param specs: list of dicts of name, suffix and an optional parent
+    :param modifier: MDagModifier
+    :return: list of node names in the same order as specs
+    """
+    if not specs:
+        return list()
+    nodes = list()
+    for spec in specs:
+        suffix = spec.get('suffix', 'baked')
+        parent = spec.get('parent', None)
+        if parent:
+            node = modifier.createNode('transform', getDependNode(parent))
+        else:
+            node = modifier.createNode('transform')
+        modifier.renameNode(node, spec.get('name', 'loc') + ('_' + suffix if suffix else ''))
+        nodes.append(node)
+    modifier.doIt()
+    for node in nodes:
+        setPlugValue(modifier, om2.MFnDependencyNode(node).findPlug('rotateOrder', False), 2)
+    modifier.doIt()
+    return [om2.MFnDagNode(node).partialPathName() for node in nodes]
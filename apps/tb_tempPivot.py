@@ -26,6 +26,9 @@ import pymel.core as pm
 import maya.cmds as cmds
 from functools import partial
 from Abstract import *
+import apps.tb_transformMath as transformMath
+from apps.tb_matrixBake import TransformSampler, bakeWorldMatrices
+from apps.tb_eventDispatcher import EventDispatcher
 
 qtVersion = pm.about(qtVersion=True)
 if int(qtVersion.split('.')[0]) < 5:
@@ -176,7 +179,7 @@ class PivotData(object):
         return returnDict
 
     def fromJson(self, data):
-        rawJsonData = json.load(open(data))
+        rawJsonData = dataStore.loadJson(data)
         self.persistentPivots = dict()
         # TODO - fix this to use actual pivot info
         persistentPivots = rawJsonData.get('persistentPivots', list())
@@ -213,10 +216,12 @@ class TempPivot(toolAbstractFactory):
     # __metaclass__ = abc.ABCMeta
     __instance = None
     toolName = 'TempPivot'
+    dependentPlugins = ['tbCurveEdit.py']
     hotkeyClass = hotkeys()
     funcs = functions()
 
-    scriptJobs = list()
+    bakeSubscriberName = 'TempPivotBake'
+    bakeEvents = ['SelectionChanged', 'ToolChanged']
     tempParentScriptJobs = list()
     crossSizeOption = 'tbBakeLocatorSize'
     assetName = 'TempPivotControls'
@@ -310,14 +315,15 @@ class TempPivot(toolAbstractFactory):
         :return:
         """
         dataFile = os.path.join(self.subFolder, refname + '.json')
-        self.saveJsonFile(dataFile, json.loads(jsonData))
+        self.saveJsonFileDeferred(dataFile, json.loads(jsonData))
+        self.clearMarkingMenuCache()
 
     def saveRigFileIfNew(self, refname, jsonData):
         self.subFolder = os.path.join(self.dataPath, self.toolName)
         if not os.path.isdir(self.subFolder):
             os.mkdir(self.subFolder)
         dataFile = os.path.join(self.subFolder, refname + '.json')
-        if not os.path.isfile(os.path.join(dataFile)):
+        if not self.getDataStore().exists(dataFile):
             self.saveJsonFile(dataFile, json.loads(jsonData))
 
     def assetRmbCommand(self):
@@ -506,18 +512,13 @@ class TempPivot(toolAbstractFactory):
         return loc
 
     def completedScriptJob(self, targets, loc, frame, worldspace=False):
-        self.scriptJobs.append(
-            pm.scriptJob(runOnce=True, event=['SelectionChanged', partial(self.bake, targets, loc, frame, worldspace=worldspace)]))
-        self.scriptJobs.append(
-            pm.scriptJob(runOnce=True, event=['ToolChanged', partial(self.bake, targets, loc, frame, worldspace=worldspace)]))
-        # self.scriptJobs.append(pm.scriptJob(runOnce=True, timeChange=partial(self.bake, targets, loc, frame)))
+        EventDispatcher().subscribe(self.bakeSubscriberName,
+                                    partial(self.bake, targets, loc, frame, worldspace=worldspace),
+                                    events=self.bakeEvents,
+                                    once=True)
 
     def clearScriptJobs(self):
-        for j in self.scriptJobs:
-            try:
-                pm.scriptJob(kill=j)
-            except:
-                pass
+        EventDispatcher().unsubscribe(self.bakeSubscriberName)
 
     def bake(self, targets, loc, frame, deletePoint=True, worldspace=False):
         self.clearScriptJobs()
@@ -526,8 +527,10 @@ class TempPivot(toolAbstractFactory):
             cmds.currentTime(frame)
             mainTarget = targets[0]
             constraints = list()
-            control = self.funcs.tempControl(name=mainTarget, suffix='Pivot', drawType='orb',
-                                             scale=pm.optionVar.get(self.crossSizeOption, 1))
+            control = self.funcs.tempControls([{'name': mainTarget,
+                                                'suffix': 'Pivot',
+                                                'drawType': 'orb',
+                                                'scale': pm.optionVar.get(self.crossSizeOption, 1)}])[0]
             constraintState, inputs, constraints = self.funcs.isConstrained(mainTarget)
 
             #controlParent = cmds.createNode('transform', name=mainTarget + '_Pivot_grp')
@@ -562,10 +565,6 @@ class TempPivot(toolAbstractFactory):
 
             pm.delete(pm.parentConstraint(loc, control))
 
-            mainConstraint = pm.parentConstraint(targets[-1], control, maintainOffset=True)
-            keyRangeStart = cmds.playbackOptions(query=True, min=True)
-            keyRangeEnd = cmds.playbackOptions(query=True, max=True)
-
             ps = pm.PyNode(targets[-1])
             ns = ps.namespace()
             if not cmds.objExists(ns + self.assetName):
@@ -580,42 +579,79 @@ class TempPivot(toolAbstractFactory):
                          force=True,
                          addNode=[control])
 
-            bakeTargets = list()
             targetParents = dict()
-            targetConstraints = dict()
 
             for t in targets:
                 grp = pm.createNode('transform', name=str(t) + '_tmpGrp')
                 pm.parent(grp, control)
                 targetParents[t] = grp
-                targetConstraints[t] = pm.parentConstraint(t, grp)
-                bakeTargets.append(grp)
 
                 pm.container(asset, edit=True,
                              includeHierarchyBelow=True,
                              force=True,
                              addNode=grp)
 
-            bakeTargets.append(control)
-
             if constraints:
                 pm.delete(constraints)
             keyRange = self.funcs.getBestTimelineRangeForBake()
-            pm.bakeResults(bakeTargets,
-                           time=(keyRange[0], keyRange[1]),
-                           simulation=False,
-                           sampleBy=1)
-            for c in bakeTargets:
-                cmds.filterCurve(str(c) + '.rotateX', str(c) + '.rotateY', str(c) + '.rotateZ',
-                                 filter='euler')
-            pm.delete(mainConstraint)
-            pm.delete(targetConstraints.values())
+            self.bakePivotTargets(targets, control, targetParents, keyRange)
             for t in targets:
                 pm.parentConstraint(targetParents[t], t)
             pm.select(control, replace=True)
 
             if deletePoint: pm.delete(loc)
 
+    @staticmethod
+    def getBakeFrames(keyRange):
+        return [keyRange[0] + x for x in range(int(keyRange[1] - keyRange[0]) + 1)]
+
+    @staticmethod
+    def sampleConstraintWorld(nodes, frames):
+        """
+        World matrices with scale removed at each node's rotate pivot, the frame a parent constraint
+        without offset puts back on the node
+        :return: dict of node: list of matrices
+        """
+        sampler = TransformSampler(nodes)
+        sampled = sampler.sample(frames)
+        return {node: [transformMath.pivotFrame(m, sampler.nodeData[node]['rotatePivot']) for m in matrices]
+                for node, matrices in sampled.items()}
+
+    @staticmethod
+    def getHoldOffset(node, target):
+        """
+        The current offset from target's pivot frame to node, as a maintainOffset parent constraint would keep it
+        """
+        sampler = TransformSampler([node, target])
+        current = sampler.sampleCurrent()
+        return transformMath.holdOffset(current[node],
+                                        transformMath.pivotFrame(current[target],
+                                                                 sampler.nodeData[target]['rotatePivot']))
+
+    def bakePivotTargets(self, targets, control, targetParents, keyRange):
+        """
+        Keys the pivot control to follow the last target, holding its current offset, and keys
+        each target's group under it with target * pivot inverse. Everything comes from
+        sampled world matrices, no constraints or bakeResults
+        :param targets:
+        :param control: pivot control
+        :param targetParents: dict of target: group under the pivot control
+        :param keyRange:
+        :return:
+        """
+        control = str(control)
+        frames = self.getBakeFrames(keyRange)
+        targetWorld = self.sampleConstraintWorld(targets, frames)
+        offset = self.getHoldOffset(control, targets[-1])
+        controlWorld = transformMath.followMatrices(offset, targetWorld[targets[-1]])
+
+        worldMatrices = {control: controlWorld}
+        parentMatrices = {control: TransformSampler([control]).sampleParentSpace(frames)[control]}
+        for t in targets:
+            worldMatrices[str(targetParents[t])] = targetWorld[t]
+            parentMatrices[str(targetParents[t])] = controlWorld
+        bakeWorldMatrices(worldMatrices, parentMatrices, frames)
+
     def createTempPivot(self, sel, worldspace=False):
         mainControl = sel[-1]
 
@@ -659,13 +695,10 @@ class TempPivot(toolAbstractFactory):
         self.createPersistentTempPivotScriptJob(sel, loc, frame, keyRange)
 
     def createPersistentTempPivotScriptJob(self, targets, loc, frame, keyRange):
-        self.scriptJobs.append(
-            pm.scriptJob(runOnce=True, event=['SelectionChanged',
-                                              partial(self.bakePersistentTempPivot, targets, loc, frame, keyRange)]))
-        self.scriptJobs.append(
-            pm.scriptJob(runOnce=True,
-                         event=['ToolChanged', partial(self.bakePersistentTempPivot, targets, loc, frame, keyRange)]))
-        # self.scriptJobs.append(pm.scriptJob(runOnce=True, timeChange=partial(self.bake, targets, loc, frame)))
+        EventDispatcher().subscribe(self.bakeSubscriberName,
+                                    partial(self.bakePersistentTempPivot, targets, loc, frame, keyRange),
+                                    events=self.bakeEvents,
+                                    once=True)
 
     def quickBakeTempPivotSelected(self, worldspace=False):
         sel = cmds.ls(sl=True, type='transform')
@@ -774,12 +807,13 @@ class TempPivot(toolAbstractFactory):
             self.funcs.getSetColour(mainTarget, tempNull, brightnessOffset=0.05)
             # self.funcs.boldControl(tempNull, mainTarget, offset=1.0)
 
-            control = self.funcs.tempControl(name=mainTarget, suffix='Pivot', drawType='orb',
-                                             scale=pm.optionVar.get(self.crossSizeOption, 1))
-            constraintState, inputs, constraints = self.funcs.isConstrained(mainTarget)
-
             controlParent = cmds.createNode('transform', name=mainTarget + '_Pivot_grp')
-            pm.parent(control, controlParent)
+            control = self.funcs.tempControls([{'name': mainTarget,
+                                                'suffix': 'Pivot',
+                                                'drawType': 'orb',
+                                                'scale': pm.optionVar.get(self.crossSizeOption, 1),
+                                                'parent': controlParent}])[0]
+            constraintState, inputs, constraints = self.funcs.isConstrained(mainTarget)
 
             if constraintState and constraints:
                 constrainTargets = self.funcs.getConstrainTargets(constraints[0])
@@ -794,10 +828,6 @@ class TempPivot(toolAbstractFactory):
             pm.delete(pm.parentConstraint(loc, tempNull))
             pm.parentConstraint(targets[-1], tempNull, maintainOffset=True)
 
-            mainConstraint = pm.parentConstraint(targets[-1], control, maintainOffset=True)
-            keyRangeStart = cmds.playbackOptions(query=True, min=True)
-            keyRangeEnd = cmds.playbackOptions(query=True, max=True)
-
             ps = pm.PyNode(targets[-1])
             ns = ps.namespace()
             if not cmds.objExists(ns + self.assetName):
@@ -826,36 +856,22 @@ class TempPivot(toolAbstractFactory):
                          force=True,
                          addNode=[tempNull])
 
-            bakeTargets = list()
             targetParents = dict()
-            targetConstraints = dict()
 
             for t in targets:
                 grp = pm.createNode('transform', name=str(t) + '_tmpGrp')
                 pm.parent(grp, control)
                 targetParents[t] = grp
-                targetConstraints[t] = pm.parentConstraint(t, grp)
-                bakeTargets.append(grp)
 
                 pm.container(asset, edit=True,
                              includeHierarchyBelow=True,
                              force=True,
                              addNode=grp)
 
-            bakeTargets.append(control)
-
             if constraints:
                 pm.delete(constraints)
             # keyRange = self.funcs.getBestTimelineRangeForBake()
-            pm.bakeResults(bakeTargets,
-                           time=(keyRange[0], keyRange[1]),
-                           simulation=False,
-                           sampleBy=1)
-            for c in bakeTargets:
-                cmds.filterCurve(str(c) + '.rotateX', str(c) + '.rotateY', str(c) + '.rotateZ',
-                                 filter='euler')
-            pm.delete(mainConstraint)
-            pm.delete(targetConstraints.values())
+            self.bakePivotTargets(targets, control, targetParents, keyRange)
             for t in targets:
                 pm.parentConstraint(targetParents[t], t)
             pm.select(control, replace=True)
@@ -983,12 +999,10 @@ class TempPivot(toolAbstractFactory):
         self.completedHierarchyScriptJob(sel, loc, frame)
 
     def completedHierarchyScriptJob(self, targets, loc, frame):
-        self.scriptJobs.append(
-            pm.scriptJob(runOnce=True,
-                         event=['SelectionChanged', partial(self.bakeTempHierarchy, targets, loc, frame)]))
-        self.scriptJobs.append(
-            pm.scriptJob(runOnce=True, event=['ToolChanged', partial(self.bakeTempHierarchy, targets, loc, frame)]))
-        # self.scriptJobs.append(pm.scriptJob(runOnce=True, timeChange=partial(self.bake, targets, loc, frame)))
+        EventDispatcher().subscribe(self.bakeSubscriberName,
+                                    partial(self.bakeTempHierarchy, targets, loc, frame),
+                                    events=self.bakeEvents,
+                                    once=True)
 
     def bakeTempHierarchy(self, targets, loc, frame):
         self.clearScriptJobs()
@@ -996,8 +1010,6 @@ class TempPivot(toolAbstractFactory):
         with self.funcs.undoChunk():
             cmds.currentTime(frame)
             mainTarget = targets[-1]
-            constraints = list()
-            tempControls = list()
             tempControlsGrps = list()
             targetParents = dict()
             targetConstraints = dict()
@@ -1009,8 +1021,15 @@ class TempPivot(toolAbstractFactory):
             asset = ns + self.assetName
 
             targetDict = dict()
-            mainControl = self.funcs.tempControl(name=mainTarget, suffix='PivotControl', drawType='orb',
-                                                 scale=pm.optionVar.get(self.crossSizeOption, 0.25))
+            # the main control and one per target in one batch
+            specs = [{'name': mainTarget,
+                      'suffix': 'PivotControl',
+                      'drawType': 'orb',
+                      'scale': pm.optionVar.get(self.crossSizeOption, 0.25)}]
+            specs.extend({'name': s, 'suffix': '_pivot', 'scale': 0.25} for s in targets)
+            createdControls = self.funcs.tempControls(specs)
+            mainControl = createdControls[0]
+            tempControls = createdControls[1:]
             pm.container(asset, edit=True,
                          includeHierarchyBelow=True,
                          force=True,
@@ -1018,11 +1037,7 @@ class TempPivot(toolAbstractFactory):
             pm.delete(pm.parentConstraint(loc, mainControl))
             pm.delete(loc)
 
-            for s in targets:
-                control = self.funcs.tempControl(name=s, suffix='_pivot', scale=0.25)
-                tempControls.append(control)
-                constraint = pm.parentConstraint(s, control)
-                constraints.append(constraint)
+            for s, control in zip(targets, tempControls):
                 pm.addAttr(control, ln=self.constraintTargetAttr, at='message')
                 pm.connectAttr(s + '.message', control + '.' + self.constraintTargetAttr)
 
@@ -1034,8 +1049,10 @@ class TempPivot(toolAbstractFactory):
             for index in range(len(tempControls) - 1):
                 pm.parent(tempControls[index], tempControls[index + 1])
 
-            constraints.append(pm.parentConstraint(targets[-1], mainControl, maintainOffset=True))
             pm.parent(tempControls[-1], mainControl)
+            # bake now so the pivot nulls below are placed from the baked pose
+            keyRange = self.funcs.getBestTimelineRangeForBake()
+            self.bakePivotHierarchy(targets, tempControls, mainControl, keyRange)
             tempControls.append(mainControl)
 
             for index, c in enumerate(tempControls):
@@ -1067,25 +1084,39 @@ class TempPivot(toolAbstractFactory):
                                                      worldUpType='objectrotation')
                     '''
 
-            keyRangeStart = cmds.playbackOptions(query=True, min=True)
-            keyRangeEnd = cmds.playbackOptions(query=True, max=True)
-            keyRange = self.funcs.getBestTimelineRangeForBake()
-            pm.bakeResults(tempControls,
-                           time=(keyRange[0], keyRange[1]),
-                           simulation=False,
-                           sampleBy=1)
-            for c in tempControls:
-                cmds.filterCurve(str(c) + '.rotateX', str(c) + '.rotateY', str(c) + '.rotateZ',
-                                 filter='euler')
             self.funcs.resumeSkinning()
 
-            pm.delete(constraints)
-
             for index, t in enumerate(targets):
                 self.funcs.safeParentConstraint(tempControlsGrps[index + 1], t, orientOnly=False, maintainOffset=True)
 
             pm.select(mainControl, replace=True)
 
+    def bakePivotHierarchy(self, targets, tempControls, mainControl, keyRange):
+        """
+        Keys a chain of temp controls, each parented to the next and the last to mainControl,
+        so each one follows its target and mainControl follows the last target with its current offset
+        :param targets:
+        :param tempControls: one per target, same order
+        :param mainControl:
+        :param keyRange:
+        :return:
+        """
+        mainControl = str(mainControl)
+        frames = self.getBakeFrames(keyRange)
+        targetWorld = self.sampleConstraintWorld(targets, frames)
+        offset = self.getHoldOffset(mainControl, targets[-1])
+        mainWorld = transformMath.followMatrices(offset, targetWorld[targets[-1]])
+
+        worldMatrices = {mainControl: mainWorld}
+        parentMatrices = {mainControl: TransformSampler([mainControl]).sampleParentSpace(frames)[mainControl]}
+        for index, t in enumerate(targets):
+            worldMatrices[str(tempControls[index])] = targetWorld[t]
+            if index + 1 < len(targets):
+                parentMatrices[str(tempControls[index])] = targetWorld[targets[index + 1]]
+            else:
+                parentMatrices[str(tempControls[index])] = mainWorld
+        bakeWorldMatrices(worldMatrices, parentMatrices, frames)
+
     def constrainAimToTarget(self, constrainedControl=str(), aimTarget=str(), upObject=str()):
         locatorPos = dt.Vector(pm.xform(aimTarget, query=True, worldSpace=True,
                                         # translation=True,
@@ -0,0 +1,422 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+import math
+
+'''
+Maya-free transform maths for the matrix based bakes.
+
+Matrices are flat 16 element sequences in maya's row major, row vector layout,
+translation in elements 12-14, so world = local * parent.
+Rotate orders use maya's rotateOrder enum, angles are in degrees.
+'''
+
+rotateOrders = {0: (0, 1, 2),  # xyz
+                1: (1, 2, 0),  # yzx
+                2: (2, 0, 1),  # zxy
+                3: (0, 2, 1),  # xzy
+                4: (1, 0, 2),  # yxz
+                5: (2, 1, 0),  # zyx
+                }
+
+identity = (1.0, 0.0, 0.0, 0.0,
+            0.0, 1.0, 0.0, 0.0,
+            0.0, 0.0, 1.0, 0.0,
+            0.0, 0.0, 0.0, 1.0)
+
+gimbalTolerance = 1.0e-9
+
+
+def multiply(a, b):
+    return [a[row * 4] * b[col] + a[row * 4 + 1] * b[4 + col] + a[row * 4 + 2] * b[8 + col] + a[row * 4 + 3] * b[
+        12 + col]
+            for row in range(4) for col in range(4)]
+
+
+def inverse(m):
+    """
+    Inverse of an affine matrix, last column is assumed to be 0, 0, 0, 1
+    :param m:
+    :return:
+    """
+    a, b, c = m[0], m[1], m[2]
+    d, e, f = m[4], m[5], m[6]
+    g, h, i = m[8], m[9], m[10]
+    co00 = e * i - f * h
+    co01 = f * g - d * i
+    co02 = d * h - e * g
+    det = a * co00 + b * co01 + c * co02
+    if abs(det) < 1.0e-12:
+        raise ValueError('Matrix is not invertible')
+    invDet = 1.0 / det
+    r00 = co00 * invDet
+    r01 = (c * h - b * i) * invDet
+    r02 = (b * f - c * e) * invDet
+    r10 = co01 * invDet
+    r11 = (a * i - c * g) * invDet
+    r12 = (c * d - a * f) * invDet
+    r20 = co02 * invDet
+    r21 = (b * g - a * h) * invDet
+    r22 = (a * e - b * d) * invDet
+    tx, ty, tz = m[12], m[13], m[14]
+    return [r00, r01, r02, 0.0,
+            r10, r11, r12, 0.0,
+            r20, r21, r22, 0.0,
+            -(tx * r00 + ty * r10 + tz * r20),
+            -(tx * r01 + ty * r11 + tz * r21),
+            -(tx * r02 + ty * r12 + tz * r22),
+            1.0]
+
+
+def removeScale(m):
+    """
+    Matrix with the scale taken out of the rotation rows, which is what a parent constraint follows
+    :param m:
+    :return:
+    """
+    result = list(m)
+    sign = -1.0 if determinant3(m) < 0 else 1.0
+    for row in range(3):
+        length = math.sqrt(sum(m[row * 4 + col] * m[row * 4 + col] for col in range(3)))
+        if not length:
+            continue
+        if not row:
+            length *= sign
+        for col in range(3):
+            result[row * 4 + col] = m[row * 4 + col] / length
+    return result
+
+
+def holdOffset(node, target):
+    """
+    Offset from target to node with scale removed, what a maintainOffset parent constraint keeps
+    :param node: flat world matrix
+    :param target: flat world matrix
+    :return:
+    """
+    return multiply(removeScale(node), inverse(removeScale(target)))
+
+
+def followMatrices(offset, matrices):
+    """
+    World matrices of a node holding offset to a moving target
+    :param offset: from holdOffset
+    :param matrices: target world matrices, scale removed
+    :return:
+    """
+    return [multiply(offset, m) for m in matrices]
+
+
+def pivotFrame(m, rotatePivot=(0.0, 0.0, 0.0)):
+    """
+    The frame a parent constraint lines a node up with, scale removed and moved to the world
+    rotate pivot. rotatePivotTranslate is already part of the matrix's translation
+    :param m: world matrix
+    :param rotatePivot: local rotate pivot
+    :return:
+    """
+    result = removeScale(m)
+    result[12:15] = transformPoint(rotatePivot, m)
+    return result
+
+
+def transformPoint(point, m):
+    """
+    :param point: x, y, z
+    :param m: flat 16 element matrix
+    :return: the point moved by the matrix
+    """
+    return [point[0] * m[col] + point[1] * m[4 + col] + point[2] * m[8 + col] + m[12 + col] for col in range(3)]
+
+
+def matchRotation(m, source):
+    """
+    Matrix keeping the scale and translation of m with the rotation of source
+    :param m:
+    :param source:
+    :return:
+    """
+    result = list(m)
+    rotation = removeScale(source)
+    for row in range(3):
+        length = math.sqrt(sum(m[row * 4 + col] * m[row * 4 + col] for col in range(3)))
+        for col in range(3):
+            result[row * 4 + col] = rotation[row * 4 + col] * length
+    return result
+
+
+def matchPivot(m, pivot, worldPivot):
+    """
+    Move a matrix so its local pivot point sits at worldPivot, how xform snaps a rotate pivot
+    :param m:
+    :param pivot: local rotate pivot
+    :param worldPivot: world position to put it at
+    :return:
+    """
+    result = list(m)
+    current = transformPoint(pivot, m)
+    for col in range(3):
+        result[12 + col] += worldPivot[col] - current[col]
+    return result
+
+
+def snapMatrix(m, target, pivot, targetPivot, translate=True, orient=True):
+    """
+    Where m goes when it is snapped to target, the same as an xform snap of the rotate pivot
+    :param m: world matrix of the node being snapped
+    :param target: world matrix of the node to snap to
+    :param pivot: local rotate pivot of the node being snapped
+    :param targetPivot: local rotate pivot of the target
+    :param translate: move the pivot onto the target's pivot
+    :param orient: take the target's rotation
+    :return:
+    """
+    if translate:
+        worldPivot = transformPoint(targetPivot, target)
+    else:
+        worldPivot = transformPoint(pivot, m)
+    if orient:
+        m = matchRotation(m, target)
+    return matchPivot(m, pivot, worldPivot)
+
+
+def determinant3(m):
+    return (m[0] * (m[5] * m[10] - m[6] * m[9])
+            - m[1] * (m[4] * m[10] - m[6] * m[8])
+            + m[2] * (m[4] * m[9] - m[5] * m[8]))
+
+
+def axisRotation(axis, angle):
+    """
+    Row vector rotation matrix around a single axis
+    :param axis: 0, 1, 2 for x, y, z
+    :param angle: radians
+    :return: 3x3 as nested lists
+    """
+    c = math.cos(angle)
+    s = math.sin(angle)
+    if axis == 0:
+        return [[1.0, 0.0, 0.0], [0.0, c, s], [0.0, -s, c]]
+    if axis == 1:
+        return [[c, 0.0, -s], [0.0, 1.0, 0.0], [s, 0.0, c]]
+    return [[c, s, 0.0], [-s, c, 0.0], [0.0, 0.0, 1.0]]
+
+
+def multiply3(a, b):
+    return [[sum(a[row][k] * b[k][col] for k in range(3)) for col in range(3)] for row in range(3)]
+
+
+def transpose3(a):
+    return [[a[col][row] for col in range(3)] for row in range(3)]
+
+
+def eulerToMatrix3(rotation, rotateOrder=0):
+    """
+    :param rotation: x, y, z in degrees
+    :param rotateOrder: maya rotate order enum
+    :return: 3x3 row vector rotation
+    """
+    first, second, third = rotateOrders[rotateOrder]
+    result = axisRotation(first, math.radians(rotation[first]))
+    result = multiply3(result, axisRotation(second, math.radians(rotation[second])))
+    return multiply3(result, axisRotation(third, math.radians(rotation[third])))
+
+
+def matrix3ToEuler(r, rotateOrder=0):
+    """
+    Extract the euler angles for a rotate order from a row vector rotation
+    :param r: 3x3 rotation
+    :param rotateOrder: maya rotate order enum
+    :return: x, y, z in degrees
+    """
+    i, j, k = rotateOrders[rotateOrder]
+    parity = 1.0 if (j - i) % 3 == 1 else -1.0
+    # work on the column vector form, where the first axis is applied on the right
+    c = transpose3(r)
+    sinB = max(-1.0, min(1.0, -parity * c[k][i]))
+    cosB = math.sqrt(c[i][i] * c[i][i] + parity * parity * c[j][i] * c[j][i])
+    angles = [0.0, 0.0, 0.0]
+    if cosB > gimbalTolerance:
+        angles[i] = math.atan2(parity * c[k][j], c[k][k])
+        angles[j] = math.asin(sinB)
+        angles[k] = math.atan2(parity * c[j][i], c[i][i])
+    else:
+        angles[i] = math.atan2(-parity * c[j][k], c[j][j])
+        angles[j] = math.asin(sinB)
+        angles[k] = 0.0
+    return [math.degrees(x) for x in angles]
+
+
+def composeMatrix(translate=(0.0, 0.0, 0.0), rotate=(0.0, 0.0, 0.0), scale=(1.0, 1.0, 1.0), rotateOrder=0,
+                  rotateAxis=(0.0, 0.0, 0.0), jointOrient=(0.0, 0.0, 0.0)):
+    """
+    Local matrix of a transform, S * RA * R * JO * T, ignoring pivots and shear
+    :return: flat 16 element matrix
+    """
+    rot = multiply3(eulerToMatrix3(rotateAxis, 0), eulerToMatrix3(rotate, rotateOrder))
+    rot = multiply3(rot, eulerToMatrix3(jointOrient, 0))
+    result = list()
+    for row in range(3):
+        result.extend([rot[row][col] * scale[row] for col in range(3)])
+        result.append(0.0)
+    result.extend([translate[0], translate[1], translate[2], 1.0])
+    return result
+
+
+def decomposeMatrix(m, rotateOrder=0, rotateAxis=(0.0, 0.0, 0.0), jointOrient=(0.0, 0.0, 0.0),
+                    rotatePivot=(0.0, 0.0, 0.0), rotatePivotTranslate=(0.0, 0.0, 0.0),
+                    scalePivot=(0.0, 0.0, 0.0), scalePivotTranslate=(0.0, 0.0, 0.0)):
+    """
+    Split a local matrix back into the translate, rotate and scale channel values
+    of a transform with the given rotate order, rotate axis, joint orient and pivots
+    :param m: flat 16 element local matrix
+    :return: translate, rotate (degrees), scale
+    """
+    rows = [[m[0], m[1], m[2]], [m[4], m[5], m[6]], [m[8], m[9], m[10]]]
+    scale = [math.sqrt(sum(x * x for x in row)) for row in rows]
+    if determinant3(m) < 0:
+        scale[0] *= -1
+    rot = [[value / scale[index] if scale[index] else 0.0 for value in row] for index, row in enumerate(rows)]
+    # strip rotate axis off the front and joint orient off the back
+    rot = multiply3(transpose3(eulerToMatrix3(rotateAxis, 0)), rot)
+    rot = multiply3(rot, transpose3(eulerToMatrix3(jointOrient, 0)))
+    rotate = matrix3ToEuler(rot, rotateOrder)
+
+    # translation left over once the pivot offsets are taken out
+    fullRot = multiply3(eulerToMatrix3(rotateAxis, 0), eulerToMatrix3(rotate, rotateOrder))
+    fullRot = multiply3(fullRot, eulerToMatrix3(jointOrient, 0))
+    offset = [-scalePivot[x] * scale[x] + scalePivot[x] + scalePivotTranslate[x] - rotatePivot[x] for x in range(3)]
+    offset = [sum(offset[k] * fullRot[k][col] for k in range(3)) + rotatePivot[col] + rotatePivotTranslate[col]
+              for col in range(3)]
+    translate = [m[12] - offset[0], m[13] - offset[1], m[14] - offset[2]]
+    return translate, rotate, scale
+
+
+def wrapAngle(angle, reference):
+    return angle + 360.0 * round((reference - angle) / 360.0)
+
+
+def closestEuler(rotation, previous, rotateOrder=0):
+    """
+    The equivalent euler rotation closest to the previous one, used to unwrap baked rotations
+    :param rotation: x, y, z degrees
+    :param previous: x, y, z degrees
+    :param rotateOrder:
+    :return:
+    """
+    i, j, k = rotateOrders[rotateOrder]
+    rotation = gimbalEuler(rotation, previous, rotateOrder)
+    flipped = list(rotation)
+    flipped[i] += 180.0
+    flipped[j] = 180.0 - flipped[j]
+    flipped[k] += 180.0
+    best = None
+    bestDistance = None
+    for candidate in (rotation, flipped):
+        wrapped = [wrapAngle(candidate[x], previous[x]) for x in range(3)]
+        distance = sum(abs(wrapped[x] - previous[x]) for x in range(3))
+        if best is None or distance < bestDistance - 1.0e-9:
+            best = wrapped
+            bestDistance = distance
+    return best
+
+
+def gimbalEuler(rotation, previous, rotateOrder=0):
+    """
+    In gimbal lock only the sum or difference of the first and last angles matters,
+    matrix3ToEuler puts it all on the first axis. Move it back so the last angle
+    carries on from the previous frame
+    :param rotation: x, y, z degrees
+    :param previous: x, y, z degrees
+    :param rotateOrder:
+    :return:
+    """
+    i, j, k = rotateOrders[rotateOrder]
+    if abs(math.cos(math.radians(rotation[j]))) > 1.0e-6:
+        return rotation
+    target = eulerToMatrix3(rotation, rotateOrder)
+    delta = previous[k] - rotation[k]
+    for sign in (1.0, -1.0):
+        candidate = list(rotation)
+        candidate[k] = previous[k]
+        candidate[i] = rotation[i] + sign * delta
+        matrix = eulerToMatrix3(candidate, rotateOrder)
+        if max(abs(matrix[row][col] - target[row][col]) for row in range(3) for col in range(3)) < 1.0e-6:
+            return candidate
+    return rotation
+
+
+def unwrapEulers(rotations, rotateOrder=0):
+    """
+    Euler filter a list of rotations so each frame is closest to the last
+    :param rotations: list of x, y, z degrees
+    :param rotateOrder:
+    :return:
+    """
+    result = list()
+    previous = None
+    for rotation in rotations:
+        if previous is None:
+            previous = list(rotation)
+        else:
+            previous = closestEuler(rotation, previous, rotateOrder)
+        result.append(previous)
+    return result
+
+
+def localMatrices(worldMatrices, parentMatrices):
+    """
+    Per frame local matrix that keeps the world pose under a new parent space
+    :param worldMatrices: list of world matrices
+    :param parentMatrices: list of parent space matrices, parentMatrix * offsetParentMatrix
+    :return:
+    """
+    return [multiply(world, inverse(parent)) for world, parent in zip(worldMatrices, parentMatrices)]
+
+
+def decomposeMatrices(matrices, rotateOrder=0, unwrap=True, **kwargs):
+    """
+    Decompose a list of local matrices into per channel value lists
+    :param matrices:
+    :param rotateOrder:
+    :param unwrap: euler filter the rotations
+    :param kwargs: rotateAxis, jointOrient and pivot values passed to decomposeMatrix
+    :return: dict of channel: list of values
+    """
+    translates = list()
+    rotates = list()
+    scales = list()
+    for matrix in matrices:
+        translate, rotate, scale = decomposeMatrix(matrix, rotateOrder=rotateOrder, **kwargs)
+        translates.append(translate)
+        rotates.append(rotate)
+        scales.append(scale)
+    if unwrap:
+        rotates = unwrapEulers(rotates, rotateOrder)
+    channels = dict()
+    for index, axis in enumerate('XYZ'):
+        channels['translate' + axis] = [x[index] for x in translates]
+        channels['rotate' + axis] = [x[index] for x in rotates]
+        channels['scale' + axis] = [x[index] for x in scales]
+    return channels
@@ -104,6 +104,13 @@ class Utility(toolAbstractFactory):
         resetButton = QPushButton('Reset appData location to default')
         resetButton.clicked.connect(self.revertAppData)
 
+        backendWidget = radioGroupWidget(optionVarList=dataStore.backendNames,
+                                         optionVar=self.dataBackendOption,
+                                         defaultValue=dataStore.defaultBackend, label='appData storage')
+
+        migrateButton = QPushButton('Migrate appData json files to single file store')
+        migrateButton.clicked.connect(self.migrateAppData)
+
         useCustomScaleOption = optionVarBoolWidget('Use custom window scale',
                                                    'tbUseWindowsScale')
 
@@ -121,6 +128,8 @@ class Utility(toolAbstractFactory):
         self.layout.addWidget(copyButton)
         self.layout.addWidget(resetButton)
         self.layout.addWidget(self.dirWidget)
+        self.layout.addWidget(backendWidget)
+        self.layout.addWidget(migrateButton)
         self.layout.addWidget(useCustomScaleOption)
         self.layout.addWidget(uiScaleOption)
         self.layout.addWidget(useCustomFontScaleOption)
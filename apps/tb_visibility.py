@@ -0,0 +1,126 @@
+'''TB Animation Tools is a toolset for animators
+
+*******************************************************************************
+    License and Copyright
+    Copyright 2020-Tom Bailey
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Lesser General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+    send issues/ requests to brimblashman@gmail.com
+    visit https://tbanimtools.blogspot.com/ for "stuff"
+
+
+*******************************************************************************
+'''
+try:
+    import maya.cmds as cmds
+    import maya.api.OpenMaya as om2
+except ImportError:
+    cmds = None
+    om2 = None
+
+
+def getParentPath(path):
+    if '|' not in path:
+        return None
+    parent = path.rsplit('|', 1)[0]
+    return parent or None
+
+
+def getAncestorPaths(paths):
+    """
+    Every path plus all of their ancestors, parents listed before children
+    :param paths: full dag paths
+    :return:
+    """
+    allPaths = set()
+    for path in paths:
+        while path and path not in allPaths:
+            allPaths.add(path)
+            path = getParentPath(path)
+    return sorted(allPaths, key=lambda x: x.count('|'))
+
+
+class VisibilityResolver(object):
+    """
+    Works out effective visibility for dag paths from per node visibility
+    values that were fetched in bulk. A node is visible when it isn't hidden
+    itself, by its draw override or by a hidden layer and its parent is visible,
+    each path is only resolved once
+    """
+
+    def __init__(self, visibility, hiddenByLayer=None, overrides=None):
+        """
+        :param visibility: dict of full path: bool for the nodes and their ancestors
+        :param hiddenByLayer: set of paths in a hidden display layer
+        :param overrides: dict of full path: overrideVisibility for paths with overrideEnabled on,
+        display layers drive these through drawOverride
+        """
+        self.visibility = visibility
+        self.hiddenByLayer = hiddenByLayer or set()
+        self.overrides = overrides or dict()
+        self.resolved = dict()
+
+    def isLocallyVisible(self, path):
+        if path in self.hiddenByLayer:
+            return False
+        if not self.overrides.get(path, True):
+            return False
+        return self.visibility.get(path, True)
+
+    def isVisible(self, path):
+        # walk up until we hit a resolved path, then resolve back down
+        chain = list()
+        while path and path not in self.resolved:
+            chain.append(path)
+            path = getParentPath(path)
+        visible = self.resolved[path] if path else True
+        for path in reversed(chain):
+            visible = visible and self.isLocallyVisible(path)
+            self.resolved[path] = visible
+        return self.resolved[chain[0]] if chain else visible
+
+
+def getHiddenByLayer():
+    """
+    One membership query per hidden display layer rather than per node
+    :return: set of full paths
+    """
+    hidden = set()
+    for layer in cmds.ls(type='displayLayer') or list():
+        if cmds.getAttr(layer + '.visibility'):
+            continue
+        members = cmds.editDisplayLayerMembers(layer, query=True, fullNames=True) or list()
+        hidden.update(cmds.ls(members, long=True) or list())
+    return hidden
+
+
+def getVisibilityResolver(paths):
+    """
+    Read visibility, draw overrides and hidden display layers for the paths and all their
+    ancestors in one pass, shared ancestors are only read once
+    :param paths: full dag paths
+    :return: VisibilityResolver
+    """
+    visibility = dict()
+    overrides = dict()
+    allPaths = getAncestorPaths(paths)
+    selectionList = om2.MSelectionList()
+    for path in allPaths:
+        selectionList.add(path)
+    for index, path in enumerate(allPaths):
+        mfnDag = om2.MFnDagNode(selectionList.getDependNode(index))
+        visibility[path] = mfnDag.findPlug('visibility', False).asBool()
+        if mfnDag.findPlug('overrideEnabled', False).asBool():
+            overrides[path] = mfnDag.findPlug('overrideVisibility', False).asBool()
+    return VisibilityResolver(visibility, getHiddenByLayer(), overrides)
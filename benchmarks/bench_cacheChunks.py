@@ -0,0 +1,39 @@
+'''
+Block hashes for 5000 synthetic auto tangent curves over a 2000 frame shot, then
+one key edited on one curve to show how many blocks a chunked export would redo
+
+    python benchmarks/bench_cacheChunks.py
+'''
+import os
+import sys
+from timeit import default_timer
+
+rootPath = os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, rootPath)
+sys.path.insert(0, os.path.join(rootPath, 'tests'))
+
+from apps.tb_cacheChunks import getBlocks, hashBlocks
+from test_cacheChunks import makeCurve, withTangents, editKey
+
+
+def main(curveCount=5000, frames=2000, keyStep=4, blockSize=100):
+    curves = dict(('curve%d' % index, withTangents(*makeCurve(index, end=frames, step=keyStep)))
+                  for index in range(curveCount))
+    blocks = getBlocks(0, frames, blockSize)
+    keyCount = sum(len(curve[0]) for curve in curves.values())
+
+    start = default_timer()
+    hashes = hashBlocks(curves, blocks)
+    elapsed = default_timer() - start
+    print('%d curves, %d keys, %d blocks: %.3fs' % (curveCount, keyCount, len(blocks), elapsed))
+
+    edited = editKey(curves, 'curve%d' % (curveCount // 2), frames // 2 + keyStep, 100.0)
+    start = default_timer()
+    editedHashes = hashBlocks(edited, blocks)
+    elapsed = default_timer() - start
+    dirty = sum(1 for a, b in zip(hashes, editedHashes) if a != b)
+    print('after one key edit: %d of %d blocks dirty, %.3fs' % (dirty, len(blocks), elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+'''
+Close match latency on a synthetic 5000 name rig, ControlNameIndex against difflib
+
+    python benchmarks/bench_controlNameIndex.py
+'''
+import os
+import sys
+import random
+from difflib import get_close_matches
+from timeit import default_timer
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir, 'tests')))
+
+from apps.tb_controlNameIndex import ControlNameIndex
+from test_controlNameIndex import syntheticRig
+
+
+def main(queryCount=200):
+    names = syntheticRig()
+    generator = random.Random(1)
+    queries = [name.replace('l_', 'r_', 1) for name in generator.sample(names, queryCount)]
+
+    start = default_timer()
+    index = ControlNameIndex(names)
+    buildTime = default_timer() - start
+
+    start = default_timer()
+    for word in queries:
+        get_close_matches(word, names)
+    difflibTime = (default_timer() - start) / queryCount
+
+    start = default_timer()
+    for word in queries:
+        index.closeMatches(word)
+    indexTime = (default_timer() - start) / queryCount
+
+    start = default_timer()
+    for word in queries:
+        index.closeMatches(word)
+    cachedTime = (default_timer() - start) / queryCount
+
+    print('%d names, index built in %.3fs' % (len(names), buildTime))
+    print('difflib: %.3fms per query' % (difflibTime * 1000))
+    print('index:   %.3fms per query (%.1fx)' % (indexTime * 1000, difflibTime / indexTime))
+    print('cached:  %.4fms per query' % (cachedTime * 1000))
+
+
+if __name__ == '__main__':
+    main()
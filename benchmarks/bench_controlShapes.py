@@ -0,0 +1,84 @@
+'''
+Building the points for 1000 temp control shapes from appData/controlShapes.json.
+
+The old path kept the parsed json and rebuilt each control's points from it,
+swapping y and z and scaling per control. The library is timed cold from the
+json, cold from the sidecar and warm from its LRU cache, and the cold loads are
+timed against a plain json parse
+
+    python benchmarks/bench_controlShapes.py
+'''
+import os
+import sys
+import json
+import shutil
+import tempfile
+from timeit import default_timer
+
+rootPath = os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, rootPath)
+
+from apps.tb_controlShapes import ControlShapeLibrary, dataPath, defaultShape
+
+controlCount = 1000
+scales = [1.0, 0.5, 2.0, 10.0]
+
+
+def makeRequests(shapeNames):
+    return [(shapeNames[index % len(shapeNames)], scales[index % len(scales)], 'z' if index % 2 else 'y')
+            for index in range(controlCount)]
+
+
+def jsonPoints(pointLists, requests):
+    for shape, scale, axis in requests:
+        points = pointLists.get(shape, pointLists[defaultShape])
+        if axis == 'z':
+            points = [[p[0], p[2], p[1]] for p in points]
+        [tuple(float(x) * scale for x in p) for p in points]
+
+
+def libraryPoints(library, requests):
+    for shape, scale, axis in requests:
+        library.getPoints(shape, scale=scale, axis=axis)
+
+
+def timeIt(function, *args):
+    start = default_timer()
+    function(*args)
+    return default_timer() - start
+
+
+def main():
+    folder = tempfile.mkdtemp()
+    try:
+        path = os.path.join(folder, 'controlShapes.json')
+        shutil.copy(dataPath, path)
+
+        start = default_timer()
+        with open(path) as f:
+            pointLists = json.load(f)['pointLists']
+        jsonLoad = default_timer() - start
+        requests = makeRequests(sorted(pointLists.keys()))
+        perControl = timeIt(jsonPoints, pointLists, requests)
+
+        fromJson = ControlShapeLibrary(path, sidecarFolder=folder)
+        coldJson = timeIt(libraryPoints, fromJson, requests)
+        fromSidecar = ControlShapeLibrary(path, sidecarFolder=folder)
+        sidecarLoad = timeIt(fromSidecar.load)
+        coldSidecar = sidecarLoad + timeIt(libraryPoints, fromSidecar, requests)
+        coldHits = fromSidecar.hits
+        warm = timeIt(libraryPoints, fromSidecar, requests)
+
+        print('%d controls, %d shapes, %d distinct requests' % (controlCount, len(pointLists), len(set(requests))))
+        print('json parse                 %8.2f ms' % (jsonLoad * 1000))
+        print('sidecar load               %8.2f ms' % (sidecarLoad * 1000))
+        print('per control from json      %8.2f ms' % (perControl * 1000))
+        print('library, cold from json    %8.2f ms  (%d misses)' % (coldJson * 1000, fromJson.misses))
+        print('library, cold from sidecar %8.2f ms' % (coldSidecar * 1000))
+        print('library, warm              %8.2f ms  (%d hits)' % (warm * 1000, fromSidecar.hits - coldHits))
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+'''
+Throughput of the stepped space key redundancy pass on synthetic curves
+
+    python benchmarks/bench_curveEdit.py
+'''
+import os
+import sys
+import random
+from timeit import default_timer
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from apps.tb_curveEdit import redundantKeyIndexes
+
+
+def main(curveCount=1000, keyCount=2000):
+    generator = random.Random(0)
+    curves = list()
+    for x in range(curveCount):
+        values = list()
+        value = 0.0
+        for y in range(keyCount):
+            if generator.random() < 0.1:
+                value = float(generator.randint(0, 3))
+            values.append(value)
+        curves.append(values)
+
+    start = default_timer()
+    removed = sum(len(redundantKeyIndexes(values)) for values in curves)
+    elapsed = default_timer() - start
+    print('%d curves x %d keys: %.3fs, %.1fM keys/s, %d redundant' % (
+        curveCount, keyCount, elapsed, curveCount * keyCount / elapsed / 1.0e6, removed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+'''
+Load, save and lookup times for 1000 rig files with the JSON and SQLite stores,
+plus migrating the JSON tree into SQLite
+
+    python benchmarks/bench_dataStore.py
+'''
+import os
+import sys
+import random
+import shutil
+import tempfile
+from timeit import default_timer
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+import apps.tb_dataStore as dataStore
+
+tools = ['Pickwalk', 'SpaceSwitch', 'MirrorTools', 'TempPivot']
+
+
+def rigData(generator, controlCount=150):
+    controls = ['ctrl_%03d' % x for x in range(controlCount)]
+    return {'controls': {control: {'up': generator.choice(controls),
+                                   'down': generator.choice(controls),
+                                   'attributes': {'translateX': -1, 'rotateY': 1}} for control in controls},
+            'spaces': {control: ['world', 'root', 'chest'] for control in controls[:30]},
+            'version': 2}
+
+
+def timeStore(store, root, rigs, lookups):
+    start = default_timer()
+    for filePath, data in rigs.items():
+        store.save(filePath, data)
+    saveTime = default_timer() - start
+
+    start = default_timer()
+    for filePath in rigs:
+        store.load(filePath)
+    loadTime = default_timer() - start
+
+    start = default_timer()
+    for filePath in lookups:
+        store.load(filePath)['controls']['ctrl_010']['up']
+    lookupTime = default_timer() - start
+    return saveTime, loadTime, lookupTime
+
+
+def main(rigCount=1000, lookupCount=1000):
+    generator = random.Random(0)
+    root = tempfile.mkdtemp()
+    try:
+        rigs = dict()
+        for tool in tools:
+            os.mkdir(os.path.join(root, tool))
+        for index in range(rigCount):
+            rigs[os.path.join(root, tools[index % len(tools)], 'rig%04d.json' % index)] = rigData(generator)
+        lookups = [generator.choice(list(rigs.keys())) for x in range(lookupCount)]
+
+        jsonStore = dataStore.JsonStore(root)
+        results = {dataStore.backendJson: timeStore(jsonStore, root, rigs, lookups)}
+
+        sqliteStore = dataStore.SqliteStore(root)
+        start = default_timer()
+        migrated, failed = dataStore.migrateJsonTree(root, sqliteStore)
+        migrateTime = default_timer() - start
+        results[dataStore.backendSqlite] = timeStore(sqliteStore, root, rigs, lookups)
+        sqliteStore.close()
+
+        for name, (saveTime, loadTime, lookupTime) in results.items():
+            print('%s: save %d rigs %.2fs, load %.2fs, %d lookups %.2fs' % (
+                name, rigCount, saveTime, loadTime, lookupCount, lookupTime))
+        print('migrated %d files in %.2fs' % (len(migrated), migrateTime))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+'''
+Curve filter pool scaling on synthetic curves at 1, 2, 4 and 8 workers
+
+    python benchmarks/bench_filterPool.py
+'''
+import os
+import sys
+import math
+import multiprocessing
+from timeit import default_timer
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from apps.tb_filterPool import CurveFilterPool
+
+
+def main(curveCount=2000, frameCount=1000):
+    curves = {'curve%d' % index: [math.sin(x * 0.05 + index) * 10.0 for x in range(frameCount)]
+              for index in range(curveCount)}
+    print('%d curves x %d frames, %d cores' % (curveCount, frameCount, multiprocessing.cpu_count()))
+    baseline = None
+    for workers in [1, 2, 4, 8]:
+        pool = CurveFilterPool(workers=workers, threshold=0)
+        if workers > 1:
+            # start the pool outside the timing
+            pool.getPool()
+        start = default_timer()
+        pool.filterCurves('gauss', curves, 2.0)
+        elapsed = default_timer() - start
+        baseline = baseline or elapsed
+        print('%d workers: %.3fs (%.2fx)' % (workers, elapsed, baseline / elapsed))
+    CurveFilterPool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+'''
+DagHierarchy ordering against the old pairwise parent list sort, on the same
+synthetic paths (the old code compared getAllParents lists, rebuilt here from paths)
+
+    python benchmarks/bench_hierarchy.py
+'''
+import os
+import sys
+import random
+from timeit import default_timer
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir, 'tests')))
+
+from apps.tb_hierarchy import DagHierarchy
+from test_hierarchy import syntheticHierarchy, ancestors
+
+
+def legacySortByParents(selection):
+    parentDict = {x: ancestors(x) for x in selection}
+    mostParentKeys = sorted(parentDict, key=lambda k: len(parentDict[k]), reverse=True)
+    leastParentKeys = sorted(parentDict, key=lambda k: len(parentDict[k]))
+
+    returnedList = [x for x in selection]
+    for key in leastParentKeys:
+        found = False
+        for p in mostParentKeys:
+            if found:
+                continue
+            if p not in parentDict[key]:
+                continue
+            if p in selection:
+                found = True
+                returnedList.insert(returnedList.index(p) + 1, returnedList.pop(returnedList.index(key)))
+            if not found:
+                returnedList.insert(0, returnedList.pop(returnedList.index(key)))
+    return returnedList
+
+
+def main():
+    for count in [100, 1000, 3000, 10000]:
+        paths = syntheticHierarchy(count)
+        selection = random.Random(count).sample(paths, count // 2)
+
+        start = default_timer()
+        DagHierarchy(selection).sortByParents()
+        DagHierarchy(selection).getChains()
+        newTime = default_timer() - start
+
+        if count <= 3000:
+            start = default_timer()
+            legacySortByParents(selection)
+            legacyTime = '%.4fs' % (default_timer() - start)
+        else:
+            legacyTime = 'skipped'
+        print('%5d nodes: DagHierarchy %.4fs, pairwise sort %s' % (count, newTime, legacyTime))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+'''
+Trajectory analysis for 100 controls over 5000 frames, a mix of straight,
+strafing, circling and stepping trajectories
+
+    python benchmarks/bench_locomotionAnalysis.py
+'''
+import os
+import sys
+from timeit import default_timer
+
+rootPath = os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, rootPath)
+sys.path.insert(0, os.path.join(rootPath, 'tests'))
+
+from apps.tb_locomotionAnalysis import analyseTrajectories
+from test_locomotionAnalysis import straight, strafe, circle, steps
+
+
+def main(controlCount=100, frameCount=5000):
+    frames = list(range(frameCount))
+    makers = [straight, strafe, circle, steps]
+    trajectories = dict(('control%d' % index, makers[index % len(makers)](frames)) for index in range(controlCount))
+
+    start = default_timer()
+    result = analyseTrajectories(trajectories, frames, fps=24.0)
+    elapsed = default_timer() - start
+    print('analysis: %d controls x %d frames, %.2fs' % (controlCount, frameCount, elapsed))
+
+    start = default_timer()
+    strideCount = sum(len(analysis.strides) for analysis in result.values())
+    print('strides: %d found, %.2fs' % (strideCount, default_timer() - start))
+
+
+if __name__ == '__main__':
+    main()
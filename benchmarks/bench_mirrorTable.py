@@ -0,0 +1,72 @@
+'''
+Resolving 1000 controls through the compiled mirror table against name swapping
+
+    python benchmarks/bench_mirrorTable.py
+'''
+import os
+import sys
+from timeit import default_timer
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from apps.tb_mirrorTable import MirrorPairTable, getMirrorControl
+
+
+class Character(object):
+    def __init__(self, controls):
+        self.controls = controls
+        self.leftSide = '*_L'
+        self.rightSide = '*_R'
+        self.mirrorAxis = 'YZ'
+
+    def getSide(self, side):
+        return {'left': self.leftSide, 'right': self.rightSide}[side]
+
+
+class MirrorData(object):
+    def __init__(self, controls):
+        self.controls = {control: {'translateX': -1, 'rotateY': -1, 'rotateZ': -1} for control in controls}
+        self.oppositeControls = dict()
+
+    def json_serialize(self):
+        return {'controls': self.controls, 'oppositeControls': self.oppositeControls}
+
+
+def main(controlCount=1000, repeats=20):
+    controls = ['char:part%d_ctrl_%s' % (index // 2, 'LR'[index % 2]) for index in range(controlCount)]
+    stripped = [control.split(':')[-1] for control in controls]
+    character = Character(stripped)
+    mirrorData = MirrorData(stripped)
+
+    start = default_timer()
+    for x in range(repeats):
+        for control in controls:
+            getMirrorControl(control, '*_L', '*_R')
+            mirrorData.controls.get(control.split(':')[-1], None)
+    swapTime = (default_timer() - start) / repeats
+
+    start = default_timer()
+    table = MirrorPairTable().compile(character, mirrorData)
+    compileTime = default_timer() - start
+
+    start = default_timer()
+    for x in range(repeats):
+        table.isCurrent(character, mirrorData, checkHash=True)
+    hashTime = (default_timer() - start) / repeats
+
+    start = default_timer()
+    for x in range(repeats):
+        for control in controls:
+            table.getOpposite(control)
+            table.getSigns(control)
+    tableTime = (default_timer() - start) / repeats
+
+    print('%d controls' % controlCount)
+    print('name swapping:  %.5fs' % swapTime)
+    print('compile table:  %.5fs (once per rig)' % compileTime)
+    print('compiled table: %.5fs (%.1fx)' % (tableTime, swapTime / tableTime))
+    print('hash check:     %.5fs (once per mirror operation)' % hashTime)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+'''
+Temp pivot bake of 50 targets over 1000 frames in a mock scene.
+
+The constraint bake steps the timeline, evaluates every target, the pivot
+constraint and each group's constraint per frame, decomposes per frame and then
+euler filters every rotate curve. The analytic bake reads each target once per
+frame through a context and decomposes the pivot space matrices with the unwrap
+built in. Both are timed and the scene evaluations each one needs are counted
+
+    python benchmarks/bench_pivotBake.py
+'''
+import os
+import sys
+import random
+from timeit import default_timer
+
+rootPath = os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, rootPath)
+sys.path.insert(0, os.path.join(rootPath, 'tests'))
+
+import apps.tb_transformMath as transformMath
+from test_pivotBake import animatedTarget
+
+
+class MockScene(object):
+    def __init__(self, targetCount, frames, seed=0):
+        generator = random.Random(seed)
+        self.targets = [animatedTarget(generator, frames) for x in range(targetCount)]
+        self.time = frames[0]
+        self.timeChanges = 0
+        self.evaluations = 0
+
+    def setTime(self, frame):
+        self.time = frame
+        self.timeChanges += 1
+
+    def targetWorld(self, index, frame=None):
+        self.evaluations += 1
+        return self.targets[index][self.time if frame is None else frame]
+
+
+def constraintBake(scene, frames, offset):
+    keys = {index: list() for index in range(len(scene.targets) + 1)}
+    for frame in frames:
+        scene.setTime(frame)
+        pivot = transformMath.multiply(offset, transformMath.removeScale(scene.targetWorld(-1)))
+        scene.evaluations += 1
+        keys[len(scene.targets)].append(transformMath.decomposeMatrix(pivot))
+        for index in range(len(scene.targets)):
+            world = transformMath.removeScale(scene.targetWorld(index))
+            scene.evaluations += 1
+            local = transformMath.multiply(world, transformMath.inverse(pivot))
+            keys[index].append(transformMath.decomposeMatrix(local))
+    # filterCurve euler on every node afterwards
+    for index, values in keys.items():
+        transformMath.unwrapEulers([rotate for translate, rotate, scale in values])
+
+
+def analyticBake(scene, frames, offset):
+    targetWorld = [[transformMath.removeScale(scene.targetWorld(index, frame)) for frame in frames]
+                   for index in range(len(scene.targets))]
+    pivotWorld = transformMath.followMatrices(offset, targetWorld[-1])
+    transformMath.decomposeMatrices(pivotWorld)
+    for world in targetWorld:
+        transformMath.decomposeMatrices(transformMath.localMatrices(world, pivotWorld))
+
+
+def main(targetCount=50, frameCount=1000):
+    frames = list(range(frameCount))
+    offset = transformMath.holdOffset(transformMath.identity, transformMath.identity)
+    for name, bake in (('constraint', constraintBake), ('analytic', analyticBake)):
+        scene = MockScene(targetCount, frames)
+        start = default_timer()
+        bake(scene, frames, offset)
+        elapsed = default_timer() - start
+        print('%s bake: %d targets x %d frames, %.2fs, %d time changes, %d node evaluations' % (
+            name, targetCount, frameCount, elapsed, scene.timeChanges, scene.evaluations))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+'''
+Tumble pivot of half the vertices on a mock 100k point mesh. The per component
+path stands in for one xform query per vertex name, the batched path indexes
+one getPoints array, which is what CameraPivot now does
+
+    python benchmarks/bench_pointMath.py
+'''
+import os
+import sys
+import random
+from timeit import default_timer
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from apps.tb_pointMath import midPoint, boundingBox, scalePoint
+
+
+class MockMesh(object):
+    def __init__(self, count, seed=0):
+        generator = random.Random(seed)
+        self.points = [(generator.uniform(-50, 50), generator.uniform(0, 180), generator.uniform(-50, 50))
+                       for x in range(count)]
+        self.queries = 0
+
+    def xform(self, component):
+        # one query per component name, like cmds.xform(vertex, query=True, translation=True, worldSpace=True)
+        self.queries += 1
+        index = int(component[component.index('[') + 1:-1])
+        return list(self.points[index])
+
+    def getPoints(self):
+        self.queries += 1
+        return self.points
+
+
+def main(pointCount=100000):
+    mesh = MockMesh(pointCount)
+    indices = list(range(0, pointCount, 2))
+    components = ['pMesh.vtx[%d]' % index for index in indices]
+
+    start = default_timer()
+    perComponent = midPoint([mesh.xform(component) for component in components])
+    elapsed = default_timer() - start
+    print('per component: %d points, %d queries, %.3fs' % (len(indices), mesh.queries, elapsed))
+
+    mesh.queries = 0
+    start = default_timer()
+    points = mesh.getPoints()
+    selected = [scalePoint(points[index], 1.0) for index in indices]
+    batched = midPoint(selected)
+    elapsed = default_timer() - start
+    print('batched: %d points, %d queries, %.3fs' % (len(indices), mesh.queries, elapsed))
+    assert max(abs(a - b) for a, b in zip(perComponent, batched)) < 1.0e-9
+
+    start = default_timer()
+    boundingBox(selected)
+    print('bounding box: %.3fs' % (default_timer() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+'''
+10k simulated mouse moves over a 64 item radial menu, the sector lookup
+against checking the distance to every item
+
+    python benchmarks/bench_radialLookup.py
+'''
+import os
+import sys
+import math
+import random
+from timeit import default_timer
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from apps.tb_radialLookup import RadialLookup
+
+
+def main(itemCount=64, moveCount=10000):
+    generator = random.Random(0)
+    centre = (500.0, 400.0)
+    items = list()
+    for index in range(itemCount):
+        # two rings, like a menu with sub rows
+        radius = 120.0 if index % 2 else 200.0
+        angle = math.radians(index * 360.0 / itemCount)
+        items.append((index, (centre[0] + radius * math.sin(angle), centre[1] - radius * math.cos(angle))))
+
+    # a wandering cursor rather than uniform noise, successive moves are close together
+    moves = list()
+    x, y = centre
+    for index in range(moveCount):
+        x = min(max(x + generator.gauss(0, 12), 0.0), 1000.0)
+        y = min(max(y + generator.gauss(0, 12), 0.0), 800.0)
+        moves.append((x, y))
+
+    start = default_timer()
+    lookup = RadialLookup(centre, items, deadZone=20.0)
+    buildTime = default_timer() - start
+
+    start = default_timer()
+    fast = [lookup.closest(point) for point in moves]
+    lookupTime = default_timer() - start
+
+    start = default_timer()
+    slow = [lookup.closestBruteForce(point) for point in moves]
+    bruteTime = default_timer() - start
+
+    assert fast == slow
+    print('%d items, %d moves: build %.4fs, sector lookup %.3fs (%.1fus/move), every item %.3fs (%.1fus/move)' % (
+        itemCount, moveCount, buildTime, lookupTime, lookupTime / moveCount * 1e6, bruteTime,
+        bruteTime / moveCount * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+'''
+Restoring relative transforms for 20 targets over 500 frames in a mock scene.
+
+The stepped restore changes the time every frame, reads the parent and each
+target's parent space, sets each target's world matrix and keys it. The range
+restore samples the parent once per frame without changing the time,
+decomposes each target's local channels with the rotate order and euler filter
+built in, and writes one curve per channel. Both are timed, and the time
+changes, node evaluations and key writes each one needs are counted
+
+    python benchmarks/bench_rangeSnap.py
+'''
+import os
+import sys
+import random
+from timeit import default_timer
+
+rootPath = os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, rootPath)
+sys.path.insert(0, os.path.join(rootPath, 'tests'))
+
+import apps.tb_transformMath as transformMath
+from test_rangeSnap import animatedParent, randomMatrix
+
+channelNames = ['translateX', 'translateY', 'translateZ', 'rotateX', 'rotateY', 'rotateZ']
+
+
+class MockScene(object):
+    def __init__(self, targetCount, frames, seed=0):
+        generator = random.Random(seed)
+        self.parent = dict(zip(frames, animatedParent(generator, frames)))
+        self.offsets = [randomMatrix(generator) for x in range(targetCount)]
+        self.parentSpaces = [randomMatrix(generator) for x in range(targetCount)]
+        self.rotateOrders = [generator.randint(0, 5) for x in range(targetCount)]
+        self.time = frames[0]
+        self.timeChanges = 0
+        self.evaluations = 0
+        self.keyWrites = 0
+
+    def setTime(self, frame):
+        self.time = frame
+        self.timeChanges += 1
+
+    def parentWorld(self, frame=None):
+        self.evaluations += 1
+        return self.parent[self.time if frame is None else frame]
+
+    def targetParentSpace(self, index):
+        self.evaluations += 1
+        return self.parentSpaces[index]
+
+    def setKeys(self, count):
+        self.keyWrites += count
+
+
+def steppedRestore(scene, frames):
+    for frame in frames:
+        scene.setTime(frame)
+        parent = scene.parentWorld()
+        for index, offset in enumerate(scene.offsets):
+            world = transformMath.multiply(offset, parent)
+            local = transformMath.multiply(world, transformMath.inverse(scene.targetParentSpace(index)))
+            transformMath.decomposeMatrix(local, rotateOrder=scene.rotateOrders[index])
+            # setKeyframe on every channel of the target
+            scene.setKeys(len(channelNames))
+
+
+def rangeRestore(scene, frames):
+    parentMatrices = [scene.parentWorld(frame) for frame in frames]
+    for index, offset in enumerate(scene.offsets):
+        worldMatrices = [transformMath.multiply(offset, parent) for parent in parentMatrices]
+        parentSpace = scene.targetParentSpace(index)
+        channels = transformMath.decomposeMatrices(transformMath.localMatrices(worldMatrices,
+                                                                               [parentSpace] * len(frames)),
+                                                   rotateOrder=scene.rotateOrders[index])
+        for channel in channelNames:
+            assert len(channels[channel]) == len(frames)
+            # one addKeys per curve
+            scene.setKeys(1)
+
+
+def main(targetCount=20, frameCount=500):
+    frames = list(range(frameCount))
+    for name, restore in (('stepped', steppedRestore), ('range', rangeRestore)):
+        scene = MockScene(targetCount, frames)
+        start = default_timer()
+        restore(scene, frames)
+        elapsed = default_timer() - start
+        print('%s restore: %d targets x %d frames, %.2fs, %d time changes, %d node evaluations, %d key writes' % (
+            name, targetCount, frameCount, elapsed, scene.timeChanges, scene.evaluations, scene.keyWrites))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+'''
+Batch space switch of 200 controls in a mock scene, 50 chains of 4 controls
+that each follow the one before, every other control switches to world. Times the capture, switch and parent first
+restore, once in hierarchy order and once with every chain reversed
+
+    python benchmarks/bench_spaceSwitch.py
+'''
+import os
+import sys
+from timeit import default_timer
+
+rootPath = os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, rootPath)
+sys.path.insert(0, os.path.join(rootPath, 'tests'))
+
+from test_matrixBake import chainScene, switchAndRestore
+
+
+def run(reverse):
+    scene, chains = chainScene(50, 4)
+    nodes = [node for chain in chains for node in (reversed(chain) if reverse else chain)]
+    start = default_timer()
+    worldMatrices, count = switchAndRestore(scene, nodes, {chain[index]: 0 for chain in chains for index in (1, 3)})
+    return default_timer() - start, count, len(nodes)
+
+
+def main():
+    for reverse in (False, True):
+        elapsed, count, nodeCount = run(reverse)
+        print('%s order: %d controls, %d solves, %.3fs' % ('reversed' if reverse else 'parent first',
+                                                          nodeCount, count, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+'''
+Matrix space switch bake maths, local channels for controls under a new parent space
+from sampled world and parent matrices. The locator path this replaces needs maya,
+the numbers here are the cost of everything but sampling and writing keys.
+
+    python benchmarks/bench_spaceSwitchBake.py
+'''
+import os
+import sys
+import math
+from timeit import default_timer
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+import apps.tb_transformMath as transformMath
+
+
+def sampledMatrices(frameCount, phase):
+    return [transformMath.composeMatrix(translate=(math.sin(frame * 0.1 + phase) * 10.0, frame * 0.2, phase),
+                                       rotate=(frame * 3.0, phase * 10.0, frame * -2.0),
+                                       rotateOrder=int(phase) % 6)
+            for frame in range(frameCount)]
+
+
+def main(controlCount=20, frameCount=1000):
+    worlds = [sampledMatrices(frameCount, index) for index in range(controlCount)]
+    parents = [sampledMatrices(frameCount, index + 0.5) for index in range(controlCount)]
+
+    start = default_timer()
+    for index in range(controlCount):
+        matrices = transformMath.localMatrices(worlds[index], parents[index])
+        transformMath.decomposeMatrices(matrices, rotateOrder=index % 6, jointOrient=(0.0, 0.0, 10.0))
+    elapsed = default_timer() - start
+    print('%d controls x %d frames: %.3fs, %.1fus per control frame' % (
+        controlCount, frameCount, elapsed, elapsed / (controlCount * frameCount) * 1.0e6))
+
+
+if __name__ == '__main__':
+    main()
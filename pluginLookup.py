@@ -10,6 +10,8 @@ import maya.api.OpenMayaAnim as om2a
 import traceback
 import apps.tb_keyCommands as tb_keyCommands
 from Abstract import *
+from apps.tb_eventDispatcher import EventDispatcher
+import apps.tb_markingMenuCache as tb_markingMenuCache
 
 import zipfile
 
@@ -45,6 +47,9 @@ class ClassFinder(object):
     hotkeyClass = None
     classLookup = None
 
+    markingMenuCache = tb_markingMenuCache.MarkingMenuCache()
+    markingMenuCacheEvents = ['SceneOpened', 'NewSceneOpened', 'SceneImported']
+
     def __new__(cls):
         if ClassFinder.__instance is None:
             ClassFinder.__instance = object.__new__(cls)
@@ -86,6 +91,9 @@ class ClassFinder(object):
         self.hotkeyClass.loadAllCommands()
         self.hotkeyClass.getCommandAssignment()
         self.hotkeyClass.assignHotkeysFromLoadedClasses()
+        EventDispatcher().subscribe('MarkingMenuCache',
+                                    self.clearMarkingMenuCache,
+                                    events=self.markingMenuCacheEvents)
 
     def loadPluginsByClass(self):
         self.allClasses = [cls for cls in
@@ -173,9 +181,25 @@ class ClassFinder(object):
             # print (tool, cls)
             if not cls:
                 continue
-            menuDataDict[tool] = cls.qtMarkingMenu(selection)
+            menuDataDict[tool] = self.getToolMarkingMenuData(tool, cls, selection)
         return menuDataDict
 
+    def getToolMarkingMenuData(self, tool, cls, selection):
+        return self.markingMenuCache.get(tool,
+                                         tb_markingMenuCache.getScope(cls, toolAbstractFactory),
+                                         selection,
+                                         cls.qtMarkingMenu)
+
+    def clearMarkingMenuCache(self, tool=None):
+        """
+        :param tool: toolName to clear, clears everything by default
+        :return:
+        """
+        self.markingMenuCache.clear(tool)
+
+    def printMarkingMenuStats(self):
+        self.markingMenuCache.printStats()
+
     def collectAnimLayerTabWidgets(self):
         widgets = list()
         for tool, cls in self.tools.items():
@@ -0,0 +1,80 @@
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+from apps import tb_curveEdit
+
+
+def maya_useNewAPI():
+    """
+    The presence of this function tells Maya that the plugin produces, and
+    expects to be passed, objects created using the Maya Python API 2.0.
+    """
+    pass
+
+
+"""
+runs the edit queued by tb_curveEdit.applyCurveEdit so api curve/node edits go in the undo queue
+"""
+
+
+class CurveEditCommand(om.MPxCommand):
+    COMMAND_NAME = "tbCurveEdit"
+
+    def __init__(self):
+        super(CurveEditCommand, self).__init__()
+
+        self.undoable = True
+        self.animCurveChange = None
+        self.dagModifier = None
+
+    def doIt(self, arg_list):
+        if not tb_curveEdit.pendingEdits:
+            self.undoable = False
+            self.displayWarning('No curve edit pending')
+            return
+        edit = tb_curveEdit.pendingEdits.pop(0)
+        self.animCurveChange = oma.MAnimCurveChange()
+        self.dagModifier = om.MDagModifier()
+        edit(self.animCurveChange, self.dagModifier)
+
+    def undoIt(self):
+        self.animCurveChange.undoIt()
+        self.dagModifier.undoIt()
+
+    def redoIt(self):
+        self.dagModifier.doIt()
+        self.animCurveChange.redoIt()
+
+    def isUndoable(self):
+        return self.undoable
+
+    @classmethod
+    def creator(cls):
+        return CurveEditCommand()
+
+    @classmethod
+    def create_syntax(cls):
+        return om.MSyntax()
+
+
+def initializePlugin(plugin):
+    """
+    """
+    vendor = "tbAnimTools"
+    version = "1.0.0"
+
+    plugin_fn = om.MFnPlugin(plugin, vendor, version)
+    try:
+        plugin_fn.registerCommand(CurveEditCommand.COMMAND_NAME, CurveEditCommand.creator,
+                                  CurveEditCommand.create_syntax)
+    except:
+        om.MGlobal.displayError("Failed to register command: {0}".format(CurveEditCommand.COMMAND_NAME))
+
+
+def uninitializePlugin(plugin):
+    """
+    """
+    plugin_fn = om.MFnPlugin(plugin)
+    try:
+        plugin_fn.deregisterCommand(CurveEditCommand.COMMAND_NAME)
+    except:
+        om.MGlobal.displayError("Failed to deregister command: {0}".format(CurveEditCommand.COMMAND_NAME))
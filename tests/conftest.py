@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the tools import each other as apps.tb_x from the repo root
+rootPath = os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir))
+if rootPath not in sys.path:
+    sys.path.insert(0, rootPath)
@@ -0,0 +1,46 @@
+'''
+Stand in for tb_cacheWorker.py, behaves according to the job's options
+
+    log: file the job name is appended to when it starts
+    sleep: seconds to spend "exporting"
+    failAttempts: how many attempts fail before one succeeds
+'''
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from apps.tb_cacheJobs import CacheJob, writeProgress, statusRunning, statusDone, statusFailed
+
+
+def main(jobFile):
+    job = CacheJob.fromJson(jobFile)
+    options = job.options
+    if options.get('log'):
+        with open(options['log'], 'a') as logFile:
+            logFile.write(job.name + '\n')
+
+    attemptsFile = os.path.join(os.path.dirname(job.outputFile), job.name + '.attempts')
+    attempts = 1
+    if os.path.isfile(attemptsFile):
+        with open(attemptsFile) as f:
+            attempts = int(f.read()) + 1
+    with open(attemptsFile, 'w') as f:
+        f.write(str(attempts))
+    if attempts <= options.get('failAttempts', 0):
+        writeProgress(job.progressFile, statusFailed, error='attempt %d failed' % attempts)
+        return 1
+
+    frames = int(job.endTime - job.startTime) + 1
+    for index in range(frames):
+        writeProgress(job.progressFile, statusRunning, job.startTime + index)
+        time.sleep(options.get('sleep', 0.0) / frames)
+    with open(job.outputFile, 'w') as f:
+        f.write(job.sceneFile)
+    writeProgress(job.progressFile, statusDone, job.endTime)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1]))
@@ -0,0 +1,206 @@
+import math
+import random
+
+import pytest
+
+from apps.tb_cacheChunks import getBlocks, hashBlocks, getBlockFileName, CacheManifest, planDirtyBlocks
+
+
+def autoTangents(times, values):
+    """
+    Angles like auto/spline tangents, each one depends on the keys either side
+    """
+    angles = list()
+    count = len(times)
+    for index in range(count):
+        previous = max(0, index - 1)
+        following = min(count - 1, index + 1)
+        if previous == following:
+            angles.append(0.0)
+            continue
+        slope = (values[following] - values[previous]) / (times[following] - times[previous])
+        angles.append(math.degrees(math.atan(slope)))
+    return angles
+
+
+def makeCurve(seed, start=0, end=2000, step=10):
+    generator = random.Random(seed)
+    times = [float(time) for time in range(start, end + 1, step)]
+    values = [generator.uniform(-10, 10) for time in times]
+    return times, values
+
+
+def withTangents(times, values, infinity=('constant', 'constant')):
+    angles = autoTangents(times, values)
+    return times, values, [angles, list(angles)], list(infinity)
+
+
+def makeCurves(count, **kwargs):
+    return dict(('curve%d' % index, withTangents(*makeCurve(index), **kwargs)) for index in range(count))
+
+
+def editKey(curves, name, frame, value):
+    times, values, tangents, infinity = curves[name]
+    values = list(values)
+    values[times.index(float(frame))] = value
+    edited = dict(curves)
+    edited[name] = withTangents(times, values, infinity)
+    return edited
+
+
+def dirtyIndices(before, after):
+    return [index for index, (a, b) in enumerate(zip(before, after)) if a != b]
+
+
+def test_getBlocks():
+    assert getBlocks(0, 299, 100) == [(0, 99), (100, 199), (200, 299)]
+    assert getBlocks(1, 250, 100) == [(1, 99), (100, 199), (200, 250)]
+    assert getBlocks(5, 5, 100) == [(5, 5)]
+    assert getBlocks(0, 3, 0) == [(0, 0), (1, 1), (2, 2), (3, 3)]
+
+
+def test_blocksStayPutWhenTheRangeChanges():
+    assert getBlocks(150, 450, 100)[1:-1] == getBlocks(0, 999, 100)[2:4]
+
+
+def test_hashIsStable():
+    blocks = getBlocks(0, 2000, 200)
+    curves = makeCurves(20)
+    assert hashBlocks(curves, blocks) == hashBlocks(dict(reversed(list(curves.items()))), blocks)
+    assert len(set(hashBlocks(curves, blocks))) == len(blocks)
+
+
+def test_editingOneKeyOnlyDirtiesItsBlocks():
+    blocks = getBlocks(0, 2000, 200)
+    curves = makeCurves(20)
+    edited = editKey(curves, 'curve7', 1010, 50.0)
+    # the tangents either side of the key changed too
+    assert curves['curve7'][2][0][100] != edited['curve7'][2][0][100]
+    assert curves['curve7'][2][0][102] != edited['curve7'][2][0][102]
+    dirty = dirtyIndices(hashBlocks(curves, blocks), hashBlocks(edited, blocks))
+    # the block with the key, and the one before it that ends next to it
+    assert dirty == [4, 5]
+
+
+def test_editingAKeyInsideABlock():
+    blocks = getBlocks(0, 2000, 200)
+    curves = makeCurves(5)
+    edited = editKey(curves, 'curve0', 1100, -3.0)
+    assert dirtyIndices(hashBlocks(curves, blocks), hashBlocks(edited, blocks)) == [5]
+
+
+def test_changingOnlyATangent():
+    blocks = getBlocks(0, 2000, 200)
+    curves = makeCurves(3)
+    times, values, tangents, infinity = curves['curve1']
+    outAngles = list(tangents[1])
+    outAngles[times.index(450.0)] += 10.0
+    edited = dict(curves)
+    edited['curve1'] = (times, values, [tangents[0], outAngles], infinity)
+    assert dirtyIndices(hashBlocks(curves, blocks), hashBlocks(edited, blocks)) == [2]
+
+
+def test_infinityDirtiesEveryBlock():
+    blocks = getBlocks(0, 2000, 200)
+    curves = makeCurves(3)
+    edited = dict(curves)
+    edited['curve2'] = curves['curve2'][:3] + (['cycle', 'constant'],)
+    assert dirtyIndices(hashBlocks(curves, blocks), hashBlocks(edited, blocks)) == list(range(len(blocks)))
+
+
+def test_settingsDirtyEveryBlock():
+    blocks = getBlocks(0, 1000, 100)
+    curves = makeCurves(3)
+    before = hashBlocks(curves, blocks, {'roots': ['|charA']})
+    after = hashBlocks(curves, blocks, {'roots': ['|charB']})
+    assert dirtyIndices(before, after) == list(range(len(blocks)))
+
+
+def test_curvesWithoutTangents():
+    blocks = getBlocks(0, 2000, 200)
+    curves = dict(('curve%d' % index, makeCurve(index)) for index in range(3))
+    times, values = curves['curve0']
+    values = list(values)
+    values[times.index(1100.0)] += 1.0
+    edited = dict(curves)
+    edited['curve0'] = (times, values)
+    assert dirtyIndices(hashBlocks(curves, blocks), hashBlocks(edited, blocks)) == [5]
+
+
+def test_keysOutsideTheRange():
+    # keys outside the range still shape the blocks next to them
+    blocks = getBlocks(100, 300, 100)
+    curves = {'curve': ([0.0, 150.0, 400.0], [0.0, 1.0, 2.0])}
+    edited = {'curve': ([0.0, 150.0, 400.0], [5.0, 1.0, 2.0])}
+    assert dirtyIndices(hashBlocks(curves, blocks), hashBlocks(edited, blocks)) == [0]
+    edited = {'curve': ([0.0, 150.0, 400.0], [0.0, 1.0, 7.0])}
+    assert dirtyIndices(hashBlocks(curves, blocks), hashBlocks(edited, blocks)) == [0, 1, 2]
+    edited = {'curve': ([0.0, 150.0, 400.0, 900.0], [0.0, 1.0, 2.0, 3.0])}
+    assert dirtyIndices(hashBlocks(curves, blocks), hashBlocks(edited, blocks)) == []
+
+
+def test_emptyCurve():
+    blocks = getBlocks(0, 100, 50)
+    assert len(hashBlocks({'curve': ([], [], [[], []], ['constant', 'constant'])}, blocks)) == len(blocks)
+
+
+def test_manifestRoundTrip(tmp_path):
+    manifest = CacheManifest(name='charA', blockSize=200, settings={'roots': ['|charA']})
+    blocks = getBlocks(0, 599, 200)
+    for block, blockHash in zip(blocks, hashBlocks(makeCurves(2), blocks)):
+        manifest.setBlock(block, getBlockFileName('charA', block), blockHash)
+    path = CacheManifest.getFilePath(str(tmp_path), 'charA')
+    manifest.save(path)
+    manifest.save(path)
+    loaded = CacheManifest().fromJson(path)
+    assert loaded.json_serialize() == manifest.json_serialize()
+    assert loaded.getBlock((200, 399))['file'] == 'charA_200_399.abc'
+    assert loaded.getBlock((0, 200)) is None
+
+
+def test_setBlockKeepsOrder():
+    manifest = CacheManifest()
+    for block in [(200, 299), (0, 99), (100, 199)]:
+        manifest.setBlock(block, getBlockFileName('a', block), 'x')
+    manifest.setBlock((100, 199), 'b.abc', 'y')
+    assert [entry['start'] for entry in manifest.blocks] == [0, 100, 200]
+    assert manifest.getBlock((100, 199)) == {'start': 100, 'end': 199, 'file': 'b.abc', 'hash': 'y'}
+
+
+def test_trim():
+    manifest = CacheManifest()
+    for block in getBlocks(0, 399, 100):
+        manifest.setBlock(block, getBlockFileName('a', block), 'x')
+    removed = manifest.trim(getBlocks(100, 299, 100))
+    assert [entry['start'] for entry in removed] == [0, 300]
+    assert [entry['start'] for entry in manifest.blocks] == [100, 200]
+
+
+def test_planDirtyBlocks():
+    blocks = getBlocks(0, 2000, 200)
+    curves = makeCurves(10)
+    hashes = hashBlocks(curves, blocks)
+    manifest = CacheManifest(name='charA')
+    for block, blockHash in zip(blocks, hashes):
+        manifest.setBlock(block, getBlockFileName('charA', block), blockHash)
+    existing = set(getBlockFileName('charA', block) for block in blocks)
+
+    def fileExists(path):
+        return path in existing
+
+    assert planDirtyBlocks(manifest, blocks, hashes, fileExists=fileExists) == []
+    newHashes = hashBlocks(editKey(curves, 'curve3', 1100, 0.0), blocks)
+    assert [block for block, blockHash in planDirtyBlocks(manifest, blocks, newHashes, fileExists=fileExists)] \
+           == [(1000, 1199)]
+    existing.discard('charA_0_199.abc')
+    assert [block for block, blockHash in planDirtyBlocks(manifest, blocks, hashes, fileExists=fileExists)] \
+           == [(0, 199)]
+    assert len(planDirtyBlocks(None, blocks, hashes, fileExists=fileExists)) == len(blocks)
+
+
+@pytest.mark.parametrize('frame', [0, 10, 990, 1000, 1990, 2000])
+def test_editAnywhereStaysLocal(frame):
+    blocks = getBlocks(0, 2000, 200)
+    curves = makeCurves(4)
+    edited = editKey(curves, 'curve2', frame, 99.0)
+    assert 1 <= len(dirtyIndices(hashBlocks(curves, blocks), hashBlocks(edited, blocks))) <= 2
@@ -0,0 +1,272 @@
+import os
+import sys
+import time
+
+import pytest
+
+import apps.tb_cacheJobs as cacheJobs
+from apps.tb_cacheJobs import CacheJob, CacheJobScheduler, ScriptRunner, MayapyRunner, \
+    statusDone, statusFailed, statusCancelled, statusQueued
+
+fakeWorker = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fakeCacheWorker.py')
+
+
+class CountingRunner(ScriptRunner):
+    """
+    The fake worker script, counting how many processes are alive at once
+    """
+
+    def __init__(self):
+        super(CountingRunner, self).__init__(fakeWorker, executable=sys.executable)
+        self.processes = list()
+        self.mostAtOnce = 0
+
+    def start(self, job):
+        process = super(CountingRunner, self).start(job)
+        self.processes.append(process)
+        self.mostAtOnce = max(self.mostAtOnce, len([p for p in self.processes if p.poll() is None]))
+        return process
+
+
+@pytest.fixture
+def folders(tmp_path):
+    output = tmp_path / 'caches'
+    output.mkdir()
+    return str(output), os.path.join(str(output), '.tbCacheJobs')
+
+
+def makeJob(folders, name, sceneFile=str(), frames=5, **options):
+    outputFolder, jobFolder = folders
+    return CacheJob(name, ['|%s|geo' % name], 1, frames, os.path.join(outputFolder, name + '.abc'),
+                    sceneFile=sceneFile, options=options, jobFolder=jobFolder)
+
+
+def runUntilIdle(scheduler, timeout=30.0):
+    end = time.time() + timeout
+    while scheduler.poll():
+        assert time.time() < end, 'jobs did not finish'
+        time.sleep(0.01)
+
+
+def readLog(path):
+    with open(path) as logFile:
+        return logFile.read().split()
+
+
+def test_jobsRunInSubmissionOrder(folders):
+    log = os.path.join(folders[0], 'log.txt')
+    completed = list()
+    scheduler = CacheJobScheduler(runner=ScriptRunner(fakeWorker), maxWorkers=1, onComplete=completed.append)
+    names = ['charA', 'charB', 'charC', 'charD']
+    for name in names:
+        scheduler.submit(makeJob(folders, name, log=log))
+    runUntilIdle(scheduler)
+    assert readLog(log) == names
+    assert [job.name for job in completed] == names
+    assert all(job.status == statusDone and job.progress == 1.0 for job in completed)
+    assert all(os.path.isfile(job.outputFile) for job in completed)
+
+
+def test_concurrencyLimit(folders):
+    runner = CountingRunner()
+    scheduler = CacheJobScheduler(runner=runner, maxWorkers=2)
+    for index in range(5):
+        scheduler.submit(makeJob(folders, 'char%d' % index, sleep=0.3))
+        assert len(scheduler.running) <= 2
+    mostRunning = 0
+    end = time.time() + 30.0
+    while scheduler.poll():
+        mostRunning = max(mostRunning, len(scheduler.running))
+        assert time.time() < end
+        time.sleep(0.01)
+    assert mostRunning == 2
+    assert runner.mostAtOnce <= 2
+    assert len(runner.processes) == 5
+
+
+def test_failedJobIsRetried(folders):
+    log = os.path.join(folders[0], 'log.txt')
+    completed = list()
+    scheduler = CacheJobScheduler(runner=ScriptRunner(fakeWorker), maxWorkers=1, maxRetries=1,
+                                  onComplete=completed.append)
+    scheduler.submit(makeJob(folders, 'flaky', failAttempts=1, log=log))
+    scheduler.submit(makeJob(folders, 'steady', log=log))
+    runUntilIdle(scheduler)
+    # the retry goes before the next job
+    assert readLog(log) == ['flaky', 'flaky', 'steady']
+    assert [(job.name, job.attempts) for job in completed] == [('flaky', 2), ('steady', 1)]
+
+
+def test_jobOutOfRetriesFails(folders):
+    failed = list()
+    scheduler = CacheJobScheduler(runner=ScriptRunner(fakeWorker), maxWorkers=1, maxRetries=2,
+                                  onFailed=failed.append)
+    job = scheduler.submit(makeJob(folders, 'broken', failAttempts=10))
+    runUntilIdle(scheduler)
+    assert failed == [job]
+    assert job.status == statusFailed
+    assert job.attempts == 3
+    assert job.error == 'attempt 3 failed'
+    assert not os.path.exists(job.outputFile)
+
+
+def test_runnerThatCannotStartFails(folders):
+    failed = list()
+    scheduler = CacheJobScheduler(runner=ScriptRunner(fakeWorker, executable=os.path.join(folders[0], 'missing')),
+                                  maxRetries=1, onFailed=failed.append)
+    job = scheduler.submit(makeJob(folders, 'noPython'))
+    assert failed == [job]
+    assert job.attempts == 2
+    assert scheduler.isIdle()
+
+
+def test_cancelQueuedJob(folders):
+    log = os.path.join(folders[0], 'log.txt')
+    scheduler = CacheJobScheduler(runner=ScriptRunner(fakeWorker), maxWorkers=1)
+    first = scheduler.submit(makeJob(folders, 'first', log=log))
+    second = scheduler.submit(makeJob(folders, 'second', log=log))
+    assert second.status == statusQueued
+    assert scheduler.cancel(second.id)
+    assert not scheduler.cancel(second.id)
+    runUntilIdle(scheduler)
+    assert readLog(log) == ['first']
+    assert first.status == statusDone
+    assert second.status == statusCancelled
+    assert not os.path.exists(second.jobFile)
+
+
+def test_cancelRunningJobStartsTheNext(folders):
+    runner = CountingRunner()
+    scheduler = CacheJobScheduler(runner=runner, maxWorkers=1)
+    slow = scheduler.submit(makeJob(folders, 'slow', sleep=30.0))
+    quick = scheduler.submit(makeJob(folders, 'quick'))
+    assert scheduler.cancel(slow.id)
+    assert runner.processes[0].wait(timeout=10) is not None
+    assert slow.status == statusCancelled
+    runUntilIdle(scheduler)
+    assert quick.status == statusDone
+    assert not os.path.exists(slow.outputFile)
+
+
+def test_cancelAll(folders):
+    runner = CountingRunner()
+    scheduler = CacheJobScheduler(runner=runner, maxWorkers=2)
+    jobs = [scheduler.submit(makeJob(folders, 'char%d' % index, sleep=30.0)) for index in range(4)]
+    assert scheduler.cancelAll() == 4
+    assert scheduler.isIdle()
+    assert all(job.status == statusCancelled for job in jobs)
+    # cancelling the running ones didn't start the queued ones
+    assert len(runner.processes) == 2
+    for process in runner.processes:
+        process.wait(timeout=10)
+
+
+def test_progressIsReported(folders):
+    progress = list()
+    scheduler = CacheJobScheduler(runner=ScriptRunner(fakeWorker),
+                                  onProgress=lambda job: progress.append(job.progress))
+    scheduler.submit(makeJob(folders, 'char', frames=20, sleep=0.5))
+    runUntilIdle(scheduler)
+    assert progress
+    assert progress == sorted(progress)
+    assert all(0.0 <= value <= 1.0 for value in progress)
+
+
+def test_filesAreCleanedUpWhenTheLastJobSharingASnapshotFinishes(folders):
+    outputFolder, jobFolder = folders
+    os.makedirs(jobFolder)
+    snapshot = os.path.join(jobFolder, 'shot_1234_snapshot.mb')
+    with open(snapshot, 'w') as f:
+        f.write('scene')
+    seen = list()
+
+    def complete(job):
+        seen.append((job.name, os.path.isfile(snapshot)))
+
+    scheduler = CacheJobScheduler(runner=ScriptRunner(fakeWorker), maxWorkers=1, onComplete=complete)
+    first = scheduler.submit(makeJob(folders, 'charA', sceneFile=snapshot))
+    second = scheduler.submit(makeJob(folders, 'charB', sceneFile=snapshot))
+    runUntilIdle(scheduler)
+    assert seen == [('charA', True), ('charB', False)]
+    for job in (first, second):
+        assert not os.path.exists(job.jobFile)
+        assert not os.path.exists(job.progressFile)
+        with open(job.outputFile) as f:
+            assert f.read() == snapshot
+    assert not os.path.exists(jobFolder)
+
+
+def test_scenesOutsideTheJobFolderAreKept(folders):
+    scene = os.path.join(folders[0], 'shot.mb')
+    with open(scene, 'w') as f:
+        f.write('scene')
+    scheduler = CacheJobScheduler(runner=ScriptRunner(fakeWorker))
+    scheduler.submit(makeJob(folders, 'char', sceneFile=scene))
+    runUntilIdle(scheduler)
+    assert os.path.isfile(scene)
+
+
+def test_cleanUpCanBeTurnedOff(folders):
+    scheduler = CacheJobScheduler(runner=ScriptRunner(fakeWorker), cleanUp=False)
+    job = scheduler.submit(makeJob(folders, 'char'))
+    runUntilIdle(scheduler)
+    assert os.path.isfile(job.jobFile)
+    assert CacheJob.fromJson(job.jobFile).json_serialize() == job.json_serialize()
+
+
+def makeExecutable(path):
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as f:
+        f.write('')
+    return path
+
+
+@pytest.fixture
+def mayaInstall(tmp_path, monkeypatch):
+    monkeypatch.delenv('MAYA_LOCATION', raising=False)
+    return str(tmp_path)
+
+
+def test_mayapyNextToMaya(mayaInstall, monkeypatch):
+    mayapy = makeExecutable(os.path.join(mayaInstall, 'bin', 'mayapy.exe'))
+    monkeypatch.setattr(sys, 'executable', os.path.join(mayaInstall, 'bin', 'maya.exe'))
+    assert cacheJobs.getMayapy() == mayapy
+
+
+def test_mayapyInMacBundle(mayaInstall, monkeypatch):
+    contents = os.path.join(mayaInstall, 'maya2024', 'Maya.app', 'Contents')
+    mayapy = makeExecutable(os.path.join(contents, 'bin', 'mayapy'))
+    makeExecutable(os.path.join(contents, 'MacOS', 'Maya'))
+    monkeypatch.setattr(sys, 'executable', os.path.join(contents, 'MacOS', 'Maya'))
+    assert cacheJobs.getMayapy() == mayapy
+
+
+@pytest.mark.parametrize('location', [['Maya.app', 'Contents'], ['Maya.app'], []])
+def test_mayapyFromMayaLocation(mayaInstall, monkeypatch, location):
+    mayapy = makeExecutable(os.path.join(mayaInstall, 'Maya.app', 'Contents', 'bin', 'mayapy'))
+    monkeypatch.setenv('MAYA_LOCATION', os.path.join(mayaInstall, *location))
+    monkeypatch.setattr(sys, 'executable', os.path.join(mayaInstall, 'elsewhere', 'python'))
+    assert cacheJobs.getMayapy() == mayapy
+
+
+def test_mayapyItself(mayaInstall, monkeypatch):
+    monkeypatch.setattr(sys, 'executable', os.path.join(mayaInstall, 'bin', 'mayapy'))
+    assert cacheJobs.getMayapy() == sys.executable
+
+
+def test_noMayapyFailsTheJob(folders, mayaInstall, monkeypatch):
+    gui = makeExecutable(os.path.join(mayaInstall, 'MacOS', 'Maya'))
+    monkeypatch.setattr(sys, 'executable', gui)
+    assert cacheJobs.findMayapy() is None
+    with pytest.raises(OSError, match='mayapy not found'):
+        cacheJobs.getMayapy()
+
+    failed = list()
+    scheduler = CacheJobScheduler(runner=MayapyRunner(), onFailed=failed.append)
+    job = scheduler.submit(makeJob(folders, 'noMayapy'))
+    # nothing started, the gui binary is never run
+    assert not scheduler.running
+    assert failed == [job]
+    assert job.status == statusFailed
+    assert 'mayapy not found' in job.error
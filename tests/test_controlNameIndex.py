@@ -0,0 +1,78 @@
+import random
+from difflib import get_close_matches
+
+import pytest
+
+from apps.tb_controlNameIndex import ControlNameIndex
+
+
+def syntheticRig(count=5000, seed=3):
+    generator = random.Random(seed)
+    parts = ['arm', 'leg', 'hand', 'foot', 'spine', 'neck', 'head', 'finger', 'toe', 'clavicle', 'eye', 'jaw']
+    kinds = ['ctrl', 'fk', 'ik', 'pv', 'offset', 'grp']
+    names = set()
+    while len(names) < count:
+        side = generator.choice(['l_', 'r_', 'c_', 'L_', 'R_', ''])
+        suffix = generator.choice(['', '_L', '_R', '_l', '_r'])
+        names.add('%s%s%02d_%s%s' % (side, generator.choice(parts), generator.randint(0, 40),
+                                      generator.choice(kinds), suffix))
+    return sorted(names)
+
+
+def randomWords(count, alphabet, minLength, maxLength, seed):
+    generator = random.Random(seed)
+    return [''.join(generator.choice(alphabet) for x in range(generator.randint(minLength, maxLength)))
+            for y in range(count)]
+
+
+def test_knownMisses():
+    index = ControlNameIndex(['axbxcxd', 'cd_e_c_', 'abc'])
+    assert index.closeMatches('abcd') == get_close_matches('abcd', index.names)
+    assert 'axbxcxd' in index.closeMatches('abcd')
+    assert index.closeMatches('d_e') == ['cd_e_c_']
+
+
+@pytest.mark.parametrize('cutoff, queryCount', [(0.6, 2000), (0.75, 500), (0.3, 500)])
+def test_randomShortNamesAgreeWithDifflib(cutoff, queryCount):
+    names = sorted(set(randomWords(600, 'abcde_', 1, 9, seed=7)))
+    index = ControlNameIndex(names)
+    for word in randomWords(queryCount, 'abcde_', 1, 8, seed=11):
+        assert index.closeMatches(word, n=3, cutoff=cutoff) == get_close_matches(word, names, n=3, cutoff=cutoff)
+
+
+def test_syntheticRigAgreesWithDifflib():
+    names = syntheticRig()
+    index = ControlNameIndex(names, namespace='char')
+    generator = random.Random(5)
+    queries = [name.replace('l_', 'r_', 1).replace('_L', '_R') for name in generator.sample(names, 100)]
+    queries += [generator.choice(names)[:-2] for x in range(50)]
+    for word in queries:
+        expected = get_close_matches(word, names)
+        result = index.closeMatches(word)
+        assert result[:1] == expected[:1]
+        assert result == expected
+
+
+def test_cachedQueriesReturnCopies():
+    index = ControlNameIndex(['l_arm', 'r_arm'])
+    first = index.closeMatches('l_arm')
+    first.append('changed')
+    assert index.closeMatches('l_arm') == ['l_arm', 'r_arm']
+
+
+def test_invalidation():
+    index = ControlNameIndex(['a', 'b'], namespace='char', nodeCount=10)
+    assert index.isValid('char', 10)
+    assert not index.isValid('char', 11)
+    assert not index.isValid('other', 10)
+
+
+def test_withPrefix():
+    index = ControlNameIndex(['l_arm', 'l_leg', 'r_arm', 'l'])
+    assert index.withPrefix('l_') == ['l_arm', 'l_leg']
+    assert index.withPrefix('x') == []
+
+
+def test_badCount():
+    with pytest.raises(ValueError):
+        ControlNameIndex(['a']).closeMatches('a', n=0)
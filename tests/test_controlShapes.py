@@ -0,0 +1,138 @@
+import json
+import os
+
+import pytest
+
+from apps.tb_controlShapes import ControlShapeLibrary, dataPath, defaultShape, getSidecarPath, getUserCacheFolder
+
+
+def jsonPoints(path, shape, scale=1.0, axis='y'):
+    # the old per control parse of controlShapes.json
+    with open(path) as f:
+        pointLists = json.load(f)['pointLists']
+    points = pointLists.get(shape, pointLists[defaultShape])
+    if axis == 'z':
+        points = [[p[0], p[2], p[1]] for p in points]
+    return [tuple(float(x) * scale for x in p) for p in points]
+
+
+@pytest.fixture(autouse=True)
+def userFolder(tmp_path, monkeypatch):
+    # keep the sidecars out of the real user cache folder
+    folder = tmp_path / 'maya'
+    monkeypatch.setenv('MAYA_APP_DIR', str(folder))
+    return str(folder)
+
+
+@pytest.fixture
+def shapesFile(tmp_path):
+    path = tmp_path / 'controlShapes.json'
+    path.write_text(json.dumps({'pointLists': {'cross': [[1, 0, 0], [-1, 0, 0], [0, 0, 1]],
+                                               'tri': [[0.5, 1.25, -2], [3, 4, 5], [0, 0, 0]]}}))
+    return str(path)
+
+
+@pytest.mark.parametrize('scale', [1.0, 0.5, 3.3])
+@pytest.mark.parametrize('axis', ['y', 'z'])
+def test_identicalToJson(scale, axis):
+    library = ControlShapeLibrary(useSidecar=False)
+    for shape in library.shapeNames() + ['missing']:
+        assert list(library.getPoints(shape, scale=scale, axis=axis)) == jsonPoints(dataPath, shape, scale, axis)
+
+
+def test_identicalThroughSidecar(shapesFile):
+    ControlShapeLibrary(shapesFile).load()
+    assert os.path.isfile(getSidecarPath(shapesFile))
+    library = ControlShapeLibrary(shapesFile)
+    for shape in ['cross', 'tri', 'missing']:
+        assert list(library.getPoints(shape, scale=2.0, axis='z')) == jsonPoints(shapesFile, shape, 2.0, 'z')
+
+
+def test_sidecarSkipsJson(shapesFile, monkeypatch):
+    ControlShapeLibrary(shapesFile).load()
+
+    def noJson(f):
+        raise AssertionError('json parsed with an up to date sidecar')
+
+    monkeypatch.setattr('apps.tb_controlShapes.json.load', noJson)
+    assert ControlShapeLibrary(shapesFile).shapeNames() == ['cross', 'tri']
+
+
+def test_sidecarIgnoredWhenJsonChanges(shapesFile):
+    ControlShapeLibrary(shapesFile).load()
+    with open(shapesFile, 'w') as f:
+        json.dump({'pointLists': {'cross': [[2, 0, 0]]}}, f)
+    sourceTime = os.path.getmtime(shapesFile) + 10
+    os.utime(shapesFile, (sourceTime, sourceTime))
+    assert ControlShapeLibrary(shapesFile).getPoints('cross') == ((2.0, 0.0, 0.0),)
+
+
+@pytest.mark.parametrize('contents', [b'', b'garbage\n', b'{"version": 1}\n', b'\x80\x02}q\x00.'])
+def test_badSidecarIgnored(shapesFile, contents):
+    sidecarPath = getSidecarPath(shapesFile)
+    os.makedirs(os.path.dirname(sidecarPath))
+    with open(sidecarPath, 'wb') as f:
+        f.write(contents)
+    assert list(ControlShapeLibrary(shapesFile).getPoints('tri')) == jsonPoints(shapesFile, 'tri')
+
+
+def test_truncatedSidecarIgnored(shapesFile):
+    ControlShapeLibrary(shapesFile).load()
+    sidecarPath = getSidecarPath(shapesFile)
+    with open(sidecarPath, 'rb') as f:
+        data = f.read()
+    for contents in [data[:-8], data + b'\x00' * 8]:
+        with open(sidecarPath, 'wb') as f:
+            f.write(contents)
+        assert list(ControlShapeLibrary(shapesFile).getPoints('tri')) == jsonPoints(shapesFile, 'tri')
+
+
+def test_unwritableSidecar(shapesFile, monkeypatch):
+    # the cache folder can't be made under a file
+    library = ControlShapeLibrary(shapesFile, sidecarFolder=os.path.join(shapesFile, 'cache'))
+    assert library.getPoints('cross') == ((1.0, 0.0, 0.0), (-1.0, 0.0, 0.0), (0.0, 0.0, 1.0))
+
+
+def test_sidecarGoesToTheUserCacheFolder(shapesFile, userFolder, tmp_path):
+    library = ControlShapeLibrary(shapesFile)
+    library.load()
+    assert os.path.dirname(library.sidecarPath) == getUserCacheFolder()
+    assert getUserCacheFolder().startswith(userFolder)
+    # nothing is written next to the json
+    assert sorted(os.listdir(os.path.dirname(shapesFile))) == ['controlShapes.json', 'maya']
+    # another install's shapes don't share the sidecar
+    other = tmp_path / 'other'
+    other.mkdir()
+    assert getSidecarPath(str(other / 'controlShapes.json')) != library.sidecarPath
+
+
+def test_sidecarFolder(shapesFile, tmp_path):
+    folder = str(tmp_path / 'sidecars')
+    library = ControlShapeLibrary(shapesFile, sidecarFolder=folder)
+    library.load()
+    assert os.listdir(folder) == [os.path.basename(library.sidecarPath)]
+    assert ControlShapeLibrary(shapesFile, sidecarFolder=folder).load() == library.shapes
+
+
+def test_lruCache(shapesFile):
+    library = ControlShapeLibrary(shapesFile, cacheSize=2, useSidecar=False)
+    first = library.getPoints('cross')
+    assert library.getPoints('cross') is first
+    library.getPoints('tri')
+    library.getPoints('cross')
+    library.getPoints('tri', scale=2.0)
+    # cross was used last so tri at scale 1 went
+    assert (library.hits, library.misses) == (2, 3)
+    assert list(library.cache.keys()) == [('cross', 1.0, 'y'), ('tri', 2.0, 'y')]
+    library.getPoints('tri')
+    assert (library.hits, library.misses) == (2, 4)
+
+
+def test_reload(shapesFile):
+    library = ControlShapeLibrary(shapesFile, useSidecar=False)
+    library.getPoints('cross')
+    with open(shapesFile, 'w') as f:
+        json.dump({'pointLists': {'cross': [[0, 3, 0]], 'new': [[1, 1, 1]]}}, f)
+    library.reload()
+    assert library.getPoints('cross') == ((0.0, 3.0, 0.0),)
+    assert library.hasShape('new')
@@ -0,0 +1,101 @@
+import pytest
+
+import apps.tb_curveEdit as curveEdit
+from apps.tb_curveEdit import redundantKeyIndexes, removeRedundantSteppedKeys
+
+
+class FakeAnimCurveModule(object):
+    class MFnAnimCurve(object):
+        kTangentStep = 'step'
+        kTangentLinear = 'linear'
+
+
+class FakeCurve(object):
+    """
+    Stands in for MFnAnimCurve, records every edit made through it
+    """
+
+    def __init__(self, values):
+        self.values = list(values)
+        self.outTangents = ['auto'] * len(values)
+        self.inTangents = ['auto'] * len(values)
+        self.removed = list()
+        self.changes = set()
+
+    @property
+    def numKeys(self):
+        return len(self.values)
+
+    def value(self, index):
+        return self.values[index]
+
+    def remove(self, index, change=None):
+        self.changes.add(change)
+        self.removed.append(index)
+        self.values.pop(index)
+        self.outTangents.pop(index)
+        self.inTangents.pop(index)
+
+    def setOutTangentType(self, index, tangentType, change=None):
+        self.changes.add(change)
+        self.outTangents[index] = tangentType
+
+    def setInTangentType(self, index, tangentType, change=None):
+        self.changes.add(change)
+        self.inTangents[index] = tangentType
+
+
+@pytest.fixture(autouse=True)
+def fakeApi(monkeypatch):
+    monkeypatch.setattr(curveEdit, 'oma2', FakeAnimCurveModule)
+
+
+@pytest.mark.parametrize('values, expected', [
+    ([], []),
+    ([1.0], []),
+    ([1.0, 1.0], [1]),
+    ([0.0, 0.0, 0.0, 0.0], [1, 2, 3]),
+    ([0.0, 1.0, 0.0, 1.0, 0.0], []),
+    ([2.0, 2.0, 1.0, 1.0, 1.0, 2.0, 2.0], [1, 3, 4, 6]),
+    ([0.0, 1.0, 1.0], [2]),
+])
+def test_redundantKeyIndexes(values, expected):
+    assert redundantKeyIndexes(values) == expected
+
+
+def test_firstKeyIsAlwaysKept():
+    curve = FakeCurve([3.0, 3.0, 3.0])
+    assert removeRedundantSteppedKeys(curve) == 2
+    assert curve.values == [3.0]
+
+
+def test_lastKeyGoesWhenItRepeats():
+    curve = FakeCurve([0.0, 1.0, 2.0, 2.0])
+    assert removeRedundantSteppedKeys(curve) == 1
+    assert curve.values == [0.0, 1.0, 2.0]
+
+
+def test_singleKey():
+    curve = FakeCurve([5.0])
+    assert removeRedundantSteppedKeys(curve) == 0
+    assert curve.values == [5.0]
+    assert curve.outTangents == ['step']
+    assert curve.inTangents == ['linear']
+
+
+def test_alternatingValuesAreUntouched():
+    curve = FakeCurve([0.0, 1.0] * 10)
+    assert removeRedundantSteppedKeys(curve) == 0
+    assert curve.values == [0.0, 1.0] * 10
+
+
+def test_removesFromTheEndSoIndexesStayValid():
+    curve = FakeCurve([1.0, 1.0, 2.0, 2.0, 1.0, 1.0])
+    change = object()
+    assert removeRedundantSteppedKeys(curve, animCurveChange=change) == 3
+    assert curve.removed == [5, 3, 1]
+    assert curve.values == [1.0, 2.0, 1.0]
+    assert curve.outTangents == ['step'] * 3
+    assert curve.inTangents == ['linear'] * 3
+    # every edit goes through the one change for undo
+    assert curve.changes == {change}
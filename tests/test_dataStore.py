@@ -0,0 +1,285 @@
+import json
+import os
+import threading
+
+import pytest
+
+import apps.tb_dataStore as dataStore
+
+
+def rigData(index, controls=20):
+    return {'name': 'rig%d' % index,
+            'controls': {'ctrl%d' % x: {'up': 'ctrl%d' % (x + 1), 'value': x * 0.5} for x in range(controls)},
+            'flags': [True, False, None]}
+
+
+@pytest.fixture(params=dataStore.backendNames)
+def store(request, tmp_path):
+    if request.param == dataStore.backendSqlite:
+        store = dataStore.SqliteStore(str(tmp_path))
+        yield store
+        store.close()
+    else:
+        yield dataStore.JsonStore(str(tmp_path))
+
+
+def test_roundTrip(store, tmp_path):
+    filePath = os.path.join(str(tmp_path), 'MirrorTools', 'rig0.json')
+    os.mkdir(os.path.dirname(filePath))
+    store.save(filePath, rigData(0))
+    assert store.exists(filePath)
+    assert store.load(filePath) == rigData(0)
+    assert store.listNames(os.path.dirname(filePath)) == ['rig0']
+
+
+def test_loadedValuesCanBeEditedAndSaved(store, tmp_path):
+    filePath = os.path.join(str(tmp_path), 'rig1.json')
+    store.save(filePath, rigData(1))
+    data = store.load(filePath)
+    data['controls']['extra'] = 1
+    store.save(filePath, data)
+    assert store.load(filePath)['controls']['extra'] == 1
+
+    edited = dataStore.plainData(store.load(filePath))
+    assert isinstance(edited, dict)
+    edited['added'] = [1, 2]
+    json.dumps(edited)
+    store.save(filePath, edited)
+    assert store.load(filePath)['added'] == [1, 2]
+    assert json.loads(dataStore.dumpJson(store.load(filePath)))['added'] == [1, 2]
+
+
+def test_sqliteOnlyDecodesRequestedKeys(tmp_path, monkeypatch):
+    store = dataStore.SqliteStore(str(tmp_path))
+    filePath = os.path.join(str(tmp_path), 'MirrorTools', 'rig2.json')
+    data = dict(('key%d' % index, rigData(index)) for index in range(50))
+    store.save(filePath, data)
+    decoded = list()
+    loads = json.loads
+
+    def countingLoads(text, *args, **kwargs):
+        decoded.append(text)
+        return loads(text, *args, **kwargs)
+
+    monkeypatch.setattr(dataStore.json, 'loads', countingLoads)
+    document = store.load(filePath)
+    assert isinstance(document, dataStore.LazyDocument)
+    assert len(document) == 50
+    assert 'key3' in document and 'missing' not in document
+    assert document.get('missing', 'default') == 'default'
+    assert decoded == []
+    assert document['key3']['controls']['ctrl2']['up'] == 'ctrl3'
+    assert document['key3']['name'] == 'rig3'
+    # one decode, cached for the second lookup
+    assert len(decoded) == 1
+    assert list(document.keys())[:3] == ['key0', 'key1', 'key2']
+    assert len(decoded) == 1
+    assert document == data
+    store.close()
+
+
+def test_sqliteSavesUndecodedKeysUnchanged(tmp_path):
+    store = dataStore.SqliteStore(str(tmp_path))
+    filePath = os.path.join(str(tmp_path), 'rig3.json')
+    store.save(filePath, {'a': rigData(0), 'b': [1, 2]})
+    document = store.load(filePath)
+    document['b'].append(3)
+    store.save(filePath, document)
+    assert list(document.decoded.keys()) == ['b']
+    assert store.load(filePath) == {'a': rigData(0), 'b': [1, 2, 3]}
+    store.close()
+
+
+def test_deferredSaveOfALoadedDocument(tmp_path):
+    store = dataStore.SqliteStore(str(tmp_path))
+    filePath = os.path.join(str(tmp_path), 'rig4.json')
+    store.save(filePath, rigData(4))
+    store.saveDeferred(filePath, store.load(filePath))
+    assert store.load(filePath) == rigData(4)
+    dataStore.flushSaves()
+    assert store.load(filePath) == rigData(4)
+    store.close()
+
+
+def test_keyOrderIsKept(store, tmp_path):
+    filePath = os.path.join(str(tmp_path), 'ordered.json')
+    data = dict((name, index) for index, name in enumerate(['zeta', 'alpha', 'mid', 'beta']))
+    store.save(filePath, data)
+    store.save(filePath, data)
+    assert list(store.load(filePath).keys()) == ['zeta', 'alpha', 'mid', 'beta']
+
+
+def test_nonMappingDocuments(store, tmp_path):
+    filePath = os.path.join(str(tmp_path), 'list.json')
+    store.save(filePath, [1, 'two', {'three': 3}])
+    assert store.load(filePath) == [1, 'two', {'three': 3}]
+
+
+def test_sqliteImportsJsonFilesOnFirstRead(tmp_path):
+    filePath = os.path.join(str(tmp_path), 'legacy.json')
+    dataStore.JsonStore().save(filePath, rigData(2))
+    store = dataStore.SqliteStore(str(tmp_path))
+    try:
+        assert store.load(filePath) == rigData(2)
+        os.remove(filePath)
+        assert store.load(filePath) == rigData(2)
+    finally:
+        store.close()
+
+
+def test_migrateJsonTree(tmp_path):
+    root = str(tmp_path)
+    jsonStore = dataStore.JsonStore(root)
+    for tool in ('SpaceSwitch', 'Pickwalk'):
+        os.mkdir(os.path.join(root, tool))
+        for index in range(3):
+            jsonStore.save(os.path.join(root, tool, 'rig%d.json' % index), rigData(index))
+    with open(os.path.join(root, 'Pickwalk', 'broken.json'), 'w') as brokenFile:
+        brokenFile.write('{not json')
+    store = dataStore.SqliteStore(root)
+    try:
+        migrated, failed = dataStore.migrateJsonTree(root, store)
+        assert len(migrated) == 6
+        assert failed == [os.path.join(root, 'Pickwalk', 'broken.json')]
+        assert store.hasDocument('SpaceSwitch', 'rig1')
+        assert dataStore.migrateJsonTree(root, store) == ([], failed)
+    finally:
+        store.close()
+
+
+def test_pathsOutsideTheRootStayJson(tmp_path):
+    root = tmp_path / 'appData'
+    root.mkdir()
+    store = dataStore.SqliteStore(str(root))
+    try:
+        filePath = str(tmp_path / 'outside.json')
+        store.save(filePath, {'a': 1})
+        with open(filePath) as jsonFile:
+            assert json.load(jsonFile) == {'a': 1}
+    finally:
+        store.close()
+
+
+@pytest.fixture
+def saveQueue(monkeypatch):
+    """
+    A fresh queue with a hand wound clock and no worker thread, due saves are written by writeDue
+    """
+    queue = dataStore.SaveQueue(delay=0.25, maxDelay=2.0)
+    queue.now = 0.0
+    queue.clock = lambda: queue.now
+    queue.startWorker = lambda: None
+    monkeypatch.setattr(dataStore, 'saveQueue', queue)
+    return queue
+
+
+def readFile(filePath):
+    with open(filePath) as jsonFile:
+        return json.load(jsonFile)
+
+
+def test_rapidSavesAreCoalesced(saveQueue, tmp_path):
+    store = dataStore.JsonStore(str(tmp_path))
+    filePath = os.path.join(str(tmp_path), 'walk.json')
+    for index in range(50):
+        store.saveDeferred(filePath, {'index': index})
+        saveQueue.now += 0.01
+    assert not os.path.exists(filePath)
+    assert store.load(filePath) == {'index': 49}
+    saveQueue.now += 0.25
+    saveQueue.writeDue()
+    assert readFile(filePath) == {'index': 49}
+    assert saveQueue.stats() == {'requests': 50, 'writes': 1, 'pending': 0, 'errors': 0}
+
+
+def test_fileThatKeepsChangingIsWrittenEveryMaxDelay(saveQueue, tmp_path):
+    store = dataStore.JsonStore(str(tmp_path))
+    filePath = os.path.join(str(tmp_path), 'busy.json')
+    for index in range(100):
+        store.saveDeferred(filePath, {'index': index})
+        saveQueue.now += 0.1
+        saveQueue.writeDue()
+    saveQueue.flush()
+    assert readFile(filePath) == {'index': 99}
+    assert saveQueue.writes == 5
+
+
+def test_queuedSnapshotIgnoresLaterEdits(saveQueue, tmp_path):
+    store = dataStore.JsonStore(str(tmp_path))
+    filePath = os.path.join(str(tmp_path), 'snapshot.json')
+    data = {'controls': ['a']}
+    store.saveDeferred(filePath, data)
+    data['controls'].append('b')
+    assert store.load(filePath) == {'controls': ['a']}
+    store.load(filePath)['controls'].append('c')
+    saveQueue.flush()
+    assert readFile(filePath) == {'controls': ['a']}
+
+
+def test_noLostUpdatesAcrossThreads(tmp_path):
+    queue = dataStore.SaveQueue(delay=0.01, maxDelay=0.05)
+    store = dataStore.JsonStore(str(tmp_path))
+    fileNames = [os.path.join(str(tmp_path), 'rig%d.json' % x) for x in range(4)]
+
+    def save(writer):
+        for index in range(200):
+            queue.save(store, fileNames[writer], {'writer': writer, 'index': index})
+
+    threads = [threading.Thread(target=save, args=(writer,)) for writer in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.flush()
+    for writer, fileName in enumerate(fileNames):
+        assert readFile(fileName) == {'writer': writer, 'index': 199}
+    assert queue.requests == 800
+    assert queue.writes < 800
+    assert not queue.errors
+
+
+def test_interruptedWriteKeepsTheOldFile(monkeypatch, tmp_path):
+    filePath = os.path.join(str(tmp_path), 'data.json')
+    dataStore.writeFileAtomic(filePath, json.dumps({'old': True}))
+
+    def crash(fileno):
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(dataStore.os, 'fsync', crash)
+    with pytest.raises(KeyboardInterrupt):
+        dataStore.writeFileAtomic(filePath, json.dumps({'new': True}))
+    assert readFile(filePath) == {'old': True}
+    assert os.listdir(str(tmp_path)) == ['data.json']
+
+
+def test_failedQueuedWriteIsRecorded(saveQueue, monkeypatch, tmp_path):
+    store = dataStore.JsonStore(str(tmp_path))
+    filePath = os.path.join(str(tmp_path), 'data.json')
+    store.save(filePath, {'old': True})
+
+    def crash(source, destination):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(dataStore, 'replaceFile', crash)
+    store.saveDeferred(filePath, {'new': True})
+    saveQueue.flush()
+    assert readFile(filePath) == {'old': True}
+    assert saveQueue.stats()['errors'] == 1
+    assert os.listdir(str(tmp_path)) == ['data.json']
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='posix permissions')
+def test_savingKeepsFilePermissions(tmp_path):
+    filePath = os.path.join(str(tmp_path), 'shared.json')
+    with open(filePath, 'w') as jsonFile:
+        jsonFile.write('{}')
+    os.chmod(filePath, 0o664)
+    dataStore.writeFileAtomic(filePath, json.dumps({'a': 1}))
+    assert os.stat(filePath).st_mode & 0o777 == 0o664
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='posix permissions')
+def test_newFilesFollowTheUmask(tmp_path):
+    filePath = os.path.join(str(tmp_path), 'new.json')
+    dataStore.writeFileAtomic(filePath, '{}')
+    assert os.stat(filePath).st_mode & 0o777 == dataStore.newFileMode
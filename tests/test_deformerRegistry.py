@@ -0,0 +1,226 @@
+import pytest
+
+import apps.tb_deformerRegistry as deformerRegistry
+import apps.tb_visibility as visibility
+from apps.tb_deformerRegistry import DeformerRegistry
+from apps.tb_visibility import getAncestorPaths
+from test_visibility import FakeScene
+
+
+class FakeDagPath(object):
+    def __init__(self, path):
+        self.path = path
+
+    def node(self):
+        return self.path
+
+
+class DeformerScene(FakeScene):
+    """
+    The visibility scene plus deformers, standing in for maya.cmds and OpenMaya
+    in both the registry and tb_visibility
+    """
+
+    def __init__(self):
+        super(DeformerScene, self).__init__()
+        self.deformers = dict()
+        self.shapes = dict()
+        self.attributes = dict()
+        self.refreshSuspended = False
+        self.refreshChanges = 0
+
+    def addDeformer(self, name, deformerType, shapes):
+        self.deformers[name] = deformerType
+        self.shapes[name] = shapes
+        self.attributes[name + '.frozen'] = False
+        self.attributes[name + '.nodeState'] = 0
+        for path in getAncestorPaths(shapes):
+            if path not in self.nodes:
+                self.addNode(path)
+
+    def ls(self, *args, **kwargs):
+        if kwargs.get('type', 'displayLayer') != 'displayLayer':
+            self.count('ls')
+            return [name for name, deformerType in self.deformers.items() if deformerType == kwargs['type']]
+        return super(DeformerScene, self).ls(*args, **kwargs)
+
+    def objExists(self, name):
+        return name in self.deformers
+
+    def getAttr(self, plug):
+        if plug in self.attributes:
+            self.count('getAttr')
+            return self.attributes[plug]
+        return super(DeformerScene, self).getAttr(plug)
+
+    def setAttr(self, plug, value):
+        self.count('setAttr')
+        self.attributes[plug] = value
+
+    def refresh(self, suspend=False):
+        if suspend != self.refreshSuspended:
+            self.refreshChanges += 1
+        self.refreshSuspended = suspend
+
+
+@pytest.fixture
+def scene(monkeypatch):
+    fake = DeformerScene()
+    fake.addDeformer('bodySkin', 'skinCluster', ['|char|geo|body|bodyShape'])
+    fake.addDeformer('propSkin', 'skinCluster', ['|char|props|sword|swordShape'])
+    fake.addDeformer('faceShapes', 'blendShape', ['|char|geo|face|faceShape'])
+    fake.addDeformer('jiggle', 'deltaMush', ['|char|geo|body|bodyShape'])
+    for module in [deformerRegistry, visibility]:
+        monkeypatch.setattr(module, 'cmds', fake)
+        monkeypatch.setattr(module, 'om2', fake)
+
+    class MockRegistry(DeformerRegistry):
+        def installCallbacks(self):
+            pass
+
+        @staticmethod
+        def getOutputShapes(deformer, maxDepth=32):
+            return list(fake.shapes[deformer])
+
+        @staticmethod
+        def getNodeHash(node):
+            return node
+
+    monkeypatch.setattr(DeformerRegistry, '_DeformerRegistry__instance', None)
+    for attribute, value in [('sceneVersion', 0), ('cachedVersion', -1), ('deformerShapes', dict()),
+                             ('deformerTypes', dict()), ('shapePaths', list()), ('trackedNodes', set()),
+                             ('suspended', dict()), ('suspendDepth', 0)]:
+        monkeypatch.setattr(DeformerRegistry, attribute, value)
+    fake.registry = MockRegistry()
+    return fake
+
+
+def test_validDeformersFollowThePolicy(scene):
+    registry = scene.registry
+    assert sorted(registry.getValidDeformers(['skinCluster'])) == ['bodySkin', 'propSkin']
+    assert sorted(registry.getValidDeformers(['skinCluster', 'blendShape', 'deltaMush'])) == \
+        ['bodySkin', 'faceShapes', 'jiggle', 'propSkin']
+
+
+def test_hiddenAncestorsAndLayersAreSkipped(scene):
+    registry = scene.registry
+    scene.addNode('|char|props', visible=False)
+    scene.addLayer('hiddenLayer', ['|char|geo|face'], visible=False)
+    assert sorted(registry.getValidDeformers(['skinCluster', 'blendShape'])) == ['bodySkin']
+
+
+def test_drawOverridesAreSkipped(scene):
+    registry = scene.registry
+    scene.addNode('|char|geo|face', overrideEnabled=True, overrideVisibility=False)
+    assert sorted(registry.getValidDeformers(['skinCluster', 'blendShape'])) == ['bodySkin', 'propSkin']
+
+
+def test_sameRulesAsTheCacheTool(scene):
+    registry = scene.registry
+    scene.addNode('|char|geo|body', overrideEnabled=True, overrideVisibility=False)
+    scene.addLayer('hiddenLayer', ['|char|props|sword'], visible=False)
+    valid = registry.getValidDeformers(['skinCluster', 'blendShape', 'deltaMush'])
+    resolver = visibility.getVisibilityResolver(registry.shapePaths)
+    for deformer, shapes in registry.deformerShapes.items():
+        assert (deformer in valid) == any(resolver.isVisible(shape) for shape in shapes)
+        assert (deformer in valid) == any(scene.isVisible(shape) for shape in shapes)
+    assert valid == ['faceShapes']
+
+
+def test_repeatedEntriesSkipTheScan(scene):
+    registry = scene.registry
+    registry.getValidDeformers(['skinCluster'])
+    scanCalls = scene.calls['ls']
+    for x in range(5):
+        registry.getValidDeformers(['skinCluster'])
+    # only the display layer query runs again, the deformer scan doesn't
+    assert scene.calls['ls'] == scanCalls + 5
+
+    # visibility is still read live for the cached shapes
+    scene.addNode('|char|geo', visible=False)
+    assert registry.getValidDeformers(['skinCluster']) == ['propSkin']
+
+
+def test_sceneChangesTriggerARescan(scene):
+    registry = scene.registry
+    registry.getValidDeformers(['skinCluster'])
+    scene.addDeformer('newSkin', 'skinCluster', ['|other|otherShape'])
+    assert 'newSkin' not in registry.getValidDeformers(['skinCluster'])
+    DeformerRegistry.sceneChanged()
+    assert 'newSkin' in registry.getValidDeformers(['skinCluster'])
+
+
+def test_onlyTrackedNodesInvalidate(scene):
+    registry = scene.registry
+    registry.getValidDeformers(['skinCluster'])
+    # temp controls and locators coming and going during a bake
+    for node in ['|loc_baked', '|char|geo|body|tempControl', '|null']:
+        registry.trackedNodeRemoved(node)
+        registry.trackedNodeReparented(None, FakeDagPath(node), FakeDagPath('|'))
+    assert registry.isCacheValid()
+
+    registry.trackedNodeReparented(None, FakeDagPath('|char|props'), FakeDagPath('|other'))
+    assert not registry.isCacheValid()
+    registry.getValidDeformers(['skinCluster'])
+    registry.trackedNodeRemoved('|char|geo|body|bodyShape')
+    assert not registry.isCacheValid()
+
+
+def test_missingShapeRebuilds(scene):
+    registry = scene.registry
+    registry.getValidDeformers(['skinCluster'])
+    del scene.nodes['|char|props|sword|swordShape']
+    scene.shapes['propSkin'] = list()
+    assert registry.getValidDeformers(['skinCluster']) == ['bodySkin']
+    assert registry.isCacheValid()
+
+
+def test_suspendAndResumeRestoreState(scene):
+    registry = scene.registry
+    scene.attributes['propSkin.nodeState'] = 2
+    deformers = registry.getValidDeformers(['skinCluster'])
+    registry.suspend(deformers)
+    assert sorted(registry.suspended.keys()) == ['bodySkin', 'propSkin']
+    for deformer in deformers:
+        assert scene.attributes[deformer + '.frozen'] == 1
+        assert scene.attributes[deformer + '.nodeState'] == 1
+    # the deltaMush isn't in the policy so it's left alone
+    assert scene.attributes['jiggle.nodeState'] == 0
+
+    assert scene.refreshSuspended
+
+    registry.resume()
+    assert not scene.refreshSuspended
+    assert registry.suspended == dict()
+    assert scene.attributes['bodySkin.nodeState'] == 0
+    assert scene.attributes['propSkin.nodeState'] == 2
+    assert scene.attributes['bodySkin.frozen'] is False
+
+
+def test_nestedSuspensionsResumeAtTheOuterLevel(scene):
+    registry = scene.registry
+    deformers = registry.getValidDeformers(['skinCluster'])
+    registry.suspend(deformers)
+    setCalls = scene.calls['setAttr']
+    registry.suspend(deformers)
+    assert scene.calls['setAttr'] == setCalls
+    registry.resume()
+    assert scene.attributes['bodySkin.nodeState'] == 1
+    # the inner exit leaves the viewport suspended for the outer block
+    assert scene.refreshSuspended
+    assert scene.refreshChanges == 1
+    registry.resume()
+    assert scene.attributes['bodySkin.nodeState'] == 0
+    assert not scene.refreshSuspended
+    assert scene.refreshChanges == 2
+
+
+def test_forcedResume(scene):
+    registry = scene.registry
+    deformers = registry.getValidDeformers(['skinCluster'])
+    registry.suspend(deformers)
+    registry.suspend(deformers)
+    registry.resume(force=True)
+    assert registry.suspendDepth == 0
+    assert not scene.refreshSuspended
+    assert scene.attributes['bodySkin.nodeState'] == 0
@@ -0,0 +1,257 @@
+from collections import OrderedDict
+
+import pytest
+
+import apps.tb_eventDispatcher as eventDispatcher
+from apps.tb_eventDispatcher import EventDispatcher, SelectionSnapshot
+
+
+class FakeCmds(object):
+    """
+    scriptJob and ls stand ins, fire() calls the jobs like maya would
+    """
+
+    def __init__(self):
+        self.jobs = dict()
+        self.nextJob = 0
+        self.selection = list()
+        self.lsCalls = 0
+        self.warnings = list()
+
+    def scriptJob(self, event=None, conditionTrue=None, kill=None, force=False):
+        if kill is not None:
+            self.jobs.pop(kill)
+            return
+        self.nextJob += 1
+        self.jobs[self.nextJob] = event or conditionTrue
+        return self.nextJob
+
+    def fire(self, event):
+        for name, function in list(self.jobs.values()):
+            if name == event:
+                function()
+
+    def ls(self, *args, **kwargs):
+        self.lsCalls += 1
+        return list(self.selection)
+
+    def warning(self, message):
+        self.warnings.append(message)
+
+
+class FakeLoop(object):
+    """
+    Idle queue and timers run by hand, with a clock that only moves when told to
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.queue = list()
+
+    def schedule(self, delay, function):
+        self.queue.append((self.now + delay, function))
+
+    def clock(self):
+        return self.now
+
+    def runIdle(self):
+        """
+        Run everything due now, including anything queued while running
+        :return: number of calls made
+        """
+        calls = 0
+        while True:
+            due = [item for item in self.queue if item[0] <= self.now]
+            if not due:
+                return calls
+            self.queue.remove(due[0])
+            due[0][1]()
+            calls += 1
+
+    def advance(self, seconds):
+        self.now += seconds
+        return self.runIdle()
+
+
+@pytest.fixture
+def fakeCmds(monkeypatch):
+    fake = FakeCmds()
+    monkeypatch.setattr(eventDispatcher, 'cmds', fake)
+    return fake
+
+
+@pytest.fixture
+def loop():
+    return FakeLoop()
+
+
+@pytest.fixture
+def dispatcher(monkeypatch, fakeCmds, loop):
+    monkeypatch.setattr(EventDispatcher, '_EventDispatcher__instance', None)
+    for attribute, value in (('scriptJobs', dict()),
+                             ('eventSubscribers', dict()),
+                             ('subscribers', OrderedDict()),
+                             ('pendingEvents', OrderedDict()),
+                             ('throttled', set()),
+                             ('sequence', 0),
+                             ('flushScheduled', False),
+                             ('delayScheduled', False),
+                             ('flushing', False),
+                             ('snapshot', None),
+                             ('scheduler', staticmethod(loop.schedule)),
+                             ('clock', staticmethod(loop.clock))):
+        monkeypatch.setattr(EventDispatcher, attribute, value)
+    return EventDispatcher()
+
+
+def recorder(calls, name):
+    return lambda: calls.append(name)
+
+
+def test_burstIsCoalescedIntoOneFlush(dispatcher, fakeCmds, loop):
+    calls = list()
+    dispatcher.subscribe('a', recorder(calls, 'a'), events=['SelectionChanged'])
+    for x in range(5):
+        fakeCmds.fire('SelectionChanged')
+    assert calls == []
+    assert loop.runIdle() == 1
+    assert calls == ['a']
+
+
+def test_subscribersRunOnceInSubscribeOrder(dispatcher, fakeCmds, loop):
+    calls = list()
+    dispatcher.subscribe('b', recorder(calls, 'b'), events=['SelectionChanged', 'DragRelease'])
+    dispatcher.subscribe('a', recorder(calls, 'a'), events=['DragRelease'])
+    dispatcher.subscribe('c', recorder(calls, 'c'), events=['SelectionChanged'])
+    fakeCmds.fire('DragRelease')
+    fakeCmds.fire('SelectionChanged')
+    loop.runIdle()
+    assert calls == ['b', 'a', 'c']
+
+
+def test_oneScriptJobPerEvent(dispatcher, fakeCmds):
+    dispatcher.subscribe('a', recorder([], 'a'), events=['SelectionChanged'])
+    dispatcher.subscribe('b', recorder([], 'b'), events=['SelectionChanged'])
+    dispatcher.subscribe('c', recorder([], 'c'), conditions=['playingBack'])
+    assert sorted(fakeCmds.jobs.values(), key=lambda x: x[0]) == [
+        ('SelectionChanged', fakeCmds.jobs[1][1]), ('playingBack', fakeCmds.jobs[2][1])]
+    dispatcher.unsubscribe('a')
+    assert len(fakeCmds.jobs) == 2
+    dispatcher.unsubscribe('b')
+    dispatcher.unsubscribe('c')
+    assert fakeCmds.jobs == {}
+
+
+def test_laterSubscriberMissesQueuedEvent(dispatcher, fakeCmds, loop):
+    calls = list()
+    dispatcher.subscribe('a', recorder(calls, 'a'), events=['SelectionChanged'])
+    fakeCmds.fire('SelectionChanged')
+    # like a once bake registered right after the selection it should ignore
+    dispatcher.subscribe('late', recorder(calls, 'late'), events=['SelectionChanged'], once=True)
+    loop.runIdle()
+    assert calls == ['a']
+    fakeCmds.fire('SelectionChanged')
+    loop.runIdle()
+    assert calls == ['a', 'a', 'late']
+
+
+def test_onceSubscriberIsRemoved(dispatcher, fakeCmds, loop):
+    calls = list()
+    dispatcher.subscribe('once', recorder(calls, 'once'), events=['SelectionChanged'], once=True)
+    fakeCmds.fire('SelectionChanged')
+    loop.runIdle()
+    fakeCmds.fire('SelectionChanged')
+    loop.runIdle()
+    assert calls == ['once']
+    assert not dispatcher.isSubscribed('once')
+    assert fakeCmds.jobs == {}
+
+
+def test_resubscribingReplaces(dispatcher, fakeCmds, loop):
+    calls = list()
+    dispatcher.subscribe('a', recorder(calls, 'old'), events=['SelectionChanged'])
+    dispatcher.subscribe('a', recorder(calls, 'new'), events=['SelectionChanged'])
+    fakeCmds.fire('SelectionChanged')
+    loop.runIdle()
+    assert calls == ['new']
+
+
+def test_throttledSubscriberIsDelayedNotDropped(dispatcher, fakeCmds, loop):
+    calls = list()
+    dispatcher.subscribe('slow', recorder(calls, 'slow'), events=['SelectionChanged'], interval=1.0)
+    dispatcher.subscribe('fast', recorder(calls, 'fast'), events=['SelectionChanged'])
+    fakeCmds.fire('SelectionChanged')
+    loop.runIdle()
+    loop.advance(0.25)
+    fakeCmds.fire('SelectionChanged')
+    loop.runIdle()
+    assert calls == ['slow', 'fast', 'fast']
+    fakeCmds.fire('SelectionChanged')
+    loop.advance(0.25)
+    # still throttled, the delayed flush is already waiting
+    assert calls == ['slow', 'fast', 'fast', 'fast']
+    loop.advance(0.5)
+    assert calls == ['slow', 'fast', 'fast', 'fast', 'slow']
+    assert loop.queue == []
+
+
+def test_snapshotIsSharedWithinAFlush(dispatcher, fakeCmds, loop):
+    fakeCmds.selection = ['pCube1', 'pCube1.vtx[0]', 'pCube1.vtx[1]', 'curve1.cv[2]', 'pCube1.f[3]', 'pCube1.e[4]',
+                          'mesh.map[0]']
+    snapshots = list()
+
+    def read():
+        snapshots.append(dispatcher.getSelectionSnapshot())
+
+    for name in 'abc':
+        dispatcher.subscribe(name, read, events=['SelectionChanged'])
+    fakeCmds.fire('SelectionChanged')
+    loop.runIdle()
+    assert fakeCmds.lsCalls == 1
+    assert snapshots[0] is snapshots[1] is snapshots[2]
+    snapshot = snapshots[0]
+    assert snapshot.objects == ['pCube1']
+    assert snapshot.vertices == ['pCube1.vtx[0]', 'pCube1.vtx[1]']
+    assert snapshot.cvs == ['curve1.cv[2]']
+    assert snapshot.faces == ['pCube1.f[3]']
+    assert snapshot.edges == ['pCube1.e[4]']
+    assert snapshot.otherComponents == ['mesh.map[0]']
+
+    fakeCmds.fire('SelectionChanged')
+    loop.runIdle()
+    assert fakeCmds.lsCalls == 2
+    assert snapshots[3] is not snapshot
+
+
+def test_emptySnapshotIsFalse():
+    assert not SelectionSnapshot(selection=[])
+    assert SelectionSnapshot(selection=['a'])
+
+
+def test_failingSubscriberDoesNotStopOthers(dispatcher, fakeCmds, loop):
+    calls = list()
+
+    def fail():
+        raise ValueError('broken')
+
+    dispatcher.subscribe('broken', fail, events=['SelectionChanged'])
+    dispatcher.subscribe('a', recorder(calls, 'a'), events=['SelectionChanged'])
+    fakeCmds.fire('SelectionChanged')
+    loop.runIdle()
+    assert calls == ['a']
+    assert len(fakeCmds.warnings) == 1 and 'broken' in fakeCmds.warnings[0]
+
+
+def test_stats(dispatcher, fakeCmds, loop):
+    def work():
+        loop.now += 0.5
+
+    dispatcher.subscribe('work', work, events=['SelectionChanged'])
+    for x in range(2):
+        fakeCmds.fire('SelectionChanged')
+        loop.runIdle()
+    stats = dispatcher.getStats()['work']
+    assert stats['calls'] == 2
+    assert stats['total'] == pytest.approx(1.0)
+    assert stats['average'] == pytest.approx(0.5)
+    assert stats['max'] == pytest.approx(0.5)
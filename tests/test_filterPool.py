@@ -0,0 +1,94 @@
+import math
+import os
+import random
+import sys
+
+import pytest
+
+from apps.tb_filterPool import CurveFilterPool, filterFunctions, shared_memory
+
+
+def syntheticCurves(curveCount=12, seed=1):
+    generator = random.Random(seed)
+    curves = dict()
+    for index in range(curveCount):
+        length = generator.randint(20, 400)
+        curves['curve%d' % index] = [math.sin(x * 0.1 + index) * 10.0 + generator.uniform(-1.0, 1.0)
+                                     for x in range(length)]
+    return curves
+
+
+filterArgs = {'gauss': (2.0,),
+              'highpass': (0.4, 2),
+              'butter': (4.0, 24.0, 2)}
+
+
+@pytest.mark.parametrize('filterName', sorted(filterArgs.keys()))
+def test_inProcessMatchesFilterFunction(filterName):
+    curves = syntheticCurves()
+    result = CurveFilterPool(workers=1).filterCurves(filterName, curves, *filterArgs[filterName])
+    for name, values in curves.items():
+        assert result[name] == filterFunctions[filterName](values, *filterArgs[filterName])
+
+
+@pytest.mark.skipif(shared_memory is None, reason='needs multiprocessing.shared_memory')
+@pytest.mark.parametrize('filterName', sorted(filterArgs.keys()))
+def test_outputIsIndependentOfWorkerCount(filterName):
+    curves = syntheticCurves()
+    expected = CurveFilterPool(workers=1).filterCurves(filterName, curves, *filterArgs[filterName])
+    try:
+        for workers in [2, 4]:
+            pool = CurveFilterPool(workers=workers, threshold=0)
+            assert pool.useWorkers(sum(len(x) for x in curves.values()), len(curves))
+            assert pool.filterCurves(filterName, curves, *filterArgs[filterName]) == expected
+    finally:
+        CurveFilterPool.close()
+
+
+def test_thresholdKeepsSmallSelectionsInProcess():
+    pool = CurveFilterPool(workers=4, threshold=1000)
+    assert not pool.useWorkers(999, 10)
+    assert not pool.useWorkers(100000, 1)
+    assert not CurveFilterPool(workers=1, threshold=0).useWorkers(100000, 10)
+
+
+def test_workersUseMayapy(tmp_path, monkeypatch):
+    monkeypatch.delenv('MAYA_LOCATION', raising=False)
+    contents = tmp_path / 'Maya.app' / 'Contents'
+    (contents / 'bin').mkdir(parents=True)
+    (contents / 'bin' / 'mayapy').write_text('')
+    monkeypatch.setattr(sys, 'executable', str(contents / 'MacOS' / 'Maya'))
+    assert CurveFilterPool.workerExecutable() == str(contents / 'bin' / 'mayapy')
+
+
+@pytest.mark.skipif(shared_memory is None, reason='needs multiprocessing.shared_memory')
+def test_noMayapyStaysInProcess(tmp_path, monkeypatch):
+    monkeypatch.delenv('MAYA_LOCATION', raising=False)
+    monkeypatch.setattr(sys, 'executable', os.path.join(str(tmp_path), 'MacOS', 'Maya'))
+    pool = CurveFilterPool(workers=4, threshold=0)
+    assert CurveFilterPool.workerExecutable() is None
+    assert not pool.useWorkers(100000, 10)
+    curves = syntheticCurves()
+    # filters in process, no pool is ever made with the gui executable
+    assert pool.filterCurves('gauss', curves, 2.0) == dict((name, filterFunctions['gauss'](values, 2.0))
+                                                          for name, values in curves.items())
+    assert CurveFilterPool.pool is None
+
+
+def test_emptyCurvesAreSkipped():
+    result = CurveFilterPool(workers=1).filterCurves('gauss', {'a': [], 'b': [1.0, 2.0, 3.0]}, 1.0)
+    assert list(result.keys()) == ['b']
+
+
+def test_shardSpansCoverEverySpanOnce():
+    spans = [(index * 100, length) for index, length in enumerate([50, 400, 10, 10, 200, 90, 5])]
+    shards = CurveFilterPool.shardSpans(spans, 3)
+    assert len(shards) == 3
+    assert sorted(span for shard in shards for span in shard) == sorted(spans)
+    loads = [sum(span[1] for span in shard) for shard in shards]
+    assert max(loads) == 400
+
+
+def test_shardSpansNeverMakesEmptyShards():
+    spans = [(0, 10), (10, 10)]
+    assert len(CurveFilterPool.shardSpans(spans, 8)) == 2
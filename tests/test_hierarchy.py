@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from apps.tb_hierarchy import DagHierarchy
+
+
+def syntheticHierarchy(count, seed=2, maxChildren=4):
+    """
+    Random tree of full dag paths, breadth first
+    """
+    generator = random.Random(seed)
+    paths = ['|root']
+    index = 0
+    while len(paths) < count:
+        parent = paths[index]
+        for x in range(generator.randint(1, maxChildren)):
+            if len(paths) >= count:
+                break
+            paths.append('%s|n%d' % (parent, len(paths)))
+        index += 1
+    return paths
+
+
+def ancestors(path):
+    parts = path.split('|')
+    return ['|'.join(parts[:i]) for i in range(2, len(parts))]
+
+
+def test_parentMapSkipsUnselectedAncestors():
+    hierarchy = DagHierarchy(['|a|b|c|d', '|a', '|x|y', '|a|b'])
+    assert hierarchy.parentMap == {'|a|b|c|d': '|a|b', '|a': None, '|x|y': None, '|a|b': '|a'}
+    assert hierarchy.getTopParent('|a|b|c|d') == '|a'
+
+
+def test_duplicatesAreDropped():
+    hierarchy = DagHierarchy(['|a', '|a|b', '|a'])
+    assert hierarchy.paths == ['|a', '|a|b']
+
+
+@pytest.mark.parametrize('count', [10, 1000, 10000])
+def test_sortByParentsOnSyntheticHierarchies(count):
+    paths = syntheticHierarchy(count)
+    generator = random.Random(count)
+    selection = generator.sample(paths, max(2, count // 3))
+    ordered = DagHierarchy(selection).sortByParents()
+    assert sorted(ordered) == sorted(selection)
+    position = {path: index for index, path in enumerate(ordered)}
+    selected = set(selection)
+    for path in ordered:
+        for ancestor in ancestors(path):
+            if ancestor in selected:
+                assert position[ancestor] < position[path]
+
+
+def test_sortKeepsSelectionOrderWithinDepth():
+    selection = ['|a|c', '|b', '|a|b', '|a']
+    assert DagHierarchy(selection).sortByParents() == ['|b', '|a', '|a|c', '|a|b']
+
+
+def test_chainsRunToTheDeepestDescendant():
+    selection = ['|root|a', '|root|a|b|c', '|root|a|b|c|d|e', '|root|a|x', '|other']
+    chains = DagHierarchy(selection).getChains()
+    assert list(chains.keys()) == ['|root|a']
+    assert chains['|root|a'] == ['|root|a|b', '|root|a|b|c', '|root|a|b|c|d', '|root|a|b|c|d|e']
+
+
+@pytest.mark.parametrize('count', [100, 10000])
+def test_chainsOnSyntheticHierarchies(count):
+    paths = syntheticHierarchy(count)
+    generator = random.Random(count + 1)
+    selection = generator.sample(paths, count // 4)
+    hierarchy = DagHierarchy(selection)
+    chains = hierarchy.getChains()
+    for top, chain in chains.items():
+        assert hierarchy.parentMap[top] is None
+        parent = top
+        for path in chain:
+            assert DagHierarchy.getParentPath(path) == parent
+            parent = path
+        # no selected node under the top goes deeper than the chain
+        deepest = max(DagHierarchy.depth(path) for path in selection if path.startswith(top + '|'))
+        assert DagHierarchy.depth(chain[-1]) == deepest
@@ -0,0 +1,192 @@
+import math
+
+import pytest
+
+from apps.tb_locomotionAnalysis import velocities, floorSpeeds, principalDirection, dominantAxis, curvature, \
+    strideSegments, TrajectoryAnalysis, analyseTrajectories, getFloorAxes, defaultForwardAxis
+
+
+def straight(frames, direction=(0.0, 0.0, 1.0), speed=2.0, bob=0.0):
+    """
+    Walking in a line with an optional up and down bob
+    """
+    return [[direction[0] * speed * frame, bob * math.sin(frame * 0.5), direction[2] * speed * frame]
+            for frame in frames]
+
+
+def circle(frames, radius=50.0, degreesPerFrame=1.0, clockwise=False):
+    sign = -1.0 if clockwise else 1.0
+    points = list()
+    for frame in frames:
+        angle = math.radians(frame * degreesPerFrame) * sign
+        # looking down y, counter clockwise goes from +x towards -z
+        points.append([radius * math.cos(angle), 0.0, -radius * math.sin(angle)])
+    return points
+
+
+def strafe(frames, forward=(0.0, 0.0, 1.0), speed=1.5, sway=4.0):
+    """
+    Moving sideways along x, swaying forward and back
+    """
+    return [[speed * frame, 0.0, sway * math.sin(frame * 0.3)] for frame in frames]
+
+
+def steps(frames, stride=20, plant=8, length=30.0):
+    """
+    A foot that plants for a few frames then swings to the next plant
+    """
+    points = list()
+    for frame in frames:
+        cycle, phase = divmod(frame, stride)
+        if phase < plant:
+            offset = 0.0
+        else:
+            t = (phase - plant) / float(stride - plant)
+            offset = (1.0 - math.cos(t * math.pi)) * 0.5
+        points.append([0.0, math.sin(offset * math.pi) * 5.0, (cycle + offset) * length])
+    return points
+
+
+frames = list(range(200))
+
+
+def test_getFloorAxes():
+    assert getFloorAxes('y') == [0, 2]
+    assert getFloorAxes('z') == [0, 1]
+
+
+def test_straightLine():
+    analysis = TrajectoryAnalysis(straight(frames, bob=3.0), frames)
+    assert analysis.forwardAxis == 'z'
+    assert analysis.direction == pytest.approx([0.0, 0.0, 1.0])
+    assert analysis.speed == pytest.approx([2.0] * len(frames))
+    assert max(abs(k) for k in analysis.curvature) < 1.0e-12
+    assert analysis.distance == pytest.approx(2.0 * (len(frames) - 1))
+
+
+def test_straightLineBackwards():
+    analysis = TrajectoryAnalysis(straight(frames, direction=(-0.6, 0.0, -0.8)), frames)
+    assert analysis.direction == pytest.approx([-0.6, 0.0, -0.8])
+    assert analysis.forwardAxis == 'z'
+
+
+def test_diagonalPicksTheLargerAxis():
+    analysis = TrajectoryAnalysis(straight(frames, direction=(0.8, 0.0, 0.6)), frames)
+    assert analysis.forwardAxis == 'x'
+
+
+def test_strafe():
+    # the start to end difference and the spread both point along x
+    analysis = TrajectoryAnalysis(strafe(frames), frames)
+    assert analysis.forwardAxis == 'x'
+    assert analysis.direction[0] > 0.99
+    assert abs(analysis.averageCurvature) < 0.05
+
+
+@pytest.mark.parametrize('clockwise', [False, True])
+def test_circleCurvature(clockwise):
+    radius = 50.0
+    quarter = list(range(90))
+    analysis = TrajectoryAnalysis(circle(quarter, radius=radius, clockwise=clockwise), quarter)
+    expected = -1.0 / radius if clockwise else 1.0 / radius
+    assert analysis.curvature == pytest.approx([expected] * len(quarter), rel=1.0e-6)
+    assert analysis.averageCurvature == pytest.approx(expected, rel=1.0e-6)
+    assert analysis.speed == pytest.approx([radius * math.radians(1.0)] * len(quarter), rel=1.0e-3)
+
+
+def test_curvedPathDirection():
+    # a quarter circle from +x to -z, start to end is diagonal but travel is mostly along the arc
+    quarter = list(range(91))
+    analysis = TrajectoryAnalysis(circle(quarter), quarter)
+    assert analysis.direction[1] == 0.0
+    assert analysis.direction[0] < 0.0
+    assert analysis.direction[2] < 0.0
+    assert math.hypot(analysis.direction[0], analysis.direction[2]) == pytest.approx(1.0)
+
+
+def test_fullCircleStillHasADirection():
+    analysis = TrajectoryAnalysis(circle(list(range(361))), list(range(361)))
+    assert analysis.direction is not None
+    assert analysis.distance == pytest.approx(2.0 * math.pi * 50.0, rel=1.0e-3)
+
+
+def test_notMoving():
+    points = [[1.0, 2.0, 3.0]] * 20
+    analysis = TrajectoryAnalysis(points, list(range(20)))
+    assert analysis.direction is None
+    assert analysis.forwardAxis is None
+    assert analysis.averageCurvature == 0.0
+    assert analysis.strides == []
+    assert principalDirection(points[:1]) is None
+    assert dominantAxis(None) is None
+
+
+@pytest.mark.parametrize('upAxis', ['y', 'z'])
+def test_stationaryControlsFallBackToAFloorAxis(upAxis):
+    # a rotate only control and one bobbing up and down in place
+    still = [[1.0, 2.0, 3.0]] * 20
+    up = getFloorAxes(upAxis)
+    bobbing = [[0.0, 0.0, 0.0] for frame in range(20)]
+    for frame, point in enumerate(bobbing):
+        point['xyz'.index(upAxis)] = math.sin(frame * 0.3) * 5.0
+    for points in (still, bobbing):
+        analysis = TrajectoryAnalysis(points, list(range(20)), upAxis=upAxis)
+        assert analysis.isStationary
+        assert analysis.forwardAxis is None
+        assert analysis.getForwardAxis() == defaultForwardAxis(upAxis)
+        assert 'xyz'.index(analysis.getForwardAxis()) in up
+    assert defaultForwardAxis('y') == 'x'
+    assert defaultForwardAxis('z') == 'x'
+
+
+def test_movingControlsKeepTheirForwardAxis():
+    analysis = TrajectoryAnalysis(straight(frames), frames)
+    assert not analysis.isStationary
+    assert analysis.getForwardAxis() == analysis.forwardAxis == 'z'
+
+
+def test_velocities():
+    points = [[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [3.0, 0.0, 0.0], [6.0, 0.0, 0.0]]
+    assert velocities(points) == [[1.0, 0.0, 0.0], [1.5, 0.0, 0.0], [2.5, 0.0, 0.0], [3.0, 0.0, 0.0]]
+    assert velocities(points, fps=24.0)[0] == [24.0, 0.0, 0.0]
+    assert velocities(points[:1]) == [[0.0, 0.0, 0.0]]
+    assert floorSpeeds([[3.0, 10.0, 4.0]]) == [5.0]
+    assert floorSpeeds([[3.0, 4.0, 10.0]], upAxis='z') == [5.0]
+
+
+def test_zUp():
+    points = [[0.0, frame * 1.0, 0.5 * frame] for frame in frames]
+    analysis = TrajectoryAnalysis(points, frames, upAxis='z')
+    assert analysis.forwardAxis == 'y'
+    assert analysis.direction[2] == 0.0
+
+
+def test_curvatureEnds():
+    result = curvature(circle(list(range(10)), radius=10.0))
+    assert result[0] == result[1]
+    assert result[-1] == result[-2]
+    assert curvature([[0, 0, 0], [1, 0, 0]]) == [0.0, 0.0]
+
+
+def test_strides():
+    stepFrames = list(range(100, 200))
+    analysis = TrajectoryAnalysis(steps(list(range(100))), stepFrames)
+    assert analysis.forwardAxis == 'z'
+    assert analysis.strides == [(100 + start, 100 + start + 20) for start in range(0, 80, 20)]
+
+
+def test_strideSegments():
+    speeds = [0, 0, 0, 5, 5, 5, 0, 5, 5, 0, 0, 0, 5, 5]
+    # the one frame stop doesn't count as a plant
+    assert strideSegments(speeds) == [(0, 9)]
+    assert strideSegments(speeds, minimumLength=1) == [(0, 6), (6, 9)]
+    assert strideSegments([]) == []
+
+
+def test_analyseTrajectories():
+    trajectories = {'straight': straight(frames), 'strafe': strafe(frames), 'circle': circle(frames)}
+    result = analyseTrajectories(trajectories, frames, fps=24.0)
+    assert sorted(result.keys()) == ['circle', 'strafe', 'straight']
+    assert result['straight'].speed[0] == pytest.approx(48.0)
+    assert result['strafe'].forwardAxis == 'x'
+    assert result['circle'].averageCurvature == pytest.approx(1.0 / 50.0, rel=1.0e-6)
@@ -0,0 +1,226 @@
+import json
+import math
+import random
+
+import pytest
+
+import apps.tb_transformMath as transformMath
+import apps.tb_locomotionGraphs as locomotionGraphs
+from apps.tb_nodeGraph import NodeGraph
+from apps.tb_locomotionGraphs import evaluateCircleExpression, circleNetwork, circleExpressionString, \
+    parseCircleExpression, circleNodeCounts, getRedirectNames, redirectGraph, redirectStrafeGraph
+from test_transformMath import assertMatricesClose
+
+circleArguments = {'turnControl': 'ns:walk_CTRL',
+                   'turnAttr': 'DegreesPerMeter',
+                   'rotateAttr': 'rotateY',
+                   'circleCentreAttr': 'circleCentre',
+                   'floorForwardAttr': 'translateZ',
+                   'floorSideAttr': 'translateX',
+                   'offsetAttr': 'ns:walk_CTRL.offset',
+                   'driverControl': 'ns:walk_CTRL',
+                   'outputNode': 'ns:walk_circle'}
+
+
+def getCircleGraph(driverAxis, upAxis):
+    return circleNetwork(turnPlug='walk.turn',
+                         driverPlug='walk.translate' + driverAxis.upper(),
+                         offsetPlug='walk.offset',
+                         circleCentrePlug='walk.circleCentre',
+                         outputNode='circle',
+                         rotateAttr='rotateY',
+                         floorForwardAttr='forward',
+                         floorSideAttr='side',
+                         upAxis=upAxis)
+
+
+def evaluateCircleGraph(graph, driverAxis, progress, offset, turn):
+    result = graph.evaluate(['circle.forward', 'circle.side', 'circle.rotateY', 'walk.circleCentre'],
+                            inputs={'walk.turn': turn,
+                                    'walk.translate' + driverAxis.upper(): progress,
+                                    'walk.offset': offset})
+    return {'forward': result['circle.forward'],
+            'side': result['circle.side'],
+            # angles come out of the graph in radians
+            'rotate': math.degrees(result['circle.rotateY']),
+            'circleCentre': result['walk.circleCentre']}
+
+
+@pytest.mark.parametrize('driverAxis', ['x', 'z'])
+def test_nodeCounts(driverAxis):
+    for upAxis in ['y', 'z']:
+        assert getCircleGraph(driverAxis, upAxis).getNodeCount() == circleNodeCounts[driverAxis]
+
+
+@pytest.mark.parametrize('driverAxis', ['x', 'z'])
+@pytest.mark.parametrize('upAxis', ['y', 'z'])
+def test_networkMatchesTheExpression(driverAxis, upAxis):
+    graph = getCircleGraph(driverAxis, upAxis)
+    generator = random.Random(len(driverAxis + upAxis))
+    worst = 0.0
+    for x in range(500):
+        progress = generator.uniform(-2000.0, 2000.0)
+        offset = generator.uniform(-100.0, 100.0)
+        turn = generator.choice([generator.uniform(-90.0, 90.0), generator.uniform(-1.0, 1.0)])
+        expected = evaluateCircleExpression(progress, offset, turn, driverAxis=driverAxis, upAxis=upAxis)
+        result = evaluateCircleGraph(graph, driverAxis, progress, offset, turn)
+        for key, value in expected.items():
+            worst = max(worst, abs(result[key] - value) / max(1.0, abs(value)))
+    assert worst < 1.0e-6
+
+
+@pytest.mark.parametrize('driverAxis', ['x', 'z'])
+def test_sampledFramesOfAWalk(driverAxis):
+    """
+    A walk cycle moving forward 10 units a frame while the turn is keyed from straight to a tight circle
+    """
+    graph = getCircleGraph(driverAxis, 'y')
+    for frame in range(0, 240):
+        progress = frame * 10.0
+        turn = 0.0 if frame < 24 else min(45.0, (frame - 24) * 0.5)
+        expected = evaluateCircleExpression(progress, 25.0, turn, driverAxis=driverAxis)
+        result = evaluateCircleGraph(graph, driverAxis, progress, 25.0, turn)
+        for key in expected:
+            assert result[key] == pytest.approx(expected[key], rel=1.0e-7, abs=1.0e-7), (frame, key)
+
+
+def test_noTurnZeroesEverything():
+    for driverAxis in ['x', 'z']:
+        graph = getCircleGraph(driverAxis, 'y')
+        result = evaluateCircleGraph(graph, driverAxis, 123.0, 4.0, 0.0)
+        assert result == {'forward': 0.0, 'side': 0.0, 'rotate': 0.0, 'circleCentre': 0.0}
+        assert evaluateCircleExpression(123.0, 4.0, 0.0, driverAxis=driverAxis) == result
+
+
+def test_circleCentreIsTheRadius():
+    for turn in [1.0, 30.0, -45.0]:
+        circumference = 100.0 * 360.0 / turn
+        result = evaluateCircleExpression(10.0, 0.0, turn)
+        assert result['circleCentre'] == pytest.approx(circumference / (2.0 * locomotionGraphs.melPi))
+        assert result['rotate'] == pytest.approx(-10.0 * turn * 0.01, rel=1.0e-9)
+
+
+@pytest.mark.parametrize('driverAttr', ['translateX', 'translateZ'])
+@pytest.mark.parametrize('upAxis', ['y', 'z'])
+def test_parseCircleExpression(driverAttr, upAxis):
+    arguments = dict(circleArguments, driverAttr=driverAttr)
+    assert parseCircleExpression(circleExpressionString(upAxis=upAxis, **arguments)) == arguments
+
+
+def test_parseOtherExpressions():
+    assert parseCircleExpression('pCube1.translateY = sin(time);') is None
+    assert parseCircleExpression(str()) is None
+
+
+def redirectPlan(controls=('arm_CTRL', 'leg_CTRL'), jointOrients=('leg_CTRL',), upAxis='y'):
+    names = getRedirectNames
+    colours = {names(control)['rotationRoot']: (1.0, 0.5, 0.0) for control in controls}
+    shapes = {names(control)['rotationRoot']: [names(control)['rotationRoot'] + 'Shape'] for control in controls}
+    return redirectGraph(list(controls), 'strafe_CTRL', upAxis=upAxis, jointOrients=list(jointOrients),
+                         colours=colours, shapes=shapes)
+
+
+def test_redirectDryRunIsJson():
+    plan = redirectPlan().toJson()
+    text = json.dumps(plan, sort_keys=True)
+    assert json.loads(text) == json.loads(json.dumps(NodeGraph.fromJson(json.loads(text)).toJson(), sort_keys=True))
+
+
+def test_redirectNodes():
+    graph = redirectPlan()
+    assert list(graph.nodes.items()) == [
+        ('arm_CTRL_RotateBaked', 'transform'),
+        ('arm_CTRL_tiltCompose', 'composeMatrix'),
+        ('arm_CTRL_tiltInverse', 'inverseMatrix'),
+        ('leg_CTRL_RotateBaked', 'transform'),
+        ('leg_CTRL_tiltCompose', 'composeMatrix'),
+        ('leg_CTRL_tiltInverse', 'inverseMatrix'),
+        ('leg_CTRL_jointOrientCompose', 'composeMatrix'),
+        ('leg_CTRL_jointOrientMult', 'multMatrix'),
+        ('leg_CTRL_jointOrientInverse', 'inverseMatrix'),
+        ('leg_CTRL_jointOrientOutMult', 'multMatrix')]
+    assert graph.attributes == [('arm_CTRL_RotationRoot', 'animControl', 'message'),
+                                ('leg_CTRL_RotationRoot', 'animControl', 'message')]
+    assert ('arm_CTRL.message', 'arm_CTRL_RotationRoot.animControl') in graph.connections
+
+
+def test_redirectParenting():
+    graph = redirectPlan(controls=['arm_CTRL'], jointOrients=[])
+    assert dict(graph.parents) == {'arm_CTRL_RotateBaked': 'arm_CTRL_RotationRoot',
+                                   'arm_CTRL_TiltDirection': 'arm_CTRL_RotationRoot',
+                                   'arm_CTRL_RotateOffset': 'arm_CTRL_RotateBaked',
+                                   'arm_CTRL_RotationRoot': 'strafe_CTRL'}
+    assert graph.getValue('arm_CTRL_RotationRoot.inheritsTransform') is False
+    assert graph.getValue('arm_CTRL_RotateBaked.rotateOrder') == 2
+
+
+@pytest.mark.parametrize('upAxis', ['y', 'z'])
+def test_redirectLocksAllButTheUpRotation(upAxis):
+    graph = redirectPlan(controls=['arm_CTRL'], upAxis=upAxis)
+    states = dict(graph.attributeStates)
+    unlocked = 'arm_CTRL_TiltDirection.rotate' + upAxis.upper()
+    assert states.pop(unlocked) == {'lock': False, 'channelBox': True}
+    assert sorted(states.keys()) == sorted('arm_CTRL_TiltDirection.' + attribute for attribute in
+                                           ['rotateX', 'rotateY', 'rotateZ', 'translate', 'scale']
+                                           if attribute != 'rotate' + upAxis.upper())
+    assert all(state == {'lock': True, 'channelBox': False} for state in states.values())
+
+
+def test_redirectColours():
+    graph = redirectPlan(controls=['arm_CTRL'], jointOrients=[])
+    assert graph.getValue('arm_CTRL_RotationRoot.overrideColorRGB') == [1.0, 0.5, 0.0]
+    assert graph.getValue('arm_CTRL_RotationRoot.overrideRGBColors') is True
+    assert graph.getValue('arm_CTRL_RotationRootShape.overrideEnabled') is False
+    # no colour given for the offset control
+    assert graph.getValue('arm_CTRL_RotateOffset.overrideEnabled') is None
+
+
+def test_redirectCustomNames():
+    names = {'rotationRoot': 'tempA', 'rotateBaked': 'tempB', 'rotateOffset': 'tempC', 'tiltDirection': 'tempD'}
+    graph = redirectGraph(['arm_CTRL'], 'strafe_CTRL', names={'arm_CTRL': names})
+    assert 'tempB' in graph.nodes
+    assert graph.parents['tempC'] == 'tempB'
+    assert ('arm_CTRL_tiltInverse.outputMatrix', 'tempC.offsetParentMatrix') in graph.connections
+
+
+@pytest.mark.parametrize('jointOrient', [False, True])
+def test_redirectTiltCancels(jointOrient):
+    """
+    The offset control's parent matrix undoes the tilt so the control underneath stays put
+    """
+    graph = redirectPlan(controls=['leg_CTRL'], jointOrients=['leg_CTRL'] if jointOrient else [])
+    tilt = [0.3, 0.0, -0.2]
+    orient = [10.0, 20.0, -30.0]
+    inputs = {'leg_CTRL_TiltDirection.rotate' + axis: value for axis, value in zip('XYZ', tilt)}
+    inputs.update({'leg_CTRL.jointOrient' + axis: math.radians(value) for axis, value in zip('XYZ', orient)})
+    result = graph.evaluate(['leg_CTRL_tiltCompose.outputMatrix', 'leg_CTRL_tiltInverse.outputMatrix'], inputs)
+    tiltMatrix = transformMath.composeMatrix(rotate=[math.degrees(value) for value in tilt])
+    assertMatricesClose(result['leg_CTRL_tiltCompose.outputMatrix'], tiltMatrix)
+    expected = tiltMatrix
+    if jointOrient:
+        orientMatrix = transformMath.composeMatrix(rotate=orient)
+        expected = transformMath.multiply(transformMath.multiply(orientMatrix, tiltMatrix),
+                                          transformMath.inverse(orientMatrix))
+    assertMatricesClose(transformMath.multiply(result['leg_CTRL_tiltInverse.outputMatrix'], expected),
+                        transformMath.identity)
+
+
+def test_redirectStrafeGraph():
+    sources = {'root_A': {'X': 'curveAX.output', 'Z': 'curveAZ.output'}, 'root_B': dict()}
+    graph = redirectStrafeGraph(['root_A', 'root_B'], 'strafe_CTRL', sources)
+    plan = json.loads(json.dumps(graph.toJson()))
+    assert [node for node, nodeType in plan['nodes']] == ['root_A_strafeCompose', 'root_A_strafeMult',
+                                                          'root_A_strafePick', 'root_B_strafeCompose',
+                                                          'root_B_strafeMult', 'root_B_strafePick']
+    assert plan['disconnections'] == [['curveAX.output', 'root_A.translateX'],
+                                      ['curveAZ.output', 'root_A.translateZ']]
+    assert ['curveAX.output', 'root_A_strafeCompose.inputTranslateX'] in plan['connections']
+    assert ['root_A.translate', [0.0, 0.0, 0.0]] in plan['values']
+
+    # only the strafe control's translation moves the root
+    strafe = transformMath.composeMatrix(translate=(5.0, 0.0, 2.0), rotate=(0.0, 90.0, 0.0))
+    result = graph.evaluate(['root_A.offsetParentMatrix'],
+                            {'strafe_CTRL.worldMatrix[0]': strafe, 'curveAX.output': 1.0, 'curveAZ.output': 0.0})
+    offsetParent = result['root_A.offsetParentMatrix']
+    assertMatricesClose(offsetParent[:12], transformMath.identity[:12])
+    assertMatricesClose(offsetParent[12:15], transformMath.transformPoint([1.0, 0.0, 0.0], strafe))
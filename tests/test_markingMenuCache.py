@@ -0,0 +1,170 @@
+import pytest
+
+import apps.tb_markingMenuCache as markingMenuCache
+from apps.tb_markingMenuCache import MarkingMenuCache, getScope, getSelectionNamespaces, getSelectionSignature
+
+
+class FakeBaseTool(object):
+    markingMenuScope = markingMenuCache.scopeSelection
+
+    def qtMarkingMenu(self, inputNodes):
+        return list()
+
+
+class FakeTool(FakeBaseTool):
+    """
+    Builds menu data from the selection and counts how often it was asked to
+    """
+
+    def __init__(self, scope):
+        self.markingMenuScope = scope
+        self.builds = 0
+
+    def qtMarkingMenu(self, inputNodes):
+        self.builds += 1
+        return ['build %d' % self.builds] + list(inputNodes)
+
+
+class PlainTool(FakeBaseTool):
+    markingMenuScope = markingMenuCache.scopeSelection
+
+
+class ChildTool(FakeTool):
+    pass
+
+
+@pytest.fixture
+def cache():
+    return MarkingMenuCache()
+
+
+def test_staticIsBuiltOnce(cache):
+    tool = FakeTool(markingMenuCache.scopeStatic)
+    first = cache.get('tool', tool.markingMenuScope, ['a:ctrl'], tool.qtMarkingMenu)
+    assert cache.get('tool', tool.markingMenuScope, ['b:other', 'c:more'], tool.qtMarkingMenu) is first
+    assert tool.builds == 1
+    assert cache.stats['tool']['calls'] == 2
+    assert cache.stats['tool']['hits'] == 1
+
+
+def test_rigIsBuiltOncePerNamespaceSet(cache):
+    tool = FakeTool(markingMenuCache.scopeRig)
+    build = tool.qtMarkingMenu
+    a = cache.get('tool', markingMenuCache.scopeRig, ['charA:hand_L'], build)
+    assert cache.get('tool', markingMenuCache.scopeRig, ['charA:foot_R', 'charA:hand_R'], build) is a
+    b = cache.get('tool', markingMenuCache.scopeRig, ['charB:hand_L'], build)
+    assert b is not a
+    assert cache.get('tool', markingMenuCache.scopeRig, ['charB:hand_L', 'charA:hand_L'], build) not in (a, b)
+    assert tool.builds == 3
+
+
+def test_selectionIsBuiltOncePerSelectedNodes(cache):
+    tool = FakeTool(markingMenuCache.scopeSelection)
+    build = tool.qtMarkingMenu
+    one = cache.get('tool', markingMenuCache.scopeSelection, ['a:one', 'a:two'], build)
+    # same nodes picked in another order
+    assert cache.get('tool', markingMenuCache.scopeSelection, ['a:two', 'a:one'], build) is one
+    # same types, namespace and count, but other nodes
+    other = cache.get('tool', markingMenuCache.scopeSelection, ['a:three', 'a:four'], build)
+    assert other[1:] == ['a:three', 'a:four']
+    assert tool.builds == 2
+    assert cache.stats['tool']['hits'] == 1
+
+
+def test_selectionKeepsTheLatestSelections(cache):
+    cache.maxSelectionEntries = 2
+    tool = FakeTool(markingMenuCache.scopeSelection)
+    build = tool.qtMarkingMenu
+    cache.get('tool', markingMenuCache.scopeSelection, ['a'], build)
+    cache.get('tool', markingMenuCache.scopeSelection, ['b'], build)
+    # using 'a' again makes 'b' the oldest
+    cache.get('tool', markingMenuCache.scopeSelection, ['a'], build)
+    cache.get('tool', markingMenuCache.scopeSelection, ['c'], build)
+    assert tool.builds == 3
+    assert len(cache.selectionEntries) == 2
+    cache.get('tool', markingMenuCache.scopeSelection, ['a'], build)
+    assert tool.builds == 3
+    cache.get('tool', markingMenuCache.scopeSelection, ['b'], build)
+    assert tool.builds == 4
+
+
+def test_scopesDontShareEntries(cache):
+    static = FakeTool(markingMenuCache.scopeStatic)
+    selection = FakeTool(markingMenuCache.scopeSelection)
+    cache.get('tool', static.markingMenuScope, ['a'], static.qtMarkingMenu)
+    cache.get('other', selection.markingMenuScope, ['a'], selection.qtMarkingMenu)
+    assert cache.get('other', selection.markingMenuScope, ['a'], selection.qtMarkingMenu)[0] == 'build 1'
+    assert static.builds == 1
+    assert selection.builds == 1
+
+
+def test_clearingOneToolKeepsTheRest(cache):
+    tools = {name: FakeTool(markingMenuCache.scopeStatic) for name in ('a', 'b')}
+    for name, tool in tools.items():
+        cache.get(name, tool.markingMenuScope, ['x'], tool.qtMarkingMenu)
+    cache.clear('a')
+    for name, tool in tools.items():
+        cache.get(name, tool.markingMenuScope, ['x'], tool.qtMarkingMenu)
+    assert tools['a'].builds == 2
+    assert tools['b'].builds == 1
+
+
+def test_clearingOneToolClearsItsSelections(cache):
+    tools = {name: FakeTool(markingMenuCache.scopeSelection) for name in ('a', 'b')}
+    for name, tool in tools.items():
+        cache.get(name, tool.markingMenuScope, ['x'], tool.qtMarkingMenu)
+    cache.clear('a')
+    for name, tool in tools.items():
+        cache.get(name, tool.markingMenuScope, ['x'], tool.qtMarkingMenu)
+    assert tools['a'].builds == 2
+    assert tools['b'].builds == 1
+
+
+def test_clearingEverything(cache):
+    tool = FakeTool(markingMenuCache.scopeRig)
+    selectionTool = FakeTool(markingMenuCache.scopeSelection)
+    cache.get('tool', tool.markingMenuScope, ['a:x'], tool.qtMarkingMenu)
+    cache.get('tool', tool.markingMenuScope, ['b:x'], tool.qtMarkingMenu)
+    cache.get('other', selectionTool.markingMenuScope, ['a:x'], selectionTool.qtMarkingMenu)
+    cache.clear()
+    cache.get('tool', tool.markingMenuScope, ['a:x'], tool.qtMarkingMenu)
+    cache.get('other', selectionTool.markingMenuScope, ['a:x'], selectionTool.qtMarkingMenu)
+    assert tool.builds == 3
+    assert selectionTool.builds == 2
+
+
+def test_timing(cache):
+    times = iter([1.0, 1.5, 2.0, 2.25])
+    cache.clock = lambda: next(times)
+    tool = FakeTool(markingMenuCache.scopeSelection)
+    cache.get('tool', tool.markingMenuScope, ['a'], tool.qtMarkingMenu)
+    cache.get('tool', tool.markingMenuScope, ['b'], tool.qtMarkingMenu)
+    # cached, not timed
+    cache.get('tool', tool.markingMenuScope, ['b'], tool.qtMarkingMenu)
+    assert cache.stats['tool']['total'] == pytest.approx(0.75)
+    assert cache.stats['tool']['last'] == pytest.approx(0.25)
+
+
+def test_selectionSignature():
+    assert getSelectionSignature(['b:ctrl', 'a:ctrl', 'b:ctrl']) == ('a:ctrl', 'b:ctrl')
+
+
+def test_menuItem():
+    item = markingMenuCache.menuItem('Mirror Pose', 'mirrorSelection', variableData={'option': 'swap'},
+                                     radialPosition='SE')
+    assert item['command'] == 'mirrorSelection'
+    assert item['variable_data'] == {'option': 'swap'}
+    assert item['radial'] and item['radial_position'] == 'SE'
+    assert markingMenuCache.menuItem('Quick Aim', 'quickAim')['variable_data'] == {}
+    assert not markingMenuCache.menuItem('Quick Aim', 'quickAim')['radial']
+
+
+def test_selectionNamespaces():
+    assert getSelectionNamespaces(['a:b:ctrl', 'ctrl', 'c:ctrl', 'a:b:other']) == ('', 'a:b', 'c')
+
+
+def test_scope():
+    assert getScope(FakeTool(markingMenuCache.scopeRig), FakeBaseTool) == markingMenuCache.scopeRig
+    assert getScope(ChildTool(markingMenuCache.scopeRig), FakeBaseTool) == markingMenuCache.scopeRig
+    # the base class menu is the same whatever is selected
+    assert getScope(PlainTool(), FakeBaseTool) == markingMenuCache.scopeStatic
@@ -0,0 +1,170 @@
+import random
+
+import pytest
+
+import apps.tb_transformMath as transformMath
+from apps.tb_matrixBake import TransformSampler, restoreWorldPoses, transformChannels
+
+
+class MockScene(object):
+    """
+    Controls with translate, rotate and a space attribute. Each space is a target
+    control (or None for world) and a fixed offset, like a space switch group
+    constrained to the target
+    """
+
+    def __init__(self):
+        self.nodes = dict()
+
+    def addControl(self, name, spaces, space=0, translate=(0.0, 0.0, 0.0), rotate=(0.0, 0.0, 0.0),
+                   rotateOrder=0):
+        self.nodes[name] = {'spaces': spaces,
+                            'space': space,
+                            'translate': list(translate),
+                            'rotate': list(rotate),
+                            'rotateOrder': rotateOrder}
+
+    def parentSpace(self, name):
+        target, offset = self.nodes[name]['spaces'][self.nodes[name]['space']]
+        if target is None:
+            return list(offset)
+        return transformMath.multiply(offset, self.worldMatrix(target))
+
+    def worldMatrix(self, name):
+        node = self.nodes[name]
+        local = transformMath.composeMatrix(translate=node['translate'],
+                                            rotate=node['rotate'],
+                                            rotateOrder=node['rotateOrder'])
+        return transformMath.multiply(local, self.parentSpace(name))
+
+    def setValues(self, name, values):
+        for channel, value in values.items():
+            attribute = 'translate' if channel.startswith('translate') else 'rotate'
+            self.nodes[name][attribute]['XYZ'.index(channel[-1])] = value
+
+
+class MockSampler(TransformSampler):
+    def __init__(self, scene, nodes):
+        self.scene = scene
+        self.nodes = list(nodes)
+        self.nodeData = dict()
+        for node in self.nodes:
+            self.nodeData[node] = {'rotateOrder': scene.nodes[node]['rotateOrder'],
+                                   'rotateAxis': (0.0, 0.0, 0.0),
+                                   'jointOrient': (0.0, 0.0, 0.0),
+                                   'rotatePivot': (0.0, 0.0, 0.0),
+                                   'rotatePivotTranslate': (0.0, 0.0, 0.0),
+                                   'scalePivot': (0.0, 0.0, 0.0),
+                                   'scalePivotTranslate': (0.0, 0.0, 0.0)}
+
+    def readParentSpace(self, node, context=None):
+        return self.scene.parentSpace(node)
+
+    def sampleCurrent(self, matrix='worldMatrix', nodes=None):
+        return {node: self.scene.worldMatrix(node) for node in nodes or self.nodes}
+
+
+def randomOffset(generator):
+    return transformMath.composeMatrix(translate=[generator.uniform(-10, 10) for x in range(3)],
+                                       rotate=[generator.uniform(-180, 180) for x in range(3)],
+                                       rotateOrder=generator.randint(0, 5))
+
+
+def chainScene(chainCount, chainLength, seed=0):
+    """
+    Chains of controls where each one can follow the previous control or the world
+    :return: scene, list of chains of control names
+    """
+    generator = random.Random(seed)
+    scene = MockScene()
+    chains = list()
+    for chainIndex in range(chainCount):
+        chain = list()
+        for index in range(chainLength):
+            name = 'chain%d_ctrl%d' % (chainIndex, index)
+            spaces = [(None, randomOffset(generator))]
+            if chain:
+                spaces.append((chain[-1], randomOffset(generator)))
+            scene.addControl(name, spaces,
+                             space=len(spaces) - 1,
+                             translate=[generator.uniform(-5, 5) for x in range(3)],
+                             rotate=[generator.uniform(-170, 170) for x in range(3)],
+                             rotateOrder=generator.randint(0, 5))
+            chain.append(name)
+        chains.append(chain)
+    return scene, chains
+
+
+def switchAndRestore(scene, nodes, spaceValues):
+    """
+    What switchSpaces does, capture world matrices, flip spaces, put everything back
+    """
+    sampler = MockSampler(scene, nodes)
+    worldMatrices = sampler.sampleCurrent()
+    currentRotations = {node: tuple(scene.nodes[node]['rotate']) for node in nodes}
+    for node, value in spaceValues.items():
+        scene.nodes[node]['space'] = value
+    count = restoreWorldPoses(sampler, worldMatrices, {node: transformChannels for node in nodes},
+                              currentRotations, scene.setValues)
+    return worldMatrices, count
+
+
+def assertPosesKept(scene, worldMatrices):
+    for node, matrix in worldMatrices.items():
+        assert scene.worldMatrix(node) == pytest.approx(matrix, abs=1e-6), node
+
+
+def test_chainSwitchedToWorldKeepsPoses():
+    scene, chains = chainScene(3, 5)
+    nodes = [node for chain in chains for node in chain]
+    worldMatrices, count = switchAndRestore(scene, nodes, {node: 0 for node in nodes})
+    assertPosesKept(scene, worldMatrices)
+    assert count == len(nodes)
+
+
+def test_chainSwitchedToParentKeepsPoses():
+    scene, chains = chainScene(3, 5, seed=1)
+    nodes = [node for chain in chains for node in chain]
+    for node in nodes:
+        scene.nodes[node]['space'] = 0
+    spaceValues = {node: len(scene.nodes[node]['spaces']) - 1 for node in nodes}
+    worldMatrices, count = switchAndRestore(scene, nodes, spaceValues)
+    assertPosesKept(scene, worldMatrices)
+
+
+def test_childrenBeforeParentsAreSolvedAgain():
+    scene, chains = chainScene(2, 4, seed=2)
+    nodes = [node for chain in chains for node in reversed(chain)]
+    worldMatrices, count = switchAndRestore(scene, nodes, {chain[1]: 0 for chain in chains})
+    assertPosesKept(scene, worldMatrices)
+    # followers solved while the switched control was out of place are solved again
+    assert count > len(nodes)
+
+
+def test_unswitchedFollowersStayPut():
+    scene, chains = chainScene(1, 4, seed=3)
+    chain = chains[0]
+    worldMatrices, count = switchAndRestore(scene, chain, {chain[1]: 0})
+    assertPosesKept(scene, worldMatrices)
+
+
+def test_rotationStaysClosestToCurrent():
+    scene = MockScene()
+    scene.addControl('target', [(None, transformMath.identity)], rotate=(0.0, 0.0, 30.0))
+    scene.addControl('ctrl', [(None, transformMath.identity), ('target', transformMath.identity)],
+                     space=0, rotate=(0.0, 0.0, 350.0))
+    worldMatrices, count = switchAndRestore(scene, ['ctrl'], {'ctrl': 1})
+    assertPosesKept(scene, worldMatrices)
+    assert scene.nodes['ctrl']['rotate'][2] == pytest.approx(320.0)
+
+
+def test_nodesWithoutChannelsAreSkipped():
+    scene, chains = chainScene(1, 2, seed=4)
+    nodes = chains[0]
+    sampler = MockSampler(scene, nodes)
+    written = list()
+    count = restoreWorldPoses(sampler, sampler.sampleCurrent(), {nodes[0]: [], nodes[1]: transformChannels},
+                              {node: (0.0, 0.0, 0.0) for node in nodes},
+                              lambda node, values: written.append(node))
+    assert written == [nodes[1]]
+    assert count == 1
@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+from apps.tb_mirrorTable import MirrorPairTable, getMirrorControl
+
+
+class FakeCharacter(object):
+    def __init__(self, controls, leftSide, rightSide, jsonFile='rig.json', char='rig'):
+        self.controls = list(controls)
+        self.leftSide = leftSide
+        self.rightSide = rightSide
+        self.mirrorAxis = 'YZ'
+        self.jsonFile = jsonFile
+        self.char = char
+
+    def getSide(self, side):
+        return {'left': self.leftSide, 'right': self.rightSide}[side]
+
+    def getJsonFile(self):
+        return self.jsonFile
+
+
+class FakeMirrorData(object):
+    def __init__(self, controls=None, oppositeControls=None):
+        self.mirrorPlane = 'YZ'
+        self.controls = controls or dict()
+        self.oppositeControls = oppositeControls or dict()
+
+    def json_serialize(self):
+        return {'mirrorPlane': self.mirrorPlane,
+                'controls': self.controls,
+                'oppositeControls': self.oppositeControls}
+
+
+conventions = [('l_*', 'r_*', 'l_arm_ctrl', 'r_arm_ctrl'),
+               ('*_L', '*_R', 'arm_ctrl_L', 'arm_ctrl_R'),
+               ('Left', 'Right', 'armLeft_ctrl', 'armRight_ctrl')]
+
+
+@pytest.mark.parametrize('left, right, leftControl, rightControl', conventions)
+def test_mirrorControlSwapsBothWays(left, right, leftControl, rightControl):
+    assert getMirrorControl(leftControl, left, right) == rightControl
+    assert getMirrorControl(rightControl, left, right) == leftControl
+    assert getMirrorControl('spine_ctrl', left, right) == 'spine_ctrl'
+
+
+def test_prefixSwapKeepsNamespace():
+    assert getMirrorControl('char:l_hand', 'l_*', 'r_*') == 'char:r_hand'
+
+
+@pytest.mark.parametrize('left, right, leftControl, rightControl', conventions)
+def test_compiledTableMatchesNameSwapping(left, right, leftControl, rightControl):
+    character = FakeCharacter([leftControl, rightControl, 'spine_ctrl'], left, right)
+    table = MirrorPairTable().compile(character)
+    for control in character.controls:
+        assert table.getOpposite(control) == getMirrorControl(control, left, right)
+    assert table.getOpposite('ns:' + leftControl) == 'ns:' + rightControl
+    assert table.getOpposite('notInRig') is None
+
+
+def test_mirrorDataOverridesNamesAndGivesSigns():
+    character = FakeCharacter(['l_arm', 'r_arm', 'odd'], 'l_*', 'r_*')
+    mirrorData = FakeMirrorData(controls={'l_arm': {'translateX': -1, 'rotateY': -1}},
+                                oppositeControls={'odd': 'other'})
+    table = MirrorPairTable().compile(character, mirrorData)
+    assert table.getOpposite('odd') == 'other'
+    signs = table.getSigns('ns:l_arm')
+    assert signs['translateX'] == -1
+    assert signs['rotateY'] == -1
+    assert signs['translateY'] == 1
+    # no calculated mirror data means the control is skipped
+    assert table.getSigns('r_arm') is None
+
+
+def test_rigHashInvalidation():
+    character = FakeCharacter(['l_arm', 'r_arm'], 'l_*', 'r_*')
+    mirrorData = FakeMirrorData()
+    table = MirrorPairTable().compile(character, mirrorData)
+    assert table.isCurrent(character, mirrorData)
+    assert table.isCurrent(character, mirrorData, checkHash=True)
+
+    character.controls.append('l_leg')
+    # the identity check alone doesn't see in place edits, the hash does
+    assert table.isCurrent(character, mirrorData)
+    assert not table.isCurrent(character, mirrorData, checkHash=True)
+
+    reloaded = FakeCharacter(['l_arm', 'r_arm'], 'l_*', 'r_*')
+    assert table.isCurrent(reloaded, FakeMirrorData())
+    mirrorData.controls['l_arm'] = {'translateX': -1}
+    assert not table.isCurrent(character, mirrorData)
+
+
+def test_jsonRoundTrip(tmp_path):
+    character = FakeCharacter(['l_arm', 'r_arm'], 'l_*', 'r_*', jsonFile=str(tmp_path / 'rig.json'))
+    mirrorData = FakeMirrorData(controls={'l_arm': {'rotateZ': -1}})
+    table = MirrorPairTable().compile(character, mirrorData)
+    filePath = MirrorPairTable.getFilePath(character)
+    assert filePath == os.path.join(str(tmp_path), 'rig.mirrorTable')
+    import json
+    with open(filePath, 'w') as f:
+        json.dump(table.json_serialize(), f)
+
+    loaded = MirrorPairTable()
+    loaded.fromJson(filePath)
+    assert loaded.opposites == table.opposites
+    assert loaded.getSigns('l_arm') == table.getSigns('l_arm')
+    assert loaded.isCurrent(character, mirrorData)
@@ -0,0 +1,128 @@
+import json
+import math
+
+import pytest
+
+import apps.tb_nodeGraph as nodeGraph
+import apps.tb_transformMath as transformMath
+from apps.tb_nodeGraph import NodeGraph
+from test_transformMath import assertMatricesClose
+
+
+class FakeCmds(object):
+    """
+    Records the scene commands a build makes, node names clash with existing ones
+    """
+
+    def __init__(self, existing=()):
+        self.calls = list()
+        self.existing = set(existing)
+
+    def createNode(self, nodeType, name=None, skipSelect=False):
+        self.calls.append(('createNode', nodeType, name))
+        if name in self.existing:
+            name = name + '1'
+        self.existing.add(name)
+        return name
+
+    def addAttr(self, node, **kwargs):
+        self.calls.append(('addAttr', node, kwargs['longName']))
+
+    def setAttr(self, plug, *args, **kwargs):
+        self.calls.append(('setAttr', plug, args, kwargs))
+
+    def connectAttr(self, source, destination, force=False):
+        self.calls.append(('connectAttr', source, destination))
+
+    def disconnectAttr(self, source, destination):
+        self.calls.append(('disconnectAttr', source, destination))
+
+    def parent(self, child, parent):
+        self.calls.append(('parent', child, parent))
+
+
+def sampleGraph():
+    graph = NodeGraph()
+    compose = graph.addNode('compose', 'composeMatrix', {'inputTranslateX': 2.0})
+    group = graph.addNode('group', 'transform', {'rotateOrder': 2}, parent='world_GRP')
+    graph.addAttr(group, 'note', 'string')
+    graph.setAttr(group + '.note', 'redirect')
+    graph.setAttr(group + '.translate', [1.0, 2.0, 3.0])
+    graph.connect('ctrl.rotate', compose + '.inputRotate')
+    graph.connect(compose + '.outputMatrix', group + '.offsetParentMatrix')
+    graph.disconnect('curve.output', 'ctrl.translateX')
+    graph.setAttrState(group + '.translate', lock=True)
+    graph.setAttrState(group + '.translate', channelBox=False)
+    return graph
+
+
+def test_jsonRoundTrip():
+    graph = sampleGraph()
+    data = json.loads(json.dumps(graph.toJson()))
+    rebuilt = NodeGraph.fromJson(data)
+    assert rebuilt.toJson() == data
+    assert data['attributeStates'] == [['group.translate', {'lock': True, 'channelBox': False}]]
+    assert data['parents'] == [['group', 'world_GRP']]
+    assert NodeGraph.fromJson(dict()).getNodeCount() == 0
+
+
+def test_update():
+    graph = sampleGraph()
+    other = NodeGraph()
+    other.addNode('inverse', 'inverseMatrix')
+    other.connect('compose.outputMatrix', 'inverse.inputMatrix')
+    other.setAttrState('group.translate', keyable=False)
+    graph.update(other)
+    assert graph.getNodeCount() == 3
+    assert graph.connections[-1] == ('compose.outputMatrix', 'inverse.inputMatrix')
+    assert graph.attributeStates['group.translate'] == {'lock': True, 'channelBox': False, 'keyable': False}
+
+
+def test_buildWithCmds(monkeypatch):
+    fake = FakeCmds(existing=['group'])
+    monkeypatch.setattr(nodeGraph, 'cmds', fake)
+    names = sampleGraph().build()
+    assert names == {'compose': 'compose', 'group': 'group1'}
+    assert [call[0] for call in fake.calls] == ['createNode', 'createNode',
+                                                'addAttr',
+                                                'setAttr', 'setAttr', 'setAttr', 'setAttr',
+                                                'disconnectAttr',
+                                                'connectAttr', 'connectAttr',
+                                                'parent',
+                                                'setAttr']
+    # clashing names are followed through to values, connections and parenting
+    assert ('setAttr', 'group1.translate', (1.0, 2.0, 3.0), {}) in fake.calls
+    assert ('setAttr', 'group1.note', ('redirect',), {'type': 'string'}) in fake.calls
+    assert ('connectAttr', 'compose.outputMatrix', 'group1.offsetParentMatrix') in fake.calls
+    assert ('parent', 'group1', 'world_GRP') in fake.calls
+    # locks go on after the values are set
+    assert fake.calls[-1] == ('setAttr', 'group1.translate', (), {'edit': True, 'lock': True, 'channelBox': False})
+
+
+def test_evaluateCompoundConnections():
+    graph = sampleGraph()
+    result = graph.evaluate(['compose.outputMatrix'], {'ctrl.rotateX': 0.0, 'ctrl.rotateY': 0.5, 'ctrl.rotateZ': 0.0})
+    assertMatricesClose(result['compose.outputMatrix'],
+                        transformMath.composeMatrix(translate=(2.0, 0.0, 0.0), rotate=(0.0, math.degrees(0.5), 0.0)))
+
+
+def test_evaluateMissingInput():
+    with pytest.raises(KeyError):
+        sampleGraph().evaluate(['compose.outputMatrix'])
+
+
+def test_matrixNodes():
+    a = transformMath.composeMatrix(translate=(1.0, 2.0, 3.0), rotate=(10.0, 20.0, 30.0), scale=(2.0, 2.0, 2.0))
+    b = transformMath.composeMatrix(translate=(-4.0, 0.0, 1.0), rotate=(0.0, 45.0, 0.0))
+    graph = NodeGraph()
+    graph.addNode('mult', 'multMatrix', {'matrixIn[0]': a})
+    graph.connect('input.matrix', 'mult.matrixIn[3]')
+    graph.addNode('inverse', 'inverseMatrix')
+    graph.connect('mult.matrixSum', 'inverse.inputMatrix')
+    graph.addNode('pick', 'pickMatrix', {'useRotate': False, 'useScale': False})
+    graph.connect('mult.matrixSum', 'pick.inputMatrix')
+    result = graph.evaluate(['mult.matrixSum', 'inverse.outputMatrix', 'pick.outputMatrix'], {'input.matrix': b})
+    product = transformMath.multiply(a, b)
+    assertMatricesClose(result['mult.matrixSum'], product)
+    assertMatricesClose(transformMath.multiply(result['inverse.outputMatrix'], product), transformMath.identity)
+    assertMatricesClose(result['pick.outputMatrix'], transformMath.composeMatrix(translate=product[12:15]))
@@ -0,0 +1,155 @@
+import math
+import random
+
+import pytest
+
+import apps.tb_transformMath as transformMath
+from test_transformMath import referenceMatrix, assertMatricesClose, orderNames
+
+'''
+The temp pivot bake maths: the pivot follows the main target holding its offset,
+each target is keyed in the pivot's space as target * pivot inverse
+'''
+
+
+def animatedTarget(generator, frames, scale=(1.0, 1.0, 1.0)):
+    """
+    Smoothly moving world matrices, built from random sine waves on every channel
+    """
+    waves = [(generator.uniform(-20, 20), generator.uniform(0.01, 0.1), generator.uniform(0, 6)) for x in range(6)]
+    matrices = list()
+    for frame in frames:
+        values = [amplitude * math.sin(speed * frame + phase) for amplitude, speed, phase in waves]
+        matrices.append(referenceMatrix(values[:3], [x * 8.0 for x in values[3:]], scale, 'xyz'))
+    return matrices
+
+
+def recompose(channels, frame, rotateOrder):
+    return referenceMatrix([channels['translate' + axis][frame] for axis in 'XYZ'],
+                           [channels['rotate' + axis][frame] for axis in 'XYZ'],
+                           [channels['scale' + axis][frame] for axis in 'XYZ'],
+                           orderNames[rotateOrder])
+
+
+def test_removeScaleMatchesUnscaledMatrix():
+    generator = random.Random(0)
+    for x in range(50):
+        translate = [generator.uniform(-10, 10) for y in range(3)]
+        rotate = [generator.uniform(-180, 180) for y in range(3)]
+        order = orderNames[x % 6]
+        scaled = referenceMatrix(translate, rotate, [generator.uniform(0.1, 5) for y in range(3)], order)
+        assertMatricesClose(transformMath.removeScale(scaled), referenceMatrix(translate, rotate, (1, 1, 1), order))
+
+
+def test_holdOffsetKeepsTheCurrentPose():
+    node = referenceMatrix([1.0, 2.0, 3.0], [10.0, 20.0, 30.0], (1, 1, 1), 'xyz')
+    target = referenceMatrix([-4.0, 0.5, 2.0], [-45.0, 5.0, 90.0], (2.0, 2.0, 2.0), 'zxy')
+    offset = transformMath.holdOffset(node, target)
+    assertMatricesClose(transformMath.followMatrices(offset, [transformMath.removeScale(target)])[0], node)
+
+
+@pytest.mark.parametrize('rotateOrder', range(6))
+def test_pivotSpaceRoundTrip(rotateOrder):
+    generator = random.Random(rotateOrder)
+    frames = list(range(100))
+    targets = [[transformMath.removeScale(m)
+                for m in animatedTarget(generator, frames, scale=[generator.uniform(0.5, 2) for x in range(3)])]
+               for t in range(5)]
+    pivot = referenceMatrix([3.0, 1.0, -2.0], [0.0, 45.0, 0.0], (1, 1, 1), 'xyz')
+    pivotWorld = transformMath.followMatrices(transformMath.holdOffset(pivot, targets[-1][0]), targets[-1])
+    assertMatricesClose(pivotWorld[0], pivot)
+    for target in targets:
+        channels = transformMath.decomposeMatrices(transformMath.localMatrices(target, pivotWorld),
+                                                   rotateOrder=rotateOrder)
+        for frame in frames:
+            assertMatricesClose(transformMath.multiply(recompose(channels, frame, rotateOrder), pivotWorld[frame]),
+                                target[frame], tolerance=1.0e-7)
+
+
+def test_hierarchyChainRoundTrip():
+    generator = random.Random(7)
+    frames = list(range(60))
+    targets = [animatedTarget(generator, frames) for t in range(4)]
+    mainWorld = transformMath.followMatrices(transformMath.holdOffset(transformMath.identity, targets[-1][0]),
+                                             targets[-1])
+    for index, target in enumerate(targets):
+        parent = targets[index + 1] if index + 1 < len(targets) else mainWorld
+        channels = transformMath.decomposeMatrices(transformMath.localMatrices(target, parent))
+        for frame in frames:
+            assertMatricesClose(transformMath.multiply(recompose(channels, frame, 0), parent[frame]), target[frame],
+                                tolerance=1.0e-7)
+
+
+def test_rigidlyAttachedTargetsHaveConstantKeys():
+    generator = random.Random(3)
+    frames = list(range(200))
+    mainTarget = animatedTarget(generator, frames)
+    attached = referenceMatrix([0.0, 5.0, 0.0], [30.0, -60.0, 10.0], (1, 1, 1), 'xyz')
+    follower = [transformMath.multiply(attached, m) for m in mainTarget]
+    pivotWorld = transformMath.followMatrices(transformMath.holdOffset(transformMath.identity, mainTarget[0]),
+                                              mainTarget)
+    channels = transformMath.decomposeMatrices(transformMath.localMatrices(follower, pivotWorld))
+    for values in channels.values():
+        assert max(values) - min(values) < 1.0e-7
+
+
+@pytest.mark.parametrize('rotateOrder', range(6))
+def test_spinningTargetIsUnwrapped(rotateOrder):
+    frames = list(range(1000))
+    pivotWorld = [list(transformMath.identity)] * len(frames)
+    spin = [referenceMatrix([0.0, 0.0, 0.0], [20.0, frame * 1.08, 0.0], (1, 1, 1), 'xyz') for frame in frames]
+    channels = transformMath.decomposeMatrices(transformMath.localMatrices(spin, pivotWorld),
+                                               rotateOrder=rotateOrder)
+    rotations = list(zip(channels['rotateX'], channels['rotateY'], channels['rotateZ']))
+    for previous, current in zip(rotations, rotations[1:]):
+        assert max(abs(a - b) for a, b in zip(previous, current)) < 10.0
+    for frame in (0, 499, 999):
+        assertMatricesClose(recompose(channels, frame, rotateOrder), spin[frame], tolerance=1.0e-7)
+
+
+def parentConstrained(frame, rotatePivot, scale, rotateOrder):
+    """
+    Where a parent constraint without offset puts a node under the world, the frame's rotation
+    with rotatePivot + rotatePivotTranslate + translate on the frame's origin
+    """
+    rotate = transformMath.decomposeMatrix(frame, rotateOrder=rotateOrder)[1]
+    # referenceMatrix has no rotatePivotTranslate, it is folded into translate
+    translate = [frame[12 + x] - rotatePivot[x] for x in range(3)]
+    return referenceMatrix(translate, rotate, scale, orderNames[rotateOrder],
+                           rotatePivot=rotatePivot, scalePivot=rotatePivot)
+
+
+@pytest.mark.parametrize('rotateOrder', range(6))
+def test_nonZeroPivotDoesNotJump(rotateOrder):
+    generator = random.Random(20 + rotateOrder)
+    frames = list(range(30))
+    # a foot control with its pivot moved to the heel
+    rotatePivot = [generator.uniform(-10, 10) for x in range(3)]
+    rotatePivotTranslate = [generator.uniform(-2, 2) for x in range(3)]
+    scale = [generator.uniform(0.5, 2) for x in range(3)]
+    waves = [(generator.uniform(-20, 20), generator.uniform(0.01, 0.1), generator.uniform(0, 6)) for x in range(6)]
+    target = list()
+    for frame in frames:
+        values = [amplitude * math.sin(speed * frame + phase) for amplitude, speed, phase in waves]
+        target.append(referenceMatrix([values[x] + rotatePivotTranslate[x] for x in range(3)],
+                                      [x * 8.0 for x in values[3:]], scale, orderNames[rotateOrder],
+                                      rotatePivot=rotatePivot, scalePivot=rotatePivot))
+
+    pivot = referenceMatrix([3.0, 1.0, -2.0], [0.0, 45.0, 0.0], (1, 1, 1), 'xyz')
+    pivotFrames = [transformMath.pivotFrame(m, rotatePivot) for m in target]
+    pivotWorld = transformMath.followMatrices(transformMath.holdOffset(pivot, pivotFrames[0]), pivotFrames)
+    assertMatricesClose(pivotWorld[0], pivot)
+    channels = transformMath.decomposeMatrices(transformMath.localMatrices(pivotFrames, pivotWorld))
+    for frame, matrix in enumerate(target):
+        group = transformMath.multiply(recompose(channels, frame, 0), pivotWorld[frame])
+        assertMatricesClose(parentConstrained(group, rotatePivot, scale, rotateOrder),
+                            matrix, tolerance=1.0e-6)
+        # the scale free matrix origin alone moves the control by its pivot offset
+        origin = transformMath.removeScale(matrix)
+        jumped = parentConstrained(origin, rotatePivot, scale, rotateOrder)
+        assert max(abs(jumped[12 + x] - matrix[12 + x]) for x in range(3)) > 1.0e-3
+
+
+def test_pivotFrameWithoutPivotIsRemoveScale():
+    matrix = referenceMatrix([1.0, -2.0, 3.0], [10.0, 20.0, 30.0], (2.0, 0.5, 1.5), 'yzx')
+    assertMatricesClose(transformMath.pivotFrame(matrix), transformMath.removeScale(matrix))
@@ -0,0 +1,224 @@
+import os
+import sys
+import struct
+import time
+
+import pytest
+
+import apps.tb_playblastEncode as playblastEncode
+from apps.tb_cacheJobs import statusDone, statusRunning
+from apps.tb_playblastEncode import getJpegSize, writeMjpegAvi, EncodeJob, getFramePath, getMovieCount, \
+    getEncodeScheduler
+
+
+def makeJpeg(width, height, payload=b''):
+    """
+    Just the markers the avi writer reads, a start of image, an app0 segment,
+    a baseline start of frame and the end of image
+    """
+    app0 = b'JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00'
+    sof0 = struct.pack('>BHHB', 8, height, width, 3) + b'\x01\x22\x00\x02\x11\x01\x03\x11\x01'
+    return b'\xff\xd8' + \
+           b'\xff\xe0' + struct.pack('>H', len(app0) + 2) + app0 + \
+           b'\xff\xc0' + struct.pack('>H', len(sof0) + 2) + sof0 + \
+           payload + b'\xff\xd9'
+
+
+class FakeFrameSource(object):
+    """
+    Stands in for the playblast capture, writes numbered jpeg frames of varying sizes
+    """
+
+    def __init__(self, folder, name='shot_0001', width=64, height=48):
+        self.prefix = os.path.join(folder, name)
+        self.width = width
+        self.height = height
+
+    def capture(self, startTime, endTime):
+        paths = list()
+        for frame in range(startTime, endTime + 1):
+            path = getFramePath(self.prefix, frame)
+            # odd and even sizes so the chunk padding gets used
+            with open(path, 'wb') as frameFile:
+                frameFile.write(makeJpeg(self.width, self.height, payload=struct.pack('>I', frame) * (frame % 5) +
+                                         b'\x00' * (frame % 2)))
+            paths.append(path)
+        return paths
+
+
+def readChunks(data, offset, end):
+    chunks = list()
+    while offset < end:
+        fourcc = data[offset:offset + 4]
+        size = struct.unpack('<I', data[offset + 4:offset + 8])[0]
+        chunks.append((fourcc, offset, data[offset + 8:offset + 8 + size]))
+        offset += 8 + size + size % 2
+    assert offset == end
+    return chunks
+
+
+def readAvi(path):
+    """
+    :return: dict with the main header, stream header, frames and index
+    """
+    with open(path, 'rb') as avi:
+        data = avi.read()
+    assert data[:4] == b'RIFF' and data[8:12] == b'AVI '
+    assert struct.unpack('<I', data[4:8])[0] == len(data) - 8
+    riff = readChunks(data, 12, len(data))
+    assert [fourcc for fourcc, offset, body in riff] == [b'LIST', b'LIST', b'idx1']
+    hdrl = riff[0][2]
+    assert hdrl[:4] == b'hdrl'
+    hdrlChunks = readChunks(hdrl, 4, len(hdrl))
+    assert hdrlChunks[0][0] == b'avih'
+    avih = struct.unpack('<14I', hdrlChunks[0][2])
+    strl = hdrlChunks[1][2]
+    assert strl[:4] == b'strl'
+    strlChunks = readChunks(strl, 4, len(strl))
+    strh = strlChunks[0][2]
+    assert strh[:8] == b'vidsMJPG'
+    scale, rate, start, length = struct.unpack('<IIII', strh[20:36])
+    movi = riff[1][2]
+    assert movi[:4] == b'movi'
+    frames = readChunks(movi, 4, len(movi))
+    index = [struct.unpack('<4sIII', riff[2][2][i:i + 16]) for i in range(0, len(riff[2][2]), 16)]
+    return {'microseconds': avih[0], 'frameCount': avih[4], 'width': avih[8], 'height': avih[9],
+            'scale': scale, 'rate': rate, 'length': length,
+            'frames': frames, 'index': index}
+
+
+def test_getJpegSize():
+    assert getJpegSize(makeJpeg(1920, 1080)) == (1920, 1080)
+    with pytest.raises(ValueError):
+        getJpegSize(b'\xff\xd8\xff\xd9' + b'\x00' * 20)
+
+
+def test_aviFraming(tmp_path):
+    framePaths = FakeFrameSource(str(tmp_path)).capture(1001, 1024)
+    output = str(tmp_path / 'shot_0001.avi')
+    written = list()
+    writeMjpegAvi(framePaths, output, 24.0, progress=written.append)
+    avi = readAvi(output)
+    assert written == list(range(len(framePaths)))
+    assert avi['frameCount'] == avi['length'] == len(framePaths)
+    assert (avi['width'], avi['height']) == (64, 48)
+    assert avi['microseconds'] == 41667
+    assert float(avi['rate']) / avi['scale'] == 24.0
+    assert [fourcc for fourcc, offset, body in avi['frames']] == [b'00dc'] * len(framePaths)
+    for path, (fourcc, offset, body) in zip(framePaths, avi['frames']):
+        with open(path, 'rb') as frame:
+            assert body == frame.read()
+    # index offsets are from the movi fourcc
+    for (fourcc, offset, body), entry in zip(avi['frames'], avi['index']):
+        assert entry == (b'00dc', 0x10, offset, len(body))
+
+
+def test_fractionalFps(tmp_path):
+    framePaths = FakeFrameSource(str(tmp_path)).capture(1, 3)
+    output = str(tmp_path / 'out.avi')
+    writeMjpegAvi(framePaths, output, 29.97)
+    avi = readAvi(output)
+    assert float(avi['rate']) / avi['scale'] == pytest.approx(29.97)
+    assert avi['microseconds'] == 33367
+
+
+def test_singleFrame(tmp_path):
+    framePaths = FakeFrameSource(str(tmp_path), width=3, height=1).capture(7, 7)
+    output = str(tmp_path / 'out.avi')
+    writeMjpegAvi(framePaths, output, 25)
+    avi = readAvi(output)
+    assert avi['frameCount'] == 1
+    assert (avi['width'], avi['height']) == (3, 1)
+
+
+def test_noFrames(tmp_path):
+    with pytest.raises(ValueError):
+        writeMjpegAvi([], str(tmp_path / 'out.avi'), 24)
+    assert not os.path.exists(str(tmp_path / 'out.avi'))
+
+
+def test_getMovieCount(tmp_path):
+    for fileName in ['shot_0000.mov', 'shot_0001.avi', 'shot_0002.MP4', 'notes.txt', '.hidden.avi']:
+        (tmp_path / fileName).write_text(u'')
+    (tmp_path / '.frames_shot_0003').mkdir()
+    (tmp_path / 'folder.avi').mkdir()
+    assert getMovieCount(str(tmp_path)) == 3
+
+
+def makeJobs(folder, count, frames=30):
+    jobs = list()
+    for index in range(count):
+        name = 'shot_%04d' % index
+        frameFolder = os.path.join(folder, '.frames_' + name)
+        os.makedirs(frameFolder)
+        framePaths = FakeFrameSource(frameFolder, name=name).capture(1, frames)
+        jobs.append(EncodeJob(name, framePaths, 1, frames, os.path.join(folder, name + '.avi'), fps=24.0,
+                              jobFolder=frameFolder))
+    return jobs
+
+
+def test_encodingRunsInTheBackground(tmp_path, monkeypatch):
+    def encodeHere(*args, **kwargs):
+        raise AssertionError('frames were encoded in the calling process')
+
+    monkeypatch.setattr(playblastEncode, 'writeMjpegAvi', encodeHere)
+    completed = list()
+    scheduler = getEncodeScheduler(maxWorkers=2, onComplete=completed.append, executable=sys.executable)
+    jobs = makeJobs(str(tmp_path), 5)
+    start = time.time()
+    for job in jobs:
+        scheduler.submit(job)
+    submitTime = time.time() - start
+
+    mostRunning = 0
+    end = time.time() + 60.0
+    while scheduler.poll():
+        assert len(scheduler.running) <= 2
+        mostRunning = max(mostRunning, len(scheduler.running))
+        assert time.time() < end, 'encodes did not finish'
+        time.sleep(0.01)
+    assert mostRunning == 2
+    assert [job.status for job in completed] == [statusDone] * 5
+    for job in jobs:
+        avi = readAvi(job.outputFile)
+        assert avi['frameCount'] == 30
+        assert not os.path.exists(job.jobFile)
+        assert not os.path.exists(job.progressFile)
+    # submitting only writes the small job files and starts processes
+    assert submitTime < 5.0
+
+
+def test_progressFromTheWorker(tmp_path):
+    progress = list()
+    scheduler = getEncodeScheduler(maxWorkers=1, executable=sys.executable,
+                                   onProgress=lambda job: progress.append(job.progress))
+    job = scheduler.submit(makeJobs(str(tmp_path), 1, frames=200)[0])
+    assert job.status == statusRunning
+    end = time.time() + 60.0
+    while scheduler.poll():
+        assert time.time() < end
+        time.sleep(0.005)
+    assert job.status == statusDone
+    assert progress == sorted(progress)
+    assert job.progress == 1.0
+
+
+def test_deleteFrames(tmp_path):
+    job = makeJobs(str(tmp_path), 1, frames=5)[0]
+    job.deleteFrames()
+    assert not any(os.path.exists(path) for path in job.options['framePaths'])
+    kept = makeJobs(str(tmp_path / 'kept'), 1, frames=5)[0]
+    kept.options['deleteFrames'] = False
+    kept.deleteFrames()
+    assert all(os.path.exists(path) for path in kept.options['framePaths'])
+
+
+def test_ffmpegCommand():
+    job = EncodeJob('shot', ['a.0010.jpg'], 10, 20, 'shot.mp4', fps=25.0, encoder=playblastEncode.encoderFfmpeg,
+                    codecArgs=playblastEncode.ffmpegCodecs['mp4'], framePattern='a.%04d.jpg')
+    command = job.getFfmpegCommand('ffmpeg')
+    assert command[:3] == ['ffmpeg', '-y', '-loglevel']
+    assert command[command.index('-start_number') + 1] == '10'
+    assert command[command.index('-framerate') + 1] == '25.0'
+    assert command[-1] == 'shot.mp4'
+    assert 'libx264' in command
@@ -0,0 +1,45 @@
+import random
+
+import pytest
+
+from apps.tb_pointMath import midPoint, boundingBox, scalePoint
+
+
+def test_midPoint():
+    assert midPoint([[0, 0, 0], [2, 4, -6]]) == [1.0, 2.0, -3.0]
+    assert midPoint([(1.5, 2.5, 3.5)]) == [1.5, 2.5, 3.5]
+
+
+def test_midPointOfNothing():
+    assert midPoint([]) is None
+    assert midPoint(iter([])) is None
+
+
+def test_midPointTakesAGenerator():
+    points = ([x, x * 2, x * 3] for x in range(5))
+    assert midPoint(points) == [2.0, 4.0, 6.0]
+
+
+def test_midPointMatchesAverage():
+    generator = random.Random(0)
+    points = [[generator.uniform(-100, 100) for y in range(3)] for x in range(1000)]
+    for axis, value in enumerate(midPoint(points)):
+        assert value == pytest.approx(sum(point[axis] for point in points) / len(points))
+
+
+def test_boundingBox():
+    points = [[1, -2, 3], [-4, 5, 0], [2, 0, -6]]
+    assert boundingBox(points) == [-4, -2, -6, 2, 5, 3]
+    assert boundingBox(iter(points)) == [-4, -2, -6, 2, 5, 3]
+    assert boundingBox([[1, 2, 3]]) == [1, 2, 3, 1, 2, 3]
+    assert boundingBox([]) is None
+
+
+def test_boundingBoxMergesBoxes():
+    box = [0, 0, 0, 1, 1, 1]
+    other = [-1, 0.5, 0.5, 0.5, 2, 0.75]
+    assert boundingBox([box[:3], box[3:], other[:3], other[3:]]) == [-1, 0, 0, 1, 2, 1]
+
+
+def test_scalePoint():
+    assert scalePoint([1, -2, 3], 2.54) == pytest.approx([2.54, -5.08, 7.62])
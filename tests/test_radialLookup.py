@@ -0,0 +1,100 @@
+import math
+import random
+
+import pytest
+
+from apps.tb_radialLookup import RadialLookup, getAngle, angleDifference
+
+
+def ring(count, radius, centre=(0.0, 0.0), offset=0.0):
+    items = list()
+    for index in range(count):
+        angle = math.radians(offset + index * 360.0 / count)
+        items.append(('item%d_%d' % (radius, index),
+                      (centre[0] + radius * math.sin(angle), centre[1] - radius * math.cos(angle))))
+    return items
+
+
+def randomPoints(generator, count, spread=300.0):
+    return [(generator.uniform(-spread, spread), generator.uniform(-spread, spread)) for x in range(count)]
+
+
+def itemDistance(lookup, item, point):
+    position = lookup.positions[lookup.items.index(item)]
+    return math.hypot(position[0] - point[0], position[1] - point[1])
+
+
+def assertMatchesBruteForce(lookup, points):
+    for point in points:
+        expected = lookup.closestBruteForce(point)
+        result = lookup.closest(point)
+        if result == expected:
+            continue
+        # only acceptable on an exact tie
+        assert itemDistance(lookup, result, point) == pytest.approx(itemDistance(lookup, expected, point))
+
+
+def test_getAngleIsClockwiseFromUp():
+    centre = (100.0, 100.0)
+    assert getAngle(centre, (100.0, 0.0)) == pytest.approx(0.0)
+    assert getAngle(centre, (200.0, 100.0)) == pytest.approx(90.0)
+    assert getAngle(centre, (100.0, 200.0)) == pytest.approx(180.0)
+    assert getAngle(centre, (0.0, 100.0)) == pytest.approx(270.0)
+
+
+def test_angleDifferenceWraps():
+    assert angleDifference(350.0, 10.0) == pytest.approx(20.0)
+    assert angleDifference(10.0, 350.0) == pytest.approx(20.0)
+    assert angleDifference(90.0, 270.0) == pytest.approx(180.0)
+    assert angleDifference(720.0, 0.0) == pytest.approx(0.0)
+
+
+@pytest.mark.parametrize('count', [1, 2, 3, 8, 64])
+def test_ringMatchesBruteForce(count):
+    generator = random.Random(count)
+    lookup = RadialLookup((0.0, 0.0), ring(count, 120.0, offset=generator.uniform(0, 360)))
+    assertMatchesBruteForce(lookup, randomPoints(generator, 2000))
+
+
+def test_nestedRingsMatchBruteForce():
+    generator = random.Random(1)
+    items = ring(8, 80.0) + ring(24, 160.0, offset=7.5) + ring(32, 260.0, offset=3.0)
+    lookup = RadialLookup((0.0, 0.0), items)
+    assertMatchesBruteForce(lookup, randomPoints(generator, 5000, spread=400.0))
+
+
+def test_scatteredItemsMatchBruteForce():
+    generator = random.Random(2)
+    for layout in range(20):
+        centre = (generator.uniform(0, 500), generator.uniform(0, 500))
+        items = [('item%d' % x, (centre[0] + generator.gauss(0, 150), centre[1] + generator.gauss(0, 150)))
+                 for x in range(generator.randint(1, 40))]
+        lookup = RadialLookup(centre, items, sectorsPerItem=generator.randint(1, 6))
+        assertMatchesBruteForce(lookup, [(centre[0] + x, centre[1] + y) for x, y in randomPoints(generator, 300)])
+
+
+def test_itemsAtTheSameAngle():
+    items = [('near', (0.0, -50.0)), ('far', (0.0, -150.0)), ('side', (100.0, 0.0))]
+    lookup = RadialLookup((0.0, 0.0), items)
+    assert lookup.closest((0.0, -60.0)) == 'near'
+    assert lookup.closest((0.0, -140.0)) == 'far'
+    assert lookup.closest((5.0, -300.0)) == 'far'
+
+
+def test_pointsAcrossTheZeroAngle():
+    items = [('left', (-10.0, -100.0)), ('right', (10.0, -100.0)), ('down', (0.0, 100.0))]
+    lookup = RadialLookup((0.0, 0.0), items)
+    assert lookup.closest((-1.0, -500.0)) == 'left'
+    assert lookup.closest((1.0, -500.0)) == 'right'
+
+
+def test_deadZone():
+    lookup = RadialLookup((50.0, 50.0), ring(8, 100.0, centre=(50.0, 50.0)), deadZone=20.0)
+    assert lookup.closest((55.0, 55.0)) is None
+    assert lookup.closestBruteForce((55.0, 55.0)) is None
+    assert lookup.closest((50.0, 25.0)) == 'item100_0'
+
+
+def test_noItems():
+    lookup = RadialLookup((0.0, 0.0), [])
+    assert lookup.closest((10.0, 10.0)) is None
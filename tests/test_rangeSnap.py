@@ -0,0 +1,155 @@
+import math
+import random
+
+import pytest
+
+import apps.tb_transformMath as transformMath
+from apps.tb_matrixBake import getChannelFilter
+from test_transformMath import referenceMatrix, assertMatricesClose, orderNames
+
+
+def randomMatrix(generator, scale=False, rotateOrder=0):
+    return transformMath.composeMatrix(translate=[generator.uniform(-10, 10) for x in range(3)],
+                                       rotate=[generator.uniform(-180, 180) for x in range(3)],
+                                       scale=[generator.uniform(0.5, 2.0) if scale else 1.0 for x in range(3)],
+                                       rotateOrder=rotateOrder)
+
+
+def animatedParent(generator, frames):
+    """
+    A parent swinging around and moving, with some wobble so no two frames match
+    """
+    speed = [generator.uniform(-4, 4) for x in range(3)]
+    phase = [generator.uniform(0, 360) for x in range(3)]
+    return [transformMath.composeMatrix(translate=[math.sin(math.radians(frame * speed[x] + phase[x])) * 20
+                                                   for x in range(3)],
+                                        rotate=[frame * speed[x] + phase[x] for x in range(3)],
+                                        rotateOrder=generator.randint(0, 5))
+            for frame in frames]
+
+
+def rowLength(m, row):
+    return math.sqrt(sum(m[row * 4 + col] ** 2 for col in range(3)))
+
+
+def test_transformPoint():
+    generator = random.Random(0)
+    for x in range(50):
+        m = randomMatrix(generator, scale=True)
+        point = [generator.uniform(-5, 5) for y in range(3)]
+        translated = transformMath.multiply(transformMath.composeMatrix(translate=point), m)
+        assertMatricesClose(transformMath.transformPoint(point, m), translated[12:15])
+    assert transformMath.transformPoint([1, 2, 3], transformMath.identity) == [1, 2, 3]
+
+
+@pytest.mark.parametrize('rotateOrder', range(6))
+def test_matchRotationKeepsScaleAndPosition(rotateOrder):
+    generator = random.Random(rotateOrder)
+    for x in range(50):
+        m = randomMatrix(generator, scale=True, rotateOrder=rotateOrder)
+        source = randomMatrix(generator, scale=True)
+        result = transformMath.matchRotation(m, source)
+        assert result[12:15] == m[12:15]
+        for row in range(3):
+            assert rowLength(result, row) == pytest.approx(rowLength(m, row))
+        translate, rotate, scale = transformMath.decomposeMatrix(result, rotateOrder=rotateOrder)
+        sourceRotation = transformMath.decomposeMatrix(transformMath.removeScale(source), rotateOrder=rotateOrder)[1]
+        assertMatricesClose(transformMath.composeMatrix(rotate=rotate, rotateOrder=rotateOrder),
+                            transformMath.composeMatrix(rotate=sourceRotation, rotateOrder=rotateOrder))
+
+
+def test_matchPivot():
+    generator = random.Random(3)
+    for x in range(50):
+        m = randomMatrix(generator, scale=True)
+        pivot = [generator.uniform(-2, 2) for y in range(3)]
+        worldPivot = [generator.uniform(-20, 20) for y in range(3)]
+        result = transformMath.matchPivot(m, pivot, worldPivot)
+        assertMatricesClose(transformMath.transformPoint(pivot, result), worldPivot)
+        assert result[:12] == m[:12]
+
+
+@pytest.mark.parametrize('rotateOrder', range(6))
+def test_snapMatrix(rotateOrder):
+    generator = random.Random(20 + rotateOrder)
+    for x in range(50):
+        m = randomMatrix(generator, scale=True, rotateOrder=rotateOrder)
+        target = randomMatrix(generator, rotateOrder=generator.randint(0, 5))
+        pivot = [generator.uniform(-2, 2) for y in range(3)]
+        targetPivot = [generator.uniform(-2, 2) for y in range(3)]
+        targetWorldPivot = transformMath.transformPoint(targetPivot, target)
+
+        both = transformMath.snapMatrix(m, target, pivot, targetPivot)
+        assertMatricesClose(transformMath.transformPoint(pivot, both), targetWorldPivot)
+        assertMatricesClose(transformMath.removeScale(both)[:12], transformMath.removeScale(target)[:12])
+
+        translateOnly = transformMath.snapMatrix(m, target, pivot, targetPivot, orient=False)
+        assertMatricesClose(translateOnly[:12], m[:12])
+        assertMatricesClose(transformMath.transformPoint(pivot, translateOnly), targetWorldPivot)
+
+        # rotating about the pivot leaves the pivot where it was
+        orientOnly = transformMath.snapMatrix(m, target, pivot, targetPivot, translate=False)
+        assertMatricesClose(transformMath.transformPoint(pivot, orientOnly), transformMath.transformPoint(pivot, m))
+        assertMatricesClose(transformMath.removeScale(orientOnly)[:12], transformMath.removeScale(target)[:12])
+
+
+@pytest.mark.parametrize('rotateOrder', range(6))
+def test_relativeOffsetOverARange(rotateOrder):
+    """
+    What restore_relative_transform_range computes for a target directly under the world
+    """
+    generator = random.Random(40 + rotateOrder)
+    frames = list(range(100))
+    parentMatrices = animatedParent(generator, frames)
+    offset = randomMatrix(generator)
+    worldMatrices = [transformMath.multiply(offset, parent) for parent in parentMatrices]
+    targetParent = [randomMatrix(generator)] * len(frames)
+    channels = transformMath.decomposeMatrices(transformMath.localMatrices(worldMatrices, targetParent),
+                                               rotateOrder=rotateOrder)
+    order = orderNames[rotateOrder]
+    for index, world in enumerate(worldMatrices):
+        translate = [channels['translate' + axis][index] for axis in 'XYZ']
+        rotate = [channels['rotate' + axis][index] for axis in 'XYZ']
+        scale = [channels['scale' + axis][index] for axis in 'XYZ']
+        local = referenceMatrix(translate, rotate, scale, order)
+        assertMatricesClose(transformMath.multiply(local, targetParent[index]), world, 1.0e-7)
+        assert scale == pytest.approx([1.0, 1.0, 1.0])
+    # the filtered curves never wrap a full turn between frames
+    for axis in 'XYZ':
+        values = channels['rotate' + axis]
+        assert max(abs(b - a) for a, b in zip(values, values[1:])) < 180.0
+
+
+def test_targetsUnderOtherTargets():
+    """
+    Decomposing a child against its parent target's new world matrices keeps both offsets
+    """
+    generator = random.Random(7)
+    frames = list(range(60))
+    parentMatrices = animatedParent(generator, frames)
+    upperOffset = randomMatrix(generator)
+    lowerOffset = randomMatrix(generator)
+    upperWorld = [transformMath.multiply(upperOffset, parent) for parent in parentMatrices]
+    lowerWorld = [transformMath.multiply(lowerOffset, parent) for parent in parentMatrices]
+    upperChannels = transformMath.decomposeMatrices(upperWorld, rotateOrder=2)
+    upperLocal = [transformMath.composeMatrix([upperChannels['translate' + a][i] for a in 'XYZ'],
+                                              [upperChannels['rotate' + a][i] for a in 'XYZ'],
+                                              rotateOrder=2)
+                  for i in range(len(frames))]
+    lowerChannels = transformMath.decomposeMatrices(transformMath.localMatrices(lowerWorld, upperLocal),
+                                                    rotateOrder=4)
+    for i in range(len(frames)):
+        lowerLocal = transformMath.composeMatrix([lowerChannels['translate' + a][i] for a in 'XYZ'],
+                                                 [lowerChannels['rotate' + a][i] for a in 'XYZ'],
+                                                 rotateOrder=4)
+        world = transformMath.multiply(lowerLocal, upperLocal[i])
+        assertMatricesClose(world, lowerWorld[i], 1.0e-7)
+        relative = transformMath.multiply(world, transformMath.inverse(parentMatrices[i]))
+        assertMatricesClose(relative, lowerOffset, 1.0e-7)
+
+
+def test_getChannelFilter():
+    assert getChannelFilter(['tx', 'rotateY', 'sx', 'visibility']) == ['translateX', 'rotateY']
+    assert getChannelFilter(['rz', 'translateX', 'ty']) == ['translateX', 'translateY', 'rotateZ']
+    assert getChannelFilter(['sx']) == []
+    assert getChannelFilter([]) == []
@@ -0,0 +1,273 @@
+import json
+
+import pytest
+
+import apps.tb_controlShapes as controlShapes
+import apps.tb_nodeGraph as nodeGraph
+import apps.tb_tempControls as tempControls
+from apps.tb_controlShapes import ControlShapeLibrary
+
+
+class FakeNode(object):
+    def __init__(self, nodeType, parent=None):
+        self.nodeType = nodeType
+        self.parent = parent
+        self.name = nodeType
+
+    def __repr__(self):
+        return self.name
+
+
+class FakePlug(object):
+    def __init__(self, node, attribute):
+        self.node = node
+        self.attribute = attribute
+
+    def child(self, index):
+        return FakePlug(self.node, self.attribute + 'RGB'[index])
+
+    def __repr__(self):
+        return '%s.%s' % (self.node.name, self.attribute)
+
+
+class FakeModifier(object):
+    """
+    Records every operation, nothing happens until doIt
+    """
+
+    def __init__(self):
+        self.operations = list()
+        self.doIts = 0
+
+    def record(self, *operation):
+        self.operations.append(operation)
+
+    def createNode(self, nodeType, parent=None):
+        node = FakeNode(nodeType, parent)
+        self.record('createNode', nodeType)
+        return node
+
+    def renameNode(self, node, name):
+        node.name = name
+        self.record('renameNode', name)
+
+    def addAttribute(self, node, attribute):
+        self.record('addAttribute', node.name, attribute)
+
+    def newPlugValue(self, plug, value):
+        self.record('newPlugValue', repr(plug), value)
+
+    def newPlugValueBool(self, plug, value):
+        self.record('newPlugValue', repr(plug), value)
+
+    def newPlugValueInt(self, plug, value):
+        self.record('newPlugValue', repr(plug), value)
+
+    def newPlugValueDouble(self, plug, value):
+        self.record('newPlugValue', repr(plug), value)
+
+    def connect(self, source, destination):
+        self.record('connect', repr(source), repr(destination))
+
+    def commandToExecute(self, command):
+        self.record('commandToExecute', command)
+
+    def doIt(self):
+        self.doIts += 1
+        self.record('doIt')
+
+    def getOperations(self, name):
+        return [operation for operation in self.operations if operation[0] == name]
+
+
+class FakeNumericAttribute(object):
+    def create(self, longName, shortName, dataType, defaultValue):
+        self.longName = longName
+        self.defaultValue = defaultValue
+        self.minimum = self.maximum = None
+        return self
+
+    def setMin(self, value):
+        self.minimum = value
+
+    def setMax(self, value):
+        self.maximum = value
+
+    def __repr__(self):
+        return self.longName
+
+
+class FakeCurveData(object):
+    created = list()
+
+    def create(self):
+        return self
+
+
+class FakeNurbsCurve(object):
+    kOpen = 1
+    created = list()
+
+    def create(self, points, knots, degree, form, is2D, rational, data):
+        FakeNurbsCurve.created.append(points)
+        data.points = points
+        return data
+
+
+class FakeSelectionList(object):
+    def add(self, node):
+        self.node = FakeNode('transform')
+        self.node.name = node
+
+    def getDependNode(self, index):
+        return self.node
+
+
+class FakeDependencyNode(object):
+    def __init__(self, node):
+        self.node = node
+
+    def findPlug(self, attribute, wantNetworkedPlug):
+        return FakePlug(self.node, attribute)
+
+    def partialPathName(self):
+        return self.node.name
+
+
+class FakeMDGModifier(object):
+    @staticmethod
+    def createNode(modifier, nodeType):
+        return modifier.createNode(nodeType)
+
+
+class FakeOpenMaya(object):
+    MDGModifier = FakeMDGModifier
+    MFnDependencyNode = FakeDependencyNode
+    MFnDagNode = FakeDependencyNode
+    MFnNumericAttribute = FakeNumericAttribute
+    MFnNurbsCurveData = FakeCurveData
+    MFnNurbsCurve = FakeNurbsCurve
+    MSelectionList = FakeSelectionList
+
+    class MFnNumericData(object):
+        kFloat = 'float'
+
+    @staticmethod
+    def MPoint(x, y, z):
+        return x, y, z
+
+
+class CountingLibrary(ControlShapeLibrary):
+    parses = 0
+
+    def load(self):
+        if self.shapes is None:
+            CountingLibrary.parses += 1
+        return super(CountingLibrary, self).load()
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    path = tmp_path / 'controlShapes.json'
+    path.write_text(json.dumps({'pointLists': {'orb': [[0, 1, 0], [1, 0, 0], [0, 0, 1]],
+                                               'cross': [[1, 0, 0], [-1, 0, 0]],
+                                               'square': [[1, 2, 3], [4, 5, 6]]}}))
+    shapeLibrary = CountingLibrary(str(path), useSidecar=False)
+    monkeypatch.setattr(CountingLibrary, 'parses', 0)
+    monkeypatch.setattr(controlShapes, 'controlShapeLibrary', shapeLibrary)
+    monkeypatch.setattr(tempControls, 'om2', FakeOpenMaya)
+    monkeypatch.setattr(nodeGraph, 'om2', FakeOpenMaya)
+    monkeypatch.setattr(FakeNurbsCurve, 'created', list())
+    return shapeLibrary
+
+
+def makeSpecs(count, drawTypes=('orb',)):
+    return [{'name': 'ctrl%d' % index, 'suffix': 'temp', 'scale': 2.0, 'drawType': drawTypes[index % len(drawTypes)],
+             'color': (0.0, 1.0, 0.0)} for index in range(count)]
+
+
+@pytest.mark.parametrize('xRay', [False, True])
+def test_operationCount(library, xRay):
+    modifier = FakeModifier()
+    names = tempControls.createTempControls(makeSpecs(10), modifier, xRay=xRay)
+    assert names == ['ctrl%d_temp' % index for index in range(10)]
+    # everything goes through the one modifier, one doIt to create and one to set up
+    assert modifier.doIts == 2
+    nodesPerControl = 6 if xRay else 5
+    assert len(modifier.getOperations('createNode')) == 10 * nodesPerControl
+    assert len(modifier.getOperations('renameNode')) == 10 * nodesPerControl
+    assert len(modifier.getOperations('addAttribute')) == 10 * (3 if xRay else 2)
+    assert len(modifier.getOperations('commandToExecute')) == 10
+    perControl = dict((name, len(modifier.getOperations(name)) // 10)
+                      for name in ['newPlugValue', 'connect'])
+    assert perControl == ({'newPlugValue': 14, 'connect': 13} if xRay else {'newPlugValue': 10, 'connect': 7})
+    # nodes are all made before the first doIt
+    firstDoIt = modifier.operations.index(('doIt',))
+    assert all(operation[0] in ('createNode', 'renameNode', 'addAttribute')
+               for operation in modifier.operations[:firstDoIt])
+
+
+def test_shapeDataIsCached(library):
+    modifier = FakeModifier()
+    tempControls.createTempControls(makeSpecs(30, drawTypes=('orb', 'square')), modifier, unitScale=0.5)
+    # one curve per shape in the batch, one json parse
+    assert len(FakeNurbsCurve.created) == 2
+    assert CountingLibrary.parses == 1
+    assert library.misses == 2
+    tempControls.createTempControls(makeSpecs(30, drawTypes=('orb', 'square')), FakeModifier(), unitScale=0.5)
+    assert CountingLibrary.parses == 1
+    assert library.misses == 2
+    assert library.hits == 2
+    # every control of a shape shares the curve data
+    cached = [operation[2] for operation in modifier.getOperations('newPlugValue')
+              if operation[1].endswith('ShapeOrig.cached')]
+    assert len(cached) == 30
+    assert len(set(id(data) for data in cached)) == 2
+    assert cached[0].points == [(0.0, 0.5, 0.0), (0.5, 0.0, 0.0), (0.0, 0.0, 0.5)]
+
+
+def test_unknownShapesDrawACross(library):
+    tempControls.createTempControls(makeSpecs(1, drawTypes=('missing',)), FakeModifier())
+    assert FakeNurbsCurve.created == [[(1.0, 0.0, 0.0), (-1.0, 0.0, 0.0)]]
+
+
+def test_zUp(library):
+    modifier = FakeModifier()
+    specs = makeSpecs(1, drawTypes=('square',))
+    specs[0]['rotateOrder'] = 3
+    tempControls.createTempControls(specs, modifier, upAxis='z')
+    assert FakeNurbsCurve.created == [[(1.0, 3.0, 2.0), (4.0, 6.0, 5.0)]]
+    assert ('newPlugValue', 'ctrl0_temp.rotateOrder', tempControls.zUpRotateOrders[3]) in modifier.operations
+
+
+def test_valuesAndParents(library):
+    modifier = FakeModifier()
+    specs = makeSpecs(2)
+    specs[1]['parent'] = 'world_GRP'
+    tempControls.createTempControls(specs, modifier, lineWidth=3.0)
+    values = dict((operation[1], operation[2]) for operation in modifier.getOperations('newPlugValue'))
+    assert values['ctrl0_temp.drawScale'] == 2.0
+    assert values['ctrl0_temp.LineWidth'] == 3.0
+    assert values['ctrl0_tempShapeOrig.intermediateObject'] is True
+    assert [values['ctrl0_tempShape.overrideColorRGB' + channel] for channel in 'RGB'] == [0.0, 1.0, 0.0]
+    attributes = [operation[2] for operation in modifier.getOperations('addAttribute')]
+    assert (attributes[0].longName, attributes[0].minimum) == ('drawScale', 0.001)
+    assert (attributes[1].longName, attributes[1].maximum) == ('LineWidth', 10)
+
+
+def test_nulls(library):
+    modifier = FakeModifier()
+    names = tempControls.createTempNulls([{'name': 'a'}, {'name': 'b', 'suffix': None, 'parent': 'grp'}],
+                                         modifier)
+    assert names == ['a_baked', 'b']
+    assert modifier.doIts == 2
+    assert len(modifier.getOperations('createNode')) == 2
+    assert modifier.getOperations('newPlugValue') == [('newPlugValue', 'a_baked.rotateOrder', 2),
+                                                      ('newPlugValue', 'b.rotateOrder', 2)]
+
+
+def test_nothingToMake(library):
+    modifier = FakeModifier()
+    assert tempControls.createTempControls([], modifier) == []
+    assert tempControls.createTempNulls([], modifier) == []
+    assert modifier.operations == []
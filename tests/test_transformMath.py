@@ -0,0 +1,197 @@
+import math
+import random
+
+import pytest
+
+import apps.tb_transformMath as transformMath
+
+'''
+Reference maths written independently of tb_transformMath, rotations are built
+by rotating the basis vectors one axis at a time in the rotate order, which is
+what maya's row vector matrices do
+'''
+
+orderNames = ['xyz', 'yzx', 'zxy', 'xzy', 'yxz', 'zyx']
+
+
+def rotateVector(vector, axis, degrees):
+    angle = math.radians(degrees)
+    c, s = math.cos(angle), math.sin(angle)
+    x, y, z = vector
+    if axis == 'x':
+        return [x, y * c - z * s, y * s + z * c]
+    if axis == 'y':
+        return [x * c + z * s, y, -x * s + z * c]
+    return [x * c - y * s, x * s + y * c, z]
+
+
+def referenceRotation(rotate, order):
+    rows = list()
+    for basis in ([1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]):
+        for axis in order:
+            basis = rotateVector(basis, axis, rotate['xyz'.index(axis)])
+        rows.append(basis)
+    return rows
+
+
+def matrixFromRows(rows, translate=(0.0, 0.0, 0.0)):
+    result = list()
+    for row in rows:
+        result.extend(list(row) + [0.0])
+    return result + list(translate) + [1.0]
+
+
+def referenceMatrix(translate, rotate, scale, order, jointOrient=(0.0, 0.0, 0.0), rotateAxis=(0.0, 0.0, 0.0),
+                    rotatePivot=(0.0, 0.0, 0.0), scalePivot=(0.0, 0.0, 0.0)):
+    """
+    maya's transform matrix, SP^-1 * S * SP * RP^-1 * RA * R * JO * RP * T
+    """
+    def translation(t):
+        return matrixFromRows([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]], t)
+
+    chain = [translation([-x for x in scalePivot]),
+             matrixFromRows([[scale[0], 0.0, 0.0], [0.0, scale[1], 0.0], [0.0, 0.0, scale[2]]]),
+             translation(scalePivot),
+             translation([-x for x in rotatePivot]),
+             matrixFromRows(referenceRotation(rotateAxis, 'xyz')),
+             matrixFromRows(referenceRotation(rotate, order)),
+             matrixFromRows(referenceRotation(jointOrient, 'xyz')),
+             translation(rotatePivot),
+             translation(translate)]
+    result = chain[0]
+    for matrix in chain[1:]:
+        result = multiply(result, matrix)
+    return result
+
+
+def multiply(a, b):
+    return [sum(a[row * 4 + k] * b[k * 4 + col] for k in range(4)) for row in range(4) for col in range(4)]
+
+
+def assertMatricesClose(a, b, tolerance=1.0e-9):
+    assert max(abs(x - y) for x, y in zip(a, b)) < tolerance
+
+
+def randomRotation(generator, middleLimit=89.0):
+    return [generator.uniform(-179.0, 179.0), generator.uniform(-middleLimit, middleLimit),
+            generator.uniform(-179.0, 179.0)]
+
+
+def test_singleAxisMatchesMaya():
+    # maya's 90 degree x rotation sends y to z
+    matrix = transformMath.composeMatrix(rotate=(90.0, 0.0, 0.0))
+    assertMatricesClose(matrix[4:7], [0.0, 0.0, 1.0])
+    assertMatricesClose(matrix, referenceMatrix((0, 0, 0), (90.0, 0.0, 0.0), (1, 1, 1), 'xyz'))
+
+
+@pytest.mark.parametrize('rotateOrder', range(6))
+def test_composeMatchesReference(rotateOrder):
+    generator = random.Random(rotateOrder)
+    for x in range(50):
+        translate = [generator.uniform(-10, 10) for y in range(3)]
+        rotate = [generator.uniform(-360, 360) for y in range(3)]
+        scale = [generator.uniform(0.2, 3.0) for y in range(3)]
+        assertMatricesClose(transformMath.composeMatrix(translate, rotate, scale, rotateOrder=rotateOrder),
+                            referenceMatrix(translate, rotate, scale, orderNames[rotateOrder]))
+
+
+@pytest.mark.parametrize('rotateOrder', range(6))
+def test_decomposeRecoversChannels(rotateOrder):
+    generator = random.Random(10 + rotateOrder)
+    order = orderNames[rotateOrder]
+    for x in range(200):
+        translate = [generator.uniform(-10, 10) for y in range(3)]
+        scale = [generator.uniform(0.2, 3.0) for y in range(3)]
+        # keep the middle axis of the order inside +-90 so the euler is unique
+        rotate = [0.0, 0.0, 0.0]
+        for index, axis in enumerate(order):
+            limit = 89.0 if index == 1 else 179.0
+            rotate['xyz'.index(axis)] = generator.uniform(-limit, limit)
+        matrix = referenceMatrix(translate, rotate, scale, order)
+        resultTranslate, resultRotate, resultScale = transformMath.decomposeMatrix(matrix, rotateOrder=rotateOrder)
+        assertMatricesClose(resultTranslate, translate)
+        assertMatricesClose(resultRotate, rotate, 1.0e-7)
+        assertMatricesClose(resultScale, scale)
+
+
+@pytest.mark.parametrize('rotateOrder', range(6))
+def test_gimbalLockStillRebuildsTheMatrix(rotateOrder):
+    order = orderNames[rotateOrder]
+    rotate = [0.0, 0.0, 0.0]
+    rotate['xyz'.index(order[0])] = 30.0
+    rotate['xyz'.index(order[1])] = 90.0
+    rotate['xyz'.index(order[2])] = 20.0
+    matrix = referenceMatrix((0, 0, 0), rotate, (1, 1, 1), order)
+    translate, resultRotate, scale = transformMath.decomposeMatrix(matrix, rotateOrder=rotateOrder)
+    assertMatricesClose(referenceMatrix(translate, resultRotate, scale, order), matrix, 1.0e-7)
+
+
+@pytest.mark.parametrize('rotateOrder', range(6))
+def test_jointOrientRotateAxisAndPivots(rotateOrder):
+    generator = random.Random(20 + rotateOrder)
+    order = orderNames[rotateOrder]
+    for x in range(50):
+        kwargs = {'jointOrient': randomRotation(generator),
+                  'rotateAxis': randomRotation(generator),
+                  'rotatePivot': [generator.uniform(-2, 2) for y in range(3)],
+                  'scalePivot': [generator.uniform(-2, 2) for y in range(3)]}
+        translate = [generator.uniform(-10, 10) for y in range(3)]
+        rotate = randomRotation(generator)
+        scale = [generator.uniform(0.5, 2.0) for y in range(3)]
+        matrix = referenceMatrix(translate, rotate, scale, order, **kwargs)
+        resultTranslate, resultRotate, resultScale = transformMath.decomposeMatrix(matrix, rotateOrder=rotateOrder,
+                                                                                   **kwargs)
+        assertMatricesClose(referenceMatrix(resultTranslate, resultRotate, resultScale, order, **kwargs), matrix,
+                            1.0e-7)
+        assertMatricesClose(resultTranslate, translate, 1.0e-7)
+        assertMatricesClose(resultScale, scale, 1.0e-7)
+
+
+def test_negativeScaleIsPutOnX():
+    matrix = referenceMatrix((1, 2, 3), (10.0, 20.0, 30.0), (-1.0, 2.0, 3.0), 'xyz')
+    translate, rotate, scale = transformMath.decomposeMatrix(matrix)
+    assertMatricesClose(scale, [-1.0, 2.0, 3.0])
+    assertMatricesClose(rotate, [10.0, 20.0, 30.0], 1.0e-7)
+
+
+def test_inverse():
+    generator = random.Random(4)
+    for x in range(20):
+        matrix = referenceMatrix([generator.uniform(-5, 5) for y in range(3)], randomRotation(generator),
+                                 [generator.uniform(0.5, 2) for y in range(3)], 'zxy')
+        assertMatricesClose(transformMath.multiply(matrix, transformMath.inverse(matrix)), transformMath.identity)
+    with pytest.raises(ValueError):
+        transformMath.inverse([0.0] * 16)
+
+
+def test_localMatricesKeepTheWorldPose():
+    generator = random.Random(6)
+    worlds = [referenceMatrix([generator.uniform(-5, 5) for y in range(3)], randomRotation(generator), (1, 1, 1),
+                              'xyz') for x in range(20)]
+    parents = [referenceMatrix([generator.uniform(-5, 5) for y in range(3)], randomRotation(generator),
+                               (2, 2, 2), 'yzx') for x in range(20)]
+    for local, world, parent in zip(transformMath.localMatrices(worlds, parents), worlds, parents):
+        assertMatricesClose(transformMath.multiply(local, parent), world)
+
+
+@pytest.mark.parametrize('rotateOrder', range(6))
+def test_unwrappedRotationsAreContinuous(rotateOrder):
+    order = orderNames[rotateOrder]
+    matrices = list()
+    expected = list()
+    for frame in range(100):
+        rotate = [frame * 7.0, frame * 3.0 - 150.0, frame * -5.0]
+        expected.append(rotate)
+        matrices.append(referenceMatrix((0, 0, 0), rotate, (1, 1, 1), order))
+    channels = transformMath.decomposeMatrices(matrices, rotateOrder=rotateOrder)
+    rotates = list(zip(channels['rotateX'], channels['rotateY'], channels['rotateZ']))
+    for previous, current in zip(rotates, rotates[1:]):
+        assert max(abs(a - b) for a, b in zip(previous, current)) < 20.0
+    for rotate, matrix in zip(rotates, matrices):
+        assertMatricesClose(referenceMatrix((0, 0, 0), rotate, (1, 1, 1), order), matrix, 1.0e-7)
+
+
+def test_closestEulerPicksTheNearestEquivalent():
+    assertMatricesClose(transformMath.closestEuler([-170.0, 0.0, 0.0], [175.0, 0.0, 0.0]), [190.0, 0.0, 0.0])
+    flipped = transformMath.closestEuler([180.0, 179.0, 180.0], [0.0, 0.0, 0.0])
+    assertMatricesClose(flipped, [0.0, 1.0, 0.0], 1.0e-9)
@@ -0,0 +1,247 @@
+import random
+
+import pytest
+
+import apps.tb_visibility as visibility
+from apps.tb_visibility import getParentPath, getAncestorPaths, VisibilityResolver
+
+
+class FakeScene(object):
+    """
+    Dag paths with visibility, draw overrides and display layers, standing in for
+    both maya.cmds and OpenMaya, every query is counted
+    """
+
+    def __init__(self):
+        self.calls = dict()
+        self.nodes = dict()
+        self.layers = dict()
+
+    def count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def addNode(self, path, visible=True, overrideEnabled=False, overrideVisibility=True):
+        self.nodes[path] = {'visibility': visible,
+                            'overrideEnabled': overrideEnabled,
+                            'overrideVisibility': overrideVisibility}
+
+    def addLayer(self, name, members, visible=True):
+        self.layers[name] = (list(members), visible)
+
+    # cmds
+    def ls(self, *args, **kwargs):
+        self.count('ls')
+        if kwargs.get('type') == 'displayLayer':
+            return list(self.layers.keys())
+        return [node for node in args[0] if node in self.nodes]
+
+    def getAttr(self, attribute):
+        self.count('getAttr')
+        layer = attribute.split('.')[0]
+        return self.layers[layer][1]
+
+    def editDisplayLayerMembers(self, layer, query=True, fullNames=True):
+        self.count('editDisplayLayerMembers')
+        return list(self.layers[layer][0])
+
+    # om2
+    def MSelectionList(self):
+        return FakeSelectionList(self)
+
+    def MFnDagNode(self, node):
+        return FakeDagNode(self, node)
+
+    def isVisible(self, path):
+        """
+        What the old per mesh walk up the parents worked out
+        """
+        while path:
+            node = self.nodes[path]
+            if not node['visibility']:
+                return False
+            if node['overrideEnabled'] and not node['overrideVisibility']:
+                return False
+            for members, visible in self.layers.values():
+                if not visible and path in members:
+                    return False
+            path = getParentPath(path)
+        return True
+
+
+class FakeSelectionList(object):
+    def __init__(self, scene):
+        self.scene = scene
+        self.items = list()
+
+    def add(self, path):
+        self.scene.count('add')
+        if path not in self.scene.nodes:
+            raise RuntimeError('No object matches name: %s' % path)
+        self.items.append(path)
+
+    def getDependNode(self, index):
+        return self.items[index]
+
+
+class FakeDagNode(object):
+    def __init__(self, scene, path):
+        self.scene = scene
+        self.path = path
+
+    def findPlug(self, attribute, wantNetworkedPlug):
+        self.scene.count('findPlug')
+        return FakePlug(self.scene.nodes[self.path][attribute])
+
+
+class FakePlug(object):
+    def __init__(self, value):
+        self.value = value
+
+    def asBool(self):
+        return self.value
+
+
+@pytest.fixture
+def scene(monkeypatch):
+    fake = FakeScene()
+    monkeypatch.setattr(visibility, 'cmds', fake)
+    monkeypatch.setattr(visibility, 'om2', fake)
+    return fake
+
+
+def makeRig(scene, characters=3, limbs=4, meshesPerLimb=5):
+    """
+    |charN|geo|limbN|meshN, returns the mesh paths
+    """
+    meshes = list()
+    for character in range(characters):
+        root = '|char%d' % character
+        scene.addNode(root)
+        scene.addNode(root + '|geo')
+        for limb in range(limbs):
+            limbPath = '%s|geo|limb%d' % (root, limb)
+            scene.addNode(limbPath)
+            for mesh in range(meshesPerLimb):
+                meshPath = '%s|mesh%d' % (limbPath, mesh)
+                scene.addNode(meshPath)
+                meshes.append(meshPath)
+    return meshes
+
+
+def test_getParentPath():
+    assert getParentPath('|a|b|c') == '|a|b'
+    assert getParentPath('|a') is None
+    assert getParentPath('a') is None
+
+
+def test_getAncestorPaths():
+    paths = getAncestorPaths(['|a|b|c', '|a|b|d', '|e'])
+    assert sorted(paths) == ['|a', '|a|b', '|a|b|c', '|a|b|d', '|e']
+    for path in paths:
+        parent = getParentPath(path)
+        if parent:
+            assert paths.index(parent) < paths.index(path)
+
+
+def test_resolver():
+    resolver = VisibilityResolver({'|a': True, '|a|b': False, '|a|b|c': True, '|a|d': True},
+                                  hiddenByLayer={'|a|d|e'},
+                                  overrides={'|a|f': False})
+    assert resolver.isVisible('|a')
+    assert not resolver.isVisible('|a|b')
+    assert not resolver.isVisible('|a|b|c')
+    assert resolver.isVisible('|a|d')
+    assert not resolver.isVisible('|a|d|e')
+    assert not resolver.isVisible('|a|f|g')
+    # missing values count as visible
+    assert resolver.isVisible('|x|y')
+
+
+def test_resolverOnlyResolvesEachPathOnce():
+    class CountingResolver(VisibilityResolver):
+        checks = 0
+
+        def isLocallyVisible(self, path):
+            CountingResolver.checks += 1
+            return super(CountingResolver, self).isLocallyVisible(path)
+
+    paths = ['|root|a%d|b%d' % (a, b) for a in range(10) for b in range(10)]
+    allPaths = getAncestorPaths(paths)
+    resolver = CountingResolver(dict((path, True) for path in allPaths))
+    for x in range(3):
+        assert all(resolver.isVisible(path) for path in paths)
+    assert CountingResolver.checks == len(allPaths)
+
+
+def test_sharedAncestorsAreReadOnce(scene):
+    meshes = makeRig(scene)
+    resolver = visibility.getVisibilityResolver(meshes)
+    assert all(resolver.isVisible(mesh) for mesh in meshes)
+    nodeCount = len(scene.nodes)
+    assert nodeCount < len(meshes) * 4
+    # one lookup and two plug reads per node, not per mesh per ancestor
+    assert scene.calls['add'] == nodeCount
+    assert scene.calls['findPlug'] == nodeCount * 2
+    # one display layer listing, no layers to check
+    assert scene.calls['ls'] == 1
+    assert 'getAttr' not in scene.calls
+
+
+def test_queriesDontGrowWithSharedMeshes(scene):
+    meshes = makeRig(scene, characters=1, limbs=1, meshesPerLimb=1)
+    visibility.getVisibilityResolver(meshes)
+    fewMeshes = dict(scene.calls)
+    scene.calls = dict()
+    for mesh in range(1, 200):
+        scene.addNode('|char0|geo|limb0|mesh%d' % mesh)
+    visibility.getVisibilityResolver([path for path in scene.nodes if '|mesh' in path])
+    # only the new meshes add queries
+    assert scene.calls['add'] - fewMeshes['add'] == 199
+    assert scene.calls['ls'] == fewMeshes['ls']
+
+
+def test_layerQueries(scene):
+    meshes = makeRig(scene, characters=2)
+    scene.addLayer('hiddenLayer', ['|char0|geo|limb1'], visible=False)
+    scene.addLayer('shownLayer', ['|char1|geo'], visible=True)
+    scene.addLayer('hiddenMeshes', ['|char1|geo|limb2|mesh0', '|char1|geo|limb3|mesh3'], visible=False)
+    resolver = visibility.getVisibilityResolver(meshes)
+    assert scene.calls['getAttr'] == 3
+    # membership is only queried for hidden layers
+    assert scene.calls['editDisplayLayerMembers'] == 2
+    for mesh in meshes:
+        assert resolver.isVisible(mesh) == scene.isVisible(mesh)
+    assert not resolver.isVisible('|char0|geo|limb1|mesh4')
+    assert resolver.isVisible('|char0|geo|limb2|mesh4')
+    assert not resolver.isVisible('|char1|geo|limb2|mesh0')
+
+
+def test_drawOverrides(scene):
+    meshes = makeRig(scene, characters=1, limbs=2, meshesPerLimb=2)
+    scene.addNode('|char0|geo|limb0', overrideEnabled=True, overrideVisibility=False)
+    scene.addNode('|char0|geo|limb1|mesh1', overrideEnabled=False, overrideVisibility=False)
+    resolver = visibility.getVisibilityResolver(meshes)
+    assert [resolver.isVisible(mesh) for mesh in meshes] == [False, False, True, True]
+    # overrideVisibility is only read where overrides are on
+    assert scene.calls['findPlug'] == len(scene.nodes) * 2 + 1
+
+
+def test_randomHierarchiesMatchTheWalk(scene):
+    generator = random.Random(4)
+    paths = ['|root']
+    scene.addNode('|root')
+    for index in range(500):
+        path = '%s|n%d' % (generator.choice(paths), index)
+        paths.append(path)
+        scene.addNode(path,
+                      visible=generator.random() > 0.05,
+                      overrideEnabled=generator.random() > 0.9,
+                      overrideVisibility=generator.random() > 0.5)
+    scene.addLayer('hidden', generator.sample(paths, 10), visible=False)
+    scene.addLayer('shown', generator.sample(paths, 10), visible=True)
+    leaves = generator.sample(paths, 200)
+    resolver = visibility.getVisibilityResolver(leaves)
+    assert [resolver.isVisible(leaf) for leaf in leaves] == [scene.isVisible(leaf) for leaf in leaves]
+    assert scene.calls['add'] == len(getAncestorPaths(leaves))
+    assert any(resolver.isVisible(leaf) for leaf in leaves)
+    assert not all(resolver.isVisible(leaf) for leaf in leaves)